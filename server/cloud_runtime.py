@@ -48,6 +48,16 @@ def voice_playback_enabled() -> bool:
     return _read_bool("GTS_ENABLE_VOICE_PLAYBACK", not is_cloud_mode())
 
 
+def query_time_budget_seconds() -> float:
+    """Per-request budget for keyword queries; 0 disables it. Defaults to 3 s in cloud mode."""
+    default = 3000 if is_cloud_mode() else 0
+    try:
+        value = int(os.environ.get("GTS_QUERY_TIME_BUDGET_MS", "").strip() or default)
+    except ValueError:
+        value = default
+    return max(0, value) / 1000
+
+
 def trusted_proxy_enabled() -> bool:
     return _read_bool("GTS_TRUST_PROXY", False)
 
@@ -1,14 +1,17 @@
 import os
 import sqlite3
+import sys
 import importlib
+import ipaddress
 import time
-from flask import Blueprint, current_app, request, jsonify
+from flask import Blueprint, current_app, g, request, jsonify
 
 from cloud_runtime import (
     cloud_feature_forbidden,
     is_cloud_mode,
     local_features_enabled,
     public_runtime_payload,
+    query_time_budget_seconds,
     settings_writable,
     voice_playback_enabled,
 )
@@ -18,7 +21,9 @@ from utils.browser_session import (
     touch_browser_client,
 )
 from utils.helpers import getLangFromRequest, normalizeSearchTerm, getLanguageName
+from utils import query_budget
 from utils.cache import search_cache
+from utils.sql_profiler import profiling_enabled as sql_profiling_enabled, sql_profiler
 
 _controllers_module = None
 _database_helper_module = None
@@ -113,6 +118,76 @@ def get_lang_id(lang_code: str) -> int:
 api_bp = Blueprint('api', __name__)
 
 
+@api_bp.before_request
+def _sync_data_generation():
+    """
+    数据库被 diffUpdate 更新后，按数据代数整体失效各级缓存；
+    数据库模块尚未加载时不存在可失效的缓存，也不为此触发加载
+    """
+    database_helper = _database_helper_module or sys.modules.get("databaseHelper")
+    if database_helper is None:
+        return None
+    search_cache.sync_generation(database_helper.syncDataGeneration())
+    return None
+
+
+@api_bp.before_request
+def _begin_sql_profile():
+    """
+    开启 GTS_SQL_PROFILE 时，把本次请求内执行的 SQL 语句数与耗时归到该请求名下
+    """
+    if sql_profiling_enabled():
+        g.sql_profile_token = sql_profiler.begin_request(request.method, request.path)
+    return None
+
+
+@api_bp.after_request
+def _end_sql_profile(response):
+    token = g.pop("sql_profile_token", None)
+    if token is None:
+        return response
+    summary = sql_profiler.end_request(token)
+    if summary is not None:
+        response.headers["Server-Timing"] = (
+            f'sql;dur={summary["sqlMs"]};desc="{summary["statements"]} statements"'
+        )
+    return response
+
+
+@api_bp.before_request
+def _begin_query_budget():
+    """
+    为本次请求设定关键词查询的时间预算（云端模式默认开启），超时的查询被中断并降级为截断结果
+    """
+    g.query_budget_token = query_budget.begin(query_time_budget_seconds())
+    return None
+
+
+@api_bp.after_request
+def _end_query_budget(response):
+    query_budget.end(g.pop("query_budget_token", None))
+    return response
+
+
+def _mark_truncated(data: dict, shown: int | None = None) -> dict:
+    """
+    有查询因时间预算被中断时标记 truncated；total 至少覆盖已返回的条目，视为近似值
+    """
+    if not query_budget.is_truncated():
+        return data
+    data["truncated"] = True
+    if shown is not None and "total" in data:
+        data["total"] = max(int(data["total"] or 0), shown)
+    return data
+
+
+def _is_loopback_request() -> bool:
+    try:
+        return ipaddress.ip_address(request.remote_addr or "").is_loopback
+    except ValueError:
+        return False
+
+
 def _get_browser_client_id() -> str:
     payload = request.get_json(silent=True)
     if isinstance(payload, dict):
@@ -203,8 +278,11 @@ def search_text():
         'results': results
     }
 
-    # 缓存结果
-    search_cache.set(cache_key, response)
+    # 缓存结果；因时间预算被截断的结果只返回不缓存
+    if query_budget.is_truncated():
+        response['truncated'] = True
+    else:
+        search_cache.set(cache_key, response)
 
     return jsonify(response)
 
@@ -245,8 +323,11 @@ def search_voice():
         'results': results
     }
 
-    # 缓存结果
-    search_cache.set(cache_key, response)
+    # 缓存结果；因时间预算被截断的结果只返回不缓存
+    if query_budget.is_truncated():
+        response['truncated'] = True
+    else:
+        search_cache.set(cache_key, response)
 
     return jsonify(response)
 
@@ -375,6 +456,39 @@ def get_languages_api():
     return jsonify(languages)
 
 
+@api_bp.route('/api/cacheStats', methods=['GET'])
+def get_cache_stats_api():
+    """
+    查看搜索缓存各命名空间的占用与命中/淘汰统计
+    """
+    return jsonify({
+        "data": search_cache.stats(),
+        "code": 200,
+        "msg": "ok"
+    })
+
+
+@api_bp.route('/api/runtime/sqlProfile', methods=['GET', 'DELETE'])
+def get_sql_profile_api():
+    """
+    查看 SQL 剖析数据（最近请求的语句数/耗时与最慢的归一化语句），DELETE 清空；
+    只对本机请求开放，云端模式下禁用
+    """
+    if not local_features_enabled():
+        return cloud_feature_forbidden("SQL profiling")
+    if not _is_loopback_request():
+        response = jsonify({"data": None, "code": 403, "msg": "SQL profiling is only available locally"})
+        response.status_code = 403
+        return response
+    if request.method == "DELETE":
+        sql_profiler.reset()
+    return jsonify({
+        "data": sql_profiler.snapshot(),
+        "code": 200,
+        "msg": "ok"
+    })
+
+
 # ----------------------------
 # Startup / Settings APIs
 # ----------------------------
@@ -551,7 +665,9 @@ def getAvailableVersionFilters():
 def keywordQuery():
     import time
 
-    langCode = int(request.json["langCode"])
+    # 传 langCodes 时为多语言模式，不再需要 langCode
+    langCodes = request.json.get("langCodes")
+    langCode = int(request.json["langCode"]) if langCodes is None else None
     keyword: str = request.json["keyword"]
     speaker = request.json.get("speaker")
     createdVersion = request.json.get("createdVersion")
@@ -574,14 +690,83 @@ def keywordQuery():
     has_source_type = sourceType and str(sourceType).strip() != ""
     has_voice_filter = voiceFilter in ("with", "without")
     if not has_keyword and not has_speaker and not has_created and not has_updated and not has_source_type and not has_voice_filter:
+        empty = {
+            "contents": [],
+            "total": 0,
+            "page": page,
+            "pageSize": pageSize,
+            "time": 0
+        }
+        if langCodes is not None:
+            empty["results"] = []
         return jsonify({
-            "data": {
-                "contents": [],
-                "total": 0,
+            "data": empty,
+            "code": 200,
+            "msg": "ok"
+        })
+
+    if langCodes is not None:
+        # 多语言模式：同一关键词按多种搜索语言并行检索，结果按语言分组
+        try:
+            langCodes = [int(code) for code in langCodes] if isinstance(langCodes, list) else []
+        except (TypeError, ValueError):
+            langCodes = []
+        if not langCodes:
+            return jsonify({"data": None, "code": 400, "msg": "Invalid langCodes"})
+        start = time.time()
+        results = _get_controllers().getTranslateObjMultiLang( # type: ignore
+            keyword,
+            langCodes,
+            speaker,
+            page=page,
+            page_size=pageSize,
+            voice_filter=voiceFilter,
+            created_version=createdVersion,
+            updated_version=updatedVersion,
+            source_type=sourceType,
+        )
+        end = time.time()
+
+        return jsonify({
+            "data": _mark_truncated({
+                "results": results,
                 "page": page,
                 "pageSize": pageSize,
-                "time": 0
-            },
+                "time": (end - start) * 1000
+            }),
+            "code": 200,
+            "msg": "ok"
+        })
+
+    if "cursor" in request.json:
+        # 游标分页：cursor 为空字符串表示第一页，之后传回上一页返回的 nextCursor
+        controllers = _get_controllers()
+        cursor_error = getattr(controllers, "InvalidSearchCursorError", ValueError)
+        start = time.time()
+        try:
+            contents, total, next_cursor = controllers.getTranslateObjByCursor( # type: ignore
+                keyword,
+                langCode,
+                speaker,
+                cursor=request.json.get("cursor") or None,
+                page_size=pageSize,
+                voice_filter=voiceFilter,
+                created_version=createdVersion,
+                updated_version=updatedVersion,
+                source_type=sourceType,
+            )
+        except cursor_error as e:
+            return jsonify({"data": None, "code": 400, "msg": str(e)})
+        end = time.time()
+
+        return jsonify({
+            "data": _mark_truncated({
+                "contents": contents,
+                "total": total,
+                "pageSize": pageSize,
+                "nextCursor": next_cursor,
+                "time": (end - start) * 1000
+            }, shown=len(contents)),
             "code": 200,
             "msg": "ok"
         })
@@ -601,17 +786,100 @@ def keywordQuery():
     end = time.time()
 
     return jsonify({
-        "data": {
+        "data": _mark_truncated({
             "contents": contents,
             "total": total,
             "page": page,
             "pageSize": pageSize,
             "time": (end - start) * 1000
-        },
+        }, shown=(page - 1) * pageSize + len(contents)),
+        "code": 200,
+        "msg": "ok"
+    })
+
+
+@api_bp.route("/api/keywordFacets", methods=["POST"])
+def keywordFacets():
+    """
+    关键词的分面计数（来源、主来源类别、有无语音、创建版本），供前端展示筛选项数量
+    """
+    import time
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        langCode = int(payload["langCode"])
+    except Exception:
+        return jsonify({"data": None, "code": 400, "msg": "Invalid langCode"})
+    keyword = str(payload.get("keyword") or "")
+    if keyword.strip() == "":
+        return jsonify({"data": None, "code": 400, "msg": "Keyword is required"})
+
+    start = time.time()
+    facets = _get_controllers().getKeywordFacets( # type: ignore
+        keyword,
+        langCode,
+        created_version=payload.get("createdVersion"),
+        updated_version=payload.get("updatedVersion"),
+    )
+    end = time.time()
+
+    return jsonify({
+        "data": _mark_truncated({**facets, "time": (end - start) * 1000}),
         "code": 200,
         "msg": "ok"
     })
 
+
+@api_bp.route("/api/keywordExport", methods=["POST"])
+def keywordExport():
+    """
+    以 NDJSON 流式导出关键词的全部匹配，每行一条结果；
+    服务端只执行一次查询并分批水合，不受结果总数影响
+    """
+    import json
+    from flask import Response, stream_with_context
+
+    if not local_features_enabled():
+        return cloud_feature_forbidden("Keyword export")
+
+    payload = request.get_json(silent=True) or {}
+    try:
+        langCode = int(payload["langCode"])
+    except Exception:
+        return jsonify({"data": None, "code": 400, "msg": "Invalid langCode"})
+    keyword = str(payload.get("keyword") or "")
+    if keyword.strip() == "":
+        return jsonify({"data": None, "code": 400, "msg": "Keyword is required"})
+
+    langs = payload.get("langs")
+    try:
+        langs = [int(lang) for lang in langs] if langs else None
+    except (TypeError, ValueError):
+        return jsonify({"data": None, "code": 400, "msg": "Invalid langs"})
+    voiceFilter = payload.get("voiceFilter", "all")
+    if voiceFilter not in ("all", "with", "without"):
+        voiceFilter = "all"
+
+    rows = _get_controllers().iterKeywordExport( # type: ignore
+        keyword,
+        langCode,
+        langs,
+        voice_filter=voiceFilter,
+        created_version=payload.get("createdVersion"),
+        updated_version=payload.get("updatedVersion"),
+    )
+
+    def generate():
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=keyword-export.ndjson"},
+    )
+
+
 @api_bp.route("/api/getVoiceOver", methods=["POST"])
 def getVoiceOver():
     from flask import send_file, make_response
@@ -1,18 +1,47 @@
+import base64
+import contextvars
+import copy
 import io
 import json
 import math
 import os
 import re
+import threading
 import unicodedata
 import zlib
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
 from typing import TypedDict
 
 import databaseHelper
 import languagePackReader
 import config
 import placeholderHandler
-from utils.cache import search_cache
+from utils import query_budget
+from utils.cache import search_cache, single_flight
+
+def _generation_scoped_cache(maxsize: int):
+    """
+    代替 lru_cache + single_flight，用于依赖数据库内容的缓存：键里并入当前数据代数，
+    代数变化前开始、变化后才写入的结果落在旧代数的键下，之后的请求不会命中
+    """
+    def decorate(func):
+        @lru_cache(maxsize=maxsize)
+        @single_flight
+        @wraps(func)
+        def cached(_generation, *args, **kwargs):
+            return func(*args, **kwargs)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached(databaseHelper.getAppliedDataGeneration(), *args, **kwargs)
+
+        wrapper.__wrapped__ = cached
+        wrapper.cache_clear = cached.cache_clear
+        wrapper.cache_info = cached.cache_info
+        return wrapper
+    return decorate
+
 
 _QUEST_SOURCE_TYPE_LABELS = {
     "AQ": "魔神任务",
@@ -26,7 +55,7 @@ _QUEST_SOURCE_TYPE_LABELS = {
 }
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_dialogue_by_talker_keyword_cached(
     speaker_keyword: str,
     lang_code: int,
@@ -41,7 +70,7 @@ def _count_dialogue_by_talker_keyword_cached(
     )
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_dialogue_by_talker_type_cached(
     talker_type: str,
     created_version: str | None,
@@ -54,7 +83,7 @@ def _count_dialogue_by_talker_type_cached(
     )
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_dialogue_by_talker_and_keyword_cached(
     speaker_keyword: str,
     keyword: str,
@@ -71,7 +100,7 @@ def _count_dialogue_by_talker_and_keyword_cached(
     )
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_dialogue_by_talker_type_and_keyword_cached(
     talker_type: str,
     keyword: str,
@@ -88,7 +117,7 @@ def _count_dialogue_by_talker_type_and_keyword_cached(
     )
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_fetter_by_speaker_and_keyword_cached(
     speaker_keyword: str,
     keyword: str,
@@ -105,7 +134,7 @@ def _count_fetter_by_speaker_and_keyword_cached(
     )
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_fetter_by_speaker_keyword_cached(
     speaker_keyword: str,
     lang_code: int,
@@ -120,7 +149,7 @@ def _count_fetter_by_speaker_keyword_cached(
     )
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_story_by_speaker_keyword_cached(
     speaker_keyword: str,
     lang_code: int,
@@ -135,7 +164,7 @@ def _count_story_by_speaker_keyword_cached(
     )
 
 
-@lru_cache(maxsize=1024)
+@_generation_scoped_cache(maxsize=1024)
 def _count_story_by_speaker_and_keyword_cached(
     speaker_keyword: str,
     keyword: str,
@@ -152,7 +181,62 @@ def _count_story_by_speaker_and_keyword_cached(
     )
 
 
-@lru_cache(maxsize=2048)
+class _UncacheableResult(Exception):
+    def __init__(self, value, budget):
+        super().__init__()
+        self.value = value
+        self.budget = budget
+
+
+def _query_budget_aware_cache(maxsize: int):
+    """
+    代替 lru_cache + single_flight，用于受请求时间预算约束的关键词计数：
+    计算期间有查询被预算中断时，降级结果照常返回但不写入缓存，下次请求重新计算；
+    与 _generation_scoped_cache 一样在键里并入数据代数
+    """
+    def decorate(func):
+        @lru_cache(maxsize=maxsize)
+        @single_flight
+        @wraps(func)
+        def cached(_generation, *args):
+            budget = query_budget.current_budget()
+            interruptions = budget.interruptions if budget is not None else 0
+            value = func(*args)
+            if budget is not None and budget.interruptions != interruptions:
+                raise _UncacheableResult(value, budget)
+            return value
+
+        @wraps(func)
+        def wrapper(*args):
+            try:
+                return cached(databaseHelper.getAppliedDataGeneration(), *args)
+            except _UncacheableResult as exc:
+                # 合并等待的其他请求拿到的是同一份降级结果，也要标记为截断
+                budget = query_budget.current_budget()
+                if budget is not None and budget is not exc.budget:
+                    budget.record_interruption()
+                return exc.value
+
+        wrapper.__wrapped__ = cached
+        wrapper.cache_clear = cached.cache_clear
+        wrapper.cache_info = cached.cache_info
+        return wrapper
+    return decorate
+
+
+def _result_is_complete(_value) -> bool:
+    # 本次请求有查询因时间预算被中断时，结果是降级的，不写入搜索缓存
+    return not query_budget.is_truncated()
+
+
+def _mark_shared_result_truncated() -> None:
+    # 合并等待的请求共享了被预算截断的结果，自身也要标记为截断
+    budget = query_budget.current_budget()
+    if budget is not None:
+        budget.record_interruption()
+
+
+@_query_budget_aware_cache(maxsize=2048)
 def _count_textmap_from_keyword_cached(
     keyword: str,
     lang_code: int,
@@ -167,7 +251,7 @@ def _count_textmap_from_keyword_cached(
     )
 
 
-@lru_cache(maxsize=2048)
+@_query_budget_aware_cache(maxsize=2048)
 def _count_textmap_from_keyword_voice_cached(
     keyword: str,
     lang_code: int,
@@ -184,7 +268,7 @@ def _count_textmap_from_keyword_voice_cached(
     )
 
 
-@lru_cache(maxsize=2048)
+@_query_budget_aware_cache(maxsize=2048)
 def _count_readable_from_keyword_cached(
     keyword: str,
     lang_code: int,
@@ -201,7 +285,7 @@ def _count_readable_from_keyword_cached(
     )
 
 
-@lru_cache(maxsize=2048)
+@_query_budget_aware_cache(maxsize=2048)
 def _count_subtitle_from_keyword_cached(
     keyword: str,
     lang_code: int,
@@ -216,6 +300,32 @@ def _count_subtitle_from_keyword_cached(
     )
 
 
+_DATA_GENERATION_SCOPED_CACHES = (
+    _count_dialogue_by_talker_keyword_cached,
+    _count_dialogue_by_talker_type_cached,
+    _count_dialogue_by_talker_and_keyword_cached,
+    _count_dialogue_by_talker_type_and_keyword_cached,
+    _count_fetter_by_speaker_and_keyword_cached,
+    _count_fetter_by_speaker_keyword_cached,
+    _count_story_by_speaker_keyword_cached,
+    _count_story_by_speaker_and_keyword_cached,
+    _count_textmap_from_keyword_cached,
+    _count_textmap_from_keyword_voice_cached,
+    _count_readable_from_keyword_cached,
+    _count_subtitle_from_keyword_cached,
+)
+
+
+def _clear_data_generation_scoped_caches() -> None:
+    # 键里已并入数据代数，旧代数的条目不会再命中，这里只是及时释放它们
+    for cached_fn in _DATA_GENERATION_SCOPED_CACHES:
+        cached_fn.cache_clear()
+    _load_entity_readable_lookup.cache_clear()
+
+
+databaseHelper.addDataGenerationListener(_clear_data_generation_scoped_caches)
+
+
 class AssetDirDialogUnavailableError(RuntimeError):
     """Raised when the native asset-directory picker cannot be opened."""
 
@@ -647,7 +757,7 @@ class _EntityReadableLookup(TypedDict):
     item_desc_hash_by_item_id: dict[int, int]
 
 
-@lru_cache(maxsize=1)
+@_generation_scoped_cache(maxsize=1)
 def _load_entity_readable_lookup() -> _EntityReadableLookup:
     asset_dir = str(config.getAssetDir() or "").strip()
     candidate_roots = [asset_dir]
@@ -1316,8 +1426,36 @@ def _build_entity_detail_payload(
     }
 
 
-def _select_primary_source_from_text_hash(text_hash: int, lang_code: int) -> tuple[dict, str, bool, int]:
-    talk_info = databaseHelper.getTalkInfo(text_hash)
+_PRIMARY_SOURCE_KIND_ORDER = ("dialogue", "voice", "story", "quest", "entity", "readable")
+
+
+def _primary_source_start_index(text_hash: int, source_kinds: dict[int, str] | None) -> int:
+    """
+    text_primary_source 记录了第一个可能命中的来源，排在它前面的来源必然落空，可直接跳过。
+    表缺失（source_kinds 为 None）时从头级联；表中没有该 hash 时直接落到未归类文本。
+    """
+    if source_kinds is None:
+        return 0
+    source_kind = source_kinds.get(int(text_hash))
+    if source_kind is None:
+        return len(_PRIMARY_SOURCE_KIND_ORDER)
+    if source_kind not in _PRIMARY_SOURCE_KIND_ORDER:
+        return 0
+    return _PRIMARY_SOURCE_KIND_ORDER.index(source_kind)
+
+
+def _select_primary_source_from_text_hash(
+    text_hash: int,
+    lang_code: int,
+    start_index: int | None = None,
+) -> tuple[dict, str, bool, int]:
+    if start_index is None:
+        start_index = _primary_source_start_index(
+            text_hash,
+            databaseHelper.selectPrimarySourceKinds([text_hash]),
+        )
+
+    talk_info = databaseHelper.getTalkInfo(text_hash) if start_index <= 0 else None
     if talk_info is not None:
         talk_id, talker_type, talker_id, coop_quest_id = talk_info
         talker_name = databaseHelper.getTalkerName(talker_type, talker_id, lang_code)
@@ -1336,7 +1474,7 @@ def _select_primary_source_from_text_hash(text_hash: int, lang_code: int) -> tup
         )
         return primary, origin, True, 1
 
-    fetter_origin = databaseHelper.getSourceFromFetter(text_hash, lang_code)
+    fetter_origin = databaseHelper.getSourceFromFetter(text_hash, lang_code) if start_index <= 1 else None
     if fetter_origin is not None:
         primary = _build_primary_source(
             "voice",
@@ -1346,11 +1484,11 @@ def _select_primary_source_from_text_hash(text_hash: int, lang_code: int) -> tup
         )
         return primary, fetter_origin, False, 1
 
-    story_source = _select_story_source_from_text_hash(text_hash, lang_code)
+    story_source = _select_story_source_from_text_hash(text_hash, lang_code) if start_index <= 2 else None
     if story_source is not None:
         return story_source
 
-    quest_sources = databaseHelper.selectQuestHashSources(text_hash)
+    quest_sources = databaseHelper.selectQuestHashSources(text_hash) if start_index <= 3 else []
     if quest_sources:
         source_priority = {"title": 0, "desc": 1, "long_desc": 2}
         quest_id, matched_source_type = min(
@@ -1374,13 +1512,13 @@ def _select_primary_source_from_text_hash(text_hash: int, lang_code: int) -> tup
         )
         return primary, origin, False, len(quest_ids)
 
-    entity_sources = _get_valid_entity_source_candidates(text_hash, lang_code)
+    entity_sources = _get_valid_entity_source_candidates(text_hash, lang_code) if start_index <= 4 else []
     if entity_sources:
         primary, origin, _ = _build_entity_source_payload([entity_sources[0][0]], lang_code, text_hash)
         source_count = len(entity_sources)
         return primary, origin, False, source_count
 
-    readable_info = databaseHelper.getReadableInfoByTitleHash(text_hash)
+    readable_info = databaseHelper.getReadableInfoByTitleHash(text_hash) if start_index <= 5 else None
     if readable_info:
         file_name, _title_text_map_hash, readable_id = readable_info
         readable_title = _get_text_map_content_with_fallback(text_hash, lang_code, [config.getSourceLanguage()]) or str(file_name)
@@ -1404,25 +1542,24 @@ def _select_primary_source_from_text_hash(text_hash: int, lang_code: int) -> tup
     return primary, unknown_origin, False, 0
 
 
-def queryTextHashInfo(textHash: int, langs: 'list[int]', sourceLangCode: int, queryOrigin=True):
-    """
-    查询文本哈希的信息
-    - 获取多语言翻译
-    - 查询语音路径
-    - 获取版本信息
-    - queryOrigin=False 用于搜索阶段，跳过来源查询以大幅减少数据库查询
-    """
-    obj = {'translates': {}, 'voicePaths': [], 'availableVoiceLangs': [], 'hash': textHash}
+def _resolve_text_hash_info_langs(langs: 'list[int]', sourceLangCode: int) -> list[int]:
     # 去重并添加源语言
     lang_list = list(dict.fromkeys(langs or []))
     if sourceLangCode and sourceLangCode not in lang_list:
         lang_list.append(sourceLangCode)
+    return lang_list
 
-    # 获取翻译
-    translates = databaseHelper.selectTextMapFromTextHash(textHash, lang_list)
-    if not translates:
-        # 回退：如果选择的语言没有翻译，返回至少一种可用语言
-        translates = databaseHelper.selectTextMapFromTextHash(textHash, None)
+
+def _assemble_text_hash_info(
+    textHash: int,
+    translates,
+    voicePath: str | None,
+    version_row,
+    lang_list: list[int],
+    sourceLangCode: int,
+    queryOrigin: bool,
+) -> dict:
+    obj = {'translates': {}, 'voicePaths': [], 'availableVoiceLangs': [], 'hash': textHash}
     for translate in translates:
         obj['translates'][str(translate[1])] = _normalize_text_map_content(translate[0], translate[1])
 
@@ -1440,16 +1577,147 @@ def queryTextHashInfo(textHash: int, langs: 'list[int]', sourceLangCode: int, qu
         obj['origin'] = "其他文本"
         obj['isTalk'] = False
 
-    # 查询语音路径
-    voicePath = selectVoicePathFromTextHash(textHash)
     _attach_voice_metadata(obj, voicePath, lang_list)
 
     # 添加版本信息
-    created_raw, updated_raw = databaseHelper.getTextMapVersionInfo(textHash, sourceLangCode)
+    created_raw, updated_raw = version_row or (None, None)
     obj.update(_build_version_fields(created_raw, updated_raw))
     return obj
 
 
+def queryTextHashInfo(textHash: int, langs: 'list[int]', sourceLangCode: int, queryOrigin=True):
+    """
+    查询文本哈希的信息
+    - 获取多语言翻译
+    - 查询语音路径
+    - 获取版本信息
+    - queryOrigin=False 用于搜索阶段，跳过来源查询以大幅减少数据库查询
+    """
+    lang_list = _resolve_text_hash_info_langs(langs, sourceLangCode)
+
+    # 获取翻译
+    translates = databaseHelper.selectTextMapFromTextHash(textHash, lang_list)
+    if not translates:
+        # 回退：如果选择的语言没有翻译，返回至少一种可用语言
+        translates = databaseHelper.selectTextMapFromTextHash(textHash, None)
+
+    voicePath = selectVoicePathFromTextHash(textHash)
+    version_row = databaseHelper.getTextMapVersionInfo(textHash, sourceLangCode)
+    return _assemble_text_hash_info(
+        textHash, translates, voicePath, version_row, lang_list, sourceLangCode, queryOrigin,
+    )
+
+
+# 多语言并行搜索期间各语言共享的水合结果：(textHash, 语言列表, 来源语言, queryOrigin) -> 条目
+_HYDRATION_MEMO: contextvars.ContextVar[dict | None] = contextvars.ContextVar("hydration_memo", default=None)
+_HYDRATION_MEMO_LOCK = threading.Lock()
+
+
+def queryTextHashInfoBatch(
+    textHashes: 'list[int]',
+    langs: 'list[int]',
+    sourceLangCode: int,
+    queryOrigin=True,
+) -> list[dict]:
+    """
+    批量版 queryTextHashInfo，返回与 textHashes 一一对应的条目
+    - 翻译、语音路径、版本信息各用一次 hash IN (...) 查询取回
+    - 搜索页面水合时使用，避免每条结果三次以上的数据库往返
+    """
+    if not textHashes:
+        return []
+    memo = _HYDRATION_MEMO.get()
+    if memo is None:
+        return _fetch_text_hash_info_batch(textHashes, langs, sourceLangCode, queryOrigin)
+
+    lang_key = tuple(_resolve_text_hash_info_langs(langs, sourceLangCode))
+    keys = [(text_hash, lang_key, sourceLangCode, queryOrigin) for text_hash in textHashes]
+    # 未水合的键在锁内认领（memo 中先放 Event），其他语言的线程遇到认领中的键等待结果而不是重复查询
+    claimed = []
+    pending = []
+    with _HYDRATION_MEMO_LOCK:
+        for key in dict.fromkeys(keys):
+            slot = memo.get(key)
+            if slot is None:
+                memo[key] = threading.Event()
+                claimed.append(key)
+            elif isinstance(slot, threading.Event):
+                pending.append((key, slot))
+    if claimed:
+        try:
+            fetched = _fetch_text_hash_info_batch([key[0] for key in claimed], langs, sourceLangCode, queryOrigin)
+        except BaseException:
+            with _HYDRATION_MEMO_LOCK:
+                events = [memo.pop(key) for key in claimed]
+            for event in events:
+                event.set()
+            raise
+        with _HYDRATION_MEMO_LOCK:
+            events = [memo[key] for key in claimed]
+            for key, entry in zip(claimed, fetched):
+                memo[key] = entry
+        for event in events:
+            event.set()
+    for _key, event in pending:
+        event.wait()
+    with _HYDRATION_MEMO_LOCK:
+        # 认领方查询失败时键已移除，这部分由本线程自行查询
+        unresolved = [key for key in dict.fromkeys(keys) if not isinstance(memo.get(key), dict)]
+    resolved = {}
+    if unresolved:
+        fetched = _fetch_text_hash_info_batch([key[0] for key in unresolved], langs, sourceLangCode, queryOrigin)
+        resolved = dict(zip(unresolved, fetched))
+    with _HYDRATION_MEMO_LOCK:
+        entries = [resolved[key] if key in resolved else memo[key] for key in keys]
+    # 各语言之后还会在条目上补字段，返回副本避免互相污染
+    return [copy.deepcopy(entry) for entry in entries]
+
+
+def _fetch_text_hash_info_batch(
+    textHashes: 'list[int]',
+    langs: 'list[int]',
+    sourceLangCode: int,
+    queryOrigin=True,
+) -> list[dict]:
+    lang_list = _resolve_text_hash_info_langs(langs, sourceLangCode)
+
+    translates_by_hash = databaseHelper.selectTextMapFromTextHashes(textHashes, lang_list)
+    missing_hashes = [text_hash for text_hash in textHashes if text_hash not in translates_by_hash]
+    if missing_hashes:
+        # 回退：如果选择的语言没有翻译，返回至少一种可用语言
+        translates_by_hash.update(databaseHelper.selectTextMapFromTextHashes(missing_hashes, None))
+
+    voice_paths = databaseHelper.selectVoicePathsFromTextHashes(textHashes)
+    version_rows = databaseHelper.getTextMapVersionInfoBatch(textHashes, sourceLangCode)
+    return [
+        _assemble_text_hash_info(
+            text_hash,
+            translates_by_hash.get(text_hash, []),
+            voice_paths.get(text_hash),
+            version_rows.get(text_hash),
+            lang_list,
+            sourceLangCode,
+            queryOrigin,
+        )
+        for text_hash in textHashes
+    ]
+
+
+def _hydrate_unseen_rows(rows, seen_hashes: set, langs: 'list[int]', sourceLangCode: int, queryOrigin=True):
+    """
+    按行首的 textHash 去重后批量水合，返回 (row, entry) 列表
+    """
+    picked_rows = []
+    for row in rows:
+        text_hash = row[0]
+        if text_hash in seen_hashes:
+            continue
+        seen_hashes.add(text_hash)
+        picked_rows.append(row)
+    entries = queryTextHashInfoBatch([row[0] for row in picked_rows], langs, sourceLangCode, queryOrigin)
+    return list(zip(picked_rows, entries))
+
+
 def _resolve_avatar_query_langs(search_lang: int | None = None) -> tuple[list[int], int, int]:
     """
     解析角色查询的语言设置
@@ -1877,11 +2145,7 @@ def _collect_unknown_textmap_candidates(
             break
 
         batch_entries: list[dict] = []
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            batch_entries.append(queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False))
+        batch_entries.extend(obj for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False))
 
         _mark_entries_with_known_primary_source(batch_entries)
         candidates.extend(
@@ -1969,6 +2233,12 @@ def _enrich_primary_sources(results: list[dict], source_lang_code: int):
     仅对分页后的最终结果调用，避免对全部候选做昂贵查询。
     已有 primarySource 的条目（readable/subtitle）会被跳过。
     """
+    pending_hashes = [
+        entry["hash"]
+        for entry in results
+        if entry.get("hash") is not None and not entry.get("primarySource")
+    ]
+    source_kinds = databaseHelper.selectPrimarySourceKinds(pending_hashes) if pending_hashes else None
     for entry in results:
         entry.pop("_hasKnownPrimarySource", None)
         text_hash = entry.get('hash')
@@ -1991,7 +2261,11 @@ def _enrich_primary_sources(results: list[dict], source_lang_code: int):
             continue
         if entry.get('primarySource'):
             continue
-        primary_source, origin, is_talk, source_count = _select_primary_source_from_text_hash(text_hash, source_lang_code)
+        primary_source, origin, is_talk, source_count = _select_primary_source_from_text_hash(
+            text_hash,
+            source_lang_code,
+            _primary_source_start_index(text_hash, source_kinds),
+        )
         entry['primarySource'] = primary_source
         entry['origin'] = origin
         entry['isTalk'] = is_talk
@@ -2025,11 +2299,7 @@ def _handle_speaker_only_query(speaker_keyword: str, langCode: int, page: int, p
             created_version_filter,
             updated_version_filter,
         )
-        for textHash, avatarId in voice_rows:
-            if textHash in seen_hashes:
-                continue
-            seen_hashes.add(textHash)
-            obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+        for (_textHash, avatarId), obj in _hydrate_unseen_rows(voice_rows, seen_hashes, langs, sourceLangCode):
             obj['_preferredSourceType'] = "voice"
             obj['talker'] = databaseHelper.getCharterName(avatarId, langCode)
             ans.append(obj)
@@ -2057,11 +2327,7 @@ def _handle_speaker_only_query(speaker_keyword: str, langCode: int, page: int, p
             created_version_filter,
             updated_version_filter,
         )
-        for textHash, avatarId in story_rows:
-            if textHash in seen_hashes:
-                continue
-            seen_hashes.add(textHash)
-            obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+        for (_textHash, avatarId), obj in _hydrate_unseen_rows(story_rows, seen_hashes, langs, sourceLangCode):
             obj['_preferredSourceType'] = "story"
             obj['talker'] = databaseHelper.getCharterName(avatarId, langCode)
             ans.append(obj)
@@ -2089,11 +2355,7 @@ def _handle_speaker_only_query(speaker_keyword: str, langCode: int, page: int, p
         created_version_filter,
         updated_version_filter,
     )
-    for textHash, talkerType, talkerId, _dialogueId in dialogue_rows:
-        if textHash in seen_hashes:
-            continue
-        seen_hashes.add(textHash)
-        obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+    for (_textHash, talkerType, talkerId, _dialogueId), obj in _hydrate_unseen_rows(dialogue_rows, seen_hashes, langs, sourceLangCode):
         obj['talker'] = databaseHelper.getTalkerName(talkerType, talkerId, sourceLangCode)
         ans.append(obj)
 
@@ -2118,11 +2380,7 @@ def _handle_speaker_only_query(speaker_keyword: str, langCode: int, page: int, p
             created_version_filter,
             updated_version_filter,
         )
-        for textHash, talkerType, talkerId, _dialogueId in talker_rows:
-            if textHash in seen_hashes:
-                continue
-            seen_hashes.add(textHash)
-            obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+        for (_textHash, talkerType, talkerId, _dialogueId), obj in _hydrate_unseen_rows(talker_rows, seen_hashes, langs, sourceLangCode):
             obj['talker'] = databaseHelper.getTalkerName(talkerType, talkerId, sourceLangCode)
             ans.append(obj)
         total += _count_dialogue_by_talker_type_cached(
@@ -2168,11 +2426,7 @@ def _handle_speaker_and_keyword_query(speaker_keyword: str, keyword_trim: str, l
             created_version_filter,
             updated_version_filter,
         )
-        for textHash, avatarId in fetter_rows:
-            if textHash in seen_hashes:
-                continue
-            seen_hashes.add(textHash)
-            obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+        for (_textHash, avatarId), obj in _hydrate_unseen_rows(fetter_rows, seen_hashes, langs, sourceLangCode):
             obj['_preferredSourceType'] = "voice"
             obj['talker'] = databaseHelper.getCharterName(avatarId, langCode)
             ans.append(obj)
@@ -2207,11 +2461,7 @@ def _handle_speaker_and_keyword_query(speaker_keyword: str, keyword_trim: str, l
             created_version_filter,
             updated_version_filter,
         )
-        for textHash, avatarId in story_rows:
-            if textHash in seen_hashes:
-                continue
-            seen_hashes.add(textHash)
-            obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+        for (_textHash, avatarId), obj in _hydrate_unseen_rows(story_rows, seen_hashes, langs, sourceLangCode):
             obj['_preferredSourceType'] = "story"
             obj['talker'] = databaseHelper.getCharterName(avatarId, langCode)
             ans.append(obj)
@@ -2244,11 +2494,7 @@ def _handle_speaker_and_keyword_query(speaker_keyword: str, keyword_trim: str, l
         created_version_filter,
         updated_version_filter,
     )
-    for textHash, talkerType, talkerId, _dialogueId in dialogue_rows:
-        if textHash in seen_hashes:
-            continue
-        seen_hashes.add(textHash)
-        obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+    for (_textHash, talkerType, talkerId, _dialogueId), obj in _hydrate_unseen_rows(dialogue_rows, seen_hashes, langs, sourceLangCode):
         obj['talker'] = databaseHelper.getTalkerName(talkerType, talkerId, langCode)
         ans.append(obj)
 
@@ -2278,11 +2524,7 @@ def _handle_speaker_and_keyword_query(speaker_keyword: str, keyword_trim: str, l
             created_version_filter,
             updated_version_filter,
         )
-        for textHash, talkerType, talkerId, _dialogueId in talker_rows:
-            if textHash in seen_hashes:
-                continue
-            seen_hashes.add(textHash)
-            obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+        for (_textHash, talkerType, talkerId, _dialogueId), obj in _hydrate_unseen_rows(talker_rows, seen_hashes, langs, sourceLangCode):
             obj['talker'] = databaseHelper.getTalkerName(talkerType, talkerId, langCode)
             ans.append(obj)
         total += _count_dialogue_by_talker_type_and_keyword_cached(
@@ -2302,11 +2544,7 @@ def _handle_speaker_and_keyword_query(speaker_keyword: str, keyword_trim: str, l
         created_version_filter,
         updated_version_filter,
     )
-    for textHash, avatarId in fetter_rows:
-        if textHash in seen_hashes:
-            continue
-        seen_hashes.add(textHash)
-        obj = queryTextHashInfo(textHash, langs, sourceLangCode)
+    for (_textHash, avatarId), obj in _hydrate_unseen_rows(fetter_rows, seen_hashes, langs, sourceLangCode):
         obj['talker'] = databaseHelper.getCharterName(avatarId, langCode)
         ans.append(obj)
     voice_total = _count_fetter_by_speaker_and_keyword_cached(
@@ -2373,13 +2611,7 @@ def _handle_keyword_only_query(keyword: str, keyword_trim: str, langCode: int, p
         if result_lang in langMap:
             targetLangStrs.append(langMap[result_lang])
     strToLangId = _build_lang_str_to_id_map()
-    prefix_labels = {
-        "Book": "书籍",
-        "Costume": "装扮",
-        "Relic": "圣遗物",
-        "Weapon": "武器",
-        "Wings": "风之翼",
-    }
+    prefix_labels = _SEARCH_PREFIX_LABELS
 
     safe_page = page if page and page > 0 else 1
     safe_size = page_size if page_size and page > 0 else 50
@@ -2444,12 +2676,7 @@ def _handle_all_voice_filter(keyword, keyword_trim, langCode, safe_page, safe_si
             created_version_filter,
             updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            obj = queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False)
-            ans.append(obj)
+        ans.extend(obj for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False))
         remaining = safe_size - len(ans)
         offset_after_hash = 0
     else:
@@ -2555,12 +2782,7 @@ def _handle_specific_voice_filter(keyword, keyword_trim, langCode, safe_page, sa
             created_version_filter,
             updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            obj = queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False)
-            ans.append(obj)
+        ans.extend(obj for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False))
         remaining = safe_size - len(ans)
         offset_after_hash = 0
     else:
@@ -2631,11 +2853,7 @@ def _handle_all_voice_filter_ranked(keyword, keyword_trim, langCode, safe_page,
             hash_value if is_hash_query else None, None,
             created_version_filter, updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            candidates.append(queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False))
+        candidates.extend(obj for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False))
 
     elif normalized_source_type == "unknown":
         unknown_candidates, unknown_total = _collect_unknown_textmap_candidates(
@@ -2667,11 +2885,7 @@ def _handle_all_voice_filter_ranked(keyword, keyword_trim, langCode, safe_page,
             keyword, langCode, db_source_type, candidate_limit, 0,
             created_version_filter, updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            obj = queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False)
+        for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False):
             if db_source_type in {"voice", "story"}:
                 obj['_preferredSourceType'] = db_source_type
             candidates.append(obj)
@@ -2723,11 +2937,7 @@ def _handle_all_voice_filter_ranked(keyword, keyword_trim, langCode, safe_page,
             hash_value if is_hash_query else None, None,
             created_version_filter, updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            candidates.append(queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False))
+        candidates.extend(obj for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False))
 
         if langStr:
             readable_contents = databaseHelper.selectReadableFromKeyword(
@@ -2793,11 +3003,7 @@ def _handle_specific_voice_filter_ranked(keyword, keyword_trim, langCode, safe_p
             hash_value if is_hash_query else None, voice_filter,
             created_version_filter, updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            candidates.append(queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False))
+        candidates.extend(obj for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False))
 
     elif normalized_source_type == "unknown":
         unknown_candidates, unknown_total = _collect_unknown_textmap_candidates(
@@ -2826,11 +3032,7 @@ def _handle_specific_voice_filter_ranked(keyword, keyword_trim, langCode, safe_p
             keyword, langCode, db_source_type, candidate_limit * 3, 0,
             created_version_filter, updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            obj = queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False)
+        for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False):
             if db_source_type in {"voice", "story"}:
                 obj['_preferredSourceType'] = db_source_type
             candidates.append(obj)
@@ -2887,11 +3089,7 @@ def _handle_specific_voice_filter_ranked(keyword, keyword_trim, langCode, safe_p
             hash_value if is_hash_query else None, voice_filter,
             created_version_filter, updated_version_filter,
         )
-        for text_hash, _content, _created_raw, _updated_raw in rows:
-            if text_hash in text_hashes_seen:
-                continue
-            text_hashes_seen.add(text_hash)
-            candidates.append(queryTextHashInfo(text_hash, langs, sourceLangCode, queryOrigin=False))
+        candidates.extend(obj for _row, obj in _hydrate_unseen_rows(rows, text_hashes_seen, langs, sourceLangCode, queryOrigin=False))
 
         if voice_filter == "without":
             if langStr:
@@ -3101,31 +3299,598 @@ def getTranslateObj(
         _get_search_display_cache_fingerprint(),
     )
 
-    # 尝试从缓存中获取结果
-    cached_result = search_cache.get(cache_key)
-    if cached_result:
-        return cached_result
+    def _compute():
+        if keyword_trim == "" and speaker_keyword:
+            # 仅说话者查询
+            result = _handle_speaker_only_query(speaker_keyword, langCode, page, page_size, voice_filter, created_version_filter, updated_version_filter, source_type_filter)
+        elif keyword_trim != "" and speaker_keyword:
+            # 说话者和关键词查询
+            result = _handle_speaker_and_keyword_query(speaker_keyword, keyword_trim, langCode, page, page_size, voice_filter, created_version_filter, updated_version_filter, source_type_filter)
+        else:
+            # 仅关键词查询
+            result = _handle_keyword_only_query(keyword, keyword_trim, langCode, page, page_size, voice_filter, created_version_filter, updated_version_filter, source_type_filter)
+
+        # 为搜索阶段跳过来源查询的条目补充 primarySource
+        contents, total = result
+        source_lang_code = config.getSourceLanguage()
+        _enrich_primary_sources(contents, source_lang_code)
+        return (contents, total)
+
+    # 命中缓存直接返回；同一查询的并发请求只计算一次，其余请求共享结果
+    return search_cache.get_or_compute(
+        cache_key,
+        _compute,
+        cacheable=_result_is_complete,
+        on_shared_uncacheable=_mark_shared_result_truncated,
+    )
+
+
+_MULTI_LANG_SEARCH_WORKERS = 4
+
+
+def getTranslateObjMultiLang(
+    keyword: str,
+    langCodes: 'list[int]',
+    speaker: str | None = None,
+    page: int = 1,
+    page_size: int = 50,
+    voice_filter: str = "all",
+    created_version: str | None = None,
+    updated_version: str | None = None,
+    source_type: str | None = None,
+) -> list[dict]:
+    """
+    同一关键词按多种搜索语言并行检索，返回按语言分组的 [{langCode, contents, total}]
+    - 每种语言在线程池中执行 getTranslateObj，各自使用一条池化只读连接
+    - 不同语言命中同一 textHash 时只水合一次
+    """
+    lang_codes = list(dict.fromkeys(int(lang_code) for lang_code in langCodes))
+    if not lang_codes:
+        return []
+    memo: dict = {}
+
+    def _search(lang_code: int):
+        _HYDRATION_MEMO.set(memo)
+        return getTranslateObj(
+            keyword,
+            lang_code,
+            speaker,
+            page=page,
+            page_size=page_size,
+            voice_filter=voice_filter,
+            created_version=created_version,
+            updated_version=updated_version,
+            source_type=source_type,
+        )
+
+    workers = min(len(lang_codes), _MULTI_LANG_SEARCH_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="multi-lang-search") as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, _search, lang_code)
+            for lang_code in lang_codes
+        ]
+        results = [future.result() for future in futures]
+
+    return [
+        {"langCode": lang_code, "contents": contents, "total": total}
+        for lang_code, (contents, total) in zip(lang_codes, results)
+    ]
+
+
+class InvalidSearchCursorError(ValueError):
+    """Raised when a keyword search cursor is malformed or belongs to another query."""
+
+
+_SEARCH_CURSOR_VERSION = 1
+_SEARCH_PREFIX_LABELS = {
+    "Book": "书籍",
+    "Costume": "装扮",
+    "Relic": "圣遗物",
+    "Weapon": "武器",
+    "Wings": "风之翼",
+}
+
+
+def _build_search_cursor_fingerprint(query_key: tuple) -> int:
+    return zlib.crc32(repr(query_key).encode("utf-8"))
+
+
+def _encode_search_cursor(state: dict) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_search_cursor(token: str, fingerprint: int) -> dict:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidSearchCursorError("invalid cursor") from exc
+    if not isinstance(state, dict) or state.get("v") != _SEARCH_CURSOR_VERSION:
+        raise InvalidSearchCursorError("invalid cursor")
+    if state.get("f") != fingerprint:
+        raise InvalidSearchCursorError("cursor does not match this query")
+    if not _is_valid_search_cursor_state(state):
+        raise InvalidSearchCursorError("invalid cursor")
+    return state
+
+
+_SEARCH_CURSOR_SOURCES = frozenset({"textmap", "readable", "subtitle"})
+
+
+def _is_cursor_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_valid_search_cursor_state(state: dict) -> bool:
+    """
+    校验令牌中各字段的形状：n/p 为非负整数，h 为布尔，
+    k 为 数据源 -> None / False / [匹配等级, 语音等级, id] 三个整数
+    """
+    if "n" in state and not (_is_cursor_int(state["n"]) and state["n"] >= 0):
+        return False
+    if "p" in state and not (_is_cursor_int(state["p"]) and state["p"] >= 1):
+        return False
+    if "h" in state and not isinstance(state["h"], bool):
+        return False
+    if "k" in state:
+        positions = state["k"]
+        if not isinstance(positions, dict):
+            return False
+        for source, position in positions.items():
+            if source not in _SEARCH_CURSOR_SOURCES:
+                return False
+            if position is None or position is False:
+                continue
+            if not (
+                isinstance(position, list)
+                and len(position) == 3
+                and all(_is_cursor_int(part) for part in position)
+            ):
+                return False
+    return True
+
+
+def _resolve_seek_sources(
+    source_type_filter: str | None,
+    voice_filter: str,
+    lang_str: str | None,
+) -> list[str] | None:
+    """
+    返回参与游标分页的数据源；None 表示该筛选仍需应用层过滤，只能按页码分页
+    """
+    include_text_sources = voice_filter != "with"
+    if source_type_filter is None:
+        sources = ["textmap"]
+        if include_text_sources and lang_str:
+            sources.append("readable")
+        if include_text_sources:
+            sources.append("subtitle")
+        return sources
+    if source_type_filter == "textmap":
+        return ["textmap"]
+    if source_type_filter == "readable":
+        return ["readable"] if include_text_sources and lang_str else []
+    if source_type_filter == "subtitle":
+        return ["subtitle"] if include_text_sources else []
+    if voice_filter == "all" and source_type_filter in _get_db_filterable_source_types():
+        return ["textmap"]
+    return None
+
+
+def _build_seek_hash_entry(
+    hash_value: int | None,
+    keyword_trim: str,
+    langCode: int,
+    langs: list[int],
+    sourceLangCode: int,
+    voice_filter: str,
+    created_version_filter: str | None,
+    updated_version_filter: str | None,
+    source_type_filter: str | None,
+) -> dict | None:
+    """
+    数字关键词命中但内容不含关键词的 textMap 条目，只在游标首页置顶一次
+    """
+    if hash_value is None:
+        return None
+    hash_obj = queryTextHashInfo(hash_value, langs, sourceLangCode)
+    if not hash_obj.get('translates'):
+        return None
+    if not _entry_version_match(hash_obj, created_version_filter, updated_version_filter):
+        return None
+    if databaseHelper.isTextMapHashInKeyword(hash_value, keyword_trim, langCode):
+        return None
+    if not _text_hash_matches_source_type(hash_value, source_type_filter, sourceLangCode, hash_obj):
+        return None
+    if voice_filter in ("with", "without"):
+        has_voice = databaseHelper.hasVoiceForTextHashDb(hash_value)
+        if (voice_filter == "with") != bool(has_voice):
+            return None
+    hash_obj['hashMatch'] = True
+    if source_type_filter in {"voice", "story"}:
+        hash_obj['_preferredSourceType'] = source_type_filter
+    return hash_obj
 
-    # 使用原有的查询逻辑
-    if keyword_trim == "" and speaker_keyword:
-        # 仅说话者查询
-        result = _handle_speaker_only_query(speaker_keyword, langCode, page, page_size, voice_filter, created_version_filter, updated_version_filter, source_type_filter)
-    elif keyword_trim != "" and speaker_keyword:
-        # 说话者和关键词查询
-        result = _handle_speaker_and_keyword_query(speaker_keyword, keyword_trim, langCode, page, page_size, voice_filter, created_version_filter, updated_version_filter, source_type_filter)
+
+def _count_seek_sources(
+    sources: list[str],
+    keyword: str,
+    langCode: int,
+    langStr: str | None,
+    voice_filter: str,
+    created_version_filter: str | None,
+    updated_version_filter: str | None,
+    source_type_filter: str | None,
+) -> int:
+    total = 0
+    for source in sources:
+        if source == "textmap":
+            if source_type_filter not in (None, "textmap"):
+                total += databaseHelper.countTextMapFromKeywordBySourceType(
+                    keyword, langCode, source_type_filter, created_version_filter, updated_version_filter,
+                )
+            elif voice_filter == "all":
+                total += _count_textmap_from_keyword_cached(
+                    keyword, langCode, created_version_filter, updated_version_filter,
+                )
+            else:
+                total += _count_textmap_from_keyword_voice_cached(
+                    keyword, langCode, voice_filter, created_version_filter, updated_version_filter,
+                )
+        elif source == "readable" and langStr:
+            total += _count_readable_from_keyword_cached(
+                keyword, langCode, langStr, created_version_filter, updated_version_filter,
+            )
+        elif source == "subtitle":
+            total += _count_subtitle_from_keyword_cached(
+                keyword, langCode, created_version_filter, updated_version_filter,
+            )
+    return total
+
+
+def _handle_keyword_seek_query(
+    keyword: str,
+    keyword_trim: str,
+    langCode: int,
+    page_size: int,
+    voice_filter: str,
+    created_version_filter: str | None,
+    updated_version_filter: str | None,
+    source_type_filter: str | None,
+    sources: list[str],
+    state: dict,
+) -> tuple[list[dict], int, dict | None]:
+    """
+    游标分页的关键词查询
+    - 各数据源按 (匹配等级, 语音等级, id) 在数据库中 seek 取下一批，再在内存中归并
+    - 每页只取 page_size 行并只水合这些行，深页与第一页代价相同
+    """
+    langs = config.getResultLanguages().copy()
+    if langCode not in langs:
+        langs.append(langCode)
+    sourceLangCode = config.getSourceLanguage()
+    langMap = databaseHelper.getLangCodeMap()
+    langStr = langMap.get(langCode)
+    targetLangStrs = [langMap[lang] for lang in langs if lang in langMap]
+    strToLangId = _build_lang_str_to_id_map()
+    hash_value = _parse_int_keyword(keyword_trim)
+    textmap_voice_filter = None if voice_filter == "all" else voice_filter
+    textmap_source_type = source_type_filter if source_type_filter not in (None, "textmap") else None
+
+    entries: list[dict] = []
+    if "k" in state:
+        positions = dict(state["k"])
+        hash_extra = bool(state.get("h"))
     else:
-        # 仅关键词查询
-        result = _handle_keyword_only_query(keyword, keyword_trim, langCode, page, page_size, voice_filter, created_version_filter, updated_version_filter, source_type_filter)
+        positions = {source: None for source in sources}
+        hash_entry = _build_seek_hash_entry(
+            hash_value,
+            keyword_trim,
+            langCode,
+            langs,
+            sourceLangCode,
+            voice_filter,
+            created_version_filter,
+            updated_version_filter,
+            source_type_filter,
+        )
+        hash_extra = hash_entry is not None
+        if hash_entry is not None:
+            entries.append(hash_entry)
+
+    limit = page_size - len(entries)
+    fetched: list[tuple[tuple[int, int, int, int], str, tuple]] = []
+    exhausted: set[str] = set()
+    degraded: set[str] = set()
+    budget = query_budget.current_budget()
+    if limit > 0:
+        for source_index, source in enumerate(sources):
+            after = positions.get(source)
+            if after is False:
+                continue
+            after_key = tuple(after) if after else None
+            interruptions = budget.interruptions if budget is not None else 0
+            if source == "textmap":
+                rows = databaseHelper.selectTextMapFromKeywordSeek(
+                    keyword, langCode, limit, after_key,
+                    hash_value, textmap_voice_filter,
+                    created_version_filter, updated_version_filter,
+                    textmap_source_type,
+                )
+            elif source == "readable":
+                rows = databaseHelper.selectReadableFromKeywordSeek(
+                    keyword, langCode, langStr, limit, after_key,
+                    created_version_filter, updated_version_filter,
+                )
+            else:
+                rows = databaseHelper.selectSubtitleFromKeywordSeek(
+                    keyword, langCode, limit, after_key,
+                    created_version_filter, updated_version_filter,
+                )
+            if budget is not None and budget.interruptions != interruptions:
+                # 被时间预算中断的数据源结果是降级的空列表，保留原位置，下一页重试
+                degraded.add(source)
+            elif len(rows) < limit:
+                exhausted.add(source)
+            for row in rows:
+                fetched.append(((row[-3], row[-2], source_index, row[-1]), source, row))
+
+    fetched.sort(key=lambda item: item[0])
+    taken = fetched[:limit] if limit > 0 else []
+
+    for source in sources:
+        source_keys = [key for key, item_source, _row in taken if item_source == source]
+        if source_keys:
+            positions[source] = [source_keys[-1][0], source_keys[-1][1], source_keys[-1][3]]
+        fetched_count = sum(1 for _key, item_source, _row in fetched if item_source == source)
+        if source in exhausted and len(source_keys) == fetched_count:
+            positions[source] = False
+
+    textmap_rows = [row for _key, source, row in taken if source == "textmap"]
+    textmap_entries = iter(
+        queryTextHashInfoBatch([row[0] for row in textmap_rows], langs, sourceLangCode, queryOrigin=False)
+    )
+    for _key, source, row in taken:
+        if source == "textmap":
+            obj = next(textmap_entries)
+            if textmap_source_type in {"voice", "story"}:
+                obj['_preferredSourceType'] = textmap_source_type
+        elif source == "readable":
+            fileName, content, titleTextMapHash, readableId, created_raw, updated_raw = row[:6]
+            obj = _build_readable_obj(fileName, content, titleTextMapHash, readableId, created_raw, updated_raw, sourceLangCode, langCode, targetLangStrs, strToLangId, _SEARCH_PREFIX_LABELS, isSearchPhase=True)
+        else:
+            fileName, content, startTime, endTime, subtitleId, created_raw, updated_raw = row[:7]
+            obj = _build_subtitle_obj(fileName, content, startTime, endTime, subtitleId, created_raw, updated_raw, langs)
+        entries.append(obj)
+    _mark_entries_with_known_primary_source(entries)
 
-    # 为搜索阶段跳过来源查询的条目补充 primarySource
-    contents, total = result
-    source_lang_code = config.getSourceLanguage()
-    _enrich_primary_sources(contents, source_lang_code)
-    result = (contents, total)
+    total = _count_seek_sources(
+        sources,
+        keyword,
+        langCode,
+        langStr,
+        voice_filter,
+        created_version_filter,
+        updated_version_filter,
+        source_type_filter,
+    ) + (1 if hash_extra else 0)
+
+    if all(positions.get(source) is False for source in sources) or (not entries and not degraded):
+        return entries, total, None
+    next_state = {
+        "v": _SEARCH_CURSOR_VERSION,
+        "f": state["f"],
+        "n": int(state.get("n", 0)) + len(entries),
+        "k": positions,
+        "h": hash_extra,
+    }
+    return entries, total, next_state
 
-    # 将结果缓存
-    search_cache.set(cache_key, result)
-    return result
+
+def getTranslateObjByCursor(
+    keyword: str,
+    langCode: int,
+    speaker: str | None = None,
+    cursor: str | None = None,
+    page_size: int = 50,
+    voice_filter: str = "all",
+    created_version: str | None = None,
+    updated_version: str | None = None,
+    source_type: str | None = None,
+) -> tuple[list[dict], int, str | None]:
+    """
+    游标分页版 getTranslateObj，返回 (contents, total, nextCursor)
+    - cursor 为上一页返回的不透明令牌，首页传 None
+    - 仅关键词查询走 seek 分页；说话者查询和需要应用层过滤的来源类型在令牌里记录页码
+    """
+    speaker_keyword = (speaker or "").strip()
+    keyword_trim = keyword.strip()
+    created_version_filter = _normalize_version_filter(created_version)
+    updated_version_filter = _normalize_version_filter(updated_version)
+    source_type_filter = _normalize_source_type_filter(source_type)
+    safe_size = max(1, int(page_size) if page_size else 50)
+
+    query_key = (
+        keyword_trim,
+        langCode,
+        speaker_keyword,
+        safe_size,
+        voice_filter,
+        created_version_filter,
+        updated_version_filter,
+        source_type_filter,
+    )
+    fingerprint = _build_search_cursor_fingerprint(query_key)
+    if cursor:
+        state = _decode_search_cursor(cursor, fingerprint)
+    else:
+        state = {"v": _SEARCH_CURSOR_VERSION, "f": fingerprint, "n": 0}
+
+    cache_key = ("cursor", *query_key, cursor or "", _get_search_display_cache_fingerprint())
+
+    def _compute():
+        sources = None
+        if keyword_trim and not speaker_keyword:
+            lang_str = databaseHelper.getLangCodeMap().get(langCode)
+            sources = _resolve_seek_sources(source_type_filter, voice_filter, lang_str)
+
+        if sources is None:
+            page = max(1, int(state.get("p", 1)))
+            contents, total = getTranslateObj(
+                keyword,
+                langCode,
+                speaker,
+                page=page,
+                page_size=safe_size,
+                voice_filter=voice_filter,
+                created_version=created_version,
+                updated_version=updated_version,
+                source_type=source_type,
+            )
+            next_state = None
+            if page * safe_size < total:
+                next_state = {**state, "n": page * safe_size, "p": page + 1}
+        else:
+            contents, total, next_state = _handle_keyword_seek_query(
+                keyword,
+                keyword_trim,
+                langCode,
+                safe_size,
+                voice_filter,
+                created_version_filter,
+                updated_version_filter,
+                source_type_filter,
+                sources,
+                state,
+            )
+            _enrich_primary_sources(contents, config.getSourceLanguage())
+
+        next_cursor = _encode_search_cursor(next_state) if next_state else None
+        return (contents, total, next_cursor)
+
+    return search_cache.get_or_compute(
+        cache_key,
+        _compute,
+        cacheable=_result_is_complete,
+        on_shared_uncacheable=_mark_shared_result_truncated,
+    )
+
+
+def getKeywordFacets(
+    keyword: str,
+    langCode: int,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+) -> dict:
+    """
+    关键词搜索的分面计数：来源、主来源类别、有无语音、创建版本，一次查询得出
+    - 主来源类别只统计 textMap 命中，没有主来源记录的计入 unknown
+    - voice.without 含阅读物和字幕，与 voiceFilter=without 的搜索总数口径一致
+    """
+    keyword_trim = keyword.strip()
+    created_version_filter = _normalize_version_filter(created_version)
+    updated_version_filter = _normalize_version_filter(updated_version)
+    cache_key = ("facets", keyword_trim, langCode, created_version_filter, updated_version_filter)
+
+    def _compute():
+        lang_str = databaseHelper.getLangCodeMap().get(langCode)
+        rows = databaseHelper.countKeywordFacets(
+            keyword, langCode, lang_str, created_version_filter, updated_version_filter,
+        )
+        sources = {"textmap": 0, "readable": 0, "subtitle": 0}
+        source_kinds: dict[str, int] = {}
+        voice = {"with": 0, "without": 0}
+        created_versions: dict[str, int] = {}
+        for src, kind, has_voice, created_raw, count in rows:
+            sources[src] = sources.get(src, 0) + count
+            if src == "textmap":
+                kind_key = kind or "unknown"
+                source_kinds[kind_key] = source_kinds.get(kind_key, 0) + count
+            voice["with" if has_voice else "without"] += count
+            version_key = _extract_version_tag(created_raw) or "unknown"
+            created_versions[version_key] = created_versions.get(version_key, 0) + count
+        return {
+            "total": sum(sources.values()),
+            "sources": sources,
+            "sourceKinds": source_kinds,
+            "voice": voice,
+            "createdVersions": created_versions,
+        }
+
+    return search_cache.get_or_compute(
+        cache_key,
+        _compute,
+        cacheable=_result_is_complete,
+        on_shared_uncacheable=_mark_shared_result_truncated,
+    )
+
+
+_EXPORT_BATCH_SIZE = 200
+
+
+def iterKeywordExport(
+    keyword: str,
+    langCode: int,
+    langs: 'list[int] | None' = None,
+    voice_filter: str = "all",
+    created_version: str | None = None,
+    updated_version: str | None = None,
+    batch_size: int = _EXPORT_BATCH_SIZE,
+):
+    """
+    逐条产出关键词的全部匹配，顺序与分页搜索一致（文本 → 阅读物 → 字幕）。
+    每个来源只执行一次查询并按 batch_size 分批水合，不做全量缓存，供 NDJSON 导出使用
+    """
+    created_version_filter = _normalize_version_filter(created_version)
+    updated_version_filter = _normalize_version_filter(updated_version)
+    result_langs = list(langs) if langs else config.getResultLanguages().copy()
+    if langCode not in result_langs:
+        result_langs.append(langCode)
+    sourceLangCode = config.getSourceLanguage()
+
+    for rows in databaseHelper.iterTextMapFromKeyword(
+        keyword,
+        langCode,
+        batch_size,
+        voice_filter if voice_filter in ("with", "without") else None,
+        created_version_filter,
+        updated_version_filter,
+    ):
+        # textMap 每个 (hash, lang) 只有一行，批内去重即可，不必记住全部已输出的 hash
+        entries = [obj for _row, obj in _hydrate_unseen_rows(rows, set(), result_langs, sourceLangCode, queryOrigin=False)]
+        _enrich_primary_sources(entries, sourceLangCode)
+        yield from entries
+
+    # 阅读物和字幕没有语音，与 _handle_specific_voice_filter 一样只在非“有语音”时输出
+    if voice_filter == "with":
+        return
+
+    langMap = databaseHelper.getLangCodeMap()
+    langStr = langMap.get(langCode)
+    if langStr:
+        targetLangStrs = [langMap[lang] for lang in result_langs if lang in langMap]
+        strToLangId = _build_lang_str_to_id_map()
+        for rows in databaseHelper.iterReadableFromKeyword(
+            keyword,
+            langCode,
+            langStr,
+            batch_size,
+            created_version_filter,
+            updated_version_filter,
+        ):
+            for fileName, content, titleTextMapHash, readableId, created_raw, updated_raw in rows:
+                yield _build_readable_obj(fileName, content, titleTextMapHash, readableId, created_raw, updated_raw, sourceLangCode, langCode, targetLangStrs, strToLangId, _SEARCH_PREFIX_LABELS, isSearchPhase=True)
+
+    for rows in databaseHelper.iterSubtitleFromKeyword(
+        keyword,
+        langCode,
+        batch_size,
+        created_version_filter,
+        updated_version_filter,
+    ):
+        for fileName, content, startTime, endTime, subtitleId, created_raw, updated_raw in rows:
+            yield _build_subtitle_obj(fileName, content, startTime, endTime, subtitleId, created_raw, updated_raw, result_langs)
 
 
 def searchNameEntries(
@@ -3781,8 +4546,8 @@ def getDialogueGroup(
         (safe_page - 1) * safe_page_size,
     )
     dialogues = []
-    for dialogue_text_hash, talkerType, talkerId, dialogueId in raw_dialogues:
-        obj = queryTextHashInfo(dialogue_text_hash, langs, sourceLangCode, False)
+    dialogue_entries = queryTextHashInfoBatch([row[0] for row in raw_dialogues], langs, sourceLangCode, False)
+    for (_dialogue_text_hash, talkerType, talkerId, dialogueId), obj in zip(raw_dialogues, dialogue_entries):
         obj["talker"] = databaseHelper.getTalkerName(talkerType, talkerId, sourceLangCode)
         obj["dialogueId"] = dialogueId
         obj["talkId"] = resolved_talk_id
@@ -4024,8 +4789,8 @@ def getQuestDialogues(
     rows = databaseHelper.selectQuestDialoguesPaged(questId, page_size, offset)
     dialogues = []
 
-    for textHash, talkerType, talkerId, dialogueId, talkId in rows:
-        obj = queryTextHashInfo(textHash, langs, sourceLangCode, False)
+    dialogue_entries = queryTextHashInfoBatch([row[0] for row in rows], langs, sourceLangCode, False)
+    for (_textHash, talkerType, talkerId, dialogueId, talkId), obj in zip(rows, dialogue_entries):
         obj['talker'] = databaseHelper.getTalkerName(talkerType, talkerId, sourceLangCode)
         obj['dialogueId'] = dialogueId
         obj['talkId'] = talkId
@@ -4110,9 +4875,9 @@ def getTalkFromHash(
     if rawDialogues is None:
         rawDialogues = []
 
-    for rawDialogue in rawDialogues:
-        dialogue_text_hash, talkerType, talkerId, dialogueId = rawDialogue
-        obj = queryTextHashInfo(dialogue_text_hash, langs, sourceLangCode, False)
+    dialogue_entries = queryTextHashInfoBatch([row[0] for row in rawDialogues], langs, sourceLangCode, False)
+    for rawDialogue, obj in zip(rawDialogues, dialogue_entries):
+        _dialogue_text_hash, talkerType, talkerId, dialogueId = rawDialogue
         obj['talker'] = databaseHelper.getTalkerName(talkerType, talkerId, sourceLangCode)
         obj['dialogueId'] = dialogueId
         obj['isSelectedHash'] = obj.get('hash') == requested_text_hash
@@ -1,13 +1,17 @@
 """Search-oriented controller exports."""
 
 from .common import (
+    InvalidSearchCursorError,
     getTranslateObj,
+    getTranslateObjByCursor,
     searchNameEntries,
     searchNpcDialogueEntries,
 )
 
 __all__ = [
+    "InvalidSearchCursorError",
     "getTranslateObj",
+    "getTranslateObjByCursor",
     "searchNameEntries",
     "searchNpcDialogueEntries",
 ]
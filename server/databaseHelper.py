@@ -1,7 +1,8 @@
 import json
 import sqlite3
 import threading
-from contextlib import closing
+from contextlib import closing, contextmanager
+from functools import lru_cache, wraps
 import re
 import os
 from pathlib import Path
@@ -9,6 +10,8 @@ from pathlib import Path
 import config
 import fts_tokenizer
 from quest_text_filters import build_quest_text_not_excluded_sql, is_excluded_quest_text
+from utils import query_budget
+from utils.sql_profiler import ProfiledConnection, profiling_enabled as sql_profiling_enabled
 
 
 _READABLE_LANG_SUFFIX_RE = re.compile(r"_(CHS|CHT|DE|EN|ES|FR|ID|IT|JP|KR|PT|RU|TH|TR|VI)$", re.IGNORECASE)
@@ -166,21 +169,30 @@ def _ensure_runtime_sql_functions(connection: sqlite3.Connection) -> None:
     _REGISTERED_SQL_CONNECTION_IDS.add(conn_id)
 
 
-def _configure_connection(connection: sqlite3.Connection) -> None:
+# 查询模板按形状固定 SQL 文本后，形状组合数会超过 sqlite3 默认的 128 条语句缓存
+_STATEMENT_CACHE_SIZE = 512
+
+
+def _configure_connection(connection: sqlite3.Connection, *, read_only: bool = False) -> None:
     """Register FTS helpers and apply default runtime PRAGMAs."""
     tokenizer, ext_path, ext_entry = _resolve_fts_settings()
     _ensure_runtime_sql_functions(connection)
     _register_fts_content_function(connection, tokenizer)
     _try_load_fts_extension(connection, ext_path, ext_entry)
     _apply_connection_pragmas(connection)
+    if read_only:
+        # 读连接只负责查询，运行时索引由写连接创建。
+        try:
+            connection.execute("PRAGMA query_only=ON")
+        except sqlite3.DatabaseError:
+            pass
+        # 只在读连接上检查请求时间预算，写连接上的同步/建索引不应被中途打断
+        connection.set_progress_handler(query_budget.progress_handler, query_budget.PROGRESS_STEPS)
+        return
     _ensure_runtime_query_indexes(connection)
 
 
-def get_connection() -> sqlite3.Connection:
-    """
-    获取数据库连接
-    配置连接参数并返回一个sqlite3.Connection对象
-    """
+def _resolve_db_path() -> Path:
     db_path: Path = config.get_db_path()
     if not db_path.exists():
         # 数据库文件不存在
@@ -188,14 +200,152 @@ def get_connection() -> sqlite3.Connection:
             f"Database file not found: {db_path}. "
             "Please place data.db in the server folder."
         )
+    return db_path
+
 
-    connection = sqlite3.connect(str(db_path), check_same_thread=False)
-    _configure_connection(connection)
+def get_connection(*, read_only: bool = False) -> sqlite3.Connection:
+    """
+    获取数据库连接
+    配置连接参数并返回一个sqlite3.Connection对象
+    """
+    db_path = _resolve_db_path()
+    connection = sqlite3.connect(
+        str(db_path),
+        check_same_thread=False,
+        cached_statements=_STATEMENT_CACHE_SIZE,
+        # GTS_SQL_PROFILE=1 时改用计时连接，统计归到当前请求名下
+        factory=ProfiledConnection if sql_profiling_enabled() else sqlite3.Connection,
+    )
+    _configure_connection(connection, read_only=read_only)
     return connection
 
 
-# 全局数据库连接
-conn = get_connection()
+def _close_connection(connection: sqlite3.Connection) -> None:
+    # 连接关闭后 id 可能被新连接复用，需同步移除函数注册记录。
+    _REGISTERED_SQL_CONNECTION_IDS.discard(id(connection))
+    _DATA_GENERATION_STATE["data_versions"].pop(id(connection), None)
+    try:
+        connection.close()
+    except sqlite3.Error:
+        pass
+
+
+class _ConnectionPool:
+    """
+    按线程分配只读连接（WAL 读者 + query_only），另维护一个共享写连接。
+    线程结束后其读连接会被回收复用，避免 threaded=True 下每个请求都新建连接。
+    """
+
+    def __init__(self, max_idle: int = 8):
+        self._max_idle = max(0, int(max_idle))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._owners: dict[int, tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._idle: list[sqlite3.Connection] = []
+        self._writer: sqlite3.Connection | None = None
+        self.write_lock = threading.RLock()
+
+    def _reclaim_dead_owners_locked(self) -> None:
+        for ident, (thread, connection) in list(self._owners.items()):
+            if thread.is_alive():
+                continue
+            del self._owners[ident]
+            if len(self._idle) < self._max_idle:
+                self._idle.append(connection)
+            else:
+                _close_connection(connection)
+
+    def reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+        with self._lock:
+            self._reclaim_dead_owners_locked()
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = get_connection(read_only=True)
+        with self._lock:
+            self._owners[threading.get_ident()] = (threading.current_thread(), connection)
+        self._local.connection = connection
+        return connection
+
+    def writer(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._writer is None:
+                self._writer = get_connection()
+            return self._writer
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections = [connection for _, connection in self._owners.values()]
+            connections.extend(self._idle)
+            if self._writer is not None:
+                connections.append(self._writer)
+            self._owners.clear()
+            self._idle.clear()
+            self._writer = None
+            self._local = threading.local()
+        for connection in connections:
+            _close_connection(connection)
+
+
+class _PooledConnection:
+    """
+    兼容原全局 conn 的代理：cursor() 落到当前线程的只读连接上。
+    写操作请通过 _write_cursor() 使用写连接。
+    """
+
+    def __init__(self, pool: _ConnectionPool):
+        self.pool = pool
+
+    def cursor(self) -> sqlite3.Cursor:
+        return self.pool.reader().cursor()
+
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        return self.pool.reader().execute(sql, parameters)
+
+    def commit(self) -> None:
+        # 只读连接没有需要提交的事务。
+        return None
+
+    def close(self) -> None:
+        self.pool.close_all()
+
+
+def _current_connection() -> sqlite3.Connection:
+    if isinstance(conn, _PooledConnection):
+        return conn.pool.reader()
+    return conn
+
+
+_STANDALONE_WRITE_LOCK = threading.RLock()
+
+
+@contextmanager
+def _write_cursor():
+    """
+    在写连接上执行写操作并提交。
+    conn 被替换为普通连接（如测试中的内存库）时直接复用它。
+    """
+    if isinstance(conn, _PooledConnection):
+        connection = conn.pool.writer()
+        lock = conn.pool.write_lock
+    else:
+        connection = conn
+        lock = _STANDALONE_WRITE_LOCK
+    with lock:
+        try:
+            with closing(connection.cursor()) as cursor:
+                yield cursor
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+# 全局数据库连接（按线程分配只读连接，写操作走独立写连接）
+_resolve_db_path()
+conn = _PooledConnection(_ConnectionPool())
+conn.pool.writer()
 
 # 缓存字典
 _CACHE: dict[str, dict] = {
@@ -204,23 +354,40 @@ _CACHE: dict[str, dict] = {
     "fts": {  # FTS相关缓存
         "available": None,
         "tokenizer": None,
-        "langs": None
+        "langs": None,
+        "readable_langs": None,
+        "subtitle_langs": None
     },
     "version": {},  # 版本相关缓存
     "names": {  # 名称缓存
         "characters": {},  # 角色名称缓存
         "wander": {},  # 旅行者名称缓存
         "traveller": {},  # 空旅行者名称缓存
-        "mate_avatar": {}  # 血亲同伴名称缓存
+        "mate_avatar": {},  # 血亲同伴名称缓存
+        "manual_text": {},  # 语言 -> manualTextMap 占位符字典
+        "avatar_by_lang": {},  # 预热：语言 -> {avatarId: 原始角色名}
+        "npc_by_lang": {}  # 预热：语言 -> {npcId: 原始 NPC 名}
     }
 }
 
 
 _RAW_CHARACTER_NAME_CACHE: dict[str, str | None] = {}
+# 查询形状 -> 拼好的 SQL 文本（或 (片段, 参数槽位)）；键里带上影响 SQL 文本的表结构状态
+_SQL_TEMPLATE_CACHE: dict[tuple, object] = {}
+_SQL_TEMPLATE_CACHE_LIMIT = 4096
 _FETTER_VOICE_TABLE = "fetterVoice"
-_FETTER_VOICE_SYNC_LOCK = threading.Lock()
-_FETTER_VOICE_SYNC_ATTEMPTED = False
-_FETTER_AVATAR_MAPPINGS: dict[str, int] | None = None
+_TEXT_HASH_VOICE_TABLE = "text_hash_voice"
+_TEXT_PRIMARY_SOURCE_TABLE = "text_primary_source"
+_SPEAKER_NAME_TABLE = "speaker_name"
+_NPC_DIALOGUE_GROUP_TABLE = "npc_dialogue_group"
+_QUEST_STEP_TABLE = "quest_step"
+_QUEST_STEP_TALK_TABLE = "quest_step_talk"
+_QUEST_HIDDEN_TABLE = "quest_hidden"
+_NORMALIZED_CONTENT_COLUMN = "normalized_content"
+# 与 dbBuild/voiceItemImport.FETTER_VOICE_BUILT_META_KEY 一致
+FETTER_VOICE_BUILT_META_KEY = "fetter_voice_built"
+_FETTER_VOICE_CHECK_LOCK = threading.Lock()
+_FETTER_VOICE_CHECKED = False
 _ANIME_GAME_DATA_JSON_CACHE: dict[str, object | None] = {}
 _MAIN_QUEST_ROWS_BY_ID: dict[int, dict] | None = None
 _QUEST_STEP_ROWS_BY_MAIN_ID: dict[int, list[dict]] | None = None
@@ -229,6 +396,123 @@ _QUEST_STEP_TALK_CONDITION_TYPES = {
     "QUEST_CONTENT_COMPLETE_TALK",
     "QUEST_CONTENT_FINISH_PLOT",
 }
+DATA_GENERATION_META_KEY = "db_generation"
+_DATA_GENERATION_LOCK = threading.Lock()
+_DATA_GENERATION_STATE: dict[str, object] = {
+    "generation": None,  # 最近一次读到的 app_meta.db_generation
+    "applied": None,  # 进程内缓存对应的数据代数
+    "data_versions": {},  # id(读连接) -> 上次看到的 PRAGMA data_version
+}
+_DATA_GENERATION_LISTENERS: list = []
+
+
+def addDataGenerationListener(listener) -> None:
+    """
+    注册数据代数变化时的回调（如控制器层的计数缓存），回调不带参数
+    """
+    if listener not in _DATA_GENERATION_LISTENERS:
+        _DATA_GENERATION_LISTENERS.append(listener)
+
+
+def _read_data_generation_meta(cursor) -> int:
+    try:
+        row = cursor.execute(
+            "SELECT v FROM app_meta WHERE k=? LIMIT 1",
+            (DATA_GENERATION_META_KEY,),
+        ).fetchone()
+    except sqlite3.Error:
+        return 0
+    try:
+        return int(row[0]) if row and row[0] is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def getDataGeneration() -> int:
+    """
+    返回当前数据库的数据代数（diffUpdate 收尾时递增）。
+    先比较本连接的 PRAGMA data_version：其它连接没有提交过写入时直接复用上次读到的值，
+    每个请求只多一条 PRAGMA，不必每次都查 app_meta
+    """
+    connection = _current_connection()
+    with closing(connection.cursor()) as cursor:
+        try:
+            data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            data_version = None
+        seen_versions = _DATA_GENERATION_STATE["data_versions"]
+        cached = _DATA_GENERATION_STATE["generation"]
+        if cached is not None and data_version is not None and seen_versions.get(id(connection)) == data_version:
+            return cached
+        generation = _read_data_generation_meta(cursor)
+    with _DATA_GENERATION_LOCK:
+        if data_version is not None:
+            seen_versions[id(connection)] = data_version
+        _DATA_GENERATION_STATE["generation"] = generation
+    return generation
+
+
+def getAppliedDataGeneration() -> int | None:
+    """
+    返回进程内缓存当前对应的数据代数（最近一次 syncDataGeneration 的结果），供上层缓存并入键中
+    """
+    return _DATA_GENERATION_STATE["applied"]
+
+
+def _flush_data_caches() -> None:
+    global _FETTER_VOICE_CHECKED, _MAIN_QUEST_ROWS_BY_ID, _QUEST_STEP_ROWS_BY_MAIN_ID
+    global _RAW_CHARACTER_NAME_CACHE, _QUEST_STEP_TALK_MAP_CACHE
+    _CACHE["column"].clear()
+    _CACHE["table"].clear()
+    for key in _CACHE["fts"]:
+        _CACHE["fts"][key] = None
+    # 由数据内容计算的缓存整体换成新字典：代数变化前开始的计算持有旧字典的引用，
+    # 结束后写回的旧数据落在被丢弃的字典里，不会进入新代数的缓存
+    _CACHE["version"] = {}
+    _CACHE["names"] = {bucket_name: {} for bucket_name in _CACHE["names"]}
+    _RAW_CHARACTER_NAME_CACHE = {}
+    _SQL_TEMPLATE_CACHE.clear()
+    _ANIME_GAME_DATA_JSON_CACHE.clear()
+    _QUEST_STEP_TALK_MAP_CACHE = {}
+    _FETTER_VOICE_CHECKED = False
+    _MAIN_QUEST_ROWS_BY_ID = None
+    _QUEST_STEP_ROWS_BY_MAIN_ID = None
+
+
+def syncDataGeneration() -> int:
+    """
+    每个请求开始时调用：数据代数变化时清空本模块的表结构/名称/版本缓存并通知监听者，
+    返回当前数据代数供上层缓存（search_cache）比对
+    """
+    try:
+        generation = getDataGeneration()
+    except sqlite3.Error:
+        return int(_DATA_GENERATION_STATE["applied"] or 0)
+    with _DATA_GENERATION_LOCK:
+        applied = _DATA_GENERATION_STATE["applied"]
+        if applied == generation:
+            return generation
+        _DATA_GENERATION_STATE["applied"] = generation
+    # 首次同步时进程内缓存本就为空，无需清空
+    if applied is not None:
+        _flush_data_caches()
+        for listener in list(_DATA_GENERATION_LISTENERS):
+            listener()
+    return generation
+
+
+def _sql_template(key: tuple, build):
+    """
+    按查询形状缓存 SQL 文本：同一形状只拼一次字符串，参数全部绑定，
+    SQL 文本稳定后 sqlite3 的语句缓存也能直接复用预编译语句
+    """
+    template = _SQL_TEMPLATE_CACHE.get(key)
+    if template is None:
+        template = build()
+        if len(_SQL_TEMPLATE_CACHE) >= _SQL_TEMPLATE_CACHE_LIMIT:
+            _SQL_TEMPLATE_CACHE.clear()
+        _SQL_TEMPLATE_CACHE[key] = template
+    return template
 
 
 def _get_gender_cache_key() -> str:
@@ -249,16 +533,56 @@ def _normalize_output_text(text: str | None, langCode: int):
     return placeholderHandler.replace(text, config.getIsMale(), langCode)
 
 
+def _preloaded_name(bucket_name: str, entity_id, langCode: int) -> tuple[bool, str | None]:
+    names = _CACHE["names"].get(bucket_name, {}).get(langCode)
+    if names is None:
+        return False, None
+    try:
+        return True, names.get(int(entity_id))
+    except (TypeError, ValueError):
+        return False, None
+
+
+def preloadNameTables(langs) -> dict[str, int]:
+    """
+    预热：按语言一次性读出全部角色名和 NPC 名，之后 getCharacterNameRaw / getTalkerName
+    只做字典查找。已加载的语言跳过；数据代数变化时随名称缓存一起清空
+    """
+    loaded = {"avatar": 0, "npc": 0}
+    sources = (
+        ("avatar", "avatar_by_lang", "select avatarId, content from avatar, textMap "
+                                     "where avatar.nameTextMapHash=textMap.hash and lang=?"),
+        ("npc", "npc_by_lang", "select npcId, content from npc, textMap where textHash = hash and lang = ?"),
+    )
+    with closing(conn.cursor()) as cursor:
+        for lang in dict.fromkeys(int(lang) for lang in langs):
+            for table_name, bucket_name, sql in sources:
+                bucket = _get_name_cache_bucket(bucket_name)
+                if lang in bucket or not _table_exists(table_name):
+                    continue
+                names: dict[int, str] = {}
+                for entity_id, content in cursor.execute(sql, (lang,)):
+                    names.setdefault(entity_id, content)
+                # 整体赋值，查询线程不会看到装了一半的字典
+                bucket[lang] = names
+                loaded[table_name] += len(names)
+    return loaded
+
+
 def getCharacterNameRaw(avatarId: int, langCode: int = 1):
+    preloaded, name = _preloaded_name("avatar_by_lang", avatarId, langCode)
+    if preloaded:
+        return name
     cache_key = f"{avatarId}:{langCode}"
-    if cache_key in _RAW_CHARACTER_NAME_CACHE:
-        return _RAW_CHARACTER_NAME_CACHE[cache_key]
+    name_cache = _RAW_CHARACTER_NAME_CACHE
+    if cache_key in name_cache:
+        return name_cache[cache_key]
     with closing(conn.cursor()) as cursor:
         sql = "select content from avatar, textMap where avatarId=? and avatar.nameTextMapHash=textMap.hash and lang=?"
         cursor.execute(sql, (avatarId, langCode))
         rows = cursor.fetchall()
         result = rows[0][0] if rows else None
-        _RAW_CHARACTER_NAME_CACHE[cache_key] = result
+        name_cache[cache_key] = result
         return result
 
 
@@ -372,6 +696,20 @@ def _version_select_expr(table_alias: str, table_name: str | None = None, lang_c
     """
     构建版本选择表达式
     """
+    schema_key = None
+    if table_name:
+        schema_key = (
+            _table_has_column(table_name, "created_version_id"),
+            _has_version_id_columns(table_name),
+            _has_version_dim(),
+        )
+    return _sql_template(
+        ("version_select", table_alias, table_name, lang_code, schema_key),
+        lambda: _compose_version_select_expr(table_alias, table_name, lang_code),
+    )
+
+
+def _compose_version_select_expr(table_alias: str, table_name: str | None, lang_code: int | None) -> str:
     if not table_name:
         return "NULL as created_version, NULL as updated_version"
     if table_name == 'quest':
@@ -500,6 +838,8 @@ def _escape_like(value: str) -> str:
 
 CHINESE_LANG_CODES = {1, 2}
 _TEXTMAP_FTS_TABLE = "textMap_fts"
+_READABLE_FTS_TABLE = "readable_fts"
+_SUBTITLE_FTS_TABLE = "subtitle_fts"
 _TEXTMAP_FTS_AVAILABLE: bool | None = None
 _TEXTMAP_FTS_TOKENIZER: str | None = None
 _TEXTMAP_FTS_LANGS: set[int] | None = None
@@ -558,18 +898,16 @@ def _get_textmap_fts_tokenizer() -> str:
     return _CACHE["fts"]["tokenizer"]
 
 
-def _get_textmap_fts_langs() -> set[int]:
+def _load_fts_langs_meta(meta_key: str) -> set[int]:
     """
-    获取启用了全文搜索的语言代码
+    读取构建时写入 app_meta 的全文索引语言列表
     """
-    if _CACHE["fts"]["langs"] is not None:
-        return _CACHE["fts"]["langs"]
-
     langs: set[int] = set()
     with closing(conn.cursor()) as cursor:
         try:
             row = cursor.execute(
-                "SELECT v FROM app_meta WHERE k='textmap_fts_langs' LIMIT 1"
+                "SELECT v FROM app_meta WHERE k=? LIMIT 1",
+                (meta_key,),
             ).fetchone()
         except Exception:
             row = None
@@ -582,6 +920,17 @@ def _get_textmap_fts_langs() -> set[int]:
                 langs.add(int(part))
             except Exception:
                 continue
+    return langs
+
+
+def _get_textmap_fts_langs() -> set[int]:
+    """
+    获取启用了全文搜索的语言代码
+    """
+    if _CACHE["fts"]["langs"] is not None:
+        return _CACHE["fts"]["langs"]
+
+    langs = _load_fts_langs_meta("textmap_fts_langs")
     if not langs:
         langs = set(config.getFtsLangAllowList())
     _CACHE["fts"]["langs"] = langs
@@ -594,6 +943,36 @@ def _is_textmap_fts_lang_enabled(lang_code: int) -> bool:
     return lang_code in _get_textmap_fts_langs()
 
 
+def _is_readable_fts_lang_enabled(lang_code: int) -> bool:
+    """
+    readable_fts 与 textMap_fts 共用开关和分词设置；旧库没有该表时走 LIKE
+    """
+    if not config.getEnableTextMapFts():
+        return False
+    if not _table_exists(_READABLE_FTS_TABLE):
+        return False
+    langs = _CACHE["fts"].get("readable_langs")
+    if langs is None:
+        langs = _load_fts_langs_meta("readable_fts_langs")
+        _CACHE["fts"]["readable_langs"] = langs
+    return lang_code in langs
+
+
+def _is_subtitle_fts_lang_enabled(lang_code: int) -> bool:
+    """
+    subtitle_fts 同样跟随 textMap_fts 的开关与语言白名单；旧库没有该表时走 LIKE
+    """
+    if not config.getEnableTextMapFts():
+        return False
+    if not _table_exists(_SUBTITLE_FTS_TABLE):
+        return False
+    langs = _CACHE["fts"].get("subtitle_langs")
+    if langs is None:
+        langs = _load_fts_langs_meta("subtitle_fts_langs")
+        _CACHE["fts"]["subtitle_langs"] = langs
+    return lang_code in langs
+
+
 def _resolve_fts_query_filters() -> tuple[set[str], int, int]:
     stopwords_text = os.environ.get("GTS_FTS_STOPWORDS")
     if stopwords_text is None:
@@ -735,6 +1114,9 @@ def _execute_with_fallback(
     def _should_use_fallback(exc: sqlite3.Error) -> bool:
         if sql_fallback is None:
             return False
+        if query_budget.is_interrupted_error(exc):
+            # 因时间预算被中断时改走 LIKE 只会更慢
+            return False
         if isinstance(exc, sqlite3.OperationalError):
             return True
         if not isinstance(exc, sqlite3.DatabaseError):
@@ -766,6 +1148,28 @@ def _execute_with_fallback(
         cursor.execute(sql_fallback, fallback_params)
 
 
+def _degrade_on_query_budget(default_factory):
+    """
+    关键词查询装饰器：在请求时间预算内“布防”执行，超时被进度回调中断时不抛错，
+    记一次中断并返回 default_factory() 作为降级结果（计数为 0、结果为空），由上层标记为截断
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget.armed() as budget:
+                if budget is None:
+                    return func(*args, **kwargs)
+                try:
+                    return func(*args, **kwargs)
+                except sqlite3.OperationalError as exc:
+                    if not (query_budget.is_interrupted_error(exc) and budget.expired()):
+                        raise
+                    budget.record_interruption()
+                    return default_factory()
+        return wrapper
+    return decorate
+
+
 def _safe_execute(cursor: sqlite3.Cursor, sql: str, params: list = []) -> list:
     """
     安全执行SQL查询，处理异常并返回结果
@@ -795,6 +1199,8 @@ def _build_like_patterns(keyword: str, lang_code: int) -> tuple[str, str]:
     return exact, fuzzy
 
 
+# 一次搜索会对同一关键词反复构建排序表达式，归一化结果只取决于关键词和语言
+@lru_cache(maxsize=1024)
 def _normalize_match_keyword(keyword: str | None, lang_code: int) -> str:
     raw_text = str(keyword or "").strip()
     text = fts_tokenizer.normalize_search_keyword(raw_text) or raw_text
@@ -803,14 +1209,36 @@ def _normalize_match_keyword(keyword: str | None, lang_code: int) -> str:
     return text.lower()
 
 
-def _build_normalized_match_expr(field_expr: str, lang_code: int) -> str:
-    trimmed = f"trim(coalesce({field_expr}, ''))"
-    if lang_code in CHINESE_LANG_CODES:
-        return (
-            "lower(replace(replace(replace(replace("
-            f"{trimmed}, ' ', ''), char(9), ''), char(10), ''), char(13), ''))"
-        )
-    return f"lower({trimmed})"
+def _stored_normalized_field(field_expr: str, table: str | None) -> str | None:
+    """
+    textMap/readable/subtitle 的 content 在导入时已写好 normalized_content，存在时直接比较该列
+    """
+    if table is None or not (field_expr == "content" or field_expr.endswith(".content")):
+        return None
+    if not _table_has_column(table, _NORMALIZED_CONTENT_COLUMN):
+        return None
+    return field_expr[: -len("content")] + _NORMALIZED_CONTENT_COLUMN
+
+
+def _build_normalized_match_expr(field_expr: str, lang_code: int, table: str | None = None) -> str:
+    is_chinese = lang_code in CHINESE_LANG_CODES
+    stored = _stored_normalized_field(field_expr, table)
+
+    def build():
+        trimmed = f"trim(coalesce({field_expr}, ''))"
+        if is_chinese:
+            computed = (
+                "lower(replace(replace(replace(replace("
+                f"{trimmed}, ' ', ''), char(9), ''), char(10), ''), char(13), ''))"
+            )
+        else:
+            computed = f"lower({trimmed})"
+        if stored is None:
+            return computed
+        # 回填未完成的行仍按原表达式计算，coalesce 命中存储值时不会求值第二个参数
+        return f"coalesce({stored}, {computed})"
+
+    return _sql_template(("normalized_match", field_expr, is_chinese, stored), build)
 
 
 def _build_match_sort_case(
@@ -818,25 +1246,66 @@ def _build_match_sort_case(
     keyword: str,
     lang_code: int,
     base_rank: int = 0,
+    table: str | None = None,
 ) -> tuple[str, list]:
     normalized_keyword = _normalize_match_keyword(keyword, lang_code)
     if not normalized_keyword:
         return f"case when 1=1 then {base_rank} end", []
 
-    normalized_expr = _build_normalized_match_expr(field_expr, lang_code)
+    normalized_expr = _build_normalized_match_expr(field_expr, lang_code, table)
     escaped = _escape_like(normalized_keyword)
     prefix = f"{escaped}%"
     contains = f"%{escaped}%"
-    sql = (
-        "case "
-        f"when {normalized_expr} = ? then {base_rank} "
-        f"when {normalized_expr} like ? escape '\\' then {base_rank + 1} "
-        f"when {normalized_expr} like ? escape '\\' then {base_rank + 2} "
-        f"else {base_rank + 3} end"
+    sql = _sql_template(
+        ("match_sort", normalized_expr, base_rank),
+        lambda: (
+            "case "
+            f"when {normalized_expr} = ? then {base_rank} "
+            f"when {normalized_expr} like ? escape '\\' then {base_rank + 1} "
+            f"when {normalized_expr} like ? escape '\\' then {base_rank + 2} "
+            f"else {base_rank + 3} end"
+        ),
     )
     return sql, [normalized_keyword, prefix, contains]
 
 
+def _build_search_rank_expr(
+    field_expr: str,
+    keyword: str,
+    lang_code: int,
+    hash_field: str | None = None,
+    hash_value: int | None = None,
+    table: str | None = None,
+) -> tuple[str, list]:
+    """
+    构建与应用层 _sort_search_results 一致的主排序值：精确命中哈希时为 0，否则为匹配等级
+    """
+    match_sort_sql, match_sort_params = _build_match_sort_case(field_expr, keyword, lang_code, table=table)
+    if hash_field is None or hash_value is None:
+        return match_sort_sql, match_sort_params
+    return f"case when {hash_field} = ? then 0 else {match_sort_sql} end", [hash_value, *match_sort_params]
+
+
+def _wrap_seek_query(
+    inner_sql: str,
+    inner_params: list,
+    after_key: tuple[int, int, int] | None,
+    limit: int,
+) -> tuple[str, list]:
+    """
+    将带 sort_rank / voice_rank / seek_id 列的查询包装为游标（seek）分页查询
+    排序键为 (sort_rank, voice_rank, seek_id)，after_key 为上一页最后一行的键
+    """
+    sql = f"select * from ({inner_sql}) seek "
+    params = list(inner_params)
+    if after_key is not None:
+        sql += "where (seek.sort_rank, seek.voice_rank, seek.seek_id) > (?, ?, ?) "
+        params.extend(int(value) for value in after_key)
+    sql += "order by seek.sort_rank, seek.voice_rank, seek.seek_id limit ?"
+    params.append(int(limit))
+    return sql, params
+
+
 def _build_textmap_query(
     use_fts: bool,
     keyword: str,
@@ -850,76 +1319,118 @@ def _build_textmap_query(
     updated_version: str | None,
     hash_value: int | None = None,
     limit: int | None = None,
-    offset: int | None = None
+    offset: int | None = None,
+    seek: bool = False,
+    join_clause: str = "",
+    join_params: list | None = None,
 ) -> tuple[str, list]:
     """
     构建文本映射查询
+    seek=True 时额外输出 sort_rank / voice_rank / seek_id 列且不排序，交由 _wrap_seek_query 包装
+    SQL 文本按查询形状缓存，每次调用只重新组装参数
     """
-    params: list = []
+    use_fts = bool(use_fts and fts_match)
+    has_hash = hash_value is not None
+    has_limit = limit is not None
+    has_offset = has_limit and offset is not None
+    voice_mode = voice_filter if voice_expr and voice_filter in ("with", "without") else None
+    created = _normalize_version_filter(created_version)
+    updated = _normalize_version_filter(updated_version)
     version_select = _version_select_expr("tm", "textMap")
+    version_fragment, version_slots = _version_filter_fragment("tm", "textMap", bool(created), bool(updated), False)
+    match_sort_sql, match_sort_params = _build_match_sort_case("tm.content", keyword, langCode, table="textMap")
+    voice_order_sql = _voice_order_expr("tm.hash")
+
+    def build():
+        select_sql = f"select tm.hash, tm.content, {version_select}"
+        if seek:
+            rank_sql = match_sort_sql
+            if has_hash:
+                rank_sql = f"case when tm.hash = ? then 0 else {match_sort_sql} end"
+            select_sql = (
+                f"select distinct tm.hash, tm.content, {version_select}, "
+                f"{rank_sql} as sort_rank, {voice_order_sql} as voice_rank, tm.hash as seek_id"
+            )
+        select_sql += f" from textMap tm {join_clause}"
 
-    if use_fts and fts_match:
-        # 使用FTS查询
-        sql = (
-            f"select tm.hash, tm.content, {version_select} from textMap tm "
-            f"where tm.id in (select rowid from {_TEXTMAP_FTS_TABLE} where {_TEXTMAP_FTS_TABLE} match ? and lang=?) "
-            "and tm.lang=? "
-            "and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
-        )
-        params = [fts_match, langCode, langCode, exact, fuzzy]
-    else:
-        # 使用LIKE查询
-        sql = (
-            f"select tm.hash, tm.content, {version_select} from textMap tm "
-            "where tm.lang=? and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
-        )
-        params = [langCode, exact, fuzzy]
+        if use_fts:
+            # 使用FTS查询
+            sql = (
+                f"{select_sql}"
+                f"where tm.id in (select rowid from {_TEXTMAP_FTS_TABLE} where {_TEXTMAP_FTS_TABLE} match ? and lang=?) "
+                "and tm.lang=? "
+                "and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
+            )
+        else:
+            # 使用LIKE查询
+            sql = (
+                f"{select_sql}"
+                "where tm.lang=? and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
+            )
 
-    # 添加版本过滤
-    sql = _append_version_filter_clause(
-        sql,
-        params,
-        "tm",
-        created_version,
-        updated_version,
-        "textMap",
-    )
+        # 添加版本过滤
+        sql += version_fragment
 
-    # 添加语音过滤
-    if voice_filter and voice_expr:
-        if voice_filter == "with":
+        # 添加语音过滤
+        if voice_mode == "with":
             sql += f"and ({voice_expr}) "
-        elif voice_filter == "without":
+        elif voice_mode == "without":
             sql += f"and not ({voice_expr}) "
 
-    match_sort_sql, match_sort_params = _build_match_sort_case("tm.content", keyword, langCode)
+        if seek:
+            return sql
 
-    # 简化排序逻辑：只在SQL中做基本排序
-    # 复杂的子查询（source_presence, dialogue exist check）移到应用层避免性能问题
-    if hash_value is not None:
-        sql += (
-            "order by "
-            "case when tm.hash = ? then 0 else 1 end, "
-            f"{match_sort_sql}, "
-            f"{_voice_order_expr('tm.hash')} "
-        )
-        params.append(hash_value)
+        # 简化排序逻辑：只在SQL中做基本排序
+        # 复杂的子查询（source_presence, dialogue exist check）移到应用层避免性能问题
+        if has_hash:
+            sql += (
+                "order by "
+                "case when tm.hash = ? then 0 else 1 end, "
+                f"{match_sort_sql}, "
+                f"{voice_order_sql} "
+            )
+        else:
+            sql += (
+                "order by "
+                f"{match_sort_sql}, "
+                f"{voice_order_sql} "
+            )
+
+        if has_limit:
+            sql += "limit ?"
+            if has_offset:
+                sql += " offset ?"
+        return sql
+
+    sql = _sql_template(
+        (
+            "textmap_query", use_fts, seek, join_clause, has_hash, has_limit, has_offset,
+            version_select, version_fragment, match_sort_sql, voice_order_sql,
+            voice_mode, voice_expr if voice_mode else None,
+        ),
+        build,
+    )
+
+    params: list = []
+    hash_params = [hash_value] if has_hash else []
+    if seek:
+        params.extend(hash_params)
         params.extend(match_sort_params)
+    params.extend(join_params or [])
+    if use_fts:
+        params.extend([fts_match, langCode, langCode, exact, fuzzy])
     else:
-        sql += (
-            "order by "
-            f"{match_sort_sql}, "
-            f"{_voice_order_expr('tm.hash')} "
-        )
-        params.extend(match_sort_params)
-
-    if limit is not None:
-        sql += "limit ?"
+        params.extend([langCode, exact, fuzzy])
+    params.extend(_version_filter_slot_values(version_slots, created, updated, None))
+    if seek:
+        return sql, params
+
+    params.extend(hash_params)
+    params.extend(match_sort_params)
+    if has_limit:
         params.append(limit)
-        if offset is not None:
-            sql += " offset ?"
+        if has_offset:
             params.append(offset)
-
     return sql, params
 
 
@@ -937,42 +1448,47 @@ def _build_textmap_count_query(
     """
     构建文本映射计数查询
     """
-    params: list = []
+    use_fts = bool(use_fts and fts_match)
+    voice_mode = voice_filter if voice_expr and voice_filter in ("with", "without") else None
+    created = _normalize_version_filter(created_version)
+    updated = _normalize_version_filter(updated_version)
+    version_fragment, version_slots = _version_filter_fragment("tm", "textMap", bool(created), bool(updated), False)
 
-    if use_fts and fts_match:
-        # 使用FTS查询
-        sql = (
-            f"select count(*) from textMap tm "
-            f"where tm.id in (select rowid from {_TEXTMAP_FTS_TABLE} where {_TEXTMAP_FTS_TABLE} match ? and lang=?) "
-            "and tm.lang=? "
-            "and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
-        )
-        params = [fts_match, langCode, langCode, exact, fuzzy]
-    else:
-        # 使用LIKE查询
-        sql = (
-            "select count(*) from textMap tm "
-            "where tm.lang=? and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
-        )
-        params = [langCode, exact, fuzzy]
+    def build():
+        if use_fts:
+            # 使用FTS查询
+            sql = (
+                f"select count(*) from textMap tm "
+                f"where tm.id in (select rowid from {_TEXTMAP_FTS_TABLE} where {_TEXTMAP_FTS_TABLE} match ? and lang=?) "
+                "and tm.lang=? "
+                "and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
+            )
+        else:
+            # 使用LIKE查询
+            sql = (
+                "select count(*) from textMap tm "
+                "where tm.lang=? and (tm.content like ? escape '\\' or tm.content like ? escape '\\') "
+            )
 
-    # 添加版本过滤
-    sql = _append_version_filter_clause(
-        sql,
-        params,
-        "tm",
-        created_version,
-        updated_version,
-        "textMap",
-    )
+        # 添加版本过滤
+        sql += version_fragment
 
-    # 添加语音过滤
-    if voice_filter and voice_expr:
-        if voice_filter == "with":
+        # 添加语音过滤
+        if voice_mode == "with":
             sql += f"and ({voice_expr})"
-        elif voice_filter == "without":
+        elif voice_mode == "without":
             sql += f"and not ({voice_expr})"
+        return sql
 
+    sql = _sql_template(
+        ("textmap_count", use_fts, version_fragment, voice_mode, voice_expr if voice_mode else None),
+        build,
+    )
+    if use_fts:
+        params = [fts_match, langCode, langCode, exact, fuzzy]
+    else:
+        params = [langCode, exact, fuzzy]
+    params.extend(_version_filter_slot_values(version_slots, created, updated, None))
     return sql, params
 
 
@@ -1098,9 +1614,8 @@ def _ensure_fetter_voice_schema(cursor: sqlite3.Cursor | None = None) -> None:
     if cursor is not None:
         ensure(cursor)
         return
-    with closing(conn.cursor()) as local_cursor:
+    with _write_cursor() as local_cursor:
         ensure(local_cursor)
-    conn.commit()
 
 
 def _resolve_anime_game_data_root() -> Path | None:
@@ -1214,13 +1729,32 @@ def _is_hidden_quest_source_obj(obj: object) -> bool:
     return False
 
 
+def _quest_step_tables_ready() -> bool:
+    """
+    构建阶段生成的 quest_step / quest_step_talk / quest_hidden 存在时，子任务标题与隐藏任务标记直接查表；
+    旧库缺表时才回退到现场读取 BinOutput/Quest 与任务 Excel
+    """
+    return _table_exists(_QUEST_STEP_TALK_TABLE)
+
+
+def _is_hidden_quest(quest_id: int) -> bool:
+    if _quest_step_tables_ready():
+        with closing(conn.cursor()) as cursor:
+            row = cursor.execute(
+                f"select 1 from {_QUEST_HIDDEN_TABLE} where questId=?",
+                (quest_id,),
+            ).fetchone()
+        return row is not None
+    quest_bin = _get_quest_bin_output(quest_id)
+    main_quest = _load_main_quest_rows_by_id().get(quest_id)
+    return _is_hidden_quest_source_obj(quest_bin) or _is_hidden_quest_source_obj(main_quest)
+
+
 def isHiddenQuestWithoutBody(questId: int) -> bool:
     quest_id = _coerce_optional_int(questId)
     if quest_id is None:
         return False
-    quest_bin = _get_quest_bin_output(quest_id)
-    main_quest = _load_main_quest_rows_by_id().get(quest_id)
-    if not (_is_hidden_quest_source_obj(quest_bin) or _is_hidden_quest_source_obj(main_quest)):
+    if not _is_hidden_quest(quest_id):
         return False
     return countQuestDialogues(quest_id) <= 0
 
@@ -1384,6 +1918,9 @@ def getQuestDescription(questId: int, langCode: int = 1) -> str:
             ).fetchone()
         if row and row[0] and not is_excluded_quest_text(row[0]):
             return _normalize_output_text(row[0], langCode) or ""
+        if _quest_step_tables_ready():
+            # 构建阶段已把描述哈希写入 quest 表，查不到即为该语言无描述，不再回退读取任务 Excel
+            return ""
 
     row = _load_main_quest_rows_by_id().get(questId)
     if not isinstance(row, dict):
@@ -1411,11 +1948,7 @@ def getQuestLongDescription(questId: int, langCode: int = 1) -> str:
     return ""
 
 
-def getQuestStepTitleMap(questId: int, langCode: int = 1) -> dict[int, str]:
-    cache_key = (int(questId), int(langCode))
-    if cache_key in _QUEST_STEP_TALK_MAP_CACHE:
-        return _QUEST_STEP_TALK_MAP_CACHE[cache_key]
-
+def _select_quest_talk_step_titles(questId: int, langCode: int) -> dict[int, str]:
     talk_title_map: dict[int, str] = {}
     if _table_has_column("questTalk", "stepTitleTextMapHash"):
         with closing(conn.cursor()) as cursor:
@@ -1436,7 +1969,57 @@ def getQuestStepTitleMap(questId: int, langCode: int = 1) -> dict[int, str]:
                     if isinstance(talk_id, int) and content and not is_excluded_quest_text(content)
                 }
             )
+    return talk_title_map
+
+
+def _fill_quest_step_titles_from_tables(questId: int, langCode: int, talk_title_map: dict[int, str]) -> None:
+    """
+    按导入时落库的 talk → 子任务映射补全标题：先按子任务顺序填完成条件中的对话，
+    再给仍未命中的顶层 talk 取其候选子任务中第一个有标题的；子任务标题优先 Excel 哈希，该语言为空时用 BinOutput 哈希
+    """
+    with closing(conn.cursor()) as cursor:
+        rows = cursor.execute(
+            "select t.kind, t.talkId, t.subId, t.seq, s.stepOrder, title.content, fallback.content "
+            f"from {_QUEST_STEP_TALK_TABLE} t "
+            f"join {_QUEST_STEP_TABLE} s on s.questId=t.questId and s.subId=t.subId "
+            "left join textMap title on title.hash=s.titleTextMapHash and title.lang=? "
+            "left join textMap fallback on fallback.hash=s.fallbackTitleTextMapHash and fallback.lang=? "
+            "where t.questId=?",
+            (langCode, langCode, questId),
+        ).fetchall()
+
+    finish_rows = sorted(
+        (row for row in rows if row[0] == 0),
+        key=lambda row: (row[4] if row[4] is not None else 10**9, row[2], row[3]),
+    )
+    for _kind, talk_id, _sub_id, _seq, _order, title, fallback in finish_rows:
+        step_title = title or fallback or ""
+        if step_title:
+            talk_title_map.setdefault(talk_id, step_title)
+
+    top_level_talk_ids = {row[1] for row in rows if row[0] == 1 and row[1] not in talk_title_map}
+    for _kind, talk_id, _sub_id, _seq, _order, title, fallback in sorted(
+        (row for row in rows if row[0] == 1),
+        key=lambda row: (row[1], row[3]),
+    ):
+        step_title = title or fallback or ""
+        if step_title and talk_id in top_level_talk_ids:
+            talk_title_map[talk_id] = step_title
+            top_level_talk_ids.discard(talk_id)
+
+
+def getQuestStepTitleMap(questId: int, langCode: int = 1) -> dict[int, str]:
+    if _quest_step_tables_ready():
+        talk_title_map = _select_quest_talk_step_titles(questId, langCode)
+        _fill_quest_step_titles_from_tables(questId, langCode, talk_title_map)
+        return talk_title_map
+
+    cache_key = (int(questId), int(langCode))
+    step_map_cache = _QUEST_STEP_TALK_MAP_CACHE
+    if cache_key in step_map_cache:
+        return step_map_cache[cache_key]
 
+    talk_title_map = _select_quest_talk_step_titles(questId, langCode)
     title_by_sub_id: dict[int, str] = {}
     order_by_sub_id: dict[int, int] = {}
 
@@ -1500,230 +2083,53 @@ def getQuestStepTitleMap(questId: int, langCode: int = 1) -> dict[int, str]:
                     talk_title_map.setdefault(talk_id, title)
                     break
 
-    _QUEST_STEP_TALK_MAP_CACHE[cache_key] = talk_title_map
+    step_map_cache[cache_key] = talk_title_map
     return talk_title_map
 
 
-def _collect_fetter_switch_names(config_node, output: set[str]) -> None:
-    if isinstance(config_node, dict):
-        for value in config_node.values():
-            _collect_fetter_switch_names(value, output)
-        return
-    if isinstance(config_node, list):
-        for item in config_node:
-            _collect_fetter_switch_names(item, output)
-        return
-    if isinstance(config_node, str):
-        lowered = config_node.lower()
-        if lowered.startswith("switch_"):
-            output.add(lowered)
-
-
-def _extract_fetter_internal_names(avatar_config: dict) -> set[str]:
-    switch_names: set[str] = set()
-    _collect_fetter_switch_names(avatar_config, switch_names)
-    generic_names = {
-        "switch_boy",
-        "switch_girl",
-        "switch_male",
-        "switch_female",
-        "switch_loli",
-        "switch_lady",
-        "switch_other",
-    }
-    filtered = {name for name in switch_names if name not in generic_names}
-    if filtered:
-        return filtered
-
-    legacy_name = (
-        avatar_config.get("PLJBIDOIHEA", {})
-        .get("KDKDKOMMCOB", {})
-        .get("GLMJHDNIGID")
-    )
-    if isinstance(legacy_name, str) and legacy_name:
-        return {legacy_name.lower()}
-    return set()
-
-
-def _load_fetter_avatar_mappings() -> dict[str, int]:
-    global _FETTER_AVATAR_MAPPINGS
-    if _FETTER_AVATAR_MAPPINGS is not None:
-        return _FETTER_AVATAR_MAPPINGS
-
-    data_root = _resolve_anime_game_data_root()
-    if data_root is None:
-        _FETTER_AVATAR_MAPPINGS = {}
-        return _FETTER_AVATAR_MAPPINGS
-
-    avatar_excel = data_root / "ExcelBinOutput" / "AvatarExcelConfigData.json"
-    avatar_dir = data_root / "BinOutput" / "Avatar"
-    if not avatar_excel.is_file() or not avatar_dir.is_dir():
-        _FETTER_AVATAR_MAPPINGS = {}
-        return _FETTER_AVATAR_MAPPINGS
-
-    try:
-        with open(avatar_excel, encoding="utf-8") as fp:
-            avatars_json = json.load(fp)
-    except Exception:
-        _FETTER_AVATAR_MAPPINGS = {}
-        return _FETTER_AVATAR_MAPPINGS
-
-    mappings: dict[str, int] = {}
-    for avatar in avatars_json:
-        if not isinstance(avatar, dict):
-            continue
-        avatar_id = avatar.get("id")
-        if not isinstance(avatar_id, int) or avatar_id >= 11000000:
-            continue
-        icon_name = str(avatar.get("iconName") or "")
-        if len(icon_name) <= 14:
-            continue
-        config_path = avatar_dir / f"ConfigAvatar_{icon_name[14:]}.json"
-        if not config_path.is_file():
-            continue
-        try:
-            with open(config_path, encoding="utf-8") as fp:
-                avatar_config = json.load(fp)
-        except Exception:
-            continue
-        for internal_name in _extract_fetter_internal_names(avatar_config):
-            mappings.setdefault(internal_name, avatar_id)
-
-    _FETTER_AVATAR_MAPPINGS = mappings
-    return mappings
-
-
-def _map_fetter_switch_name_to_avatar_id(raw_name: str | None) -> int:
-    text = str(raw_name or "").strip().lower()
-    if not text:
-        return 0
-    if text.startswith("switch_gcg") or text.startswith("gcg"):
-        return 0
-    if text == "switch_hero":
-        return 10000005
-    if text == "switch_heroine":
-        return 10000007
-    if text == "switch_tartaglia_melee":
-        text = "switch_tartaglia"
-    return _load_fetter_avatar_mappings().get(text, 0)
-
-
-def _pick_fetter_source_value(source: dict, keys: tuple[str, ...]):
-    for key in keys:
-        value = source.get(key)
-        if value is not None:
-            return value
-    return None
-
-
-def _extract_fetter_voice_rows(content: dict) -> list[tuple[int, int, str]]:
-    raw_type = _pick_fetter_source_value(
-        content,
-        ("JOMDCMBGNMB", "IACPGADBANJ", "Type", "type"),
-    )
-    if str(raw_type or "").strip().lower() != "fetter":
-        return []
-
-    raw_voice_file = _pick_fetter_source_value(
-        content,
-        ("BKGHEBIGJNC", "MGOMDNKKLCP", "voiceFile", "Id", "id"),
-    )
-    voice_file = _coerce_optional_int(raw_voice_file)
-    if voice_file is None:
-        return []
-
-    source_nodes = _pick_fetter_source_value(
-        content,
-        ("NEJBKIJIBHJ", "OPGDOEDEJOJ", "SourceNames", "sourceNames"),
-    )
-    if source_nodes is None:
-        source_nodes = []
-    if not isinstance(source_nodes, list):
-        return []
-
-    rows: list[tuple[int, int, str]] = []
-    seen_rows: set[tuple[int, str]] = set()
-    for source in source_nodes:
-        if not isinstance(source, dict):
-            continue
-        switch_name = _pick_fetter_source_value(
-            source,
-            ("FBCCEBGJEDB", "IEPAMKPOOII", "avatarName", "GDIJGLOHHFM", "switchName"),
-        )
-        avatar_id = _map_fetter_switch_name_to_avatar_id(switch_name)
-        if avatar_id <= 0:
-            continue
-        voice_path = _pick_fetter_source_value(
-            source,
-            ("sourceFileName", "NKPOOPONEHG", "MDOCAGOFPAP", "DCIHFJLBLAP", "BJDAJEKPCFP"),
-        )
-        voice_path_text = str(voice_path or "").strip()
-        row_key = (avatar_id, voice_path_text)
-        if not voice_path_text or row_key in seen_rows:
-            continue
-        seen_rows.add(row_key)
-        rows.append((avatar_id, voice_file, voice_path_text))
-    return rows
-
-
-def _load_fetter_voice_rows_from_data() -> list[tuple[int, int, str]]:
-    data_root = _resolve_anime_game_data_root()
-    if data_root is None:
-        return []
-
-    items_dir = data_root / "BinOutput" / "Voice" / "Items"
-    rows: list[tuple[int, int, str]] = []
-    for json_file in sorted(items_dir.glob("*.json")):
+def _read_fetter_voice_built_meta() -> str | None:
+    with closing(conn.cursor()) as cursor:
         try:
-            with open(json_file, encoding="utf-8") as fp:
-                payload = json.load(fp)
-        except Exception:
-            continue
-        if not isinstance(payload, dict):
-            continue
-        for content in payload.values():
-            if not isinstance(content, dict):
-                continue
-            rows.extend(_extract_fetter_voice_rows(content))
-    return rows
+            row = cursor.execute(
+                "SELECT v FROM app_meta WHERE k=? LIMIT 1",
+                (FETTER_VOICE_BUILT_META_KEY,),
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+    return str(row[0]) if row and row[0] is not None else None
 
 
 def _ensure_fetter_voice_data() -> None:
-    global _FETTER_VOICE_SYNC_ATTEMPTED
-    _ensure_fetter_voice_schema()
-    with closing(conn.cursor()) as cursor:
-        row = cursor.execute(f"SELECT 1 FROM {_FETTER_VOICE_TABLE} LIMIT 1").fetchone()
-        if row:
-            return
-    if _FETTER_VOICE_SYNC_ATTEMPTED:
+    """
+    fetterVoice 由构建阶段（DBBuild fetter_voices / diffUpdate fetter_voice）写入并在 app_meta 留下完成标记，
+    运行时每个数据代数只检查一次标记，不再现场解析语音数据；旧库缺标记且缺表时只补建空表，保证关联查询可用
+    """
+    global _FETTER_VOICE_CHECKED
+    if _FETTER_VOICE_CHECKED:
         return
+    with _FETTER_VOICE_CHECK_LOCK:
+        if _FETTER_VOICE_CHECKED:
+            return
+        if not _read_fetter_voice_built_meta() and not _table_exists(_FETTER_VOICE_TABLE):
+            with _write_cursor() as cursor:
+                _ensure_fetter_voice_schema(cursor)
+            _CACHE["table"].pop(_FETTER_VOICE_TABLE, None)
+        _FETTER_VOICE_CHECKED = True
 
-    with _FETTER_VOICE_SYNC_LOCK:
-        with closing(conn.cursor()) as cursor:
-            _ensure_fetter_voice_schema(cursor)
-            row = cursor.execute(f"SELECT 1 FROM {_FETTER_VOICE_TABLE} LIMIT 1").fetchone()
-            if row:
-                _FETTER_VOICE_SYNC_ATTEMPTED = True
-                conn.commit()
-                return
 
-        rows = _load_fetter_voice_rows_from_data()
-        with closing(conn.cursor()) as cursor:
-            _ensure_fetter_voice_schema(cursor)
-            if rows:
-                cursor.executemany(
-                    f"""
-                    INSERT INTO {_FETTER_VOICE_TABLE}(avatarId, voiceFile, voicePath)
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(avatarId, voiceFile, voicePath) DO NOTHING
-                    """,
-                    rows,
-                )
-        conn.commit()
-        _FETTER_VOICE_SYNC_ATTEMPTED = True
+def _text_hash_voice_table_ready() -> bool:
+    """
+    构建阶段维护的 text_hash_voice 存在时，语音判断改为主键查找；旧库缺表时回退到关联子查询
+    """
+    return _table_exists(_TEXT_HASH_VOICE_TABLE)
 
 
 def _text_hash_has_voice_expr(text_hash_field: str) -> str:
+    if _text_hash_voice_table_ready():
+        return (
+            f"exists (select 1 from {_TEXT_HASH_VOICE_TABLE} thv "
+            f"where thv.hash = {text_hash_field} and thv.has_voice = 1)"
+        )
     return (
         "exists ("
         "select 1 from dialogue d "
@@ -1738,20 +2144,64 @@ def _text_hash_has_voice_expr(text_hash_field: str) -> str:
 
 
 def _voice_exists_expr(text_hash_field: str) -> str:
-    return _text_hash_has_voice_expr(text_hash_field)
+    return _sql_template(
+        ("voice_exists", text_hash_field, _text_hash_voice_table_ready()),
+        lambda: _text_hash_has_voice_expr(text_hash_field),
+    )
 
 
 def _voice_order_expr(text_hash_field: str) -> str:
-    return (
-        "case when "
-        f"{_text_hash_has_voice_expr(text_hash_field)} "
-        "then 0 else 1 end"
+    return _sql_template(
+        ("voice_order", text_hash_field, _text_hash_voice_table_ready()),
+        lambda: (
+            "case when "
+            f"{_text_hash_has_voice_expr(text_hash_field)} "
+            "then 0 else 1 end"
+        ),
     )
 
 
+def _select_avatar_scoped_voice_paths_from_text_hashes(text_hashes: list[int]) -> dict[int, str]:
+    """
+    批量版语音路径查询：对白语音优先，其次角色语音，与单条查询的优先级一致。
+    """
+    result: dict[int, str] = {}
+    normalized_ids = _unique_text_hashes(text_hashes)
+    if not normalized_ids:
+        return result
+    _ensure_fetter_voice_data()
+    with closing(conn.cursor()) as cursor:
+        for chunk in _iter_hash_chunks(normalized_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            sql_dialogue = (
+                "select dialogue.textHash, voicePath from dialogue "
+                "join voice on voice.dialogueId = dialogue.dialogueId "
+                f"where dialogue.textHash in ({placeholders})"
+            )
+            for text_hash, voice_path in cursor.execute(sql_dialogue, chunk).fetchall():
+                result.setdefault(int(text_hash), voice_path)
+
+            missing = [text_hash for text_hash in chunk if text_hash not in result]
+            if not missing:
+                continue
+            placeholders = ",".join("?" for _ in missing)
+            sql_fetter = (
+                "select fetters.voiceFileTextTextMapHash, fv.voicePath from fetters "
+                f"join {_FETTER_VOICE_TABLE} fv on fv.avatarId = fetters.avatarId and fv.voiceFile = fetters.voiceFile "
+                f"where fetters.voiceFileTextTextMapHash in ({placeholders})"
+            )
+            for text_hash, voice_path in cursor.execute(sql_fetter, missing).fetchall():
+                result.setdefault(int(text_hash), voice_path)
+    return result
+
+
 def _has_avatar_scoped_fetter_voice(textHash: int) -> bool:
     _ensure_fetter_voice_data()
     with closing(conn.cursor()) as cursor:
+        if _text_hash_voice_table_ready():
+            cursor.execute(f"SELECT {_text_hash_has_voice_expr('?')}", (textHash,))
+            row = cursor.fetchone()
+            return bool(row and row[0])
         sql = (
             "SELECT EXISTS("
             "SELECT 1 FROM dialogue d "
@@ -1884,106 +2334,165 @@ def _select_avatar_scoped_voice_items_by_filters(
         return cursor.fetchall()
 
 
-def _append_version_filter_clause(
-    sql: str,
-    params: list,
-    table_alias: str,
-    created_version: str | None,
-    updated_version: str | None,
-    table_name: str | None = None,
-    lang_code: int | None = None,
-) -> str:
-    created = _normalize_version_filter(created_version)
-    updated = _normalize_version_filter(updated_version)
-    if table_name == 'quest':
-        # For quest table, only check created_version_id since updated_version_id is in quest_version
-        if not _table_has_column(table_name, "created_version_id"):
-            if created or updated:
-                sql += "and 1=0 "
-            return sql
-        has_id_mode = bool(_table_has_column(table_name, "created_version_id") and _has_version_dim())
-    elif table_name == 'npc':
-        if not _table_has_column(table_name, "created_version_id"):
-            if created or updated:
-                sql += "and 1=0 "
-            return sql
-        has_id_mode = bool(_table_has_column(table_name, "created_version_id") and _has_version_dim())
-    else:
-        if table_name and not _has_version_id_columns(table_name):
-            if created or updated:
-                sql += "and 1=0 "
-            return sql
-        has_id_mode = bool(table_name and _has_version_id_columns(table_name) and _has_version_dim())
-    if created:
-        if has_id_mode:
-            sql += (
-                f"and exists ("
-                f"select 1 from {_VERSION_DIM_TABLE} vdc "
-                f"where vdc.id = {table_alias}.created_version_id "
-                f"and coalesce(vdc.version_tag, '') = ? "
-                f"limit 1) "
+# 版本 id 集合以 JSON 数组作为单个参数传入，SQL 文本与集合大小无关，可以继续走模板缓存
+_VERSION_ID_SET_SQL = "(select value from json_each(?))"
+
+
+def _version_filter_ids(version_tag: str) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    把版本过滤值解析成 version_dim.id 集合，缓存在 _CACHE["version"]（数据代数变化时整体换新）。
+    键里带上 version_dim 的最大 id，单独回放历史等未递增代数的写入新增版本后也会重新解析。
+    返回 (version_tag 等于该值的 id, 与该版本视为同一版本的 id)；后者供“更新版本”过滤排除创建即更新的行
+    """
+    version_cache = _CACHE["version"]
+    with closing(conn.cursor()) as cursor:
+        row = cursor.execute(f"select max(id) from {_VERSION_DIM_TABLE}").fetchone()
+        key = ("filter_ids", version_tag, row[0] if row else None)
+        cached = version_cache.get(key)
+        if cached is not None:
+            return cached
+        tag_ids = tuple(
+            int(row[0])
+            for row in cursor.execute(
+                f"select id from {_VERSION_DIM_TABLE} where coalesce(version_tag, '') = ? order by id",
+                (version_tag,),
             )
-            params.append(created)
+        )
+        same_version_ids = tuple(
+            int(row[0])
+            for row in cursor.execute(
+                f"select id from {_VERSION_DIM_TABLE} "
+                "where lower(trim(coalesce(version_tag, raw_version, ''))) = ? order by id",
+                (version_tag.strip().lower(),),
+            )
+        )
+    resolved = (tag_ids, same_version_ids)
+    version_cache[key] = resolved
+    return resolved
+
+
+def _version_filter_slot_values(
+    slots: tuple[str, ...],
+    created: str | None,
+    updated: str | None,
+    lang_code: int | None,
+) -> list:
+    values: list = []
+    for slot in slots:
+        if slot == "lang":
+            values.append(lang_code)
+        elif slot == "created_ids":
+            values.append(json.dumps(_version_filter_ids(created)[0]))
+        elif slot == "updated_ids":
+            values.append(json.dumps(_version_filter_ids(updated)[0]))
+        elif slot == "updated_same_ids":
+            values.append(json.dumps(_version_filter_ids(updated)[1]))
+    return values
+
+
+def _version_filter_fragment(
+    table_alias: str,
+    table_name: str | None,
+    created: bool,
+    updated: bool,
+    has_lang: bool,
+) -> tuple[str, tuple[str, ...]]:
+    """
+    按查询形状生成版本过滤片段，返回 (SQL 片段, 参数槽位)；槽位取值为 created / updated / lang
+    """
+    def build():
+        fragment = ""
+        slots: list[str] = []
+        if table_name == 'quest':
+            # For quest table, only check created_version_id since updated_version_id is in quest_version
+            if not _table_has_column(table_name, "created_version_id"):
+                if created or updated:
+                    fragment += "and 1=0 "
+                return fragment, tuple(slots)
+            has_id_mode = bool(_table_has_column(table_name, "created_version_id") and _has_version_dim())
+        elif table_name == 'npc':
+            if not _table_has_column(table_name, "created_version_id"):
+                if created or updated:
+                    fragment += "and 1=0 "
+                return fragment, tuple(slots)
+            has_id_mode = bool(_table_has_column(table_name, "created_version_id") and _has_version_dim())
         else:
-            sql += "and 1=0 "
-    if updated:
-        if has_id_mode:
-            if table_name == 'quest' and lang_code is not None:
-                # For quest table, updated version is in quest_version table with language filter
-                sql += (
-                    f"and exists ("
-                    f"select 1 from quest_version qv "
-                    f"join {_VERSION_DIM_TABLE} vdu on vdu.id = qv.updated_version_id "
-                    f"where qv.questId = {table_alias}.questId "
-                    f"and qv.lang = ? "
-                    f"and coalesce(vdu.version_tag, '') = ? "
-                    f"limit 1) "
-                )
-                params.append(lang_code)
-                params.append(updated)
-
-                # "updated version" filter should only include rows that were actually updated
-                # after creation, excluding rows where created_version == updated_version.
-                sql += (
-                    f"and not exists ("
-                    f"select 1 from {_VERSION_DIM_TABLE} vdc "
-                    f"join quest_version qv on qv.questId = {table_alias}.questId "
-                    f"join {_VERSION_DIM_TABLE} vdu on vdu.id = qv.updated_version_id "
-                    f"where vdc.id = {table_alias}.created_version_id "
-                    f"and qv.lang = ? "
-                    f"and lower(trim(coalesce(vdc.version_tag, vdc.raw_version, ''))) "
-                    f"= lower(trim(coalesce(vdu.version_tag, vdu.raw_version, ''))) "
-                    f"limit 1) "
-                )
-                params.append(lang_code)
-            elif table_name == 'npc':
-                sql += "and 1=0 "
+            if table_name and not _has_version_id_columns(table_name):
+                if created or updated:
+                    fragment += "and 1=0 "
+                return fragment, tuple(slots)
+            has_id_mode = bool(table_name and _has_version_id_columns(table_name) and _has_version_dim())
+        if created:
+            if has_id_mode:
+                fragment += f"and {table_alias}.created_version_id in {_VERSION_ID_SET_SQL} "
+                slots.append("created_ids")
             else:
-                # For other tables, updated version is in the same table
-                sql += (
-                    f"and exists ("
-                    f"select 1 from {_VERSION_DIM_TABLE} vdu "
-                    f"where vdu.id = {table_alias}.updated_version_id "
-                    f"and coalesce(vdu.version_tag, '') = ? "
-                    f"limit 1) "
-                )
-                params.append(updated)
-
-                # "updated version" filter should only include rows that were actually updated
-                # after creation, excluding rows where created_version == updated_version.
-                sql += (
-                    f"and not exists ("
-                    f"select 1 from {_VERSION_DIM_TABLE} vdc "
-                    f"join {_VERSION_DIM_TABLE} vdu on vdu.id = {table_alias}.updated_version_id "
-                    f"where vdc.id = {table_alias}.created_version_id "
-                    f"and lower(trim(coalesce(vdc.version_tag, vdc.raw_version, ''))) "
-                    f"= lower(trim(coalesce(vdu.version_tag, vdu.raw_version, ''))) "
-                    f"limit 1) "
-                )
-        else:
-            sql += "and 1=0 "
-    return sql
+                fragment += "and 1=0 "
+        if updated:
+            if has_id_mode:
+                if table_name == 'quest' and has_lang:
+                    # For quest table, updated version is in quest_version table with language filter
+                    fragment += (
+                        f"and exists ("
+                        f"select 1 from quest_version qv "
+                        f"where qv.questId = {table_alias}.questId "
+                        f"and qv.lang = ? "
+                        f"and qv.updated_version_id in {_VERSION_ID_SET_SQL} "
+                        f"limit 1) "
+                    )
+                    slots.append("lang")
+                    slots.append("updated_ids")
+                    # "updated version" filter should only include rows that were actually updated
+                    # after creation, excluding rows where created_version == updated_version.
+                    fragment += (
+                        f"and ({table_alias}.created_version_id is null "
+                        f"or {table_alias}.created_version_id not in {_VERSION_ID_SET_SQL}) "
+                    )
+                    slots.append("updated_same_ids")
+                elif table_name == 'npc':
+                    fragment += "and 1=0 "
+                else:
+                    # For other tables, updated version is in the same table
+                    fragment += f"and {table_alias}.updated_version_id in {_VERSION_ID_SET_SQL} "
+                    slots.append("updated_ids")
+                    # "updated version" filter should only include rows that were actually updated
+                    # after creation, excluding rows where created_version == updated_version.
+                    fragment += (
+                        f"and ({table_alias}.created_version_id is null "
+                        f"or {table_alias}.created_version_id not in {_VERSION_ID_SET_SQL}) "
+                    )
+                    slots.append("updated_same_ids")
+            else:
+                fragment += "and 1=0 "
+        return fragment, tuple(slots)
+
+    schema_key = (
+        _table_has_column(table_name, "created_version_id") if table_name else None,
+        _has_version_id_columns(table_name) if table_name else None,
+        _has_version_dim(),
+    )
+    return _sql_template(
+        ("version_filter", table_alias, table_name, created, updated, has_lang, schema_key),
+        build,
+    )
+
 
+def _append_version_filter_clause(
+    sql: str,
+    params: list,
+    table_alias: str,
+    created_version: str | None,
+    updated_version: str | None,
+    table_name: str | None = None,
+    lang_code: int | None = None,
+) -> str:
+    created = _normalize_version_filter(created_version)
+    updated = _normalize_version_filter(updated_version)
+    fragment, slots = _version_filter_fragment(
+        table_alias, table_name, bool(created), bool(updated), lang_code is not None
+    )
+    params.extend(_version_filter_slot_values(slots, created, updated, lang_code))
+    return sql + fragment
 
 _QUEST_SOURCE_TYPE_FILTERS = {
     "AQ",
@@ -2097,7 +2606,7 @@ def _build_readable_meta_join_sql(
 ) -> str:
     if not _table_exists("readable_meta"):
         return ""
-    _ensure_runtime_sql_functions(conn)
+    _ensure_runtime_sql_functions(_current_connection())
     return (
         f"left join readable_meta {meta_alias} "
         f"on {meta_alias}.normalized_file_name = gts_normalize_readable_file_name({table_alias}.fileName) "
@@ -2182,47 +2691,34 @@ def _append_textmap_exists_version_filter(
         params.append(lang_code)
     if created:
         if has_id_mode:
-            sql += (
-                f"and exists (select 1 from {_VERSION_DIM_TABLE} vdc "
-                f"where vdc.id = tmv.created_version_id "
-                f"and coalesce(vdc.version_tag, '') = ? "
-                f"limit 1) "
-            )
-            params.append(created)
+            sql += f"and tmv.created_version_id in {_VERSION_ID_SET_SQL} "
+            params.append(json.dumps(_version_filter_ids(created)[0]))
         else:
             sql += "and 1=0 "
     if updated:
         if has_id_mode:
+            tag_ids, same_version_ids = _version_filter_ids(updated)
+            sql += f"and tmv.updated_version_id in {_VERSION_ID_SET_SQL} "
+            params.append(json.dumps(tag_ids))
+            # Keep semantics consistent with direct table filtering.
             sql += (
-                f"and exists (select 1 from {_VERSION_DIM_TABLE} vdu "
-                f"where vdu.id = tmv.updated_version_id "
-                f"and coalesce(vdu.version_tag, '') = ? "
-                f"limit 1) "
+                f"and (tmv.created_version_id is null "
+                f"or tmv.created_version_id not in {_VERSION_ID_SET_SQL}) "
             )
-            params.append(updated)
+            params.append(json.dumps(same_version_ids))
         else:
             sql += "and 1=0 "
-        # Keep semantics consistent with direct table filtering.
-        if has_id_mode:
-            sql += (
-                f"and not exists ("
-                f"select 1 from {_VERSION_DIM_TABLE} vdc "
-                f"join {_VERSION_DIM_TABLE} vdu on vdu.id = tmv.updated_version_id "
-                f"where vdc.id = tmv.created_version_id "
-                f"and lower(trim(coalesce(vdc.version_tag, vdc.raw_version, ''))) "
-                f"= lower(trim(coalesce(vdu.version_tag, vdu.raw_version, ''))) "
-                f"limit 1) "
-            )
     sql += "limit 1) "
     return sql
 
 
+@_degrade_on_query_budget(list)
 def selectTextMapFromKeyword(keyWord: str, langCode: int, limit: int | None = None):
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyWord, langCode)
         fts_match = _build_textmap_fts_match(keyWord, langCode)
-        match_sort_sql, match_sort_params = _build_match_sort_case("tm.content", keyWord, langCode)
-        normalized_length_sql = f"length({_build_normalized_match_expr('tm.content', langCode)})"
+        match_sort_sql, match_sort_params = _build_match_sort_case("tm.content", keyWord, langCode, table="textMap")
+        normalized_length_sql = f"length({_build_normalized_match_expr('tm.content', langCode, table='textMap')})"
 
         sql_like = (
             "select tm.hash, tm.content from textMap tm "
@@ -2252,6 +2748,62 @@ def selectTextMapFromKeyword(keyWord: str, langCode: int, limit: int | None = No
         return cursor.fetchall()
 
 
+def _execute_textmap_keyword_paged(
+    cursor,
+    keyWord: str,
+    langCode: int,
+    limit: int | None,
+    offset: int | None,
+    hash_value: int | None = None,
+    voice_filter: str | None = None,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+) -> None:
+    exact, fuzzy = _build_like_patterns(keyWord, langCode)
+    fts_match = _build_textmap_fts_match(keyWord, langCode)
+    hash_value = hash_value if hash_value is not None else -1
+    voice_expr = _voice_exists_expr("tm.hash")
+
+    # 构建LIKE查询
+    sql_like, params_like = _build_textmap_query(
+        use_fts=False,
+        keyword=keyWord,
+        langCode=langCode,
+        exact=exact,
+        fuzzy=fuzzy,
+        fts_match=fts_match,
+        voice_expr=voice_expr,
+        voice_filter=voice_filter,
+        created_version=created_version,
+        updated_version=updated_version,
+        hash_value=hash_value,
+        limit=limit,
+        offset=offset
+    )
+
+    # 如果启用了FTS且有匹配表达式，构建FTS查询
+    if _is_textmap_fts_lang_enabled(langCode) and fts_match is not None:
+        sql_fts, params_fts = _build_textmap_query(
+            use_fts=True,
+            keyword=keyWord,
+            langCode=langCode,
+            exact=exact,
+            fuzzy=fuzzy,
+            fts_match=fts_match,
+            voice_expr=voice_expr,
+            voice_filter=voice_filter,
+            created_version=created_version,
+            updated_version=updated_version,
+            hash_value=hash_value,
+            limit=limit,
+            offset=offset
+        )
+        _execute_with_fallback(cursor, sql_fts, params_fts, sql_like, params_like)
+    else:
+        cursor.execute(sql_like, params_like)
+
+
+@_degrade_on_query_budget(list)
 def selectTextMapFromKeywordPaged(
     keyWord: str,
     langCode: int,
@@ -2275,53 +2827,99 @@ def selectTextMapFromKeywordPaged(
 
     这些优化措施在保证搜索速度的同时，不会增加数据库体积，实现了速度与体积的平衡
     """
+    _ensure_fetter_voice_data()
+    with closing(conn.cursor()) as cursor:
+        _execute_textmap_keyword_paged(
+            cursor, keyWord, langCode, limit, offset, hash_value, voice_filter, created_version, updated_version
+        )
+        return cursor.fetchall()
+
+
+def _iter_cursor_batches(cursor: sqlite3.Cursor, batch_size: int):
+    batch_size = max(1, int(batch_size))
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def iterTextMapFromKeyword(
+    keyWord: str,
+    langCode: int,
+    batch_size: int = 500,
+    voice_filter: str | None = None,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+):
+    """
+    流式遍历全部匹配文本，排序与 selectTextMapFromKeywordPaged 一致。
+    整个导出只执行一次查询，按 batch_size 分批 fetchmany，内存占用与结果总数无关
+    """
+    _ensure_fetter_voice_data()
+    with closing(conn.cursor()) as cursor:
+        _execute_textmap_keyword_paged(
+            cursor, keyWord, langCode, None, None, None, voice_filter, created_version, updated_version
+        )
+        yield from _iter_cursor_batches(cursor, batch_size)
+
+
+@_degrade_on_query_budget(list)
+def selectTextMapFromKeywordSeek(
+    keyWord: str,
+    langCode: int,
+    limit: int,
+    after_key: tuple[int, int, int] | None = None,
+    hash_value: int | None = None,
+    voice_filter: str | None = None,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+    source_type: str | None = None,
+):
+    """
+    游标分页搜索文本：按 (sort_rank, voice_rank, hash) 排序并从 after_key 之后继续取
+    返回 (hash, content, created, updated, sort_rank, voice_rank, seek_id)
+    与 OFFSET 分页不同，深页与第一页的代价基本一致
+    """
+    join_clause, join_params = "", []
+    if source_type:
+        join_clause, join_params = _build_source_type_join(source_type)
+        if not join_clause:
+            return []
+
     _ensure_fetter_voice_data()
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyWord, langCode)
         fts_match = _build_textmap_fts_match(keyWord, langCode)
-        hash_value = hash_value if hash_value is not None else -1
         voice_expr = _voice_exists_expr("tm.hash")
+        query_kwargs = {
+            "keyword": keyWord,
+            "langCode": langCode,
+            "exact": exact,
+            "fuzzy": fuzzy,
+            "fts_match": fts_match,
+            "voice_expr": voice_expr,
+            "voice_filter": voice_filter,
+            "created_version": created_version,
+            "updated_version": updated_version,
+            "hash_value": hash_value,
+            "seek": True,
+            "join_clause": join_clause,
+            "join_params": join_params,
+        }
 
-        # 构建LIKE查询
-        sql_like, params_like = _build_textmap_query(
-            use_fts=False,
-            keyword=keyWord,
-            langCode=langCode,
-            exact=exact,
-            fuzzy=fuzzy,
-            fts_match=fts_match,
-            voice_expr=voice_expr,
-            voice_filter=voice_filter,
-            created_version=created_version,
-            updated_version=updated_version,
-            hash_value=hash_value,
-            limit=limit,
-            offset=offset
-        )
-
-        # 如果启用了FTS且有匹配表达式，构建FTS查询
+        inner_like, inner_params_like = _build_textmap_query(use_fts=False, **query_kwargs)
+        sql_like, params_like = _wrap_seek_query(inner_like, inner_params_like, after_key, limit)
         if _is_textmap_fts_lang_enabled(langCode) and fts_match is not None:
-            sql_fts, params_fts = _build_textmap_query(
-                use_fts=True,
-                keyword=keyWord,
-                langCode=langCode,
-                exact=exact,
-                fuzzy=fuzzy,
-                fts_match=fts_match,
-                voice_expr=voice_expr,
-                voice_filter=voice_filter,
-                created_version=created_version,
-                updated_version=updated_version,
-                hash_value=hash_value,
-                limit=limit,
-                offset=offset
-            )
+            inner_fts, inner_params_fts = _build_textmap_query(use_fts=True, **query_kwargs)
+            sql_fts, params_fts = _wrap_seek_query(inner_fts, inner_params_fts, after_key, limit)
             _execute_with_fallback(cursor, sql_fts, params_fts, sql_like, params_like)
         else:
             cursor.execute(sql_like, params_like)
         return cursor.fetchall()
 
 
+@_degrade_on_query_budget(int)
 def countTextMapFromKeyword(
     keyWord: str,
     langCode: int,
@@ -2456,6 +3054,7 @@ def _build_source_type_join(source_type: str) -> tuple[str, list]:
     return "", []
 
 
+@_degrade_on_query_budget(list)
 def selectTextMapFromKeywordBySourceType(
     keyWord: str,
     langCode: int,
@@ -2484,7 +3083,7 @@ def selectTextMapFromKeywordBySourceType(
         )
         params_like = [*join_params, langCode, exact, fuzzy]
         sql_like = _append_version_filter_clause(sql_like, params_like, "tm", created_version, updated_version, "textMap")
-        match_sort_sql, match_sort_params = _build_match_sort_case("tm.content", keyWord, langCode)
+        match_sort_sql, match_sort_params = _build_match_sort_case("tm.content", keyWord, langCode, table="textMap")
         sql_like += f"ORDER BY {match_sort_sql}, length(tm.content) "
         params_like.extend(match_sort_params)
         sql_like += "LIMIT ? OFFSET ?"
@@ -2512,6 +3111,7 @@ def selectTextMapFromKeywordBySourceType(
         return cursor.fetchall()
 
 
+@_degrade_on_query_budget(int)
 def countTextMapFromKeywordBySourceType(
     keyWord: str,
     langCode: int,
@@ -2554,6 +3154,7 @@ def countTextMapFromKeywordBySourceType(
         return int(row[0]) if row else 0
 
 
+@_degrade_on_query_budget(int)
 def countTextMapFromKeywordVoice(
     keyWord: str,
     langCode: int,
@@ -2639,6 +3240,102 @@ def selectTextMapFromTextHash(textHash: int, langs: list[int] | None = None):
         return cursor.fetchall()
 
 
+_HASH_BATCH_CHUNK_SIZE = 500
+
+
+def _unique_text_hashes(text_hashes) -> list[int]:
+    normalized_ids: list[int] = []
+    seen_ids: set[int] = set()
+    for value in text_hashes or []:
+        normalized = _coerce_optional_int(value)
+        if normalized is None or normalized in seen_ids:
+            continue
+        seen_ids.add(normalized)
+        normalized_ids.append(normalized)
+    return normalized_ids
+
+
+def _iter_hash_chunks(text_hashes: list[int]):
+    for start in range(0, len(text_hashes), _HASH_BATCH_CHUNK_SIZE):
+        yield text_hashes[start:start + _HASH_BATCH_CHUNK_SIZE]
+
+
+def selectTextMapFromTextHashes(
+    text_hashes: list[int],
+    langs: list[int] | None = None,
+) -> dict[int, list[tuple[str, int]]]:
+    """
+    批量版 selectTextMapFromTextHash：按 hash 分组返回 (content, lang) 列表。
+    """
+    result: dict[int, list[tuple[str, int]]] = {}
+    normalized_ids = _unique_text_hashes(text_hashes)
+    if not normalized_ids:
+        return result
+
+    lang_values = [int(lang) for lang in (langs or [])]
+    with closing(conn.cursor()) as cursor:
+        for chunk in _iter_hash_chunks(normalized_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            sql = f"select hash, content, lang from textMap where hash in ({placeholders})"
+            params: list[int] = list(chunk)
+            if lang_values:
+                sql += f" and lang in ({','.join('?' for _ in lang_values)})"
+                params.extend(lang_values)
+            for text_hash, content, lang in cursor.execute(sql, params).fetchall():
+                result.setdefault(int(text_hash), []).append((content, lang))
+    return result
+
+
+def getTextMapVersionInfoBatch(
+    text_hashes: list[int],
+    preferred_lang: int | None,
+) -> dict[int, tuple[str | None, str | None]]:
+    """
+    批量版 getTextMapVersionInfo：仅返回首选语言存在的 hash。
+    """
+    result: dict[int, tuple[str | None, str | None]] = {}
+    if not _has_version_id_columns("textMap"):
+        return result
+    preferred_lang = _coerce_optional_int(preferred_lang)
+    normalized_ids = _unique_text_hashes(text_hashes)
+    if preferred_lang is None or not normalized_ids:
+        return result
+
+    created_expr = _version_value_expr("tm", "created", "textMap")
+    updated_expr = _version_value_expr("tm", "updated", "textMap")
+    with closing(conn.cursor()) as cursor:
+        for chunk in _iter_hash_chunks(normalized_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            sql = (
+                f"select tm.hash, {created_expr}, {updated_expr} from textMap tm "
+                f"where tm.hash in ({placeholders}) and tm.lang=?"
+            )
+            for text_hash, created_raw, updated_raw in cursor.execute(sql, [*chunk, preferred_lang]).fetchall():
+                result.setdefault(int(text_hash), (created_raw, updated_raw))
+    return result
+
+
+def selectPrimarySourceKinds(text_hashes: list[int]) -> dict[int, str] | None:
+    """
+    批量读取构建阶段写入的主来源类别（dialogue/voice/story/quest/entity/readable）。
+    表中没有的 hash 必然是未归类文本；旧库缺表时返回 None，调用方走完整的来源级联查询。
+    """
+    if not _table_exists(_TEXT_PRIMARY_SOURCE_TABLE):
+        return None
+    result: dict[int, str] = {}
+    normalized_ids = _unique_text_hashes(text_hashes)
+    with closing(conn.cursor()) as cursor:
+        for chunk in _iter_hash_chunks(normalized_ids):
+            placeholders = ",".join("?" for _ in chunk)
+            sql = (
+                f"select hash, source_kind from {_TEXT_PRIMARY_SOURCE_TABLE} "
+                f"where hash in ({placeholders})"
+            )
+            for text_hash, source_kind in cursor.execute(sql, chunk).fetchall():
+                result[int(text_hash)] = str(source_kind)
+    return result
+
+
 def getTextMapVersionInfo(textHash: int, preferred_lang: int | None = None):
     if not _has_version_id_columns("textMap"):
         return None, None
@@ -2677,10 +3374,9 @@ def getImportedTextMapLangs():
 
 def getAllVersionValues() -> list[str]:
     values: set[str] = set()
-    with closing(conn.cursor()) as cursor:
+    placeholders = ",".join(["?"] * len(_VERSION_SOURCE_TABLES))
+    with _write_cursor() as cursor:
         _ensure_version_catalog_schema(cursor)
-        placeholders = ",".join(["?"] * len(_VERSION_SOURCE_TABLES))
-
         existing_count_row = cursor.execute(
             f"""
             SELECT COUNT(*)
@@ -2692,8 +3388,8 @@ def getAllVersionValues() -> list[str]:
         existing_count = int(existing_count_row[0] or 0) if existing_count_row else 0
         if existing_count == 0:
             _rebuild_version_catalog(cursor, _VERSION_SOURCE_TABLES)
-            conn.commit()
 
+    with closing(conn.cursor()) as cursor:
         rows = cursor.execute(
             f"""
             SELECT DISTINCT raw_version
@@ -2851,14 +3547,7 @@ def getSourceFromFetter(textHash: int, langCode: int = 1):
 
 
 def selectTextHashesWithKnownPrimarySource(text_hashes: list[int]) -> set[int]:
-    normalized_ids: list[int] = []
-    seen_ids: set[int] = set()
-    for value in text_hashes or []:
-        normalized = _coerce_optional_int(value)
-        if normalized is None or normalized in seen_ids:
-            continue
-        seen_ids.add(normalized)
-        normalized_ids.append(normalized)
+    normalized_ids = _unique_text_hashes(text_hashes)
     if not normalized_ids:
         return set()
 
@@ -3476,6 +4165,11 @@ def getTalkerName(talkerType: str, talkerId: int, langCode: int = 1):
     if talkerType == "TALK_ROLE_MATE_AVATAR":
         return getMateAvatarName(langCode)
 
+    if talkerType == "TALK_ROLE_NPC":
+        preloaded, talkerName = _preloaded_name("npc_by_lang", talkerId, langCode)
+        if preloaded:
+            return _normalize_output_text(talkerName, langCode)
+
     with closing(conn.cursor()) as cursor:
         talkerName = None
         if talkerType == "TALK_ROLE_NPC":
@@ -3586,16 +4280,29 @@ def getSourceFromDialogue(textHash: int, langCode: int = 1) -> str | None:
         return f"{talkerName}, {questCompleteName}"
 
 
-def getManualTextMap(placeHolderName, lang):
+def getManualTextMapByLang(lang) -> dict[str, str]:
+    """
+    一次性读出某语言的 manualTextMap（占位符 -> 文本），占位符渲染时只做字典查找；
+    数据代数变化时随名称缓存一起清空
+    """
+    manual_cache = _get_name_cache_bucket("manual_text")
+    mapping = manual_cache.get(lang)
+    if mapping is not None:
+        return mapping
+    mapping = {}
     with closing(conn.cursor()) as cursor:
-        sql1 = 'select content from manualTextMap, textMap where textMapId=? and textHash = hash and lang=?'
-        cursor.execute(sql1, (placeHolderName, lang))
-        ans = cursor.fetchall()
-        if len(ans) == 0:
-            return None
-        return ans[0][0]
+        sql = 'select textMapId, content from manualTextMap, textMap where textHash = hash and lang=?'
+        for placeholder, content in cursor.execute(sql, (lang,)):
+            mapping.setdefault(placeholder, content)
+    manual_cache[lang] = mapping
+    return mapping
+
+
+def getManualTextMap(placeHolderName, lang):
+    return getManualTextMapByLang(lang).get(placeHolderName)
 
 
+@_degrade_on_query_budget(list)
 def selectVoiceFromKeywordPaged(keyWord: str, page: int, size: int, langCode: int):
     """
     分页搜索语音
@@ -3970,57 +4677,199 @@ def getLangCodeMap():
         return mapping
 
 
-def selectReadableFromKeyword(
+def _build_readable_keyword_query(
+    keyword: str,
+    langCode: int,
+    langStr: str,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+    category: str | None = None,
+    seek: bool = False,
+    fts_match: str | None = None,
+    select_sql: str | None = None,
+) -> tuple[str, list] | None:
+    """
+    构建阅读物关键词查询；传入 fts_match 时先用 readable_fts 缩小候选，再用 LIKE 保证子串语义
+    """
+    exact, fuzzy = _build_like_patterns(keyword, langCode)
+    readable_langs = _expand_readable_langs([langStr])
+    if not readable_langs:
+        return None
+    lang_placeholders = ",".join(["?"] * len(readable_langs))
+    params: list = []
+    if select_sql is None:
+        version_select = _version_select_expr("readable", "readable")
+        readable_meta_join = _build_readable_meta_join_sql("readable")
+        select_sql = f"select fileName, content, titleTextMapHash, readableId, {version_select}"
+        if seek:
+            match_sort_sql, match_sort_params = _build_match_sort_case("content", keyword, langCode, table="readable")
+            select_sql += f", {match_sort_sql} as sort_rank, 1 as voice_rank, readable.id as seek_id"
+            params.extend(match_sort_params)
+        select_sql += f" from readable {readable_meta_join}"
+    sql = f"{select_sql} where "
+    if fts_match is not None:
+        sql += f"readable.id in (select rowid from {_READABLE_FTS_TABLE} where {_READABLE_FTS_TABLE} match ?) and "
+        params.append(fts_match)
+    sql += f"lang in ({lang_placeholders}) and (content like ? escape '\\' or content like ? escape '\\') "
+    for lang in readable_langs:
+        params.append(lang)
+    params.append(exact)
+    params.append(fuzzy)
+    sql = _append_version_filter_clause(
+        sql + " ",
+        params,
+        "readable",
+        created_version,
+        updated_version,
+        "readable",
+    )
+    sql = _append_readable_category_filter_clause(sql, params, "readable", category)
+    return sql, params
+
+
+def _execute_fts_keyword_query(
+    cursor: sqlite3.Cursor,
+    keyword: str,
+    langCode: int,
+    build_query,
+    fts_enabled: bool,
+) -> bool:
+    """
+    执行阅读物/字幕关键词查询：对应 FTS 表可用时先走全文索引，出错回退到 LIKE
+    build_query(fts_match) 返回 (sql, params)；返回 False 表示没有可查询的语言
+    """
+    like_query = build_query(None)
+    if like_query is None:
+        return False
+    fts_match = None
+    if fts_enabled:
+        fts_match = _build_textmap_fts_match(keyword, langCode)
+    if fts_match is None:
+        cursor.execute(like_query[0], like_query[1])
+        return True
+    fts_query = build_query(fts_match)
+    _execute_with_fallback(cursor, fts_query[0], fts_query[1], like_query[0], like_query[1])
+    return True
+
+
+def _readable_keyword_select_builder(
+    keyword: str,
+    langCode: int,
+    langStr: str,
+    limit: int | None,
+    offset: int | None,
+    created_version: str | None,
+    updated_version: str | None,
+    category: str | None,
+):
+    def build_query(fts_match: str | None):
+        query = _build_readable_keyword_query(
+            keyword,
+            langCode,
+            langStr,
+            created_version,
+            updated_version,
+            category,
+            fts_match=fts_match,
+        )
+        if query is None:
+            return None
+        sql, params = query
+        match_sort_sql, match_sort_params = _build_match_sort_case("content", keyword, langCode, table="readable")
+        normalized_length_sql = f"length({_build_normalized_match_expr('content', langCode, table='readable')})"
+        sql += f"order by {match_sort_sql}, {normalized_length_sql} "
+        params.extend(match_sort_params)
+        if limit is not None:
+            sql += " limit ?"
+            params.append(int(limit))
+        if offset is not None and offset > 0:
+            sql += " offset ?"
+            params.append(int(offset))
+        return sql, params
+
+    return build_query
+
+
+@_degrade_on_query_budget(list)
+def selectReadableFromKeyword(
+    keyword: str,
+    langCode: int,
+    langStr: str,
+    limit: int | None = None,
+    offset: int | None = None,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+    category: str | None = None,
+):
+    build_query = _readable_keyword_select_builder(
+        keyword, langCode, langStr, limit, offset, created_version, updated_version, category
+    )
+    with closing(conn.cursor()) as cursor:
+        if not _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_readable_fts_lang_enabled(langCode)
+        ):
+            return []
+        return cursor.fetchall()
+
+
+def iterReadableFromKeyword(
+    keyword: str,
+    langCode: int,
+    langStr: str,
+    batch_size: int = 500,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+):
+    """
+    流式遍历 selectReadableFromKeyword 的全部匹配，只执行一次查询并分批 fetchmany
+    """
+    build_query = _readable_keyword_select_builder(
+        keyword, langCode, langStr, None, None, created_version, updated_version, None
+    )
+    with closing(conn.cursor()) as cursor:
+        if not _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_readable_fts_lang_enabled(langCode)
+        ):
+            return
+        yield from _iter_cursor_batches(cursor, batch_size)
+
+
+@_degrade_on_query_budget(list)
+def selectReadableFromKeywordSeek(
     keyword: str,
     langCode: int,
     langStr: str,
-    limit: int | None = None,
-    offset: int | None = None,
+    limit: int,
+    after_key: tuple[int, int, int] | None = None,
     created_version: str | None = None,
     updated_version: str | None = None,
-    category: str | None = None,
 ):
-    with closing(conn.cursor()) as cursor:
-        exact, fuzzy = _build_like_patterns(keyword, langCode)
-        match_sort_sql, match_sort_params = _build_match_sort_case("content", keyword, langCode)
-        normalized_length_sql = f"length({_build_normalized_match_expr('content', langCode)})"
-        readable_langs = _expand_readable_langs([langStr])
-        if not readable_langs:
-            return []
-        lang_placeholders = ",".join(["?"] * len(readable_langs))
-        version_select = _version_select_expr("readable", "readable")
-        readable_meta_join = _build_readable_meta_join_sql("readable")
-        sql = (
-            f"select fileName, content, titleTextMapHash, readableId, {version_select} from readable "
-            f"{readable_meta_join}"
-            f"where lang in ({lang_placeholders}) and (content like ? escape '\\' or content like ? escape '\\') "
-        )
-        params = []
-        for lang in readable_langs:
-            params.append(lang)
-        params.append(exact)
-        params.append(fuzzy)
-        sql = _append_version_filter_clause(
-            sql + " ",
-            params,
-            "readable",
+    """
+    游标分页搜索阅读物，返回 selectReadableFromKeyword 的列再加 (sort_rank, voice_rank, seek_id)
+    """
+    def build_query(fts_match: str | None):
+        query = _build_readable_keyword_query(
+            keyword,
+            langCode,
+            langStr,
             created_version,
             updated_version,
-            "readable",
+            seek=True,
+            fts_match=fts_match,
         )
-        sql = _append_readable_category_filter_clause(sql, params, "readable", category)
-        sql += f"order by {match_sort_sql}, {normalized_length_sql} "
-        params.extend(match_sort_params)
-        if limit is not None:
-            sql += " limit ?"
-            params.append(int(limit))
-        if offset is not None and offset > 0:
-            sql += " offset ?"
-            params.append(int(offset))
-        cursor.execute(sql, params)
+        if query is None:
+            return None
+        return _wrap_seek_query(query[0], query[1], after_key, limit)
+
+    with closing(conn.cursor()) as cursor:
+        if not _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_readable_fts_lang_enabled(langCode)
+        ):
+            return []
         return cursor.fetchall()
 
 
+@_degrade_on_query_budget(int)
 def countReadableFromKeyword(
     keyword: str,
     langCode: int,
@@ -4028,26 +4877,22 @@ def countReadableFromKeyword(
     created_version: str | None = None,
     updated_version: str | None = None,
 ) -> int:
-    with closing(conn.cursor()) as cursor:
-        exact, fuzzy = _build_like_patterns(keyword, langCode)
-        readable_langs = _expand_readable_langs([langStr])
-        if not readable_langs:
-            return 0
-        lang_placeholders = ",".join(["?"] * len(readable_langs))
-        sql = (
-            "select count(*) from readable "
-            f"where lang in ({lang_placeholders}) and (content like ? escape '\\' or content like ? escape '\\')"
-        )
-        params = readable_langs + [exact, fuzzy]
-        sql = _append_version_filter_clause(
-            sql + " ",
-            params,
-            "readable",
+    def build_query(fts_match: str | None):
+        return _build_readable_keyword_query(
+            keyword,
+            langCode,
+            langStr,
             created_version,
             updated_version,
-            "readable",
+            fts_match=fts_match,
+            select_sql="select count(*) from readable",
         )
-        cursor.execute(sql, params)
+
+    with closing(conn.cursor()) as cursor:
+        if not _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_readable_fts_lang_enabled(langCode)
+        ):
+            return 0
         row = cursor.fetchone()
         return int(row[0]) if row else 0
 
@@ -4238,8 +5083,8 @@ def selectQuestByTitleKeyword(
         exact, fuzzy = _build_like_patterns(keyword, langCode)
         version_select = _version_select_expr("quest", "quest", langCode)
         source_type_select = "quest.source_type" if _table_has_column("quest", "source_type") else "NULL"
-        match_sort_sql, match_sort_params = _build_match_sort_case("textMap.content", keyword, langCode)
-        normalized_length_sql = f"length({_build_normalized_match_expr('textMap.content', langCode)})"
+        match_sort_sql, match_sort_params = _build_match_sort_case("textMap.content", keyword, langCode, table="textMap")
+        normalized_length_sql = f"length({_build_normalized_match_expr('textMap.content', langCode, table='textMap')})"
         sql = (
             f"select quest.questId, textMap.content, {source_type_select} as source_type, {version_select} from quest "
             "join textMap on quest.titleTextMapHash=textMap.hash "
@@ -4253,6 +5098,7 @@ def selectQuestByTitleKeyword(
             created_version,
             updated_version,
             "quest",
+            langCode,
         )
         sql = _append_quest_source_type_filter_clause(sql, params, "quest", source_type)
         sql += (
@@ -4577,7 +5423,116 @@ def getNpcSpeakerUpdatedVersionRaw(npcId: int, langCode: int | None = None) -> s
         return str(row[0]) if row and row[0] is not None else None
 
 
+def _npc_dialogue_group_ready(langCode: int) -> bool:
+    """
+    构建阶段生成的 npc_dialogue_group 含该语言的行时，NPC 非任务对白分组直接按 (lang, npc_id) 读取；
+    旧库缺表时回退到现场分组
+    """
+    if not _table_exists(_NPC_DIALOGUE_GROUP_TABLE):
+        return False
+    with closing(conn.cursor()) as cursor:
+        row = cursor.execute(
+            f"select 1 from {_NPC_DIALOGUE_GROUP_TABLE} where lang = ? limit 1",
+            (langCode,),
+        ).fetchone()
+        return row is not None
+
+
+def _npc_dialogue_groups_cte(npc_ids: list[int]) -> str:
+    """
+    多个 NPC 共用的分组合并为一行，首句取各 NPC 首句中最小的；参数依次为 lang 与 npc_ids
+    """
+    placeholders = ",".join("?" for _ in npc_ids)
+    return (
+        "with npc_groups as ("
+        "select g.talk_id, g.coop_quest_id, g.dialogue_id_fallback, "
+        "min(g.sort_dialogue_id) as sort_dialogue_id, "
+        "max(g.line_count) as line_count, "
+        "max(g.created_version_id) as created_version_id, "
+        "max(g.updated_version_id) as updated_version_id "
+        f"from {_NPC_DIALOGUE_GROUP_TABLE} g "
+        f"where g.lang = ? and g.npc_id in ({placeholders}) "
+        "group by g.talk_id, g.coop_quest_id, g.dialogue_id_fallback"
+        ") "
+    )
+
+
+def _count_materialized_npc_dialogue_groups(
+    npc_ids: list[int],
+    langCode: int,
+    non_empty_only: bool = False,
+) -> tuple[int, int]:
+    sql = (
+        _npc_dialogue_groups_cte(npc_ids)
+        + "select count(*), coalesce(sum(line_count), 0) from npc_groups "
+    )
+    if non_empty_only:
+        sql += "where line_count > 0"
+    with closing(conn.cursor()) as cursor:
+        row = cursor.execute(sql, (langCode, *npc_ids)).fetchone()
+    if not row:
+        return 0, 0
+    return int(row[0] or 0), int(row[1] or 0)
+
+
+def _select_materialized_npc_dialogue_group_page(
+    npc_ids: list[int],
+    langCode: int,
+    limit: int,
+    offset: int = 0,
+):
+    sql = (
+        _npc_dialogue_groups_cte(npc_ids)
+        + "select ng.talk_id, ng.coop_quest_id, ng.dialogue_id_fallback, ng.sort_dialogue_id, ng.line_count "
+        "from npc_groups ng "
+        "left join version_dim cv on cv.id = ng.created_version_id "
+        "where ng.line_count > 0 "
+        "order by coalesce(cv.version_sort_key, 2147483647), ng.sort_dialogue_id "
+        "limit ?"
+    )
+    params: list[object] = [langCode, *npc_ids, max(1, int(limit))]
+    if offset and int(offset) > 0:
+        sql += " offset ?"
+        params.append(int(offset))
+    with closing(conn.cursor()) as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _select_materialized_npc_dialogue_group_summaries(
+    npc_ids: list[int],
+    langCode: int,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+):
+    sql = (
+        _npc_dialogue_groups_cte(npc_ids)
+        + "select ng.talk_id, ng.coop_quest_id, ng.dialogue_id_fallback, ng.sort_dialogue_id, ng.line_count, "
+        "cv.raw_version as created_version, uv.raw_version as updated_version "
+        "from npc_groups ng "
+        "left join version_dim cv on cv.id = ng.created_version_id "
+        "left join version_dim uv on uv.id = ng.updated_version_id "
+        "where 1=1 "
+    )
+    params: list[object] = [langCode, *npc_ids]
+    created_tag = _normalize_version_filter(created_version)
+    updated_tag = _normalize_version_filter(updated_version)
+    if created_tag:
+        sql += "and coalesce(cv.version_tag, '') = ? "
+        params.append(created_tag)
+    if updated_tag:
+        sql += "and coalesce(uv.version_tag, '') = ? "
+        params.append(updated_tag)
+    sql += "order by coalesce(cv.version_sort_key, 2147483647), ng.sort_dialogue_id"
+    with closing(conn.cursor()) as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
 def getNpcNonTaskDialogueStats(npcId: int) -> tuple[int, int]:
+    source_lang_code = config.getSourceLanguage()
+    if _npc_dialogue_group_ready(source_lang_code):
+        return _count_materialized_npc_dialogue_groups([int(npcId)], source_lang_code, non_empty_only=True)
     with closing(conn.cursor()) as cursor:
         group_join = (
             "((mg.dialogueIdFallback is not null and dg.dialogueId = mg.dialogueIdFallback) "
@@ -4612,6 +5567,9 @@ def getNpcNonTaskDialogueStats(npcId: int) -> tuple[int, int]:
 
 
 def countNpcNonTaskDialogueGroups(npcId: int) -> int:
+    source_lang_code = config.getSourceLanguage()
+    if _npc_dialogue_group_ready(source_lang_code):
+        return _count_materialized_npc_dialogue_groups([int(npcId)], source_lang_code)[0]
     with closing(conn.cursor()) as cursor:
         row = cursor.execute(
             "with matching_groups as ("
@@ -4644,6 +5602,9 @@ def countNpcNonTaskDialogueGroupsForNpcIds(npcIds: list[int]) -> int:
     if not normalized_ids:
         return 0
 
+    source_lang_code = config.getSourceLanguage()
+    if _npc_dialogue_group_ready(source_lang_code):
+        return _count_materialized_npc_dialogue_groups(normalized_ids, source_lang_code)[0]
     with closing(conn.cursor()) as cursor:
         placeholders = ",".join("?" for _ in normalized_ids)
         row = cursor.execute(
@@ -4670,6 +5631,8 @@ def selectNpcNonTaskDialogueGroupPage(
     offset: int = 0,
 ):
     source_lang_code = config.getSourceLanguage()
+    if _npc_dialogue_group_ready(source_lang_code):
+        return _select_materialized_npc_dialogue_group_page([int(npcId)], source_lang_code, limit, offset)
     with closing(conn.cursor()) as cursor:
         group_join = (
             "((mg.dialogueIdFallback is not null and dg.dialogueId = mg.dialogueIdFallback) "
@@ -4732,6 +5695,8 @@ def selectNpcNonTaskDialogueGroupPageForNpcIds(
         return []
 
     source_lang_code = config.getSourceLanguage()
+    if _npc_dialogue_group_ready(source_lang_code):
+        return _select_materialized_npc_dialogue_group_page(normalized_ids, source_lang_code, limit, offset)
     with closing(conn.cursor()) as cursor:
         group_join = (
             "((mg.dialogueIdFallback is not null and dg.dialogueId = mg.dialogueIdFallback) "
@@ -4783,6 +5748,13 @@ def selectNpcNonTaskDialogueGroupSummaries(
     updated_version: str | None = None,
 ):
     source_lang_code = config.getSourceLanguage()
+    if _npc_dialogue_group_ready(source_lang_code):
+        return _select_materialized_npc_dialogue_group_summaries(
+            [int(npcId)],
+            source_lang_code,
+            created_version,
+            updated_version,
+        )
     with closing(conn.cursor()) as cursor:
         group_join = (
             "((mg.dialogueIdFallback is not null and dg.dialogueId = mg.dialogueIdFallback) "
@@ -4888,6 +5860,13 @@ def selectNpcNonTaskDialogueGroupSummariesForNpcIds(
         return []
 
     source_lang_code = config.getSourceLanguage()
+    if _npc_dialogue_group_ready(source_lang_code):
+        return _select_materialized_npc_dialogue_group_summaries(
+            normalized_ids,
+            source_lang_code,
+            created_version,
+            updated_version,
+        )
     with closing(conn.cursor()) as cursor:
         group_join = (
             "((mg.dialogueIdFallback is not null and dg.dialogueId = mg.dialogueIdFallback) "
@@ -4979,8 +5958,8 @@ def selectNpcNonTaskDialogueGroupSummariesForNpcIds(
 def selectAvatarByNameKeyword(keyword: str, langCode: int):
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyword, langCode)
-        match_sort_sql, match_sort_params = _build_match_sort_case("textMap.content", keyword, langCode)
-        normalized_length_sql = f"length({_build_normalized_match_expr('textMap.content', langCode)})"
+        match_sort_sql, match_sort_params = _build_match_sort_case("textMap.content", keyword, langCode, table="textMap")
+        normalized_length_sql = f"length({_build_normalized_match_expr('textMap.content', langCode, table='textMap')})"
         sql = (
             "select avatar.avatarId, textMap.content "
             "from avatar join textMap on avatar.nameTextMapHash=textMap.hash "
@@ -5039,6 +6018,7 @@ def selectStorySourcesByTextHash(textHash: int):
 
 _hasVoiceForTextHashDb_impl = _has_avatar_scoped_fetter_voice
 _selectVoicePathFromTextHash_impl = _select_avatar_scoped_voice_path_from_text_hash
+_selectVoicePathsFromTextHashes_impl = _select_avatar_scoped_voice_paths_from_text_hashes
 _getVoicePath_impl = _get_avatar_scoped_voice_path
 _selectAvatarVoiceItems_impl = _select_avatar_scoped_voice_items
 _selectAvatarVoiceItemsByFilters_impl = _select_avatar_scoped_voice_items_by_filters
@@ -5347,8 +6327,8 @@ def selectReadableByTitleKeyword(
 ):
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyword, langCode)
-        match_sort_sql, match_sort_params = _build_match_sort_case("textMap.content", keyword, langCode)
-        normalized_length_sql = f"length({_build_normalized_match_expr('textMap.content', langCode)})"
+        match_sort_sql, match_sort_params = _build_match_sort_case("textMap.content", keyword, langCode, table="textMap")
+        normalized_length_sql = f"length({_build_normalized_match_expr('textMap.content', langCode, table='textMap')})"
         readable_langs = _expand_readable_langs([langStr])
         if not readable_langs:
             return []
@@ -5524,32 +6504,63 @@ def selectReadableByVersion(
         return cursor.fetchall()
 
 
-def selectSubtitleFromKeyword(
+def _build_subtitle_keyword_query(
     keyword: str,
     langCode: int,
-    limit: int | None = None,
-    offset: int | None = None,
     created_version: str | None = None,
     updated_version: str | None = None,
-):
-    with closing(conn.cursor()) as cursor:
-        exact, fuzzy = _build_like_patterns(keyword, langCode)
+    seek: bool = False,
+    fts_match: str | None = None,
+    select_sql: str | None = None,
+) -> tuple[str, list]:
+    """
+    构建字幕关键词查询；传入 fts_match 时先用 subtitle_fts 缩小候选，再用 LIKE 保证子串语义
+    """
+    exact, fuzzy = _build_like_patterns(keyword, langCode)
+    params: list = []
+    if select_sql is None:
         version_select = _version_select_expr("subtitle", "subtitle")
-        match_sort_sql, match_sort_params = _build_match_sort_case("content", keyword, langCode)
-        normalized_length_sql = f"length({_build_normalized_match_expr('content', langCode)})"
-        sql = (
-            f"select fileName, content, startTime, endTime, subtitleId, {version_select} from subtitle "
-            "where lang=? and (content like ? escape '\\' or content like ? escape '\\') "
-        )
-        params = [langCode, exact, fuzzy]
-        sql = _append_version_filter_clause(
-            sql + " ",
-            params,
-            "subtitle",
+        select_sql = f"select fileName, content, startTime, endTime, subtitleId, {version_select}"
+        if seek:
+            match_sort_sql, match_sort_params = _build_match_sort_case("content", keyword, langCode, table="subtitle")
+            select_sql += f", {match_sort_sql} as sort_rank, 1 as voice_rank, subtitle.id as seek_id"
+            params.extend(match_sort_params)
+        select_sql += " from subtitle"
+    sql = f"{select_sql} where "
+    if fts_match is not None:
+        sql += f"subtitle.id in (select rowid from {_SUBTITLE_FTS_TABLE} where {_SUBTITLE_FTS_TABLE} match ?) and "
+        params.append(fts_match)
+    sql += "lang=? and (content like ? escape '\\' or content like ? escape '\\') "
+    params.extend([langCode, exact, fuzzy])
+    sql = _append_version_filter_clause(
+        sql + " ",
+        params,
+        "subtitle",
+        created_version,
+        updated_version,
+        "subtitle",
+    )
+    return sql, params
+
+
+def _subtitle_keyword_select_builder(
+    keyword: str,
+    langCode: int,
+    limit: int | None,
+    offset: int | None,
+    created_version: str | None,
+    updated_version: str | None,
+):
+    def build_query(fts_match: str | None):
+        sql, params = _build_subtitle_keyword_query(
+            keyword,
+            langCode,
             created_version,
             updated_version,
-            "subtitle",
+            fts_match=fts_match,
         )
+        match_sort_sql, match_sort_params = _build_match_sort_case("content", keyword, langCode, table="subtitle")
+        normalized_length_sql = f"length({_build_normalized_match_expr('content', langCode, table='subtitle')})"
         sql += f"order by {match_sort_sql}, {normalized_length_sql} "
         params.extend(match_sort_params)
         if limit is not None:
@@ -5558,36 +6569,203 @@ def selectSubtitleFromKeyword(
         if offset is not None and offset > 0:
             sql += " offset ?"
             params.append(int(offset))
-        cursor.execute(sql, params)
+        return sql, params
+
+    return build_query
+
+
+@_degrade_on_query_budget(list)
+def selectSubtitleFromKeyword(
+    keyword: str,
+    langCode: int,
+    limit: int | None = None,
+    offset: int | None = None,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+):
+    build_query = _subtitle_keyword_select_builder(
+        keyword, langCode, limit, offset, created_version, updated_version
+    )
+    with closing(conn.cursor()) as cursor:
+        _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_subtitle_fts_lang_enabled(langCode)
+        )
         return cursor.fetchall()
 
 
-def countSubtitleFromKeyword(
+def iterSubtitleFromKeyword(
     keyword: str,
     langCode: int,
+    batch_size: int = 500,
     created_version: str | None = None,
     updated_version: str | None = None,
-) -> int:
+):
+    """
+    流式遍历 selectSubtitleFromKeyword 的全部匹配，只执行一次查询并分批 fetchmany
+    """
+    build_query = _subtitle_keyword_select_builder(
+        keyword, langCode, None, None, created_version, updated_version
+    )
     with closing(conn.cursor()) as cursor:
-        exact, fuzzy = _build_like_patterns(keyword, langCode)
-        sql = (
-            "select count(*) from subtitle "
-            "where lang=? and (content like ? escape '\\' or content like ? escape '\\')"
+        _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_subtitle_fts_lang_enabled(langCode)
         )
-        params = [langCode, exact, fuzzy]
-        sql = _append_version_filter_clause(
-            sql + " ",
-            params,
-            "subtitle",
+        yield from _iter_cursor_batches(cursor, batch_size)
+
+
+@_degrade_on_query_budget(list)
+def selectSubtitleFromKeywordSeek(
+    keyword: str,
+    langCode: int,
+    limit: int,
+    after_key: tuple[int, int, int] | None = None,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+):
+    """
+    游标分页搜索字幕，返回 selectSubtitleFromKeyword 的列再加 (sort_rank, voice_rank, seek_id)
+    """
+    def build_query(fts_match: str | None):
+        inner_sql, inner_params = _build_subtitle_keyword_query(
+            keyword,
+            langCode,
             created_version,
             updated_version,
-            "subtitle",
+            seek=True,
+            fts_match=fts_match,
+        )
+        return _wrap_seek_query(inner_sql, inner_params, after_key, limit)
+
+    with closing(conn.cursor()) as cursor:
+        _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_subtitle_fts_lang_enabled(langCode)
+        )
+        return cursor.fetchall()
+
+
+@_degrade_on_query_budget(int)
+def countSubtitleFromKeyword(
+    keyword: str,
+    langCode: int,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+) -> int:
+    def build_query(fts_match: str | None):
+        return _build_subtitle_keyword_query(
+            keyword,
+            langCode,
+            created_version,
+            updated_version,
+            fts_match=fts_match,
+            select_sql="select count(*) from subtitle",
+        )
+
+    with closing(conn.cursor()) as cursor:
+        _execute_fts_keyword_query(
+            cursor, keyword, langCode, build_query, _is_subtitle_fts_lang_enabled(langCode)
         )
-        cursor.execute(sql, params)
         row = cursor.fetchone()
         return int(row[0]) if row else 0
 
 
+def _created_version_value_expr(table_alias: str, table_name: str) -> str:
+    if not _has_version_id_columns(table_name):
+        return "NULL"
+    return _version_value_expr(table_alias, "created", table_name)
+
+
+@_degrade_on_query_budget(list)
+def countKeywordFacets(
+    keyword: str,
+    langCode: int,
+    langStr: str | None,
+    created_version: str | None = None,
+    updated_version: str | None = None,
+) -> list[tuple[str, str | None, int, str | None, int]]:
+    """
+    一次查询统计关键词在各维度上的命中数，返回 (来源, 主来源类别, 是否有语音, 创建版本, 数量) 分组行
+    - textMap、阅读物、字幕三路匹配 UNION ALL 后整体 GROUP BY，每张表只扫描一遍
+    - textMap 按 text_primary_source 归类（没有记录的为 NULL），阅读物和字幕的类别为 NULL、语音恒为 0
+    """
+    _ensure_fetter_voice_data()
+    created = _normalize_version_filter(created_version)
+    updated = _normalize_version_filter(updated_version)
+    exact, fuzzy = _build_like_patterns(keyword, langCode)
+    fts_match = _build_textmap_fts_match(keyword, langCode)
+    has_primary_source = _table_exists("text_primary_source")
+
+    def build_query(use_fts: bool) -> tuple[str, list]:
+        textmap_fts = use_fts and fts_match is not None and _is_textmap_fts_lang_enabled(langCode)
+        kind_expr = "tps.source_kind" if has_primary_source else "NULL"
+        version_fragment, version_slots = _version_filter_fragment("tm", "textMap", bool(created), bool(updated), False)
+        textmap_sql = (
+            f"select 'textmap' as src, {kind_expr} as kind, "
+            f"case when {_voice_exists_expr('tm.hash')} then 1 else 0 end as has_voice, "
+            f"{_created_version_value_expr('tm', 'textMap')} as created_version from textMap tm "
+        )
+        if has_primary_source:
+            textmap_sql += "left join text_primary_source tps on tps.hash = tm.hash "
+        textmap_sql += "where "
+        params: list = []
+        if textmap_fts:
+            textmap_sql += f"tm.id in (select rowid from {_TEXTMAP_FTS_TABLE} where {_TEXTMAP_FTS_TABLE} match ? and lang=?) and "
+            params.extend([fts_match, langCode])
+        textmap_sql += "tm.lang=? and (tm.content like ? escape '\\' or tm.content like ? escape '\\') " + version_fragment
+        params.extend([langCode, exact, fuzzy])
+        params.extend(_version_filter_slot_values(version_slots, created, updated, None))
+        parts = [textmap_sql]
+
+        if langStr:
+            readable_query = _build_readable_keyword_query(
+                keyword,
+                langCode,
+                langStr,
+                created,
+                updated,
+                fts_match=fts_match if use_fts and _is_readable_fts_lang_enabled(langCode) else None,
+                select_sql=(
+                    "select 'readable', NULL, 0, "
+                    f"{_created_version_value_expr('readable', 'readable')} from readable"
+                ),
+            )
+            if readable_query is not None:
+                parts.append(readable_query[0])
+                params.extend(readable_query[1])
+
+        subtitle_sql, subtitle_params = _build_subtitle_keyword_query(
+            keyword,
+            langCode,
+            created,
+            updated,
+            fts_match=fts_match if use_fts and _is_subtitle_fts_lang_enabled(langCode) else None,
+            select_sql=(
+                "select 'subtitle', NULL, 0, "
+                f"{_created_version_value_expr('subtitle', 'subtitle')} from subtitle"
+            ),
+        )
+        parts.append(subtitle_sql)
+        params.extend(subtitle_params)
+
+        sql = (
+            "select src, kind, has_voice, created_version, count(*) from ("
+            + " union all ".join(parts)
+            + ") group by src, kind, has_voice, created_version"
+        )
+        return sql, params
+
+    with closing(conn.cursor()) as cursor:
+        like_sql, like_params = build_query(False)
+        if fts_match is None:
+            cursor.execute(like_sql, like_params)
+        else:
+            fts_sql, fts_params = build_query(True)
+            _execute_with_fallback(cursor, fts_sql, fts_params, like_sql, like_params)
+        return [
+            (src, kind, int(has_voice or 0), created_raw, int(count))
+            for src, kind, has_voice, created_raw, count in cursor.fetchall()
+        ]
+
+
 def getSubtitleVersionInfo(
     fileName: str,
     startTime: float | None = None,
@@ -5629,6 +6807,49 @@ def getSubtitleFileVersionInfo(fileName: str):
         return created_raw, updated_raw
 
 
+def _speaker_name_table_ready() -> bool:
+    """
+    构建阶段生成的 speaker_name 存在时，说话者名称直接按 (lang, 类型, id) 关联这张小表；旧库缺表时回退到 npc/avatar → textMap
+    """
+    return _table_exists(_SPEAKER_NAME_TABLE)
+
+
+def _speaker_name_match_table() -> str:
+    return _SPEAKER_NAME_TABLE if _speaker_name_table_ready() else "textMap"
+
+
+def _npc_speaker_join(alias: str) -> str:
+    """
+    对白说话者（NPC）名称的关联子句，带一个 lang 参数，名称列为 {alias}.content
+    """
+    if _speaker_name_table_ready():
+        return (
+            f"join {_SPEAKER_NAME_TABLE} as {alias} on dialogue.talkerType = 'TALK_ROLE_NPC' "
+            f"and {alias}.talker_type = dialogue.talkerType and {alias}.talker_id = dialogue.talkerId "
+            f"and {alias}.lang = ? "
+        )
+    return (
+        "join npc on dialogue.talkerType = 'TALK_ROLE_NPC' and dialogue.talkerId = npc.npcId "
+        f"join textMap as {alias} on npc.textHash = {alias}.hash and {alias}.lang = ? "
+    )
+
+
+def _avatar_speaker_join(alias: str, avatar_id_field: str) -> str:
+    """
+    角色名称的关联子句，带一个 lang 参数，名称列为 {alias}.content
+    """
+    if _speaker_name_table_ready():
+        return (
+            f"join {_SPEAKER_NAME_TABLE} as {alias} on {alias}.talker_type = 'AVATAR' "
+            f"and {alias}.talker_id = {avatar_id_field} and {alias}.lang = ? "
+        )
+    return (
+        f"join avatar on {avatar_id_field} = avatar.avatarId "
+        f"join textMap as {alias} on avatar.nameTextMapHash = {alias}.hash "
+        f"and {alias}.lang = ? "
+    )
+
+
 def selectDialogueByTalkerKeyword(
     keyword: str,
     langCode: int,
@@ -5638,13 +6859,12 @@ def selectDialogueByTalkerKeyword(
 ):
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyword, langCode)
-        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("npcName.content", keyword, langCode)
-        speaker_length_sql = f"length({_build_normalized_match_expr('npcName.content', langCode)})"
+        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("npcName.content", keyword, langCode, table=_speaker_name_match_table())
+        speaker_length_sql = f"length({_build_normalized_match_expr('npcName.content', langCode, table=_speaker_name_match_table())})"
         sql = (
             "select dialogue.textHash, dialogue.talkerType, dialogue.talkerId, dialogue.dialogueId "
             "from dialogue "
-            "join npc on dialogue.talkerType = 'TALK_ROLE_NPC' and dialogue.talkerId = npc.npcId "
-            "join textMap as npcName on npc.textHash = npcName.hash and npcName.lang=? "
+            f"{_npc_speaker_join('npcName')}"
             "join textMap as dialogueText on dialogue.textHash = dialogueText.hash and dialogueText.lang=? "
             "where (npcName.content like ? escape '\\' or npcName.content like ? escape '\\') "
         )
@@ -5677,8 +6897,7 @@ def countDialogueByTalkerKeyword(
         sql = (
             "select count(*) "
             "from dialogue "
-            "join npc on dialogue.talkerType = 'TALK_ROLE_NPC' and dialogue.talkerId = npc.npcId "
-            "join textMap as npcName on npc.textHash = npcName.hash and npcName.lang=? "
+            f"{_npc_speaker_join('npcName')}"
             "join textMap as dialogueText on dialogue.textHash = dialogueText.hash and dialogueText.lang=? "
             "where (npcName.content like ? escape '\\' or npcName.content like ? escape '\\') "
         )
@@ -5707,16 +6926,15 @@ def selectDialogueByTalkerAndKeyword(
     with closing(conn.cursor()) as cursor:
         speaker_exact, speaker_fuzzy = _build_like_patterns(speaker_keyword, langCode)
         keyword_exact, keyword_fuzzy = _build_like_patterns(keyword, langCode)
-        dialogue_sort_sql, dialogue_sort_params = _build_match_sort_case("dialogueText.content", keyword, langCode)
-        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("npcName.content", speaker_keyword, langCode)
-        dialogue_length_sql = f"length({_build_normalized_match_expr('dialogueText.content', langCode)})"
+        dialogue_sort_sql, dialogue_sort_params = _build_match_sort_case("dialogueText.content", keyword, langCode, table="textMap")
+        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("npcName.content", speaker_keyword, langCode, table=_speaker_name_match_table())
+        dialogue_length_sql = f"length({_build_normalized_match_expr('dialogueText.content', langCode, table='textMap')})"
         sql = (
             "select dialogue.textHash, dialogue.talkerType, dialogue.talkerId, dialogue.dialogueId "
             "from dialogue "
             "join textMap as dialogueText on dialogue.textHash = dialogueText.hash "
             "and dialogueText.lang = ? "
-            "join npc on dialogue.talkerType = 'TALK_ROLE_NPC' and dialogue.talkerId = npc.npcId "
-            "join textMap as npcName on npc.textHash = npcName.hash and npcName.lang = ? "
+            f"{_npc_speaker_join('npcName')}"
             "where (dialogueText.content like ? escape '\\' or dialogueText.content like ? escape '\\') "
             "and (npcName.content like ? escape '\\' or npcName.content like ? escape '\\') "
         )
@@ -5759,8 +6977,8 @@ def selectDialogueByTalkerTypeAndKeyword(
 ):
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyword, langCode)
-        dialogue_sort_sql, dialogue_sort_params = _build_match_sort_case("dialogueText.content", keyword, langCode)
-        dialogue_length_sql = f"length({_build_normalized_match_expr('dialogueText.content', langCode)})"
+        dialogue_sort_sql, dialogue_sort_params = _build_match_sort_case("dialogueText.content", keyword, langCode, table="textMap")
+        dialogue_length_sql = f"length({_build_normalized_match_expr('dialogueText.content', langCode, table='textMap')})"
         sql = (
             "select dialogue.textHash, dialogue.talkerType, dialogue.talkerId, dialogue.dialogueId "
             "from dialogue "
@@ -5799,16 +7017,14 @@ def selectFetterBySpeakerKeyword(
 ):
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyword, langCode)
-        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", keyword, langCode)
-        speaker_length_sql = f"length({_build_normalized_match_expr('avatarName.content', langCode)})"
+        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", keyword, langCode, table=_speaker_name_match_table())
+        speaker_length_sql = f"length({_build_normalized_match_expr('avatarName.content', langCode, table=_speaker_name_match_table())})"
         sql = (
             "select fetters.voiceFileTextTextMapHash, fetters.avatarId "
             "from fetters "
             "join textMap as voiceText on fetters.voiceFileTextTextMapHash = voiceText.hash "
             "and voiceText.lang = ? "
-            "join avatar on fetters.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'fetters.avatarId')}"
             "where (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\') "
         )
         params = [langCode, langCode, exact, fuzzy]
@@ -5840,17 +7056,15 @@ def selectFetterBySpeakerAndKeyword(
     with closing(conn.cursor()) as cursor:
         speaker_exact, speaker_fuzzy = _build_like_patterns(speaker_keyword, langCode)
         keyword_exact, keyword_fuzzy = _build_like_patterns(keyword, langCode)
-        voice_sort_sql, voice_sort_params = _build_match_sort_case("voiceText.content", keyword, langCode)
-        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", speaker_keyword, langCode)
-        voice_length_sql = f"length({_build_normalized_match_expr('voiceText.content', langCode)})"
+        voice_sort_sql, voice_sort_params = _build_match_sort_case("voiceText.content", keyword, langCode, table="textMap")
+        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", speaker_keyword, langCode, table=_speaker_name_match_table())
+        voice_length_sql = f"length({_build_normalized_match_expr('voiceText.content', langCode, table='textMap')})"
         sql = (
             "select fetters.voiceFileTextTextMapHash, fetters.avatarId "
             "from fetters "
             "join textMap as voiceText on fetters.voiceFileTextTextMapHash = voiceText.hash "
             "and voiceText.lang = ? "
-            "join avatar on fetters.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'fetters.avatarId')}"
             "where (voiceText.content like ? escape '\\' or voiceText.content like ? escape '\\') "
             "and (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\') "
         )
@@ -5892,16 +7106,14 @@ def selectAvatarStoryBySpeakerKeyword(
 ):
     with closing(conn.cursor()) as cursor:
         exact, fuzzy = _build_like_patterns(keyword, langCode)
-        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", keyword, langCode)
-        speaker_length_sql = f"length({_build_normalized_match_expr('avatarName.content', langCode)})"
+        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", keyword, langCode, table=_speaker_name_match_table())
+        speaker_length_sql = f"length({_build_normalized_match_expr('avatarName.content', langCode, table=_speaker_name_match_table())})"
         sql = (
             "select entries.contextHash, entries.avatarId "
             f"from ({_avatar_story_entries_subquery()}) as entries "
             "join textMap as storyText on entries.contextHash = storyText.hash "
             "and storyText.lang = ? "
-            "join avatar on entries.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'entries.avatarId')}"
             "where (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\') "
         )
         params = [langCode, langCode, exact, fuzzy]
@@ -5933,17 +7145,15 @@ def selectAvatarStoryBySpeakerAndKeyword(
     with closing(conn.cursor()) as cursor:
         speaker_exact, speaker_fuzzy = _build_like_patterns(speaker_keyword, langCode)
         keyword_exact, keyword_fuzzy = _build_like_patterns(keyword, langCode)
-        story_sort_sql, story_sort_params = _build_match_sort_case("storyText.content", keyword, langCode)
-        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", speaker_keyword, langCode)
-        story_length_sql = f"length({_build_normalized_match_expr('storyText.content', langCode)})"
+        story_sort_sql, story_sort_params = _build_match_sort_case("storyText.content", keyword, langCode, table="textMap")
+        speaker_sort_sql, speaker_sort_params = _build_match_sort_case("avatarName.content", speaker_keyword, langCode, table=_speaker_name_match_table())
+        story_length_sql = f"length({_build_normalized_match_expr('storyText.content', langCode, table='textMap')})"
         sql = (
             "select entries.contextHash, entries.avatarId "
             f"from ({_avatar_story_entries_subquery()}) as entries "
             "join textMap as storyText on entries.contextHash = storyText.hash "
             "and storyText.lang = ? "
-            "join avatar on entries.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'entries.avatarId')}"
             "where (storyText.content like ? escape '\\' or storyText.content like ? escape '\\') "
             "and (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\') "
         )
@@ -6020,8 +7230,7 @@ def countDialogueByTalkerAndKeyword(
             "from dialogue "
             "join textMap as dialogueText on dialogue.textHash = dialogueText.hash "
             "and dialogueText.lang = ? "
-            "join npc on dialogue.talkerType = 'TALK_ROLE_NPC' and dialogue.talkerId = npc.npcId "
-            "join textMap as npcName on npc.textHash = npcName.hash and npcName.lang = ? "
+            f"{_npc_speaker_join('npcName')}"
             "where (dialogueText.content like ? escape '\\' or dialogueText.content like ? escape '\\') "
             "and (npcName.content like ? escape '\\' or npcName.content like ? escape '\\')"
         )
@@ -6090,9 +7299,7 @@ def countFetterBySpeakerKeyword(
             "from fetters "
             "join textMap as voiceText on fetters.voiceFileTextTextMapHash = voiceText.hash "
             "and voiceText.lang = ? "
-            "join avatar on fetters.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'fetters.avatarId')}"
             "where (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\')"
         )
         params = [langCode, langCode, exact, fuzzy]
@@ -6124,9 +7331,7 @@ def countFetterBySpeakerAndKeyword(
             "from fetters "
             "join textMap as voiceText on fetters.voiceFileTextTextMapHash = voiceText.hash "
             "and voiceText.lang = ? "
-            "join avatar on fetters.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'fetters.avatarId')}"
             "where (voiceText.content like ? escape '\\' or voiceText.content like ? escape '\\') "
             "and (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\')"
         )
@@ -6164,9 +7369,7 @@ def countAvatarStoryBySpeakerKeyword(
             f"from ({_avatar_story_entries_subquery()}) as entries "
             "join textMap as storyText on entries.contextHash = storyText.hash "
             "and storyText.lang = ? "
-            "join avatar on entries.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'entries.avatarId')}"
             "where (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\')"
         )
         params = [langCode, langCode, exact, fuzzy]
@@ -6198,9 +7401,7 @@ def countAvatarStoryBySpeakerAndKeyword(
             f"from ({_avatar_story_entries_subquery()}) as entries "
             "join textMap as storyText on entries.contextHash = storyText.hash "
             "and storyText.lang = ? "
-            "join avatar on entries.avatarId = avatar.avatarId "
-            "join textMap as avatarName on avatar.nameTextMapHash = avatarName.hash "
-            "and avatarName.lang = ? "
+            f"{_avatar_speaker_join('avatarName', 'entries.avatarId')}"
             "where (storyText.content like ? escape '\\' or storyText.content like ? escape '\\') "
             "and (avatarName.content like ? escape '\\' or avatarName.content like ? escape '\\')"
         )
@@ -6349,6 +7550,10 @@ def selectVoicePathFromTextHash(textHash: int) -> str | None:
     return _selectVoicePathFromTextHash_impl(textHash)
 
 
+def selectVoicePathsFromTextHashes(text_hashes: list[int]) -> dict[int, str]:
+    return _selectVoicePathsFromTextHashes_impl(text_hashes)
+
+
 def getVoicePath(voice_hash: str, lang: int) -> str | None:
     return _getVoicePath_impl(voice_hash, lang)
 
@@ -13,11 +13,17 @@ import readableImport
 import readableMetaImport
 import subtitleImport
 import textMapImport
+import textHashVoiceImport
+import textPrimarySourceImport
+import speakerNameImport
+import npcDialogueGroupImport
 import questImport
+import questStepImport
 import entitySourceImport
 from import_utils import DEFAULT_BATCH_SIZE, executemany_batched, fast_import_pragmas, load_json_file
 from genshin_data_core.talk import is_non_dialog_talk_obj
 from version_control import (
+    backfill_normalized_content,
     ensure_version_schema,
     get_current_version,
     get_or_create_version_id,
@@ -519,14 +525,21 @@ def main(
         "quest_briefs",
         "hangouts",
         "anecdotes",
+        "quest_steps",
         "chapters",
         "load_voice_avatars",
         "voices",
+        "fetter_voices",
+        "text_hash_voice",
         "readable",
         "subtitles",
         "textmap",
         "readable_meta",
         "entity_sources",
+        "normalized_content",
+        "text_primary_source",
+        "speaker_names",
+        "npc_dialogue_groups",
         "version_catalog"
     ]
 
@@ -578,12 +591,18 @@ def main(
                     sync_delete=prune_missing,
                     skip_asking=True,
                 )
+            elif stage == "quest_steps":
+                _run_stage(stage_timer, stage, questStepImport.refresh_quest_steps, skip_asking=True)
             elif stage == "chapters":
                 _run_stage(stage_timer, stage, importChapters, skip_asking=True)
             elif stage == "load_voice_avatars":
                 _run_stage(stage_timer, stage, voiceItemImport.loadAvatars, skip_asking=True)
             elif stage == "voices":
                 _run_stage(stage_timer, stage, voiceItemImport.importAllVoiceItems, reset=prune_missing, skip_asking=True)
+            elif stage == "fetter_voices":
+                _run_stage(stage_timer, stage, voiceItemImport.refresh_fetter_voice, skip_asking=True)
+            elif stage == "text_hash_voice":
+                _run_stage(stage_timer, stage, textHashVoiceImport.refresh_text_hash_voice, skip_asking=True)
             elif stage == "readable":
                 _run_stage(
                     stage_timer,
@@ -622,6 +641,14 @@ def main(
                     entitySourceImport.importEntitySources,
                     skip_asking=True,
                 )
+            elif stage == "normalized_content":
+                _run_stage(stage_timer, stage, backfill_normalized_content, skip_asking=True)
+            elif stage == "text_primary_source":
+                _run_stage(stage_timer, stage, textPrimarySourceImport.refresh_text_primary_source, skip_asking=True)
+            elif stage == "speaker_names":
+                _run_stage(stage_timer, stage, speakerNameImport.refresh_speaker_name, skip_asking=True)
+            elif stage == "npc_dialogue_groups":
+                _run_stage(stage_timer, stage, npcDialogueGroupImport.refresh_npc_dialogue_group, skip_asking=True)
             elif stage == "version_catalog":
                 _run_stage(stage_timer, stage, rebuild_version_catalog, skip_asking=True)
     stage_timer.print_summary()
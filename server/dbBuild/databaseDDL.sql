@@ -44,6 +44,9 @@ create index dialogue_dialogueId_index
 create index dialogue_textHash_index
     on dialogue (textHash);
 
+create index dialogue_talkerType_talkerId_index
+    on dialogue (talkerType, talkerId);
+
 create table talk_dialogue_link
 (
     talkId      integer not null,
@@ -190,6 +193,7 @@ create table textMap
     lang    integer,
     created_version_id INTEGER,
     updated_version_id INTEGER,
+    normalized_content TEXT,
     constraint textMap_pk_2
         unique (lang, hash)
 );
@@ -230,6 +234,83 @@ create index fetterVoice_avatarId_voiceFile_index
 create unique index fetterVoice_avatarId_voiceFile_voicePath_uindex
     on fetterVoice (avatarId, voiceFile, voicePath);
 
+create table text_hash_voice
+(
+    hash      integer
+        constraint text_hash_voice_pk
+            primary key,
+    has_voice integer not null default 1
+);
+
+create table text_primary_source
+(
+    hash         integer
+        constraint text_primary_source_pk
+            primary key,
+    source_kind  text    not null,
+    ref_id       integer,
+    source_count integer not null default 0
+);
+
+create table speaker_name
+(
+    lang               integer not null,
+    talker_type        text    not null,
+    talker_id          integer not null,
+    content            text    not null,
+    normalized_content text,
+    constraint speaker_name_pk
+        primary key (lang, talker_type, talker_id)
+);
+
+create table npc_dialogue_group
+(
+    lang                 integer not null,
+    npc_id               integer not null,
+    talk_id              integer,
+    coop_quest_id        integer,
+    dialogue_id_fallback integer,
+    sort_dialogue_id     integer not null,
+    line_count           integer not null default 0,
+    created_version_id   integer,
+    updated_version_id   integer
+);
+
+create index npc_dialogue_group_lang_npc_id_index
+    on npc_dialogue_group (lang, npc_id);
+
+create index npc_dialogue_group_talk_id_index
+    on npc_dialogue_group (talk_id);
+
+create table quest_step
+(
+    questId                  integer not null,
+    subId                    integer not null,
+    stepOrder                integer,
+    titleTextMapHash         integer,
+    fallbackTitleTextMapHash integer,
+    constraint quest_step_pk
+        primary key (questId, subId)
+);
+
+create table quest_step_talk
+(
+    questId integer not null,
+    kind    integer not null,
+    talkId  integer not null,
+    subId   integer not null,
+    seq     integer not null,
+    constraint quest_step_talk_pk
+        primary key (questId, kind, talkId, subId)
+);
+
+create table quest_hidden
+(
+    questId integer
+        constraint quest_hidden_pk
+            primary key
+);
+
 
 create table npc
 (
@@ -273,6 +354,7 @@ create table readable
     readableId integer,
     created_version_id INTEGER,
     updated_version_id INTEGER,
+    normalized_content TEXT,
     constraint readable_pk_2
         unique (fileName, lang)
 );
@@ -323,7 +405,8 @@ create table subtitle
     subtitleId integer,
     subtitleKey TEXT,
     created_version_id INTEGER,
-    updated_version_id INTEGER
+    updated_version_id INTEGER,
+    normalized_content TEXT
 );
 
 create index subtitle_fileName_index
@@ -16,6 +16,11 @@ import readableMetaImport
 import subtitleImport
 import entitySourceImport
 import textMapImport
+import textHashVoiceImport
+import textPrimarySourceImport
+import speakerNameImport
+import npcDialogueGroupImport
+import questStepImport
 from git_utils import resolve_commit as _resolve_commit, run_git as _run_git
 from import_utils import print_skip_summary as _print_skip_summary
 from text_source_path_utils import (
@@ -24,6 +29,7 @@ from text_source_path_utils import (
 )
 from textmap_name_utils import parse_textmap_file_name, textmap_file_sort_key, analyze_textmap_version_exceptions, analyze_readable_version_exceptions, analyze_subtitle_version_exceptions, report_version_exceptions
 from version_control import (
+    backfill_normalized_content,
     ensure_version_schema,
     get_or_create_version_id,
     rebuild_version_catalog,
@@ -35,6 +41,8 @@ from versioning import resolve_version_label
 SOURCE_REPO_URL = "https://gitlab.com/Dimbreath/animegamedata2.git"
 DIFF_RESUME_RANGE_KEY = "db_diffupdate_resume_range"
 DIFF_RESUME_STAGE_KEY = "db_diffupdate_resume_stage"
+# 与 databaseHelper.DATA_GENERATION_META_KEY 一致
+DATA_GENERATION_META_KEY = "db_generation"
 def _print_anomaly_summary(anomalies: list[str]):
     if not anomalies:
         print("[ANOMALY] no non-fatal anomalies detected.")
@@ -462,6 +470,7 @@ def _analyze_diff(diff_entries: list[dict]) -> dict:
         "quest_deleted": set(),     # 删除的quest文件
         "quest_added": set(),       # 新增的quest文件
         "quest_related": False,     # 是否有quest相关变更
+        "quest_excel": False,       # 是否有任务/子任务Excel变更
         "avatar": False,            # 是否有avatar变更
         "npc": False,               # 是否有npc变更
         "manual": False,            # 是否有manual变更
@@ -480,6 +489,7 @@ def _analyze_diff(diff_entries: list[dict]) -> dict:
         "changed_textmap_hashes_by_base": {},  # 实际导入发生变化的 TextMap hash
         "textmap_scope_failed": False,  # changed hash scope 是否收集失败
         "entity_sources": False,    # 是否有entity_source相关Excel变更
+        "touched_talk_ids": None,   # talk阶段实际改写的talkId；未记录（如断点续跑）时为None
     }
 
     def handle(action: str, rel: str, old_side: bool):
@@ -522,6 +532,9 @@ def _analyze_diff(diff_entries: list[dict]) -> dict:
         if rel == "ExcelBinOutput/AnecdoteExcelConfigData.json":
             plan["quest_related"] = True
             return
+        if rel in ("ExcelBinOutput/QuestExcelConfigData.json", "ExcelBinOutput/MainQuestExcelConfigData.json"):
+            plan["quest_excel"] = True
+            return
         if rel.startswith("ExcelBinOutput/TalkExcelConfigData") and rel.endswith(".json"):
             plan["quest_related"] = True
             return
@@ -808,6 +821,9 @@ def _process_talk_stage(plan, repo_path, base_commit):
         if skipped:
             talk_skipped_files.append(talk_file)
 
+    # 有文件处理失败时无法确定改动范围，交给下游整表重算
+    plan["touched_talk_ids"] = None if anomalies else set(touched_talk_ids)
+
     # 刷新quest哈希映射
     if touched_talk_ids:
         try:
@@ -1017,6 +1033,123 @@ def _process_voice_stage(plan, prune_missing):
         voiceItemImport.importAllVoiceItems(reset=prune_missing)
 
 
+def _process_fetter_voice_stage(plan):
+    """
+    处理fetter_voice阶段；语音变更或缺少完成标记时重建fetterVoice
+    """
+    if plan["voice"] or not voiceItemImport.fetter_voice_built():
+        voiceItemImport.refresh_fetter_voice()
+        plan["fetter_voice_rebuilt"] = True
+
+
+def _process_text_hash_voice_stage(plan):
+    """
+    处理text_hash_voice阶段
+    """
+    voice_inputs_changed = (
+        plan["voice"]
+        or plan.get("fetter_voice_rebuilt")
+        or plan["fetters"]
+        or plan["talk_changed"]
+        or plan["talk_deleted"]
+        or plan["quest_related"]
+    )
+    if voice_inputs_changed or not textHashVoiceImport.text_hash_voice_table_populated(conn):
+        textHashVoiceImport.refresh_text_hash_voice(connection=conn)
+
+
+def _process_text_primary_source_stage(plan):
+    """
+    处理text_primary_source阶段
+    """
+    source_inputs_changed = (
+        plan["talk_changed"]
+        or plan["talk_deleted"]
+        or plan["quest_related"]
+        or plan["fetters"]
+        or plan["fetter_story"]
+        or plan["entity_sources"]
+        or plan["textmap_bases"]
+        or plan["readable_changed"]
+        or plan["readable_deleted"]
+        or plan["readable_mapping_changed"]
+    )
+    if not textPrimarySourceImport.text_primary_source_table_populated(conn):
+        textPrimarySourceImport.refresh_text_primary_source(connection=conn)
+    elif source_inputs_changed:
+        textPrimarySourceImport.refresh_text_primary_source(connection=conn, incremental=True)
+
+
+def _process_speaker_name_stage(plan):
+    """
+    处理speaker_name阶段
+    """
+    speaker_inputs_changed = plan["npc"] or plan["avatar"] or plan["textmap_bases"]
+    if speaker_inputs_changed or not speakerNameImport.speaker_name_table_populated(conn):
+        speakerNameImport.refresh_speaker_name(connection=conn)
+
+
+def _process_quest_step_stage(plan):
+    """
+    处理quest_step阶段；任务Excel变更或表为空时整表重算，否则只重算变更/删除的quest文件
+    """
+    if plan["quest_excel"] or not questStepImport.quest_step_table_populated(conn):
+        questStepImport.refresh_quest_steps(connection=conn, data_path=DATA_PATH)
+        return
+    quest_ids = set()
+    for file_name in plan["quest_changed"] | plan["quest_deleted"]:
+        quest_id = questStepImport.quest_id_from_file_name(file_name)
+        if quest_id is not None:
+            quest_ids.add(quest_id)
+    if quest_ids:
+        questStepImport.refresh_quest_steps(connection=conn, data_path=DATA_PATH, quest_ids=quest_ids)
+
+
+def _npc_dialogue_group_talk_scope(plan) -> set[int] | None:
+    """
+    计算npc_dialogue_group需要重算的talkId；返回None表示需要整表重算
+    """
+    if plan["quest_related"] or plan.get("textmap_scope_failed"):
+        return None
+    talk_ids: set[int] = set()
+    if plan["talk_changed"] or plan["talk_deleted"]:
+        touched_talk_ids = plan.get("touched_talk_ids")
+        if touched_talk_ids is None:
+            return None
+        talk_ids.update(touched_talk_ids)
+    changed_hashes = _changed_textmap_hashes(plan)
+    if changed_hashes:
+        # 文本版本变化会改变所在分组的创建/更新版本
+        hash_list = sorted(changed_hashes)
+        cur = conn.cursor()
+        try:
+            for start in range(0, len(hash_list), 500):
+                chunk = hash_list[start:start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = cur.execute(
+                    f"SELECT DISTINCT talkId FROM dialogue WHERE textHash IN ({placeholders}) AND talkId IS NOT NULL",
+                    chunk,
+                ).fetchall()
+                talk_ids.update(int(row[0]) for row in rows)
+        finally:
+            cur.close()
+    return talk_ids
+
+
+def _process_npc_dialogue_group_stage(plan):
+    """
+    处理npc_dialogue_group阶段；放在version_catalog之后，使分组版本取到回放后的textMap版本
+    """
+    if not npcDialogueGroupImport.npc_dialogue_group_table_populated(conn):
+        npcDialogueGroupImport.refresh_npc_dialogue_group(connection=conn)
+        return
+    talk_ids = _npc_dialogue_group_talk_scope(plan)
+    if talk_ids is None:
+        npcDialogueGroupImport.refresh_npc_dialogue_group(connection=conn)
+    elif talk_ids:
+        npcDialogueGroupImport.refresh_npc_dialogue_group(connection=conn, talk_ids=talk_ids)
+
+
 def _process_readable_stage(plan, target_version):
     """
     处理readable阶段
@@ -1331,9 +1464,15 @@ def _process_finalize_stage(target_commit, normalized_remote_ref, target_version
     处理finalize阶段
     """
     set_current_version(target_commit, remote_ref=normalized_remote_ref, version_label=target_version)
+    # 递增数据代数，运行中的服务据此清空结果/计数/名称缓存
+    try:
+        generation = int(_meta_get(DATA_GENERATION_META_KEY) or 0)
+    except ValueError:
+        generation = 0
     _meta_set_many(
         {
             "agd_last_checked_at": _utc_now_iso(),
+            DATA_GENERATION_META_KEY: str(generation + 1),
         }
     )
 
@@ -1371,15 +1510,22 @@ def run_diff_update(
         "textmap",
         "talk",
         "quest",
+        "quest_step",
         "quest_by_textmap",
         "core_tables",
         "entity_sources",
         "voice",
+        "fetter_voice",
+        "text_hash_voice",
         "readable",
         "readable_meta",
         "subtitle",
+        "normalized_content",
+        "text_primary_source",
+        "speaker_name",
         "source_file_version",
         "version_catalog",
+        "npc_dialogue_group",
         "finalize",
     ]
     stage_index = {name: idx for idx, name in enumerate(stage_order)}
@@ -1429,6 +1575,10 @@ def run_diff_update(
         anomalies.extend(quest_anomalies)
         mark_stage("quest")
 
+    if not stage_done("quest_step"):
+        _process_quest_step_stage(plan)
+        mark_stage("quest_step")
+
     if not stage_done("quest_by_textmap"):
         _process_quest_by_textmap_stage(plan, target_version)
         mark_stage("quest_by_textmap")
@@ -1445,6 +1595,14 @@ def run_diff_update(
         _process_voice_stage(plan, prune_missing)
         mark_stage("voice")
 
+    if not stage_done("fetter_voice"):
+        _process_fetter_voice_stage(plan)
+        mark_stage("fetter_voice")
+
+    if not stage_done("text_hash_voice"):
+        _process_text_hash_voice_stage(plan)
+        mark_stage("text_hash_voice")
+
     if not stage_done("readable"):
         _process_readable_stage(plan, target_version)
         mark_stage("readable")
@@ -1457,6 +1615,19 @@ def run_diff_update(
         _process_subtitle_stage(plan, target_version)
         mark_stage("subtitle")
 
+    if not stage_done("normalized_content"):
+        # 本轮新插入的 textMap/readable/subtitle 行统一补算归一化内容
+        backfill_normalized_content()
+        mark_stage("normalized_content")
+
+    if not stage_done("text_primary_source"):
+        _process_text_primary_source_stage(plan)
+        mark_stage("text_primary_source")
+
+    if not stage_done("speaker_name"):
+        _process_speaker_name_stage(plan)
+        mark_stage("speaker_name")
+
     if not stage_done("source_file_version"):
         _record_source_file_versions(diff_entries, target_version)
         mark_stage("source_file_version")
@@ -1465,6 +1636,10 @@ def run_diff_update(
         _process_version_catalog_stage(plan, target_commit, base_commit)
         mark_stage("version_catalog")
 
+    if not stage_done("npc_dialogue_group"):
+        _process_npc_dialogue_group_stage(plan)
+        mark_stage("npc_dialogue_group")
+
     if not stage_done("finalize"):
         _process_finalize_stage(target_commit, normalized_remote_ref, target_version)
         mark_stage("finalize")
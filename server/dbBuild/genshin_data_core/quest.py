@@ -248,6 +248,20 @@ class QuestParser:
                     mapping.setdefault(talk_id, step_hash)
         return mapping
 
+    def build_top_level_talk_subquest_ids(self, obj: Any) -> dict[int, list[int]]:
+        """Top-level talk id -> candidate subquest ids (the talk id itself first, then begin-cond subquests)."""
+        result: dict[int, list[int]] = {}
+        schema = self._schema(obj)
+        for talk_obj in self._talk_rows(obj):
+            talk_id = self._talk_id(talk_obj, schema)
+            if talk_id is None:
+                continue
+            candidates = result.setdefault(talk_id, [])
+            for subquest_id in (talk_id, *self._talk_start_subquest_ids(talk_obj)):
+                if subquest_id not in candidates:
+                    candidates.append(subquest_id)
+        return result
+
     def resolve_chapter_id(self, main_obj: Any, quest_obj: Any) -> Optional[int]:
         main_row = self.extract_quest_row(main_obj)
         main_chapter_id = main_row.chapter_id if main_row is not None else None
@@ -276,3 +290,4 @@ get_step_sub_id = GTS_QUEST_PARSER.get_step_sub_id
 get_step_order = GTS_QUEST_PARSER.get_step_order
 get_step_talk_ids = GTS_QUEST_PARSER.get_step_talk_ids
 build_step_title_hash_by_talk_id = GTS_QUEST_PARSER.build_step_title_hash_by_talk_id
+build_top_level_talk_subquest_ids = GTS_QUEST_PARSER.build_top_level_talk_subquest_ids
@@ -76,6 +76,7 @@ from version_control import (
     should_update_version,
 )
 import entitySourceImport
+import npcDialogueGroupImport
 from versioning import (
     _extract_version_tag,
     _version_tag_to_sort_key,
@@ -3414,6 +3415,10 @@ def backfill_textmap_versions_from_history(
         finally:
             check_cursor.close()
 
+        if refresh_version_catalog:
+            # diffUpdate 在自身的 npc_dialogue_group 阶段统一刷新；单独回放时在这里同步分组版本
+            npcDialogueGroupImport.refresh_npc_dialogue_group(connection=conn)
+
 
 def backfill_readable_versions_from_history(
     *,
@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+from contextlib import closing
+from typing import Iterable
+
+
+NPC_DIALOGUE_GROUP_TABLE = "npc_dialogue_group"
+
+_KEYS_TABLE = "_npc_dialogue_group_keys"
+_LINES_TABLE = "_npc_dialogue_group_lines"
+_GROUPS_TABLE = "_npc_dialogue_group_groups"
+_VERSIONS_TABLE = "_npc_dialogue_group_versions"
+_TALKS_TABLE = "_npc_dialogue_group_talks"
+
+
+def ensure_npc_dialogue_group_schema(connection, *, commit: bool = True) -> None:
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {NPC_DIALOGUE_GROUP_TABLE} (
+                lang INTEGER NOT NULL,
+                npc_id INTEGER NOT NULL,
+                talk_id INTEGER,
+                coop_quest_id INTEGER,
+                dialogue_id_fallback INTEGER,
+                sort_dialogue_id INTEGER NOT NULL,
+                line_count INTEGER NOT NULL DEFAULT 0,
+                created_version_id INTEGER,
+                updated_version_id INTEGER
+            )
+            """
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {NPC_DIALOGUE_GROUP_TABLE}_lang_npc_id_index "
+            f"ON {NPC_DIALOGUE_GROUP_TABLE} (lang, npc_id)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {NPC_DIALOGUE_GROUP_TABLE}_talk_id_index "
+            f"ON {NPC_DIALOGUE_GROUP_TABLE} (talk_id)"
+        )
+    if commit:
+        connection.commit()
+
+
+def _default_connection():
+    from DBConfig import conn
+
+    return conn
+
+
+def _table_exists(cursor, table_name: str) -> bool:
+    row = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+        (table_name,),
+    ).fetchone()
+    return row is not None
+
+
+def npc_dialogue_group_table_populated(connection=None) -> bool:
+    connection = connection or _default_connection()
+    with closing(connection.cursor()) as cursor:
+        if not _table_exists(cursor, NPC_DIALOGUE_GROUP_TABLE):
+            return False
+        return cursor.execute(f"SELECT 1 FROM {NPC_DIALOGUE_GROUP_TABLE} LIMIT 1").fetchone() is not None
+
+
+def _quest_talk_dialogue_join_condition(qt_alias: str = "qt", d_alias: str = "d") -> str:
+    # 与 databaseHelper._quest_talk_dialogue_join_condition 一致
+    return (
+        f"(({qt_alias}.coopQuestId IS NULL OR {qt_alias}.coopQuestId = 0) AND {d_alias}.coopQuestId IS NULL) "
+        f"OR ({qt_alias}.coopQuestId > 0 AND {d_alias}.coopQuestId = {qt_alias}.coopQuestId)"
+    )
+
+
+def _textmap_langs(cursor) -> list[int]:
+    # 借助 (lang, hash) 唯一索引逐个跳到下一个语言，避免扫描整张 textMap
+    rows = cursor.execute(
+        """
+        WITH RECURSIVE langs(lang) AS (
+            SELECT MIN(lang) FROM textMap
+            UNION ALL
+            SELECT (SELECT MIN(lang) FROM textMap WHERE lang > langs.lang) FROM langs WHERE langs.lang IS NOT NULL
+        )
+        SELECT lang FROM langs WHERE lang IS NOT NULL
+        """
+    ).fetchall()
+    return [int(row[0]) for row in rows]
+
+
+def _fill_group_keys(cursor, scoped: bool) -> None:
+    talk_filter = f"AND d.talkId IN (SELECT talk_id FROM {_TALKS_TABLE}) " if scoped else ""
+    quest_talk_join = ""
+    quest_talk_filter = ""
+    if _table_exists(cursor, "questTalk"):
+        quest_talk_join = (
+            "LEFT JOIN questTalk qt ON qt.talkId = d.talkId AND ("
+            + _quest_talk_dialogue_join_condition("qt", "d")
+            + ") "
+        )
+        quest_talk_filter = "AND qt.questId IS NULL "
+    cursor.execute(
+        f"""
+        INSERT INTO {_KEYS_TABLE}(npc_id, talk_id, coop_quest_id, dialogue_id_fallback, sort_dialogue_id)
+        SELECT d.talkerId, d.talkId, d.coopQuestId,
+               CASE WHEN d.talkId = 0 AND d.coopQuestId IS NULL THEN d.dialogueId ELSE NULL END,
+               MIN(d.dialogueId)
+        FROM dialogue d
+        {quest_talk_join}
+        WHERE d.talkerType = 'TALK_ROLE_NPC' AND d.talkerId IS NOT NULL
+        {quest_talk_filter}{talk_filter}
+        GROUP BY d.talkerId, d.talkId, d.coopQuestId,
+                 CASE WHEN d.talkId = 0 AND d.coopQuestId IS NULL THEN d.dialogueId ELSE NULL END
+        """
+    )
+
+
+def _fill_group_lines(cursor) -> None:
+    # 分组内全部对白（含其他说话者）；dialogue.talkId 没有索引，按 talk 的分组从 dialogue 侧单次扫描回查
+    cursor.execute(
+        f"""
+        INSERT INTO {_GROUPS_TABLE}(talk_id, coop_quest_id, dialogue_id_fallback)
+        SELECT DISTINCT talk_id, coop_quest_id, dialogue_id_fallback FROM {_KEYS_TABLE}
+        """
+    )
+    cursor.execute(
+        f"CREATE INDEX temp.{_GROUPS_TABLE}_group_index "
+        f"ON {_GROUPS_TABLE} (talk_id, coop_quest_id, dialogue_id_fallback)"
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO {_LINES_TABLE}(talk_id, coop_quest_id, dialogue_id_fallback, text_hash)
+        SELECT g.talk_id, g.coop_quest_id, g.dialogue_id_fallback, dg.textHash
+        FROM {_GROUPS_TABLE} g
+        JOIN dialogue dg ON dg.dialogueId = g.dialogue_id_fallback
+        WHERE g.dialogue_id_fallback IS NOT NULL
+        UNION ALL
+        SELECT g.talk_id, g.coop_quest_id, g.dialogue_id_fallback, dg.textHash
+        FROM dialogue dg
+        CROSS JOIN {_GROUPS_TABLE} g
+        WHERE g.talk_id = dg.talkId AND g.coop_quest_id IS dg.coopQuestId
+          AND g.dialogue_id_fallback IS NULL
+        """
+    )
+    cursor.execute(
+        f"CREATE INDEX temp.{_LINES_TABLE}_group_index "
+        f"ON {_LINES_TABLE} (talk_id, coop_quest_id, dialogue_id_fallback)"
+    )
+    cursor.execute(
+        f"""
+        UPDATE {_GROUPS_TABLE} SET line_count = (
+            SELECT COUNT(*) FROM {_LINES_TABLE} gl
+            WHERE gl.talk_id IS {_GROUPS_TABLE}.talk_id
+              AND gl.coop_quest_id IS {_GROUPS_TABLE}.coop_quest_id
+              AND gl.dialogue_id_fallback IS {_GROUPS_TABLE}.dialogue_id_fallback
+        )
+        """
+    )
+
+
+def _fill_group_versions(cursor) -> None:
+    """
+    每个分组在各语言下的创建版本取排序最早的 created_version_id，更新版本取最晚的 updated_version_id，
+    排序规则与运行时原先的相关子查询相同
+    """
+    if not _table_exists(cursor, "textMap") or not _table_exists(cursor, "version_dim"):
+        return
+    cursor.execute(
+        f"""
+        INSERT INTO {_VERSIONS_TABLE}(talk_id, coop_quest_id, dialogue_id_fallback, lang,
+                                      created_version_id, updated_version_id)
+        SELECT talk_id, coop_quest_id, dialogue_id_fallback, lang,
+               MAX(CASE WHEN created_rank = 1 THEN created_id END),
+               MAX(CASE WHEN updated_rank = 1 THEN updated_id END)
+        FROM (
+            SELECT gl.talk_id, gl.coop_quest_id, gl.dialogue_id_fallback, tm.lang,
+                   cv.id AS created_id, uv.id AS updated_id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY gl.talk_id, gl.coop_quest_id, gl.dialogue_id_fallback, tm.lang
+                       ORDER BY cv.id IS NULL, coalesce(cv.version_sort_key, 2147483647), cv.id
+                   ) AS created_rank,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY gl.talk_id, gl.coop_quest_id, gl.dialogue_id_fallback, tm.lang
+                       ORDER BY uv.id IS NULL, coalesce(uv.version_sort_key, -1) DESC, uv.id DESC
+                   ) AS updated_rank
+            FROM {_LINES_TABLE} gl
+            JOIN textMap tm ON tm.hash = gl.text_hash
+            LEFT JOIN version_dim cv ON cv.id = tm.created_version_id
+            LEFT JOIN version_dim uv ON uv.id = tm.updated_version_id
+        )
+        GROUP BY talk_id, coop_quest_id, dialogue_id_fallback, lang
+        """
+    )
+
+
+def _create_staging_tables(cursor) -> None:
+    _drop_staging_tables(cursor)
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE {_KEYS_TABLE} (
+            npc_id INTEGER NOT NULL,
+            talk_id INTEGER,
+            coop_quest_id INTEGER,
+            dialogue_id_fallback INTEGER,
+            sort_dialogue_id INTEGER NOT NULL
+        )
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE {_GROUPS_TABLE} (
+            talk_id INTEGER,
+            coop_quest_id INTEGER,
+            dialogue_id_fallback INTEGER,
+            line_count INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE {_LINES_TABLE} (
+            talk_id INTEGER,
+            coop_quest_id INTEGER,
+            dialogue_id_fallback INTEGER,
+            text_hash INTEGER
+        )
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE {_VERSIONS_TABLE} (
+            talk_id INTEGER,
+            coop_quest_id INTEGER,
+            dialogue_id_fallback INTEGER,
+            lang INTEGER NOT NULL,
+            created_version_id INTEGER,
+            updated_version_id INTEGER
+        )
+        """
+    )
+    cursor.execute(f"CREATE TEMP TABLE {_TALKS_TABLE} (talk_id INTEGER PRIMARY KEY)")
+
+
+def _drop_staging_tables(cursor) -> None:
+    for table_name in (_KEYS_TABLE, _GROUPS_TABLE, _LINES_TABLE, _VERSIONS_TABLE, _TALKS_TABLE):
+        cursor.execute(f"DROP TABLE IF EXISTS temp.{table_name}")
+
+
+def refresh_npc_dialogue_group(
+    *,
+    connection=None,
+    talk_ids: Iterable[int] | None = None,
+    commit: bool = True,
+) -> int:
+    """
+    重建 npc_dialogue_group：按 NPC 物化非任务对白分组（talkId/coopQuestId/单句兜底）及其
+    行数、首句和各语言下的创建/更新版本，NPC 页面据此按 (lang, npc_id) 一次索引查询即可。
+    talk_ids 不为空时只重算这些 talk 的分组（供 diffUpdate 使用）
+    """
+    connection = connection or _default_connection()
+    ensure_npc_dialogue_group_schema(connection, commit=False)
+    scoped_talk_ids = None if talk_ids is None else sorted({int(talk_id) for talk_id in talk_ids})
+    try:
+        with closing(connection.cursor()) as cursor:
+            if scoped_talk_ids is not None and not scoped_talk_ids:
+                row = cursor.execute(f"SELECT COUNT(*) FROM {NPC_DIALOGUE_GROUP_TABLE}").fetchone()
+            else:
+                _create_staging_tables(cursor)
+                if scoped_talk_ids is None:
+                    cursor.execute(f"DELETE FROM {NPC_DIALOGUE_GROUP_TABLE}")
+                else:
+                    cursor.executemany(
+                        f"INSERT INTO {_TALKS_TABLE}(talk_id) VALUES (?)",
+                        [(talk_id,) for talk_id in scoped_talk_ids],
+                    )
+                    cursor.execute(
+                        f"DELETE FROM {NPC_DIALOGUE_GROUP_TABLE} "
+                        f"WHERE talk_id IN (SELECT talk_id FROM {_TALKS_TABLE})"
+                    )
+                if _table_exists(cursor, "dialogue"):
+                    _fill_group_keys(cursor, scoped=scoped_talk_ids is not None)
+                    _fill_group_lines(cursor)
+                    _fill_group_versions(cursor)
+                    cursor.execute(
+                        f"CREATE INDEX temp.{_VERSIONS_TABLE}_group_index "
+                        f"ON {_VERSIONS_TABLE} (talk_id, coop_quest_id, dialogue_id_fallback, lang)"
+                    )
+                    langs = _textmap_langs(cursor) if _table_exists(cursor, "textMap") else []
+                    for lang in langs:
+                        cursor.execute(
+                            f"""
+                            INSERT INTO {NPC_DIALOGUE_GROUP_TABLE}(
+                                lang, npc_id, talk_id, coop_quest_id, dialogue_id_fallback,
+                                sort_dialogue_id, line_count, created_version_id, updated_version_id
+                            )
+                            SELECT ?, k.npc_id, k.talk_id, k.coop_quest_id, k.dialogue_id_fallback,
+                                   k.sort_dialogue_id, g.line_count,
+                                   v.created_version_id, v.updated_version_id
+                            FROM {_KEYS_TABLE} k
+                            JOIN {_GROUPS_TABLE} g
+                                ON g.talk_id IS k.talk_id AND g.coop_quest_id IS k.coop_quest_id
+                               AND g.dialogue_id_fallback IS k.dialogue_id_fallback
+                            LEFT JOIN {_VERSIONS_TABLE} v
+                                ON v.talk_id IS k.talk_id AND v.lang = ?
+                               AND v.coop_quest_id IS k.coop_quest_id
+                               AND v.dialogue_id_fallback IS k.dialogue_id_fallback
+                            """,
+                            (lang, lang),
+                        )
+                row = cursor.execute(f"SELECT COUNT(*) FROM {NPC_DIALOGUE_GROUP_TABLE}").fetchone()
+                _drop_staging_tables(cursor)
+        if commit:
+            connection.commit()
+    except Exception:
+        if commit:
+            connection.rollback()
+        raise
+
+    total = int(row[0] or 0) if row else 0
+    if scoped_talk_ids is not None:
+        print(f"NPC dialogue groups refreshed: total={total}, talks={len(scoped_talk_ids)}")
+    else:
+        print(f"NPC dialogue groups refreshed: total={total}")
+    return total
@@ -38,6 +38,7 @@ from version_control import (
     should_update_version,
 )
 from server_import import import_server_module
+import questStepImport
 
 quest_text_filters = import_server_module("quest_text_filters")
 build_quest_text_excluded_sql = quest_text_filters.build_quest_text_excluded_sql
@@ -2689,7 +2690,9 @@ def runQuestOnly(
             sync_delete=prune_missing,
             batch_size=batch_size,
         )
+        quest_step_rows = questStepImport.refresh_quest_steps(connection=conn, data_path=DATA_PATH)
     else:
+        quest_step_rows = 0
         quest_stats = {
             "files_total": 0,
             "imported_quest_count": 0,
@@ -2724,6 +2727,7 @@ def runQuestOnly(
     result["anecdote_new_count"] = int(anecdote_stats.get("new_quest_count", 0) or 0)
     result["anecdote_mapping_miss_count"] = int(anecdote_stats.get("mapping_miss_count", 0) or 0)
     result["talk_rows_imported"] = int(talk_rows or 0)
+    result["quest_step_talk_rows"] = int(quest_step_rows or 0)
     result["quests_processed"] = bool(include_quests)
     result["talks_processed"] = bool(include_talks)
     return result
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import os
+from contextlib import closing
+from typing import Any, Iterable
+
+from genshin_data_core.quest import (
+    build_top_level_talk_subquest_ids,
+    get_quest_subquests,
+    get_step_desc_text_map_hash,
+    get_step_order,
+    get_step_sub_id,
+    get_step_talk_ids,
+)
+from import_utils import load_json_file
+
+
+QUEST_STEP_TABLE = "quest_step"
+QUEST_STEP_TALK_TABLE = "quest_step_talk"
+QUEST_HIDDEN_TABLE = "quest_hidden"
+
+# quest_step_talk.kind：0 = 子任务完成条件中的对话（COMPLETE_TALK / FINISH_PLOT），
+# 1 = 顶层 talk 按自身 id 及 beginCond 里的子任务兜底匹配
+STEP_TALK_KIND_FINISH_COND = 0
+STEP_TALK_KIND_TOP_LEVEL = 1
+
+_HIDDEN_QUEST_TYPE_KEYS = ("showType", "FAPKBAGMFND", "questType", "NCDLPENPKKC", "OIJGOOIJBCH")
+
+
+def ensure_quest_step_schema(connection, *, commit: bool = True) -> None:
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {QUEST_STEP_TABLE} (
+                questId INTEGER NOT NULL,
+                subId INTEGER NOT NULL,
+                stepOrder INTEGER,
+                titleTextMapHash INTEGER,
+                fallbackTitleTextMapHash INTEGER,
+                PRIMARY KEY (questId, subId)
+            )
+            """
+        )
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {QUEST_STEP_TALK_TABLE} (
+                questId INTEGER NOT NULL,
+                kind INTEGER NOT NULL,
+                talkId INTEGER NOT NULL,
+                subId INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (questId, kind, talkId, subId)
+            )
+            """
+        )
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {QUEST_HIDDEN_TABLE} (questId INTEGER PRIMARY KEY)")
+    if commit:
+        connection.commit()
+
+
+def _default_connection_and_data_path():
+    from DBConfig import DATA_PATH, conn
+
+    return conn, DATA_PATH
+
+
+def _table_exists(cursor, table_name: str) -> bool:
+    row = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+        (table_name,),
+    ).fetchone()
+    return row is not None
+
+
+def quest_step_table_populated(connection=None) -> bool:
+    connection = connection or _default_connection_and_data_path()[0]
+    with closing(connection.cursor()) as cursor:
+        if not _table_exists(cursor, QUEST_STEP_TALK_TABLE):
+            return False
+        return cursor.execute(f"SELECT 1 FROM {QUEST_STEP_TALK_TABLE} LIMIT 1").fetchone() is not None
+
+
+def _load_excel_rows(data_path: str, file_name: str) -> list[dict[str, Any]]:
+    path = os.path.join(data_path, "ExcelBinOutput", file_name)
+    rows = load_json_file(path, default=[], error_msg=f"Failed to load {file_name}")
+    if not isinstance(rows, list):
+        return []
+    return [row for row in rows if isinstance(row, dict)]
+
+
+def _is_hidden_quest_obj(obj: object) -> bool:
+    if not isinstance(obj, dict):
+        return False
+    return any(obj.get(key) == "QUEST_HIDDEN" for key in _HIDDEN_QUEST_TYPE_KEYS)
+
+
+def quest_id_from_file_name(file_name: str) -> int | None:
+    stem = os.path.splitext(os.path.basename(str(file_name).replace("\\", "/")))[0]
+    return int(stem) if stem.isdigit() else None
+
+
+def _load_excel_steps_by_quest_id(data_path: str) -> dict[int, dict[int, tuple[int | None, int | None]]]:
+    """mainId -> subId -> (order, stepDescTextMapHash)"""
+    steps: dict[int, dict[int, tuple[int | None, int | None]]] = {}
+    for row in _load_excel_rows(data_path, "QuestExcelConfigData.json"):
+        main_id = row.get("mainId")
+        sub_id = row.get("subId")
+        if not isinstance(main_id, int) or not isinstance(sub_id, int):
+            continue
+        order = row.get("order")
+        text_hash = row.get("stepDescTextMapHash")
+        steps.setdefault(main_id, {})[sub_id] = (
+            order if isinstance(order, int) else None,
+            text_hash if isinstance(text_hash, int) and text_hash != 0 else None,
+        )
+    return steps
+
+
+def _build_quest_rows(
+    quest_id: int,
+    quest_bin: dict,
+    excel_steps: dict[int, tuple[int | None, int | None]],
+) -> tuple[list[tuple], list[tuple]]:
+    """
+    解析单个任务的子任务标题与 talk → 子任务映射。
+    标题先取 QuestExcelConfigData 的 stepDescTextMapHash，某语言下为空时再用 BinOutput 子任务上的哈希兜底，
+    两个哈希都保留，运行时按语言取第一个非空文本；只保留有标题哈希的子任务及指向它们的 talk
+    """
+    bin_steps: dict[int, tuple[int | None, int | None]] = {}
+    finish_talk_ids: dict[int, list[int]] = {}
+    for step in get_quest_subquests(quest_bin):
+        sub_id = get_step_sub_id(step)
+        if sub_id is None:
+            continue
+        if sub_id not in bin_steps:
+            bin_steps[sub_id] = (get_step_order(step), get_step_desc_text_map_hash(step))
+        talk_ids = finish_talk_ids.setdefault(sub_id, [])
+        for talk_id in get_step_talk_ids(step):
+            if talk_id not in talk_ids:
+                talk_ids.append(talk_id)
+
+    step_rows: list[tuple] = []
+    for sub_id in sorted(set(excel_steps) | set(bin_steps)):
+        excel_order, excel_hash = excel_steps.get(sub_id, (None, None))
+        bin_order, bin_hash = bin_steps.get(sub_id, (None, None))
+        if excel_hash is None and bin_hash is None:
+            continue
+        step_order = excel_order if excel_order is not None else bin_order
+        step_rows.append((quest_id, sub_id, step_order, excel_hash, bin_hash))
+
+    titled_sub_ids = {row[1] for row in step_rows}
+    talk_rows: list[tuple] = []
+    for sub_id, talk_ids in finish_talk_ids.items():
+        if sub_id not in titled_sub_ids:
+            continue
+        for seq, talk_id in enumerate(talk_ids):
+            talk_rows.append((quest_id, STEP_TALK_KIND_FINISH_COND, talk_id, sub_id, seq))
+    for talk_id, sub_ids in build_top_level_talk_subquest_ids(quest_bin).items():
+        for seq, sub_id in enumerate(sub_ids):
+            if sub_id in titled_sub_ids:
+                talk_rows.append((quest_id, STEP_TALK_KIND_TOP_LEVEL, talk_id, sub_id, seq))
+    return step_rows, talk_rows
+
+
+def refresh_quest_steps(
+    *,
+    connection=None,
+    data_path: str | None = None,
+    quest_ids: Iterable[int] | None = None,
+    commit: bool = True,
+) -> int:
+    """
+    重建 quest_step / quest_step_talk / quest_hidden：把任务页需要的子任务标题、talk → 子任务映射
+    与隐藏任务标记在导入时落库，运行时不再读取 BinOutput/Quest 与任务 Excel。
+    quest_ids 不为空时只重算这些任务（供 diffUpdate 使用）
+    """
+    if connection is None or data_path is None:
+        default_connection, default_data_path = _default_connection_and_data_path()
+        connection = connection or default_connection
+        data_path = data_path or default_data_path
+
+    ensure_quest_step_schema(connection, commit=False)
+    scoped_quest_ids = None if quest_ids is None else sorted({int(quest_id) for quest_id in quest_ids})
+    quest_folder = os.path.join(str(data_path), "BinOutput", "Quest")
+    if scoped_quest_ids is None:
+        file_names = sorted(os.listdir(quest_folder)) if os.path.isdir(quest_folder) else []
+    else:
+        file_names = [f"{quest_id}.json" for quest_id in scoped_quest_ids]
+
+    excel_steps = _load_excel_steps_by_quest_id(str(data_path))
+    hidden_quest_ids = {
+        row["id"]
+        for row in _load_excel_rows(str(data_path), "MainQuestExcelConfigData.json")
+        if isinstance(row.get("id"), int) and _is_hidden_quest_obj(row)
+    }
+    step_rows: list[tuple] = []
+    talk_rows: list[tuple] = []
+    for file_name in file_names:
+        quest_id = quest_id_from_file_name(file_name)
+        if quest_id is None:
+            continue
+        path = os.path.join(quest_folder, file_name)
+        if not os.path.isfile(path):
+            continue
+        quest_bin = load_json_file(path, default=None, error_msg=f"Failed to load quest {file_name}")
+        if not isinstance(quest_bin, dict):
+            continue
+        if _is_hidden_quest_obj(quest_bin):
+            hidden_quest_ids.add(quest_id)
+        quest_step_rows, quest_talk_rows = _build_quest_rows(quest_id, quest_bin, excel_steps.get(quest_id, {}))
+        step_rows.extend(quest_step_rows)
+        talk_rows.extend(quest_talk_rows)
+    if scoped_quest_ids is not None:
+        hidden_quest_ids &= set(scoped_quest_ids)
+
+    try:
+        with closing(connection.cursor()) as cursor:
+            if scoped_quest_ids is None:
+                for table_name in (QUEST_STEP_TABLE, QUEST_STEP_TALK_TABLE, QUEST_HIDDEN_TABLE):
+                    cursor.execute(f"DELETE FROM {table_name}")
+            else:
+                for table_name in (QUEST_STEP_TABLE, QUEST_STEP_TALK_TABLE, QUEST_HIDDEN_TABLE):
+                    cursor.executemany(
+                        f"DELETE FROM {table_name} WHERE questId=?",
+                        [(quest_id,) for quest_id in scoped_quest_ids],
+                    )
+            cursor.executemany(
+                f"INSERT INTO {QUEST_STEP_TABLE}(questId, subId, stepOrder, titleTextMapHash, fallbackTitleTextMapHash) "
+                "VALUES (?,?,?,?,?)",
+                step_rows,
+            )
+            cursor.executemany(
+                f"INSERT OR IGNORE INTO {QUEST_STEP_TALK_TABLE}(questId, kind, talkId, subId, seq) VALUES (?,?,?,?,?)",
+                talk_rows,
+            )
+            cursor.executemany(
+                f"INSERT INTO {QUEST_HIDDEN_TABLE}(questId) VALUES (?)",
+                [(quest_id,) for quest_id in sorted(hidden_quest_ids)],
+            )
+            row = cursor.execute(f"SELECT COUNT(*) FROM {QUEST_STEP_TALK_TABLE}").fetchone()
+        if commit:
+            connection.commit()
+    except Exception:
+        if commit:
+            connection.rollback()
+        raise
+
+    total = int(row[0] or 0) if row else 0
+    if scoped_quest_ids is not None:
+        print(f"Quest steps refreshed: total={total}, quests={len(scoped_quest_ids)}")
+    else:
+        print(f"Quest steps refreshed: total={total}, steps={len(step_rows)}, hidden={len(hidden_quest_ids)}")
+    return total
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from contextlib import closing
+
+
+SPEAKER_NAME_TABLE = "speaker_name"
+
+# 与 dialogue.talkerType 一致；角色语音/角色故事的说话者用 AVATAR 表示
+SPEAKER_TYPE_NPC = "TALK_ROLE_NPC"
+SPEAKER_TYPE_AVATAR = "AVATAR"
+
+
+def ensure_speaker_name_schema(connection, *, commit: bool = True) -> None:
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {SPEAKER_NAME_TABLE} (
+                lang INTEGER NOT NULL,
+                talker_type TEXT NOT NULL,
+                talker_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                normalized_content TEXT,
+                PRIMARY KEY (lang, talker_type, talker_id)
+            )
+            """
+        )
+        if _table_exists(cursor, "dialogue"):
+            # 说话者筛选先解析出 id 集合，再按 (talkerType, talkerId) 回查对白
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS dialogue_talkerType_talkerId_index ON dialogue (talkerType, talkerId)"
+            )
+    if commit:
+        connection.commit()
+
+
+def _default_connection():
+    from DBConfig import conn
+
+    return conn
+
+
+def _table_exists(cursor, table_name: str) -> bool:
+    row = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+        (table_name,),
+    ).fetchone()
+    return row is not None
+
+
+def _textmap_has_normalized_content(cursor) -> bool:
+    return any(row[1] == "normalized_content" for row in cursor.execute("PRAGMA table_info(textMap)"))
+
+
+def speaker_name_table_populated(connection=None) -> bool:
+    connection = connection or _default_connection()
+    with closing(connection.cursor()) as cursor:
+        if not _table_exists(cursor, SPEAKER_NAME_TABLE):
+            return False
+        return cursor.execute(f"SELECT 1 FROM {SPEAKER_NAME_TABLE} LIMIT 1").fetchone() is not None
+
+
+def refresh_speaker_name(*, connection=None, commit: bool = True) -> int:
+    """
+    重建 speaker_name：按语言展开 NPC 名与角色名，说话者搜索先在这张小表上匹配出 id 集合，
+    不再对每次查询做 dialogue → npc/avatar → textMap 的三表关联。
+    normalized_content 直接取 textMap 导入时写好的归一化内容
+    """
+    connection = connection or _default_connection()
+    ensure_speaker_name_schema(connection, commit=False)
+    try:
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(f"DELETE FROM {SPEAKER_NAME_TABLE}")
+            if _table_exists(cursor, "textMap"):
+                normalized_expr = "tm.normalized_content" if _textmap_has_normalized_content(cursor) else "NULL"
+                sources = (
+                    ("npc", SPEAKER_TYPE_NPC, "npcId", "textHash"),
+                    ("avatar", SPEAKER_TYPE_AVATAR, "avatarId", "nameTextMapHash"),
+                )
+                for table_name, talker_type, id_column, hash_column in sources:
+                    if not _table_exists(cursor, table_name):
+                        continue
+                    cursor.execute(
+                        f"""
+                        INSERT OR IGNORE INTO {SPEAKER_NAME_TABLE}(lang, talker_type, talker_id, content, normalized_content)
+                        SELECT tm.lang, ?, s.{id_column}, tm.content, {normalized_expr}
+                        FROM {table_name} s
+                        JOIN textMap tm ON tm.hash = s.{hash_column}
+                        WHERE s.{id_column} IS NOT NULL AND coalesce(tm.content, '') <> ''
+                        """,
+                        (talker_type,),
+                    )
+            row = cursor.execute(f"SELECT COUNT(*) FROM {SPEAKER_NAME_TABLE}").fetchone()
+        if commit:
+            connection.commit()
+    except Exception:
+        if commit:
+            connection.rollback()
+        raise
+
+    total = int(row[0] or 0) if row else 0
+    print(f"Speaker names refreshed: total={total}")
+    return total
@@ -14,6 +14,7 @@ from import_utils import (
 from lang_constants import LANG_CODE_MAP
 from localization_utils import build_subtitle_filename_map, load_localization_entries
 from subtitle_utils import iter_srt_entries, subtitle_key
+from textmap_fts_sql import build_subtitle_fts_delete_sql, build_subtitle_fts_insert_sql
 from text_source_path_utils import (
     build_subtitle_full_path,
     normalize_subtitle_rel_path,
@@ -31,6 +32,48 @@ def _load_subtitle_filename_map() -> dict:
     return filename_to_info
 
 
+def _subtitle_fts_langs_sql(cursor) -> str | None:
+    """
+    subtitle_fts 已建好时返回参与索引的语言列表 SQL 片段，否则返回 None（未启用 FTS 或旧库）
+    """
+    table_row = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='subtitle_fts' LIMIT 1"
+    ).fetchone()
+    if table_row is None:
+        return None
+    marker = cursor.execute("SELECT v FROM app_meta WHERE k='subtitle_fts_built' LIMIT 1").fetchone()
+    if marker is None or marker[0] != "1":
+        return None
+    langs_row = cursor.execute("SELECT v FROM app_meta WHERE k='subtitle_fts_langs' LIMIT 1").fetchone()
+    langs = sorted({int(v) for v in str(langs_row[0] if langs_row else "").split(",") if v.strip().isdigit()})
+    if not langs:
+        return None
+    return ",".join(str(v) for v in langs)
+
+
+def _delete_subtitle_fts_files(cursor, langs_sql: str | None, file_langs: list[tuple[str, int]]):
+    # 必须在改写 subtitle 之前调用，external content 索引的删除依赖旧内容
+    if langs_sql and file_langs:
+        cursor.executemany(build_subtitle_fts_delete_sql(langs_sql, "fileName=? AND lang=?"), file_langs)
+
+
+def _insert_subtitle_fts_files(cursor, langs_sql: str | None, file_langs: list[tuple[str, int]]):
+    if langs_sql and file_langs:
+        cursor.executemany(build_subtitle_fts_insert_sql(langs_sql, "fileName=? AND lang=?"), file_langs)
+
+
+def _rebuild_subtitle_fts(cursor, langs_sql: str | None):
+    if not langs_sql:
+        return
+    print("Rebuilding subtitle_fts...")
+    cursor.execute("INSERT INTO subtitle_fts(subtitle_fts) VALUES('delete-all')")
+    cursor.execute(build_subtitle_fts_insert_sql(langs_sql))
+    try:
+        cursor.execute("INSERT INTO subtitle_fts(subtitle_fts) VALUES('optimize')")
+    except Exception:
+        pass
+
+
 def _build_subtitle_upsert_sql() -> str:
     return build_versioned_upsert_sql(
         table="subtitle",
@@ -116,6 +159,21 @@ def importSubtitlesByFiles(
             continue
         changed_tasks.append((lang_name, lang_id, clean_file_name, full_path))
 
+    delete_rows: list[tuple[str, int]] = []
+    for rel_path in deleted_list:
+        parsed = normalize_subtitle_rel_path(rel_path)
+        if parsed is None:
+            skipped_paths.append(rel_path)
+            continue
+        _, lang_id, clean_file_name = parsed
+        delete_rows.append((clean_file_name, lang_id))
+
+    fts_langs_sql = _subtitle_fts_langs_sql(cursor)
+    fts_file_langs = sorted(
+        {(clean_file_name, lang_id) for _, lang_id, clean_file_name, _ in changed_tasks} | set(delete_rows)
+    )
+    _delete_subtitle_fts_files(cursor, fts_langs_sql, fts_file_langs)
+
     print(
         "Subtitle diff import: "
         f"changed={len(changed_tasks)}, deleted={len(deleted_list)}, remap={'yes' if refresh_mapping else 'no'}"
@@ -205,16 +263,9 @@ def importSubtitlesByFiles(
                 pbar.update()
     writer.flush()
 
-    delete_rows: list[tuple[str, int]] = []
-    for rel_path in deleted_list:
-        parsed = normalize_subtitle_rel_path(rel_path)
-        if parsed is None:
-            skipped_paths.append(rel_path)
-            continue
-        _, lang_id, clean_file_name = parsed
-        delete_rows.append((clean_file_name, lang_id))
     if delete_rows:
         cursor.executemany("DELETE FROM subtitle WHERE fileName=? AND lang=?", delete_rows)
+    _insert_subtitle_fts_files(cursor, fts_langs_sql, fts_file_langs)
 
     mapping_updated_rows = 0
     if refresh_mapping and not filename_to_info:
@@ -273,6 +324,8 @@ def importSubtitles(
     subtitle_root = os.path.join(DATA_PATH, "Subtitle")
     if not os.path.exists(subtitle_root):
         print(f"Subtitle path not found: {subtitle_root}")
+        if reset:
+            _rebuild_subtitle_fts(cursor, _subtitle_fts_langs_sql(cursor))
         cursor.close()
         return
 
@@ -377,6 +430,7 @@ def importSubtitles(
             """
         )
     drop_temp_table(cursor, "_seen_subtitle_key")
+    _rebuild_subtitle_fts(cursor, _subtitle_fts_langs_sql(cursor))
     cursor.close()
     _print_summary("subtitle parse/import errors", process_errors)
 
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from contextlib import closing
+
+
+TEXT_HASH_VOICE_TABLE = "text_hash_voice"
+
+
+def ensure_text_hash_voice_schema(connection, *, commit: bool = True) -> None:
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {TEXT_HASH_VOICE_TABLE} (
+                hash INTEGER PRIMARY KEY,
+                has_voice INTEGER NOT NULL DEFAULT 1
+            )
+            """
+        )
+    if commit:
+        connection.commit()
+
+
+def _default_connection():
+    from DBConfig import conn
+
+    return conn
+
+
+def text_hash_voice_table_populated(connection=None) -> bool:
+    connection = connection or _default_connection()
+    with closing(connection.cursor()) as cursor:
+        row = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+            (TEXT_HASH_VOICE_TABLE,),
+        ).fetchone()
+        if row is None:
+            return False
+        return cursor.execute(f"SELECT 1 FROM {TEXT_HASH_VOICE_TABLE} LIMIT 1").fetchone() is not None
+
+
+def refresh_text_hash_voice(*, connection=None, commit: bool = True) -> int:
+    """
+    重建 text_hash_voice：记录所有带语音的 textMap hash
+    （对白语音 dialogue+voice，或角色语音 fetters+fetterVoice），供搜索按主键判断有无语音
+    """
+    connection = connection or _default_connection()
+    ensure_text_hash_voice_schema(connection, commit=False)
+    try:
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(f"DELETE FROM {TEXT_HASH_VOICE_TABLE}")
+            cursor.execute(
+                f"""
+                INSERT OR IGNORE INTO {TEXT_HASH_VOICE_TABLE}(hash, has_voice)
+                SELECT DISTINCT d.textHash, 1
+                FROM dialogue d
+                JOIN voice v ON v.dialogueId = d.dialogueId
+                WHERE d.textHash IS NOT NULL AND d.textHash <> 0
+                """
+            )
+            cursor.execute(
+                f"""
+                INSERT OR IGNORE INTO {TEXT_HASH_VOICE_TABLE}(hash, has_voice)
+                SELECT DISTINCT f.voiceFileTextTextMapHash, 1
+                FROM fetters f
+                JOIN fetterVoice fv ON fv.avatarId = f.avatarId AND fv.voiceFile = f.voiceFile
+                WHERE f.voiceFileTextTextMapHash IS NOT NULL AND f.voiceFileTextTextMapHash <> 0
+                """
+            )
+            row = cursor.execute(f"SELECT COUNT(*) FROM {TEXT_HASH_VOICE_TABLE}").fetchone()
+        if commit:
+            connection.commit()
+    except Exception:
+        if commit:
+            connection.rollback()
+        raise
+
+    total = int(row[0] or 0) if row else 0
+    print(f"Text hash voice refreshed: total={total}")
+    return total
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from contextlib import closing
+
+
+TEXT_PRIMARY_SOURCE_TABLE = "text_primary_source"
+
+# 与 controllers.common._select_primary_source_from_text_hash 的级联顺序一致
+PRIMARY_SOURCE_KINDS: tuple[str, ...] = ("dialogue", "voice", "story", "quest", "entity", "readable")
+
+_STAGING_TABLE = "_text_primary_source_next"
+
+
+def ensure_text_primary_source_schema(connection, *, commit: bool = True) -> None:
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {TEXT_PRIMARY_SOURCE_TABLE} (
+                hash INTEGER PRIMARY KEY,
+                source_kind TEXT NOT NULL,
+                ref_id INTEGER,
+                source_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+    if commit:
+        connection.commit()
+
+
+def _default_connection():
+    from DBConfig import conn
+
+    return conn
+
+
+def _table_exists(cursor, table_name: str) -> bool:
+    row = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+        (table_name,),
+    ).fetchone()
+    return row is not None
+
+
+def text_primary_source_table_populated(connection=None) -> bool:
+    connection = connection or _default_connection()
+    with closing(connection.cursor()) as cursor:
+        if not _table_exists(cursor, TEXT_PRIMARY_SOURCE_TABLE):
+            return False
+        return cursor.execute(f"SELECT 1 FROM {TEXT_PRIMARY_SOURCE_TABLE} LIMIT 1").fetchone() is not None
+
+
+def _build_stage_selects(cursor) -> list[str]:
+    """
+    按优先级返回各来源的候选 SQL，列为 (hash, source_kind, ref_id, source_count)。
+    只判断与语言无关的前置条件（对应表里有行），标题/名称仍由运行时按语言组装。
+    """
+    selects: list[str] = []
+    if _table_exists(cursor, "dialogue"):
+        selects.append(
+            "SELECT textHash, 'dialogue', MIN(talkId), 1 FROM dialogue "
+            "WHERE textHash IS NOT NULL GROUP BY textHash"
+        )
+    if _table_exists(cursor, "fetters"):
+        selects.append(
+            "SELECT voiceFileTextTextMapHash, 'voice', MIN(avatarId), 1 FROM fetters "
+            "WHERE voiceFileTextTextMapHash IS NOT NULL GROUP BY voiceFileTextTextMapHash"
+        )
+    if _table_exists(cursor, "fetterStory"):
+        selects.append(
+            "SELECT contextHash, 'story', MIN(avatarId), COUNT(*) FROM ("
+            "SELECT avatarId, storyContextTextMapHash AS contextHash FROM fetterStory "
+            "WHERE storyContextTextMapHash IS NOT NULL "
+            "UNION ALL "
+            "SELECT avatarId, storyContext2TextMapHash AS contextHash FROM fetterStory "
+            "WHERE storyContext2TextMapHash IS NOT NULL"
+            ") GROUP BY contextHash"
+        )
+    if _table_exists(cursor, "quest_hash_map"):
+        selects.append(
+            "SELECT hash, 'quest', MIN(questId), COUNT(DISTINCT questId) FROM quest_hash_map "
+            "WHERE hash IS NOT NULL GROUP BY hash"
+        )
+    if _table_exists(cursor, "text_source_entity"):
+        # 运行时先按 text_hash 找实体，找不到才按 title_hash 找
+        for hash_column in ("text_hash", "title_hash"):
+            selects.append(
+                f"SELECT {hash_column}, 'entity', MIN(entity_id), "
+                "COUNT(DISTINCT source_type_code || ':' || entity_id) FROM text_source_entity "
+                f"WHERE {hash_column} IS NOT NULL AND source_type_code IS NOT NULL "
+                "AND entity_id IS NOT NULL AND title_hash IS NOT NULL "
+                f"GROUP BY {hash_column}"
+            )
+    if _table_exists(cursor, "readable"):
+        selects.append(
+            "SELECT titleTextMapHash, 'readable', MIN(readableId), MAX(COUNT(DISTINCT readableId), 1) "
+            "FROM readable WHERE titleTextMapHash IS NOT NULL GROUP BY titleTextMapHash"
+        )
+    return selects
+
+
+def _fill_primary_sources(cursor, target_table: str) -> None:
+    # hash 是主键，按优先级依次 INSERT OR IGNORE，先写入的来源即为主来源
+    for select_sql in _build_stage_selects(cursor):
+        cursor.execute(
+            f"INSERT OR IGNORE INTO {target_table}(hash, source_kind, ref_id, source_count) {select_sql}"
+        )
+
+
+def refresh_text_primary_source(*, connection=None, incremental: bool = False, commit: bool = True) -> int:
+    """
+    重建 text_primary_source：记录每个 textMap hash 的主来源类别，
+    运行时据此跳过必然落空的来源查询；表中没有的 hash 即为未归类文本。
+    incremental=True 时先在临时表算出新结果，只改写发生变化的 hash（供 diffUpdate 使用）
+    """
+    connection = connection or _default_connection()
+    ensure_text_primary_source_schema(connection, commit=False)
+    changed = 0
+    try:
+        with closing(connection.cursor()) as cursor:
+            if not incremental:
+                cursor.execute(f"DELETE FROM {TEXT_PRIMARY_SOURCE_TABLE}")
+                _fill_primary_sources(cursor, TEXT_PRIMARY_SOURCE_TABLE)
+            else:
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{_STAGING_TABLE}")
+                cursor.execute(
+                    f"""
+                    CREATE TEMP TABLE {_STAGING_TABLE} (
+                        hash INTEGER PRIMARY KEY,
+                        source_kind TEXT NOT NULL,
+                        ref_id INTEGER,
+                        source_count INTEGER NOT NULL DEFAULT 0
+                    )
+                    """
+                )
+                _fill_primary_sources(cursor, _STAGING_TABLE)
+                before = connection.total_changes
+                cursor.execute(
+                    f"""
+                    DELETE FROM {TEXT_PRIMARY_SOURCE_TABLE}
+                    WHERE hash NOT IN (SELECT hash FROM {_STAGING_TABLE})
+                    """
+                )
+                cursor.execute(
+                    f"""
+                    INSERT INTO {TEXT_PRIMARY_SOURCE_TABLE}(hash, source_kind, ref_id, source_count)
+                    SELECT hash, source_kind, ref_id, source_count FROM {_STAGING_TABLE} WHERE true
+                    ON CONFLICT(hash) DO UPDATE SET
+                        source_kind=excluded.source_kind,
+                        ref_id=excluded.ref_id,
+                        source_count=excluded.source_count
+                    WHERE NOT (source_kind IS excluded.source_kind)
+                       OR NOT (ref_id IS excluded.ref_id)
+                       OR NOT (source_count IS excluded.source_count)
+                    """
+                )
+                changed = connection.total_changes - before
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{_STAGING_TABLE}")
+            row = cursor.execute(f"SELECT COUNT(*) FROM {TEXT_PRIMARY_SOURCE_TABLE}").fetchone()
+        if commit:
+            connection.commit()
+    except Exception:
+        if commit:
+            connection.rollback()
+        raise
+
+    total = int(row[0] or 0) if row else 0
+    if incremental:
+        print(f"Text primary source refreshed: total={total}, changed={changed}")
+    else:
+        print(f"Text primary source refreshed: total={total}")
+    return total
@@ -43,3 +43,85 @@ def build_textmap_fts_au_trigger_sql(langs_sql: str) -> str:
         f"SELECT new.id, gts_fts_content(new.lang, new.content), new.lang, new.hash WHERE new.lang IN ({langs_sql}); "
         "END"
     )
+
+
+def build_readable_fts_table_sql(
+    token_escaped: str,
+    detail_mode: str,
+    columnsize: int,
+) -> str:
+    detail_escaped = str(detail_mode).replace("'", "''")
+    columnsize_value = 0 if int(columnsize) == 0 else 1
+    return (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS readable_fts "
+        f"USING fts5(content, lang UNINDEXED, "
+        f"content='readable', content_rowid='id', tokenize='{token_escaped}', "
+        f"detail='{detail_escaped}', columnsize={columnsize_value})"
+    )
+
+
+def build_readable_fts_ai_trigger_sql(langs_sql: str) -> str:
+    return (
+        "CREATE TRIGGER IF NOT EXISTS readable_fts_ai AFTER INSERT ON readable "
+        f"WHEN new.lang IN ({langs_sql}) BEGIN "
+        "INSERT INTO readable_fts(rowid, content, lang) "
+        "VALUES (new.id, gts_fts_content(new.lang, new.content), new.lang); "
+        "END"
+    )
+
+
+def build_readable_fts_ad_trigger_sql(langs_sql: str) -> str:
+    return (
+        "CREATE TRIGGER IF NOT EXISTS readable_fts_ad AFTER DELETE ON readable BEGIN "
+        "INSERT INTO readable_fts(readable_fts, rowid, content, lang) "
+        f"SELECT 'delete', old.id, gts_fts_content(old.lang, old.content), old.lang "
+        f"WHERE old.lang IN ({langs_sql}); "
+        "END"
+    )
+
+
+def build_readable_fts_au_trigger_sql(langs_sql: str) -> str:
+    return (
+        "CREATE TRIGGER IF NOT EXISTS readable_fts_au AFTER UPDATE OF content, lang ON readable BEGIN "
+        "INSERT INTO readable_fts(readable_fts, rowid, content, lang) "
+        f"SELECT 'delete', old.id, gts_fts_content(old.lang, old.content), old.lang "
+        f"WHERE old.lang IN ({langs_sql}); "
+        "INSERT INTO readable_fts(rowid, content, lang) "
+        f"SELECT new.id, gts_fts_content(new.lang, new.content), new.lang WHERE new.lang IN ({langs_sql}); "
+        "END"
+    )
+
+
+def build_subtitle_fts_table_sql(
+    token_escaped: str,
+    detail_mode: str,
+    columnsize: int,
+) -> str:
+    detail_escaped = str(detail_mode).replace("'", "''")
+    columnsize_value = 0 if int(columnsize) == 0 else 1
+    return (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS subtitle_fts "
+        f"USING fts5(content, lang UNINDEXED, "
+        f"content='subtitle', content_rowid='id', tokenize='{token_escaped}', "
+        f"detail='{detail_escaped}', columnsize={columnsize_value})"
+    )
+
+
+def build_subtitle_fts_insert_sql(langs_sql: str, where_sql: str = "") -> str:
+    # subtitle_fts 不挂触发器，由 subtitleImport 在导入前后按 (fileName, lang) 显式维护
+    extra = f" AND {where_sql}" if where_sql else ""
+    return (
+        "INSERT INTO subtitle_fts(rowid, content, lang) "
+        "SELECT id, gts_fts_content(lang, content), lang FROM subtitle "
+        f"WHERE lang IN ({langs_sql}){extra}"
+    )
+
+
+def build_subtitle_fts_delete_sql(langs_sql: str, where_sql: str = "") -> str:
+    # external content 表删除时必须提供旧内容，所以要在改写 subtitle 之前执行
+    extra = f" AND {where_sql}" if where_sql else ""
+    return (
+        "INSERT INTO subtitle_fts(subtitle_fts, rowid, content, lang) "
+        "SELECT 'delete', id, gts_fts_content(lang, content), lang FROM subtitle "
+        f"WHERE lang IN ({langs_sql}){extra}"
+    )
@@ -9,6 +9,7 @@ from quest_hash_map_utils import _quest_talk_dialogue_join_condition
 from server_import import import_server_module
 from versioning import (
     VERSION_DIM_TABLE,
+    backfill_normalized_content as _backfill_normalized_content_impl,
     ensure_version_schema as _ensure_version_schema_impl,
     get_current_version as _get_current_version_impl,
     get_or_create_version_id as _get_or_create_version_id_impl,
@@ -943,6 +944,12 @@ def rebuild_version_catalog(
     return _rebuild_version_catalog_impl(source_tables)
 
 
+def backfill_normalized_content(
+    tables: tuple[str, ...] | list[str] | None = None,
+) -> dict[str, int]:
+    return _backfill_normalized_content_impl(tables)
+
+
 def set_current_version(
     commit: str,
     remote_ref: str = "origin/main",
@@ -5,7 +5,14 @@ import sys
 from pathlib import Path
 
 from DBConfig import conn, DATA_PATH
+from lang_constants import LANG_CODE_MAP
 from textmap_fts_sql import (
+    build_readable_fts_ad_trigger_sql,
+    build_readable_fts_ai_trigger_sql,
+    build_readable_fts_au_trigger_sql,
+    build_readable_fts_table_sql,
+    build_subtitle_fts_insert_sql,
+    build_subtitle_fts_table_sql,
     build_textmap_fts_ad_trigger_sql,
     build_textmap_fts_ai_trigger_sql,
     build_textmap_fts_au_trigger_sql,
@@ -369,6 +376,165 @@ def _create_textmap_fts_objects(
     cursor.execute(build_textmap_fts_au_trigger_sql(langs_sql))
 
 
+def _reset_readable_fts(cursor):
+    cursor.execute("DROP TRIGGER IF EXISTS readable_fts_ai")
+    cursor.execute("DROP TRIGGER IF EXISTS readable_fts_ad")
+    cursor.execute("DROP TRIGGER IF EXISTS readable_fts_au")
+    cursor.execute("DROP TABLE IF EXISTS readable_fts")
+    cursor.execute("DELETE FROM app_meta WHERE k='readable_fts_built'")
+    cursor.execute("DELETE FROM app_meta WHERE k='readable_fts_langs'")
+    cursor.execute("DELETE FROM app_meta WHERE k='readable_fts_signature'")
+
+
+def _create_readable_fts_objects(
+    cursor,
+    token_escaped: str,
+    langs_sql: str,
+    detail_mode: str,
+    columnsize: int,
+):
+    cursor.execute(build_readable_fts_table_sql(token_escaped, detail_mode, columnsize))
+    cursor.execute(build_readable_fts_ai_trigger_sql(langs_sql))
+    cursor.execute(build_readable_fts_ad_trigger_sql(langs_sql))
+    cursor.execute(build_readable_fts_au_trigger_sql(langs_sql))
+
+
+def _readable_fts_langs_sql(allow_langs: list[int]) -> str:
+    # readable.lang 存的是语言目录名（CHS/EN/...），按 LANG_CODE_MAP 映射允许列表
+    allowed = set(allow_langs)
+    names = sorted(name for name, code in LANG_CODE_MAP.items() if code in allowed)
+    return ",".join(f"'{name}'" for name in names)
+
+
+def _ensure_readable_fts(cur, token_spec: str, allow_langs: list[int], runtime_signature: str):
+    """
+    与 textMap_fts 共用分词设置的 readable 全文索引；设置签名变化或索引缺失时重建
+    """
+    if not _table_exists("readable"):
+        return
+    langs_sql = _readable_fts_langs_sql(allow_langs)
+    existing_row = cur.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='readable_fts' LIMIT 1"
+    ).fetchone()
+    signature_row = cur.execute(
+        "SELECT v FROM app_meta WHERE k='readable_fts_signature' LIMIT 1"
+    ).fetchone()
+    marker = cur.execute(
+        "SELECT v FROM app_meta WHERE k='readable_fts_built' LIMIT 1"
+    ).fetchone()
+    existing_signature = str(signature_row[0]).strip() if signature_row and signature_row[0] else ""
+    needs_rebuild = (
+        existing_row is None
+        or existing_signature != runtime_signature
+        or marker is None
+        or marker[0] != "1"
+    )
+    if not needs_rebuild and langs_sql:
+        has_readable = cur.execute(
+            f"SELECT 1 FROM readable WHERE lang IN ({langs_sql}) LIMIT 1"
+        ).fetchone() is not None
+        has_fts = cur.execute("SELECT 1 FROM readable_fts LIMIT 1").fetchone() is not None
+        needs_rebuild = has_readable and not has_fts
+
+    token_escaped = token_spec.replace("'", "''")
+    if needs_rebuild:
+        _reset_readable_fts(cur)
+    try:
+        _create_readable_fts_objects(
+            cur,
+            token_escaped,
+            langs_sql,
+            _FTS_DETAIL_MODE,
+            _FTS_COLUMNSIZE,
+        )
+    except Exception:
+        return
+    if needs_rebuild:
+        cur.execute(
+            "INSERT INTO readable_fts(rowid, content, lang) "
+            f"SELECT id, gts_fts_content(lang, content), lang FROM readable WHERE lang IN ({langs_sql})"
+        )
+        try:
+            cur.execute("INSERT INTO readable_fts(readable_fts) VALUES('optimize')")
+        except Exception:
+            pass
+    cur.execute(
+        "INSERT OR REPLACE INTO app_meta(k, v) VALUES ('readable_fts_built', '1')"
+    )
+    cur.execute(
+        "INSERT OR REPLACE INTO app_meta(k, v) VALUES ('readable_fts_langs', ?)",
+        (_fts_langs_signature(allow_langs),),
+    )
+    cur.execute(
+        "INSERT OR REPLACE INTO app_meta(k, v) VALUES ('readable_fts_signature', ?)",
+        (runtime_signature,),
+    )
+
+
+def _reset_subtitle_fts(cursor):
+    cursor.execute("DROP TABLE IF EXISTS subtitle_fts")
+    cursor.execute("DELETE FROM app_meta WHERE k='subtitle_fts_built'")
+    cursor.execute("DELETE FROM app_meta WHERE k='subtitle_fts_langs'")
+    cursor.execute("DELETE FROM app_meta WHERE k='subtitle_fts_signature'")
+
+
+def _ensure_subtitle_fts(cur, token_spec: str, allow_langs: list[int], runtime_signature: str):
+    """
+    subtitle 全文索引；不挂触发器，日常增量由 subtitleImport 维护，这里只负责建表与整表重建
+    """
+    if not _table_exists("subtitle"):
+        return
+    langs_sql = ",".join(str(v) for v in sorted(set(allow_langs)))
+    existing_row = cur.execute(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='subtitle_fts' LIMIT 1"
+    ).fetchone()
+    signature_row = cur.execute(
+        "SELECT v FROM app_meta WHERE k='subtitle_fts_signature' LIMIT 1"
+    ).fetchone()
+    marker = cur.execute(
+        "SELECT v FROM app_meta WHERE k='subtitle_fts_built' LIMIT 1"
+    ).fetchone()
+    existing_signature = str(signature_row[0]).strip() if signature_row and signature_row[0] else ""
+    needs_rebuild = (
+        existing_row is None
+        or existing_signature != runtime_signature
+        or marker is None
+        or marker[0] != "1"
+    )
+    if not needs_rebuild and langs_sql:
+        has_subtitle = cur.execute(
+            f"SELECT 1 FROM subtitle WHERE lang IN ({langs_sql}) LIMIT 1"
+        ).fetchone() is not None
+        has_fts = cur.execute("SELECT 1 FROM subtitle_fts LIMIT 1").fetchone() is not None
+        needs_rebuild = has_subtitle and not has_fts
+    if not needs_rebuild:
+        return
+
+    token_escaped = token_spec.replace("'", "''")
+    _reset_subtitle_fts(cur)
+    try:
+        cur.execute(build_subtitle_fts_table_sql(token_escaped, _FTS_DETAIL_MODE, _FTS_COLUMNSIZE))
+    except Exception:
+        return
+    if langs_sql:
+        cur.execute(build_subtitle_fts_insert_sql(langs_sql))
+        try:
+            cur.execute("INSERT INTO subtitle_fts(subtitle_fts) VALUES('optimize')")
+        except Exception:
+            pass
+    cur.execute(
+        "INSERT OR REPLACE INTO app_meta(k, v) VALUES ('subtitle_fts_built', '1')"
+    )
+    cur.execute(
+        "INSERT OR REPLACE INTO app_meta(k, v) VALUES ('subtitle_fts_langs', ?)",
+        (_fts_langs_signature(allow_langs),),
+    )
+    cur.execute(
+        "INSERT OR REPLACE INTO app_meta(k, v) VALUES ('subtitle_fts_signature', ?)",
+        (runtime_signature,),
+    )
+
+
 def _ensure_textmap_fts():
     if not _table_exists("textMap"):
         return
@@ -389,6 +555,8 @@ def _ensure_textmap_fts():
         ) = _resolve_fts_settings()
         if not enabled:
             _reset_textmap_fts(cur)
+            _reset_readable_fts(cur)
+            _reset_subtitle_fts(cur)
             conn.commit()
             return
         _try_load_fts_extension(ext_path, ext_entry)
@@ -414,7 +582,7 @@ def _ensure_textmap_fts():
             try:
                 lang_value = int(lang_code)
             except Exception:
-                lang_value = 0
+                lang_value = LANG_CODE_MAP.get(str(lang_code or "").strip().upper(), 0)
             if fts_tokenizer is None:
                 return str(content or "")
             return fts_tokenizer.build_fts_index_text(
@@ -534,6 +702,8 @@ def _ensure_textmap_fts():
             "INSERT OR REPLACE INTO app_meta(k, v) VALUES ('textmap_fts_signature', ?)",
             (runtime_signature,),
         )
+        _ensure_readable_fts(cur, token_spec, allow_langs, runtime_signature)
+        _ensure_subtitle_fts(cur, token_spec, allow_langs, runtime_signature)
         conn.commit()
     finally:
         cur.close()
@@ -762,6 +932,88 @@ def _ensure_updated_version_autofill_rules():
         cur.close()
 
 
+NORMALIZED_CONTENT_COLUMN = "normalized_content"
+# 中文按 databaseHelper._build_normalized_match_expr 的规则额外去掉空白；readable.lang 存目录名
+_NORMALIZED_CONTENT_CHINESE_LANGS: dict[str, str] = {
+    "textMap": "1,2",
+    "subtitle": "1,2",
+    "readable": "'CHS','CHT'",
+}
+
+
+def _normalized_content_sql(row_ref: str, chinese_langs_sql: str) -> str:
+    trimmed = f"trim(coalesce({row_ref}.content, ''))"
+    return (
+        f"CASE WHEN {row_ref}.lang IN ({chinese_langs_sql}) THEN "
+        "lower(replace(replace(replace(replace("
+        f"{trimmed}, ' ', ''), char(9), ''), char(10), ''), char(13), '')) "
+        f"ELSE lower({trimmed}) END"
+    )
+
+
+def backfill_normalized_content(tables: tuple[str, ...] | list[str] | None = None) -> dict[str, int]:
+    """
+    为 normalized_content 为空的行一次性补算归一化内容，导入/diffUpdate 写完文本表后调用。
+    新插入的行不经触发器逐行回写，整批导入只多一次 UPDATE；返回各表补算的行数
+    """
+    selected = tuple(tables) if tables is not None else tuple(_NORMALIZED_CONTENT_CHINESE_LANGS)
+    updated: dict[str, int] = {}
+    cur = conn.cursor()
+    try:
+        for table_name in selected:
+            chinese_langs_sql = _NORMALIZED_CONTENT_CHINESE_LANGS[table_name]
+            if not _table_exists(table_name) or NORMALIZED_CONTENT_COLUMN not in _table_columns(table_name):
+                continue
+            cur.execute(
+                f"""
+                UPDATE {table_name}
+                SET {NORMALIZED_CONTENT_COLUMN} = {_normalized_content_sql(table_name, chinese_langs_sql)}
+                WHERE {NORMALIZED_CONTENT_COLUMN} IS NULL
+                """
+            )
+            updated[table_name] = max(0, cur.rowcount)
+        conn.commit()
+    finally:
+        cur.close()
+    return updated
+
+
+def _ensure_normalized_content_rules():
+    """
+    textMap/readable/subtitle 持久化排序用的归一化内容，搜索排序不再逐行计算。
+    新行由 backfill_normalized_content 在导入后统一补算；已有行的 content/lang 被更新时由触发器重算
+    """
+    cur = conn.cursor()
+    try:
+        for table_name, chinese_langs_sql in _NORMALIZED_CONTENT_CHINESE_LANGS.items():
+            if not _table_exists(table_name):
+                continue
+            if NORMALIZED_CONTENT_COLUMN not in _table_columns(table_name):
+                cur.execute(f"ALTER TABLE {table_name} ADD COLUMN {NORMALIZED_CONTENT_COLUMN} TEXT")
+
+            trigger_ai = f"{table_name}_normalized_content_ai"
+            trigger_au = f"{table_name}_normalized_content_au"
+            # 旧库上的 AFTER INSERT 触发器会让每行插入多一次 UPDATE，一并移除
+            cur.execute(f"DROP TRIGGER IF EXISTS {trigger_ai}")
+            cur.execute(f"DROP TRIGGER IF EXISTS {trigger_au}")
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {trigger_au}
+                AFTER UPDATE OF content, lang ON {table_name}
+                FOR EACH ROW
+                BEGIN
+                    UPDATE {table_name}
+                    SET {NORMALIZED_CONTENT_COLUMN} = {_normalized_content_sql("NEW", chinese_langs_sql)}
+                    WHERE rowid = NEW.rowid;
+                END
+                """
+            )
+        conn.commit()
+    finally:
+        cur.close()
+    backfill_normalized_content()
+
+
 def _ensure_version_catalog_table():
     cur = conn.cursor()
     try:
@@ -989,6 +1241,7 @@ def ensure_version_schema():
     _ensure_index_for_table("subtitle", "CREATE INDEX IF NOT EXISTS subtitle_updated_version_id_index ON subtitle(updated_version_id)")
     _backfill_version_dim_and_ids()
     _ensure_updated_version_autofill_rules()
+    _ensure_normalized_content_rules()
     _ensure_textmap_fts()
 
 
@@ -7,6 +7,9 @@ from import_utils import DEFAULT_BATCH_SIZE, executemany_batched, print_summary
 from version_control import ensure_version_schema
 
 
+# 角色语音导入完成标记；运行时只检查该标记，不再现场解析语音数据
+FETTER_VOICE_BUILT_META_KEY = "fetter_voice_built"
+
 avatarMappings = {}
 _UNMAPPED_AVATAR_NAMES: set[str] = set()
 GENERIC_SWITCH_NAMES = {
@@ -369,17 +372,14 @@ def importAllVoiceItems(
     files = os.listdir(os.path.join(DATA_PATH, "BinOutput", "Voice", "Items"))
     cursor = conn.cursor()
     failed_files: list[str] = []
-    _ensure_fetter_voice_schema(cursor)
 
     if reset:
         cursor.execute("DELETE FROM voice")
-        cursor.execute("DELETE FROM fetterVoice")
 
     with LightweightProgress(len(files), desc="Voice files", unit="files") as pbar:
         for fileName in files:
             try:
                 importVoiceItem(fileName, cursor, batch_size=batch_size)
-                importFetterVoiceItem(fileName, cursor, batch_size=batch_size)
             except Exception as e:
                 failed_files.append(f"{fileName} ({e})")
                 continue
@@ -393,6 +393,61 @@ def importAllVoiceItems(
     _print_summary("voice avatar unmapped names", sorted(_UNMAPPED_AVATAR_NAMES))
 
 
+def refresh_fetter_voice(*, commit: bool = True, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    重建 fetterVoice（角色语音 → 语音文件），完成后在 app_meta 写入 fetter_voice_built 标记。
+    角色名映射未加载时先调用 loadAvatars
+    """
+    if not avatarMappings:
+        loadAvatars()
+    files = sorted(os.listdir(os.path.join(DATA_PATH, "BinOutput", "Voice", "Items")))
+    cursor = conn.cursor()
+    failed_files: list[str] = []
+    try:
+        _ensure_fetter_voice_schema(cursor)
+        cursor.execute("DELETE FROM fetterVoice")
+        with LightweightProgress(len(files), desc="Fetter voice files", unit="files") as pbar:
+            for fileName in files:
+                try:
+                    importFetterVoiceItem(fileName, cursor, batch_size=batch_size)
+                except Exception as e:
+                    failed_files.append(f"{fileName} ({e})")
+                    continue
+                finally:
+                    pbar.update()
+        cursor.execute("CREATE TABLE IF NOT EXISTS app_meta (k TEXT PRIMARY KEY, v TEXT)")
+        cursor.execute(
+            "INSERT OR REPLACE INTO app_meta(k, v) VALUES (?, '1')",
+            (FETTER_VOICE_BUILT_META_KEY,),
+        )
+        row = cursor.execute("SELECT COUNT(*) FROM fetterVoice").fetchone()
+        if commit:
+            conn.commit()
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    _print_summary("fetter voice import failed files", failed_files)
+    total = int(row[0] or 0) if row else 0
+    print(f"Fetter voices refreshed: total={total}")
+    return total
+
+
+def fetter_voice_built() -> bool:
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM app_meta WHERE k=? AND v='1' LIMIT 1",
+            (FETTER_VOICE_BUILT_META_KEY,),
+        ).fetchone()
+    except Exception:
+        return False
+    return row is not None
+
+
 if __name__ == "__main__":
     loadAvatars()
     importAllVoiceItems(reset=False)
+    refresh_fetter_voice()
@@ -8,67 +8,98 @@ _TRAVELLER_AVATAR_ID = 10000005
 _LITTLE_ONE_NAME = "\u5c0f\u5bb6\u4f19"
 
 
-def _replace_with_names(text: str, playerIsMale, lang: int, wander_name: str, traveller_name: str) -> str:
-    def replace_twin_text(match: "re.Match") -> str:
-        male_text = match.group(1)
-        female_text = match.group(2)
-        if playerIsMale == "both":
-            return f"{{{male_text}/{female_text}}}"
-        return male_text if playerIsMale else female_text
-
-    def replace_twin_text_reverse(match: "re.Match") -> str:
-        female_text = match.group(1)
-        male_text = match.group(2)
-        if playerIsMale == "both":
-            return f"{{{male_text}/{female_text}}}"
-        return male_text if playerIsMale else female_text
-
-    def replace_sex_pro(match: "re.Match") -> str:
-        if playerIsMale == "both":
-            male_text = databaseHelper.getManualTextMap(match.group(2), lang) or ""
-            female_text = databaseHelper.getManualTextMap(match.group(3), lang) or ""
-            return f"{{{male_text}/{female_text}}}"
-
-        is_mate = match.group(1) == "MATE"
-        placeholder_id = match.group(3) if is_mate == playerIsMale else match.group(2)
-        result = databaseHelper.getManualTextMap(placeholder_id, lang)
-        return result if result is not None else ""
-
-    normalized = re.sub(r"\{M#(.*?)}\{F#(.*?)}", replace_twin_text, text)
-    normalized = re.sub(r"\{F#(.*?)}\{M#(.*?)}", replace_twin_text_reverse, normalized)
-    normalized = re.sub(r"\{(.*?)AVATAR#SEXPRO\[(.*?)\|(.*?)]}", replace_sex_pro, normalized)
-    normalized = re.sub(r"\{REALNAME\[ID\(1\)\|HOSTONLY\(true\)]}", wander_name, normalized)
-    normalized = re.sub(r"#?\{REALNAME\[ID\(2\)\|SHOWHOST\(true\)]}", _LITTLE_ONE_NAME, normalized)
-    normalized = re.sub(r"\{REALNAME\[ID\(2\)\|HOSTONLY\(true\)]}", _LITTLE_ONE_NAME, normalized)
-    normalized = re.sub(r"\{NICKNAME}", traveller_name, normalized)
+# 所有占位符合并为一个正则，单次扫描完成替换；分支顺序即原先逐个 re.sub 的优先级
+_PLACEHOLDER_PATTERN = re.compile(
+    r"\{M#(?P<male>[^{}]*?)}\{F#(?P<female>[^{}]*?)}"
+    r"|\{F#(?P<female_first>[^{}]*?)}\{M#(?P<male_last>[^{}]*?)}"
+    r"|\{(?P<avatar>[^{}]*?)AVATAR#SEXPRO\[(?P<male_id>.*?)\|(?P<female_id>.*?)]}"
+    r"|(?P<wanderer>\{REALNAME\[ID\(1\)\|HOSTONLY\(true\)]})"
+    r"|(?P<little_one>#?\{REALNAME\[ID\(2\)\|SHOWHOST\(true\)]}|\{REALNAME\[ID\(2\)\|HOSTONLY\(true\)]})"
+    r"|(?P<nickname>\{NICKNAME})"
+)
+
+# (语言, 性别设置) -> (流浪者名, 旅行者名)；数据代数变化时清空
+_SPECIAL_NAME_CACHE: dict[tuple[int, object], tuple[str, str]] = {}
+
+
+def _pick_gender_text(male_text: str, female_text: str, playerIsMale) -> str:
+    if playerIsMale == "both":
+        return f"{{{male_text}/{female_text}}}"
+    return male_text if playerIsMale else female_text
+
+
+def _render(text: str, playerIsMale, lang: int, resolve_names) -> str:
+    if "{" not in text:
+        return text[1:] if text.startswith("#") else text
+
+    def render_match(match: "re.Match") -> str:
+        kind = match.lastgroup
+        if kind == "female":
+            return _pick_gender_text(match.group("male"), match.group("female"), playerIsMale)
+        if kind == "male_last":
+            return _pick_gender_text(match.group("male_last"), match.group("female_first"), playerIsMale)
+        if kind == "female_id":
+            if playerIsMale == "both":
+                male_text = databaseHelper.getManualTextMap(match.group("male_id"), lang) or ""
+                female_text = databaseHelper.getManualTextMap(match.group("female_id"), lang) or ""
+                return f"{{{male_text}/{female_text}}}"
+            is_mate = match.group("avatar") == "MATE"
+            placeholder_id = match.group("female_id") if is_mate == playerIsMale else match.group("male_id")
+            result = databaseHelper.getManualTextMap(placeholder_id, lang)
+            return result if result is not None else ""
+        if kind == "wanderer":
+            return resolve_names()[0]
+        if kind == "little_one":
+            return _LITTLE_ONE_NAME
+        return resolve_names()[1]
+
+    normalized = _PLACEHOLDER_PATTERN.sub(render_match, text)
     if normalized.startswith("#"):
         return normalized[1:]
     return normalized
 
 
+def _replace_with_names(text: str, playerIsMale, lang: int, wander_name: str, traveller_name: str) -> str:
+    names = (wander_name, traveller_name)
+    return _render(text, playerIsMale, lang, lambda: names)
+
+
 def _normalize_special_name(raw_text: str | None, playerIsMale, lang: int) -> str:
     if not raw_text:
         return ""
     return _replace_with_names(raw_text, playerIsMale, lang, "", "")
 
 
+def _special_names(playerIsMale, lang: int) -> tuple[str, str]:
+    cache_key = (lang, playerIsMale)
+    names = _SPECIAL_NAME_CACHE.get(cache_key)
+    if names is None:
+        names = (
+            _normalize_special_name(
+                databaseHelper.getCharacterNameRaw(_WANDERER_AVATAR_ID, lang),
+                playerIsMale,
+                lang,
+            ),
+            _normalize_special_name(
+                databaseHelper.getCharacterNameRaw(_TRAVELLER_AVATAR_ID, lang),
+                playerIsMale,
+                lang,
+            ),
+        )
+        _SPECIAL_NAME_CACHE[cache_key] = names
+    return names
+
+
 def replace(textMap: str | None, playerIsMale, lang: int):
     if textMap is None:
         return None
     if textMap == "":
         return ""
+    # 名称只在文本里真的出现 REALNAME/NICKNAME 时才查
+    return _render(textMap, playerIsMale, lang, lambda: _special_names(playerIsMale, lang))
 
-    wander_name = _normalize_special_name(
-        databaseHelper.getCharacterNameRaw(_WANDERER_AVATAR_ID, lang),
-        playerIsMale,
-        lang,
-    )
-    traveller_name = _normalize_special_name(
-        databaseHelper.getCharacterNameRaw(_TRAVELLER_AVATAR_ID, lang),
-        playerIsMale,
-        lang,
-    )
-    return _replace_with_names(textMap, playerIsMale, lang, wander_name, traveller_name)
+
+databaseHelper.addDataGenerationListener(_SPECIAL_NAME_CACHE.clear)
 
 
 if __name__ == "__main__":
@@ -140,6 +140,40 @@ def maybe_open_browser(url: str):
     threading.Thread(target=_open, daemon=True).start()
 
 
+def _warm_names_enabled() -> bool:
+    return os.environ.get("GTS_WARM_NAMES", "").strip() == "1"
+
+
+def maybe_start_name_preload(config_module) -> None:
+    """
+    可选预热：设置环境变量 GTS_WARM_NAMES=1 时，在后台线程把结果语言和来源语言的
+    角色名、NPC 名整表读入内存；数据代数变化清空后自动重新预热
+    """
+    if not _warm_names_enabled():
+        return
+
+    import databaseHelper
+
+    def _preload():
+        started = time.perf_counter()
+        langs = [*config_module.getResultLanguages(), config_module.getSourceLanguage()]
+        try:
+            loaded = databaseHelper.preloadNameTables(langs)
+        except Exception as exc:
+            print(f"[warm-names] preload failed: {exc}", flush=True)
+            return
+        _log_startup_profile(
+            f"name preload (avatar={loaded['avatar']}, npc={loaded['npc']})",
+            time.perf_counter() - started,
+        )
+
+    def _start():
+        threading.Thread(target=_preload, name="name-preload", daemon=True).start()
+
+    databaseHelper.addDataGenerationListener(_start)
+    _start()
+
+
 def run_local_server(app: Flask, host: str, port: int) -> None:
     from werkzeug.serving import make_server
 
@@ -258,5 +292,6 @@ if __name__ == "__main__":
         _prompt_for_asset_dir_if_needed(config)
 
     app = create_app()
+    maybe_start_name_preload(config)
     # 桌面发行版建议只监听本机
     run_local_server(app, host="127.0.0.1", port=5000)
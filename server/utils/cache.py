@@ -1,51 +1,280 @@
-from datetime import datetime, timedelta
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+# 命名空间 -> (最大条目数, 近似字节上限)
+DEFAULT_NAMESPACE_LIMITS = {
+    "search": (1000, 64 * 1024 * 1024),
+    "version": (64, 4 * 1024 * 1024),
+    "languages": (16, 256 * 1024),
+}
+
+# 缓存键前缀 -> 命名空间；未登记的前缀都归入 search
+_KEY_PREFIX_NAMESPACES = {
+    "version_data": "version",
+    "available_versions": "version",
+    "available_version_filters": "version",
+    "languages": "languages",
+}
+
+
+def _estimate_size(value, _depth=0) -> int:
+    """
+    近似估算缓存值占用的字节数：只递归常见的 JSON 结构，足够用于预算淘汰
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 8:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += _estimate_size(k, _depth + 1) + _estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _estimate_size(item, _depth + 1)
+    return size
+
+
+class _Namespace:
+    __slots__ = ("entries", "max_entries", "max_bytes", "bytes", "hits", "misses", "evictions", "expirations")
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        # key -> (value, expires_at, size)；OrderedDict 尾部为最近使用
+        self.entries: OrderedDict = OrderedDict()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+# set() 未指定数据代数时的占位值
+_ANY_GENERATION = object()
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    合并同一键的并发计算：同一时刻只有一个线程执行，其余线程等待并共享它的结果（或异常）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict = {}
+        self.coalesced = 0
+
+    def do(self, key, compute):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.result
+
+
+def single_flight(func):
+    """
+    装饰器：按参数合并并发调用，放在 lru_cache 之下，使缓存未命中时同一参数只计算一次
+    """
+    flight = SingleFlight()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        return flight.do(key, lambda: func(*args, **kwargs))
+
+    wrapper.flight = flight
+    return wrapper
 
 
 class SearchCache:
-    def __init__(self, max_size=1000, expiration_minutes=30):
-        self.cache = {}
-        self.max_size = max_size
-        self.expiration = timedelta(minutes=expiration_minutes)
+    def __init__(self, max_size=1000, expiration_minutes=30, namespace_limits=None):
+        self.ttl_seconds = expiration_minutes * 60
         self.version = 1  # 缓存版本号，用于在修复bug后自动刷新缓存
-    
-    def get(self, key):
-        # 在缓存键中包含版本号
-        versioned_key = f"v{self.version}:{key}"
-        if versioned_key not in self.cache:
-            return None
-        item = self.cache[versioned_key]
-        if datetime.now() > item['expires']:
-            del self.cache[versioned_key]
-            return None
-        return item['value']
-    
-    def set(self, key, value):
-        # 在缓存键中包含版本号
-        versioned_key = f"v{self.version}:{key}"
-        if len(self.cache) >= self.max_size:
-            # 简单的LRU策略：删除最旧的项
-            oldest_key = min(self.cache, key=lambda k: self.cache[k]['created'])
-            del self.cache[oldest_key]
-        self.cache[versioned_key] = {
-            'value': value,
-            'created': datetime.now(),
-            'expires': datetime.now() + self.expiration
+        self.generation = None  # 数据库数据代数，数据变化后整体失效
+        limits = dict(DEFAULT_NAMESPACE_LIMITS)
+        limits["search"] = (max_size, limits["search"][1])
+        limits.update(namespace_limits or {})
+        self._namespaces = {
+            name: _Namespace(int(max_entries), int(max_bytes))
+            for name, (max_entries, max_bytes) in limits.items()
         }
-    
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    @staticmethod
+    def namespace_of(key) -> str:
+        # 元组键首项可能是用户输入的关键词，只按字符串键的前缀归类
+        if not isinstance(key, str):
+            return "search"
+        return _KEY_PREFIX_NAMESPACES.get(key.split(":", 1)[0], "search")
+
+    def get(self, key):
+        return self._lookup(key, record=True)
+
+    def _lookup(self, key, record: bool):
+        ns = self._namespaces[self.namespace_of(key)]
+        with self._lock:
+            item = ns.entries.get(key)
+            if item is None:
+                if record:
+                    ns.misses += 1
+                return None
+            value, expires_at, size = item
+            if time.monotonic() > expires_at:
+                del ns.entries[key]
+                ns.bytes -= size
+                ns.expirations += 1
+                if record:
+                    ns.misses += 1
+                return None
+            ns.entries.move_to_end(key)
+            if record:
+                ns.hits += 1
+            return value
+
+    def get_or_compute(self, key, compute, cacheable=None, on_shared_uncacheable=None):
+        """
+        命中直接返回；未命中时同一键的并发请求只由一个线程执行 compute 并写入缓存，
+        其余线程等待并共享结果。cacheable(value) 为假时结果只返回、不写入缓存，
+        此时合并等待的线程拿到同一份结果后调用 on_shared_uncacheable()（如把自身请求标记为截断）
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        led = False
+        # 计算开始时的数据代数：计算期间代数变化，结果属于旧数据，不写入缓存，也不与新代数的请求合并
+        generation = self.generation
+
+        def _compute_once():
+            nonlocal led
+            led = True
+            # 上一轮计算可能刚好在本线程未命中之后写入
+            value = self._lookup(key, record=False)
+            if value is not None:
+                return value, True
+            value = compute()
+            complete = cacheable is None or cacheable(value)
+            if complete:
+                self.set(key, value, generation=generation)
+            return value, complete
+
+        value, complete = self._flight.do((generation, key), _compute_once)
+        if not complete and not led and on_shared_uncacheable is not None:
+            on_shared_uncacheable()
+        return value
+
+    def set(self, key, value, generation=_ANY_GENERATION):
+        """
+        写入缓存；给出 generation 时只在缓存仍处于该数据代数时写入
+        """
+        ns = self._namespaces[self.namespace_of(key)]
+        size = _estimate_size(value)
+        if size > ns.max_bytes:
+            # 单个值超过整个命名空间预算时不缓存，避免把其余条目全部挤掉
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if generation is not _ANY_GENERATION and generation != self.generation:
+                return
+            old = ns.entries.pop(key, None)
+            if old is not None:
+                ns.bytes -= old[2]
+            ns.entries[key] = (value, expires_at, size)
+            ns.bytes += size
+            while ns.entries and (len(ns.entries) > ns.max_entries or ns.bytes > ns.max_bytes):
+                _, (_, _, evicted_size) = ns.entries.popitem(last=False)
+                ns.bytes -= evicted_size
+                ns.evictions += 1
+
     def clear(self):
-        self.cache.clear()
-    
+        with self._lock:
+            for ns in self._namespaces.values():
+                ns.entries.clear()
+                ns.bytes = 0
+
     def size(self):
-        return len(self.cache)
-    
+        with self._lock:
+            return sum(len(ns.entries) for ns in self._namespaces.values())
+
+    def stats(self) -> dict:
+        """
+        各命名空间的条目数、近似字节数及命中/未命中/淘汰/过期计数
+        """
+        with self._lock:
+            return {
+                "version": self.version,
+                "generation": self.generation,
+                "coalesced": self._flight.coalesced,
+                "namespaces": {
+                    name: {
+                        "entries": len(ns.entries),
+                        "bytes": ns.bytes,
+                        "maxEntries": ns.max_entries,
+                        "maxBytes": ns.max_bytes,
+                        "hits": ns.hits,
+                        "misses": ns.misses,
+                        "evictions": ns.evictions,
+                        "expirations": ns.expirations,
+                    }
+                    for name, ns in self._namespaces.items()
+                },
+            }
+
     def increment_version(self):
         """递增缓存版本号，实现缓存的自动刷新"""
         self.version += 1
         # 清空当前缓存，确保使用新的版本号
         self.clear()
 
+    def sync_generation(self, generation) -> bool:
+        """
+        与数据库数据代数对齐：代数变化时清空全部命名空间，返回是否发生了清空。
+        代数变化前开始、变化后才结束的计算由 get_or_compute 按开始时的代数丢弃，不会写回旧数据
+        """
+        with self._lock:
+            if self.generation == generation:
+                return False
+            previous = self.generation
+            self.generation = generation
+            if previous is None:
+                return False
+            for ns in self._namespaces.values():
+                ns.entries.clear()
+                ns.bytes = 0
+        return True
+
 
 # 创建全局搜索缓存实例
 search_cache = SearchCache(max_size=1000, expiration_minutes=30)
 
-# 当修复bug后，调用search_cache.increment_version()来自动刷新缓存
\ No newline at end of file
+# 当修复bug后，调用search_cache.increment_version()来自动刷新缓存
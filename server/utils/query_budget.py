@@ -0,0 +1,83 @@
+"""
+单个请求内关键词查询的时间预算：API 层在请求开始时设定截止时间，
+databaseHelper 在只读连接上挂 set_progress_handler，被“布防”的查询超过截止时间即被 SQLite 中断。
+预算与布防状态都放在 ContextVar 中，多语言搜索的线程池通过 copy_context 共享同一预算
+"""
+
+import contextvars
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+# 每执行这么多条虚拟机指令回调一次进度函数，约为亚毫秒级
+PROGRESS_STEPS = 10000
+
+
+class QueryBudget:
+    __slots__ = ("deadline", "interruptions", "_lock")
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + max(0.0, float(seconds))
+        self.interruptions = 0
+        self._lock = threading.Lock()
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    def record_interruption(self) -> None:
+        with self._lock:
+            self.interruptions += 1
+
+    @property
+    def truncated(self) -> bool:
+        """本次请求是否有查询因超出预算被中断、结果被降级"""
+        return self.interruptions > 0
+
+
+_CURRENT_BUDGET: contextvars.ContextVar = contextvars.ContextVar("query_budget", default=None)
+_ARMED: contextvars.ContextVar = contextvars.ContextVar("query_budget_armed", default=False)
+
+
+def begin(seconds: float):
+    """为当前上下文设定预算；seconds <= 0 时不限制，返回 None"""
+    if seconds <= 0:
+        return None
+    return _CURRENT_BUDGET.set(QueryBudget(seconds))
+
+
+def end(token) -> None:
+    if token is not None:
+        _CURRENT_BUDGET.reset(token)
+
+
+def current_budget() -> QueryBudget | None:
+    return _CURRENT_BUDGET.get()
+
+
+def is_truncated() -> bool:
+    budget = _CURRENT_BUDGET.get()
+    return budget is not None and budget.truncated
+
+
+@contextmanager
+def armed():
+    """在此范围内执行的查询受预算约束；范围外（如结果水合）的查询不受影响"""
+    token = _ARMED.set(True)
+    try:
+        yield _CURRENT_BUDGET.get()
+    finally:
+        _ARMED.reset(token)
+
+
+def progress_handler() -> int:
+    """set_progress_handler 回调：已布防且预算耗尽时返回非零，SQLite 以 interrupted 中止当前语句"""
+    if not _ARMED.get():
+        return 0
+    budget = _CURRENT_BUDGET.get()
+    return 1 if budget is not None and budget.expired() else 0
+
+
+def is_interrupted_error(exc: BaseException) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and "interrupted" in str(exc).lower()
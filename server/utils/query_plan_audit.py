@@ -0,0 +1,442 @@
+"""
+databaseHelper 查询计划审计：用代表性参数逐个调用查询函数，记录其执行的每条 SELECT，
+取 EXPLAIN QUERY PLAN，报告大表全表扫描（SCAN）与 ORDER BY 临时 B 树，
+并与已提交的计划快照比对，查询或表结构改动导致退化为扫描时在发布前暴露出来。
+
+用法（在 server 目录下）：
+    python -m utils.query_plan_audit                   # 基于 databaseDDL.sql 的夹具库审计并与快照比对
+    python -m utils.query_plan_audit --db data.db      # 在真实库上审计（只读，使用库内统计信息）
+    python -m utils.query_plan_audit --update-snapshot # 确认计划变化后重写快照
+"""
+import argparse
+import inspect
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+DDL_PATH = SERVER_DIR / "dbBuild" / "databaseDDL.sql"
+SNAPSHOT_PATH = Path(__file__).resolve().parent / "query_plan_snapshot.json"
+
+# 行数以十万、百万计的表；对它们的 SCAN 视为问题，小维表（version_dim、npc 等）不报告
+LARGE_TABLES = frozenset(
+    {
+        "textMap",
+        "dialogue",
+        "talk_dialogue_link",
+        "questTalk",
+        "quest_hash_map",
+        "quest_version",
+        "readable",
+        "subtitle",
+        "fetters",
+        "fetterStory",
+        "fetterVoice",
+        "voice",
+        "text_hash_voice",
+        "text_primary_source",
+        "text_source_entity",
+        "speaker_name",
+        "npc_dialogue_group",
+    }
+)
+
+# 不是查询构造函数，或会写库/依赖请求上下文
+EXCLUDED_FUNCTIONS = frozenset(
+    {
+        "addDataGenerationListener",
+        "getDataGeneration",
+        "getAppliedDataGeneration",
+        "syncDataGeneration",
+        "preloadNameTables",
+    }
+)
+
+_KEYWORD = "风起地"
+_VERSION_FILTERS = {"created_version": "5.0", "updated_version": "5.1"}
+
+# 按参数名给出代表性取值；未列出且没有默认值的参数使该函数被跳过
+_PARAM_VALUES: dict[str, object] = {
+    "keyword": _KEYWORD,
+    "keyWord": _KEYWORD,
+    "speaker_keyword": "凯瑟琳",
+    "langCode": 1,
+    "lang": 1,
+    "lang_code": 1,
+    "preferred_lang": 1,
+    "langStr": "CHS",
+    "talkerType": "TALK_ROLE_NPC",
+    "fileName": "Book100.txt",
+    "file_name": "Book100.txt",
+    "prefix": "Book",
+    "source_type": "AQ",
+    "source_type_code": 1,
+    "voice_filter": "with",
+    "placeHolderName": "NICKNAME",
+    "hash_val": "1",
+    "voice_hash": "1",
+    "startTime": 0.0,
+    "limit": 20,
+    "offset": 0,
+    "page": 1,
+    "page_size": 20,
+    "size": 20,
+    "text_hashes": [1, 2],
+    "npcIds": [1, 2],
+}
+
+_ALIAS_RE = re.compile(
+    r"\b(?:from|join)\s+([A-Za-z_][\w]*)(?:\s+(?:as\s+)?([A-Za-z_][\w]*))?",
+    re.IGNORECASE,
+)
+_NOT_ALIASES = frozenset(
+    {
+        "where", "on", "join", "left", "inner", "cross", "natural", "outer", "order", "group",
+        "limit", "using", "union", "having", "window", "as", "select", "and", "or", "not", "indexed",
+    }
+)
+_SCAN_RE = re.compile(r"^SCAN (\S+)")
+
+
+class _RecordingCursor:
+    def __init__(self, cursor: sqlite3.Cursor, statements: list):
+        self._cursor = cursor
+        self._statements = statements
+
+    def execute(self, sql, params=()):
+        self._statements.append((sql, params))
+        self._cursor.execute(sql, params)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _RecordingConnection:
+    """
+    代替 databaseHelper.conn：照常执行，同时记下 (sql, 参数)，事后按原参数取查询计划
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+        self.statements: list[tuple[str, object]] = []
+
+    def cursor(self):
+        return _RecordingCursor(self._connection.cursor(), self.statements)
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, params))
+        return self._connection.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def _import_database_helper():
+    if str(SERVER_DIR) not in sys.path:
+        sys.path.insert(0, str(SERVER_DIR))
+    import databaseHelper
+
+    return databaseHelper
+
+
+def build_fixture_connection() -> sqlite3.Connection:
+    """
+    按 databaseDDL.sql 建库，补上构建阶段才创建的表、FTS 表和运行时索引，并写入少量样例行。
+    不执行 ANALYZE：没有统计信息时 SQLite 按大表估算，计划与线上库接近
+    """
+    databaseHelper = _import_database_helper()
+    dbbuild_dir = str(SERVER_DIR / "dbBuild")
+    if dbbuild_dir not in sys.path:
+        sys.path.insert(0, dbbuild_dir)
+    import textmap_fts_sql
+
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    connection.executescript(DDL_PATH.read_text(encoding="utf8"))
+    connection.executescript(
+        """
+        ALTER TABLE version_dim ADD COLUMN version_sort_key INTEGER;
+        CREATE TABLE IF NOT EXISTS app_meta (k TEXT PRIMARY KEY, v TEXT);
+        CREATE TABLE IF NOT EXISTS text_source_entity (
+            text_hash INTEGER NOT NULL,
+            source_type_code INTEGER NOT NULL,
+            entity_id INTEGER NOT NULL,
+            title_hash INTEGER NOT NULL,
+            extra INTEGER NOT NULL DEFAULT 0,
+            sub_category INTEGER NOT NULL DEFAULT 0,
+            created_version_id INTEGER,
+            PRIMARY KEY (text_hash, source_type_code, entity_id)
+        );
+        CREATE INDEX IF NOT EXISTS text_source_entity_text_hash_index ON text_source_entity(text_hash);
+        CREATE INDEX IF NOT EXISTS text_source_entity_title_hash_index ON text_source_entity(title_hash);
+        """
+    )
+    for build_sql in (
+        textmap_fts_sql.build_textmap_fts_table_sql,
+        textmap_fts_sql.build_readable_fts_table_sql,
+        textmap_fts_sql.build_subtitle_fts_table_sql,
+    ):
+        connection.execute(build_sql("trigram", "full", 0))
+    databaseHelper._ensure_runtime_sql_functions(connection)
+    databaseHelper._register_fts_content_function(connection, "trigram")
+    databaseHelper._ensure_runtime_query_indexes(connection)
+    connection.executescript(
+        """
+        INSERT INTO version_dim(id, raw_version, version_tag, version_sort_key) VALUES
+            (1, 'OSRELWin5.0.0', '5.0', 500), (2, 'OSRELWin5.1.0', '5.1', 501);
+        INSERT INTO textMap(id, hash, lang, content, created_version_id, updated_version_id, normalized_content) VALUES
+            (1, 1, 1, '风起地的风', 1, 2, '风起地的风'), (2, 2, 1, '凯瑟琳', 1, 1, '凯瑟琳'),
+            (3, 3, 1, '风起地', 1, 1, '风起地'), (4, 1, 4, 'Windrise', 1, 1, 'windrise');
+        INSERT INTO textMap_fts(textMap_fts) VALUES ('rebuild');
+        INSERT INTO npc(npcId, textHash, created_version_id) VALUES (1, 2, 1);
+        INSERT INTO dialogue(talkerType, talkerId, talkId, textHash, dialogueId) VALUES
+            ('TALK_ROLE_NPC', 1, 1, 1, 1), ('TALK_ROLE_PLAYER', 0, 1, 3, 2);
+        INSERT INTO talk_dialogue_link(talkId, coopQuestId, dialogueId) VALUES (1, 0, 1), (1, 0, 2);
+        INSERT INTO quest(questId, titleTextMapHash, created_version_id) VALUES (1, 3, 1);
+        INSERT INTO questTalk(questId, talkId) VALUES (1, 1);
+        INSERT INTO quest_hash_map(questId, hash, source_type) VALUES (1, 1, 'dialogue');
+        INSERT INTO readable(fileName, lang, content, titleTextMapHash, readableId, created_version_id, updated_version_id)
+            VALUES ('Book100.txt', 'CHS', '风起地的传说', 3, 100, 1, 1);
+        INSERT INTO readable_fts(readable_fts) VALUES ('rebuild');
+        INSERT INTO subtitle(fileName, lang, startTime, endTime, content, subtitleId, created_version_id, updated_version_id)
+            VALUES ('Cs_A', 1, 0, 1, '风起地的风', 1, 1, 1);
+        INSERT INTO subtitle_fts(subtitle_fts) VALUES ('rebuild');
+        """
+    )
+    connection.commit()
+    return connection
+
+
+def _alias_map(sql: str) -> dict[str, str]:
+    aliases: dict[str, str] = {}
+    for table, alias in _ALIAS_RE.findall(sql):
+        aliases.setdefault(table, table)
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases.setdefault(alias, table)
+    return aliases
+
+
+def plan_findings(sql: str, plan_details: list[str]) -> list[str]:
+    """
+    从一条语句的计划明细中挑出问题：大表 SCAN（含覆盖索引全扫）与 ORDER BY 临时 B 树；
+    FTS 虚表、子查询与 CTE 的物化扫描不算
+    """
+    aliases = _alias_map(sql)
+    findings: list[str] = []
+    for detail in plan_details:
+        match = _SCAN_RE.match(detail)
+        if match and "VIRTUAL TABLE" not in detail:
+            table = aliases.get(match.group(1), match.group(1))
+            if table in LARGE_TABLES:
+                findings.append(f"SCAN {table}")
+        if "USE TEMP B-TREE FOR" in detail and "ORDER BY" in detail:
+            findings.append("TEMP B-TREE FOR ORDER BY")
+    return findings
+
+
+def _is_query(sql: str) -> bool:
+    head = sql.lstrip().lower()
+    if not head.startswith(("select", "with")):
+        return False
+    return "sqlite_master" not in head and "pragma_" not in head
+
+
+def _explain(connection: sqlite3.Connection, sql: str, params) -> list[str]:
+    rows = connection.execute("EXPLAIN QUERY PLAN " + sql, params if params is not None else ()).fetchall()
+    return [str(row[-1]) for row in rows]
+
+
+def _build_arguments(function) -> dict | None:
+    kwargs: dict[str, object] = {}
+    for param in inspect.signature(function).parameters.values():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        if param.name == "langs":
+            kwargs[param.name] = ["CHS", "EN"] if "str" in str(param.annotation) else [1, 4]
+        elif param.name in _PARAM_VALUES:
+            kwargs[param.name] = _PARAM_VALUES[param.name]
+        elif param.default is not inspect.Parameter.empty:
+            continue
+        elif re.search(r"(Id|_id|Hash|_hash|IdFallback)$", param.name):
+            kwargs[param.name] = 1
+        else:
+            return None
+    return kwargs
+
+
+def iter_cases(databaseHelper=None):
+    """
+    列出 (用例名, 函数, 参数)：databaseHelper 中全部公开的小写开头函数，
+    带版本过滤参数的函数额外生成一个 [versions] 用例
+    """
+    databaseHelper = databaseHelper or _import_database_helper()
+    for name, function in sorted(vars(databaseHelper).items()):
+        if name.startswith("_") or not name[:1].islower() or name in EXCLUDED_FUNCTIONS:
+            continue
+        if not inspect.isfunction(function) or function.__module__ != databaseHelper.__name__:
+            continue
+        kwargs = _build_arguments(function)
+        if kwargs is None:
+            yield name, function, None
+            continue
+        yield name, function, kwargs
+        parameters = inspect.signature(function).parameters
+        if all(key in parameters for key in _VERSION_FILTERS):
+            yield f"{name}[versions]", function, {**kwargs, **_VERSION_FILTERS}
+
+
+def run_audit(connection: sqlite3.Connection) -> dict:
+    """
+    在给定连接上执行全部用例，返回 {用例名: {"status", "plans", "findings"}}；
+    status 为 ok / skipped（无法推断参数）/ error: ...
+    """
+    databaseHelper = _import_database_helper()
+    saved_conn = databaseHelper.conn
+    saved_template_cache = databaseHelper._SQL_TEMPLATE_CACHE
+    saved_buckets = {key: databaseHelper._CACHE[key] for key in ("table", "column", "fts", "version")}
+    saved_fetter_sync = databaseHelper._ensure_fetter_voice_data
+    recorder = _RecordingConnection(connection)
+    databaseHelper.conn = recorder
+    databaseHelper._SQL_TEMPLATE_CACHE = {}
+    databaseHelper._CACHE["table"] = {}
+    databaseHelper._CACHE["column"] = {}
+    databaseHelper._CACHE["version"] = {}
+    databaseHelper._CACHE["fts"] = {
+        key: None for key in ("available", "tokenizer", "langs", "readable_langs", "subtitle_langs")
+    }
+    # 审计只读：不触发 fetterVoice 的按需同步
+    databaseHelper._ensure_fetter_voice_data = lambda: None
+    results: dict[str, dict] = {}
+    try:
+        for case_name, function, kwargs in iter_cases(databaseHelper):
+            if kwargs is None:
+                results[case_name] = {"status": "skipped", "plans": [], "findings": []}
+                continue
+            recorder.statements.clear()
+            status = "ok"
+            try:
+                result = function(**kwargs)
+                if inspect.isgenerator(result):
+                    list(itertools.islice(result, 50))
+            except Exception as exc:
+                status = f"error: {type(exc).__name__}: {exc}"
+            plans: list[dict] = []
+            findings: list[str] = []
+            seen: set[str] = set()
+            for sql, params in list(recorder.statements):
+                if not _is_query(sql) or sql in seen:
+                    continue
+                seen.add(sql)
+                try:
+                    details = _explain(connection, sql, params)
+                except sqlite3.Error as exc:
+                    details = [f"EXPLAIN FAILED: {exc}"]
+                plans.append({"sql": " ".join(sql.split()), "plan": details})
+                findings.extend(plan_findings(sql, details))
+            results[case_name] = {"status": status, "plans": plans, "findings": sorted(set(findings))}
+    finally:
+        databaseHelper.conn = saved_conn
+        databaseHelper._SQL_TEMPLATE_CACHE = saved_template_cache
+        for key, bucket in saved_buckets.items():
+            databaseHelper._CACHE[key] = bucket
+        databaseHelper._ensure_fetter_voice_data = saved_fetter_sync
+    return results
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf8"))
+
+
+def write_snapshot(results: dict, path: Path = SNAPSHOT_PATH) -> None:
+    snapshot = {
+        "sqlite_version": sqlite3.sqlite_version,
+        "cases": {
+            name: {"findings": result["findings"], "plans": [plan["plan"] for plan in result["plans"]]}
+            for name, result in sorted(results.items())
+            if result["status"] == "ok"
+        },
+    }
+    path.write_text(json.dumps(snapshot, ensure_ascii=False, indent=2) + "\n", encoding="utf8")
+
+
+def compare_with_snapshot(results: dict, snapshot: dict) -> dict[str, list[str]]:
+    """
+    返回 {用例名: 快照中没有的新问题}；快照里没有的新用例，其全部问题都算新问题
+    """
+    baseline = snapshot.get("cases", {})
+    regressions: dict[str, list[str]] = {}
+    for name, result in results.items():
+        if result["status"] != "ok":
+            continue
+        known = set(baseline.get(name, {}).get("findings", []))
+        new_findings = [finding for finding in result["findings"] if finding not in known]
+        if new_findings:
+            regressions[name] = new_findings
+    return regressions
+
+
+def _print_report(results: dict, regressions: dict[str, list[str]]) -> None:
+    ok = [name for name, result in results.items() if result["status"] == "ok"]
+    skipped = [name for name, result in results.items() if result["status"] == "skipped"]
+    errors = {name: result["status"] for name, result in results.items() if result["status"].startswith("error")}
+    flagged = {name: result["findings"] for name, result in results.items() if result["findings"]}
+    print(
+        f"Query plan audit: cases={len(results)}, ok={len(ok)}, skipped={len(skipped)}, "
+        f"errors={len(errors)}, flagged={len(flagged)}, regressions={len(regressions)}"
+    )
+    for name, findings in sorted(flagged.items()):
+        marker = "!" if name in regressions else " "
+        print(f" {marker} {name}: {', '.join(findings)}")
+    for name, status in sorted(errors.items()):
+        print(f"   {name}: {status}")
+    if skipped:
+        print(f"   skipped (no representative arguments): {', '.join(sorted(skipped))}")
+    for name, findings in sorted(regressions.items()):
+        print(f"[REGRESSION] {name}: {', '.join(findings)}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Audit databaseHelper query plans.")
+    parser.add_argument("--db", help="audit an existing database (opened read-only) instead of the DDL fixture")
+    parser.add_argument("--snapshot", default=str(SNAPSHOT_PATH), help="plan snapshot file")
+    parser.add_argument("--update-snapshot", action="store_true", help="rewrite the snapshot from this run")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        db_uri = Path(os.path.abspath(args.db)).as_uri() + "?mode=ro"
+        connection = sqlite3.connect(db_uri, uri=True, check_same_thread=False)
+        databaseHelper = _import_database_helper()
+        databaseHelper._ensure_runtime_sql_functions(connection)
+        databaseHelper._register_fts_content_function(connection, "trigram")
+    else:
+        connection = build_fixture_connection()
+    try:
+        results = run_audit(connection)
+    finally:
+        connection.close()
+
+    snapshot_path = Path(args.snapshot)
+    if args.update_snapshot:
+        write_snapshot(results, snapshot_path)
+        print(f"Query plan snapshot written: {snapshot_path}")
+        regressions: dict[str, list[str]] = {}
+    else:
+        regressions = compare_with_snapshot(results, load_snapshot(snapshot_path))
+    _print_report(results, regressions)
+    # 语句执行报错（例如引用了不存在的列）与回退到扫描同样视为失败
+    errors = any(result["status"].startswith("error") for result in results.values())
+    return 1 if regressions or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
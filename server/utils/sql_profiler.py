@@ -0,0 +1,303 @@
+"""
+可选的 SQL 剖析：设置 GTS_SQL_PROFILE=1 后，databaseHelper 新建的连接改用 ProfiledConnection，
+语句数由 set_trace_callback 统计，耗时由游标上的 execute/fetch 计时包装统计，
+两者都记到当前 Flask 请求名下；另保留最慢的若干条归一化语句及其参数形状。
+未开启时连接保持原生 sqlite3.Connection，不产生任何额外开销
+"""
+
+import contextvars
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+DEFAULT_SLOW_STATEMENTS = 50
+DEFAULT_RECENT_REQUESTS = 100
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get("GTS_SQL_PROFILE", "").strip() == "1"
+
+
+def _read_positive_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    把语句归一化为可聚合的形状：字面量替换为 ?，in 列表折叠为 (?...)，空白压缩为单个空格
+    """
+    text = _STRING_LITERAL_RE.sub("?", sql)
+    text = _NUMBER_LITERAL_RE.sub("?", text)
+    text = _PLACEHOLDER_LIST_RE.sub("(?...)", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _value_shape(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        # 版本过滤等参数以 JSON 数组字符串传入，长度只取数量级
+        return f"str[{len(value)}]" if len(value) < 16 else f"str[{len(value) // 16 * 16}+]"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"bytes[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shape(params) -> str:
+    """
+    参数形状：只保留位置/名称与类型（字符串附带长度），不记录参数值本身
+    """
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {_value_shape(value)}" for key, value in params.items()) + "}"
+    try:
+        return "(" + ", ".join(_value_shape(value) for value in params) + ")"
+    except TypeError:
+        return _value_shape(params)
+
+
+class _RequestStats:
+    __slots__ = ("method", "path", "started", "statements", "executions", "sql_seconds")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.executions = 0
+        self.sql_seconds = 0.0
+
+
+class SqlProfiler:
+    """
+    汇总 SQL 剖析数据：按请求统计语句数与耗时（最近若干个请求），并保留最慢的若干条归一化语句
+    """
+
+    def __init__(self, max_slow_statements: int = DEFAULT_SLOW_STATEMENTS, max_recent_requests: int = DEFAULT_RECENT_REQUESTS):
+        self.max_slow_statements = max(1, int(max_slow_statements))
+        self._lock = threading.Lock()
+        # 归一化语句 -> 统计；超过上限时淘汰最大耗时最小的一条
+        self._slowest: dict[str, dict] = {}
+        self._recent: deque = deque(maxlen=max(1, int(max_recent_requests)))
+        self._current: contextvars.ContextVar = contextvars.ContextVar("sql_profile_request", default=None)
+        self.total_statements = 0
+        self.total_executions = 0
+        self.total_sql_seconds = 0.0
+
+    def begin_request(self, method: str, path: str):
+        """开始统计当前请求；返回的令牌交给 end_request"""
+        return self._current.set(_RequestStats(method, path))
+
+    def end_request(self, token=None) -> dict | None:
+        """结束当前请求的统计，写入最近请求列表并返回摘要"""
+        stats = self._current.get()
+        if token is not None:
+            self._current.reset(token)
+        else:
+            self._current.set(None)
+        if stats is None:
+            return None
+        summary = {
+            "method": stats.method,
+            "path": stats.path,
+            "statements": stats.statements,
+            "executions": stats.executions,
+            "sqlMs": round(stats.sql_seconds * 1000, 3),
+            "elapsedMs": round((time.perf_counter() - stats.started) * 1000, 3),
+        }
+        with self._lock:
+            self._recent.append(summary)
+        return summary
+
+    def current_request(self) -> _RequestStats | None:
+        return self._current.get()
+
+    def trace(self, _statement: str) -> None:
+        """set_trace_callback 回调：每条实际执行的语句（含触发器内语句）计数一次"""
+        stats = self._current.get()
+        if stats is not None:
+            stats.statements += 1
+        with self._lock:
+            self.total_statements += 1
+
+    def record(self, sql: str, params, elapsed: float) -> None:
+        """记录一次 execute（含其后读取结果行）的耗时"""
+        stats = self._current.get()
+        if stats is not None:
+            stats.executions += 1
+            stats.sql_seconds += elapsed
+        normalized = normalize_sql(sql)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self.total_executions += 1
+            self.total_sql_seconds += elapsed
+            entry = self._slowest.get(normalized)
+            if entry is None:
+                if len(self._slowest) >= self.max_slow_statements:
+                    fastest = min(self._slowest, key=lambda key: self._slowest[key]["maxMs"])
+                    if self._slowest[fastest]["maxMs"] >= elapsed_ms:
+                        return
+                    del self._slowest[fastest]
+                entry = self._slowest[normalized] = {
+                    "sql": normalized,
+                    "count": 0,
+                    "totalMs": 0.0,
+                    "maxMs": 0.0,
+                    "paramShape": "",
+                    "path": None,
+                }
+            entry["count"] += 1
+            entry["totalMs"] += elapsed_ms
+            if elapsed_ms >= entry["maxMs"]:
+                entry["maxMs"] = elapsed_ms
+                entry["paramShape"] = param_shape(params)
+                entry["path"] = stats.path if stats is not None else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            slowest = sorted(self._slowest.values(), key=lambda entry: entry["maxMs"], reverse=True)
+            return {
+                "enabled": profiling_enabled(),
+                "totalStatements": self.total_statements,
+                "totalExecutions": self.total_executions,
+                "totalSqlMs": round(self.total_sql_seconds * 1000, 3),
+                "recentRequests": list(reversed(self._recent)),
+                "slowestStatements": [
+                    {
+                        **entry,
+                        "totalMs": round(entry["totalMs"], 3),
+                        "maxMs": round(entry["maxMs"], 3),
+                        "avgMs": round(entry["totalMs"] / entry["count"], 3) if entry["count"] else 0.0,
+                    }
+                    for entry in slowest
+                ],
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._slowest.clear()
+            self._recent.clear()
+            self.total_statements = 0
+            self.total_executions = 0
+            self.total_sql_seconds = 0.0
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    计时游标：execute 与随后的 fetch/迭代耗时累计到同一条语句上，
+    在下一次 execute、close、结果读尽或游标回收时提交给剖析器
+    """
+
+    _pending = None
+
+    def _flush(self) -> None:
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            sql_profiler.record(*pending)
+
+    def _add_elapsed(self, elapsed: float) -> None:
+        pending = self._pending
+        if pending is not None:
+            self._pending = (pending[0], pending[1], pending[2] + elapsed)
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = (sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = (sql, None, time.perf_counter() - started)
+            self._flush()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._add_elapsed(time.perf_counter() - started)
+        if row is None:
+            self._flush()
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add_elapsed(time.perf_counter() - started)
+        if not rows:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._add_elapsed(time.perf_counter() - started)
+        self._flush()
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add_elapsed(time.perf_counter() - started)
+            self._flush()
+            raise
+        self._add_elapsed(time.perf_counter() - started)
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """
+    剖析连接：cursor() 与 execute() 都走计时游标，并挂上语句计数回调
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(sql_profiler.trace)
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # 原生 Connection.execute 不经过被覆盖的 cursor()，需显式改走计时游标
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# 全局剖析器实例
+sql_profiler = SqlProfiler(
+    max_slow_statements=_read_positive_int("GTS_SQL_PROFILE_SLOW_STATEMENTS", DEFAULT_SLOW_STATEMENTS),
+    max_recent_requests=_read_positive_int("GTS_SQL_PROFILE_RECENT_REQUESTS", DEFAULT_RECENT_REQUESTS),
+)
@@ -18,7 +18,7 @@ def _app() -> Flask:
     return app
 
 
-def _request_context(app: Flask, path: str, method: str = "GET", query_string=None, json_body=None):
+def _request_context(app: Flask, path: str, method: str = "GET", query_string=None, json_body=None, remote_addr="127.0.0.1"):
     query = urlencode(query_string or {}, doseq=True)
     body = b""
     content_type = None
@@ -33,7 +33,7 @@ def _request_context(app: Flask, path: str, method: str = "GET", query_string=No
         "QUERY_STRING": query,
         "SERVER_NAME": "localhost",
         "SERVER_PORT": "5000",
-        "REMOTE_ADDR": "127.0.0.1",
+        "REMOTE_ADDR": remote_addr,
         "CONTENT_TYPE": content_type or "",
         "CONTENT_LENGTH": str(len(body)),
         "wsgi.version": (1, 0),
@@ -122,6 +122,46 @@ class TestStartupAndSettingsEndpoints:
         assert calls == ["increment"]
 
 
+class TestSqlProfileEndpoint:
+    def test_sql_profile_returns_snapshot_for_local_requests(self, monkeypatch):
+        monkeypatch.setattr(api.sql_profiler, "snapshot", lambda: {"enabled": True, "slowestStatements": []})
+
+        app = _app()
+        with _request_context(app, "/api/runtime/sqlProfile"):
+            resp = api.get_sql_profile_api()
+
+        data = resp.get_json()
+        assert data["code"] == 200
+        assert data["data"]["enabled"] is True
+
+    def test_sql_profile_rejects_remote_requests(self):
+        app = _app()
+        with _request_context(app, "/api/runtime/sqlProfile", remote_addr="192.168.1.20"):
+            resp = api.get_sql_profile_api()
+
+        assert resp.status_code == 403
+
+    def test_sql_profile_disabled_in_cloud_mode(self, monkeypatch):
+        monkeypatch.setenv("GTS_CLOUD_MODE", "1")
+
+        app = _app()
+        with _request_context(app, "/api/runtime/sqlProfile"):
+            resp = api.get_sql_profile_api()
+
+        assert resp.status_code == 403
+
+    def test_profiled_request_reports_server_timing(self, monkeypatch):
+        monkeypatch.setenv("GTS_SQL_PROFILE", "1")
+
+        app = _app()
+        with _request_context(app, "/api/keywordQuery"):
+            api._begin_sql_profile()
+            api.sql_profiler.trace("select 1")
+            resp = api._end_sql_profile(app.response_class())
+
+        assert resp.headers["Server-Timing"] == 'sql;dur=0.0;desc="1 statements"'
+
+
 class TestSearchEndpoint:
     def test_search_empty_keyword(self, monkeypatch):
         monkeypatch.setattr(api.search_cache, "get", lambda key: None)
@@ -267,6 +307,26 @@ class TestKeywordQueryEndpoint:
         assert data["code"] == 200
         assert data["data"]["total"] == 1
 
+    def test_keyword_query_lang_codes_groups_results_per_language(self, monkeypatch):
+        calls = {}
+
+        def fake_multi_lang(keyword, lang_codes, speaker, **kwargs):
+            calls["lang_codes"] = lang_codes
+            return [{"langCode": code, "contents": [], "total": 0} for code in lang_codes]
+
+        monkeypatch.setattr(api.controllers_module, "getTranslateObjMultiLang", fake_multi_lang)
+
+        app = _app()
+        payload = {"langCodes": [1, "4"], "keyword": "测试"}
+        with _request_context(app, "/api/keywordQuery", method="POST", json_body=payload):
+            data = api.keywordQuery().get_json()
+
+        assert calls["lang_codes"] == [1, 4]
+        assert [group["langCode"] for group in data["data"]["results"]] == [1, 4]
+
+        with _request_context(app, "/api/keywordQuery", method="POST", json_body={"langCodes": "1", "keyword": "测试"}):
+            assert api.keywordQuery().get_json()["code"] == 400
+
     def test_keyword_query_passes_story_source_type(self, monkeypatch):
         calls = {}
 
@@ -298,6 +358,98 @@ class TestKeywordQueryEndpoint:
         assert calls["args"]["page"] == 2
         assert calls["args"]["page_size"] == 10
 
+    def test_keyword_query_with_cursor_returns_next_cursor(self, monkeypatch):
+        calls = {}
+
+        def fake_get_translate_obj_by_cursor(keyword, lang_code, speaker, cursor, page_size, voice_filter, created_version, updated_version, source_type):
+            calls["cursor"] = cursor
+            calls["page_size"] = page_size
+            return ([{"hash": 1}], 3, "next-token")
+
+        monkeypatch.setattr(api.controllers_module, "getTranslateObjByCursor", fake_get_translate_obj_by_cursor)
+
+        app = _app()
+        payload = {"langCode": 1, "keyword": "测试", "cursor": "", "pageSize": 1}
+        with _request_context(app, "/api/keywordQuery", method="POST", json_body=payload):
+            resp = api.keywordQuery()
+
+        data = resp.get_json()
+        assert data["code"] == 200
+        assert data["data"]["nextCursor"] == "next-token"
+        assert data["data"]["total"] == 3
+        assert calls == {"cursor": None, "page_size": 1}
+
+    def test_keyword_query_flags_truncated_results_with_approximate_total(self, monkeypatch, _stub_lazy_controllers):
+        from utils import query_budget
+
+        def _get_translate_obj(*args, **kwargs):
+            query_budget.current_budget().record_interruption()
+            return [{"translates": {}}] * 3, 0
+
+        _stub_lazy_controllers.getTranslateObj = _get_translate_obj
+        monkeypatch.setenv("GTS_QUERY_TIME_BUDGET_MS", "1000")
+
+        app = _app()
+        with _request_context(app, "/api/keywordQuery", method="POST", json_body={
+            "keyword": "风", "langCode": 1, "page": 2, "pageSize": 10,
+        }):
+            api._begin_query_budget()
+            resp = api.keywordQuery()
+            api._end_query_budget(resp)
+
+        data = resp.get_json()["data"]
+        assert data["truncated"] is True
+        assert data["total"] == 13
+        assert query_budget.current_budget() is None
+
+    def test_keyword_query_rejects_invalid_cursor(self, monkeypatch):
+        class FakeCursorError(ValueError):
+            pass
+
+        def fake_get_translate_obj_by_cursor(*args, **kwargs):
+            raise FakeCursorError("invalid cursor")
+
+        monkeypatch.setattr(api.controllers_module, "InvalidSearchCursorError", FakeCursorError, raising=False)
+        monkeypatch.setattr(api.controllers_module, "getTranslateObjByCursor", fake_get_translate_obj_by_cursor)
+
+        app = _app()
+        payload = {"langCode": 1, "keyword": "测试", "cursor": "broken"}
+        with _request_context(app, "/api/keywordQuery", method="POST", json_body=payload):
+            resp = api.keywordQuery()
+
+        data = resp.get_json()
+        assert data["code"] == 400
+        assert data["msg"] == "invalid cursor"
+
+    def test_keyword_export_streams_ndjson_rows_lazily(self, monkeypatch):
+        produced = []
+
+        def fake_iter_keyword_export(keyword, lang_code, langs, voice_filter, created_version, updated_version):
+            for index in range(3):
+                produced.append(index)
+                yield {"hash": index, "translates": {"4": f"wind-{index}"}}
+
+        monkeypatch.setattr(api.controllers_module, "iterKeywordExport", fake_iter_keyword_export)
+
+        app = _app()
+        payload = {"langCode": 1, "keyword": "风", "langs": [4]}
+        with _request_context(app, "/api/keywordExport", method="POST", json_body=payload):
+            resp = api.keywordExport()
+            assert resp.mimetype == "application/x-ndjson"
+            assert produced == []
+            body = "".join(resp.response)
+
+        lines = [json.loads(line) for line in body.splitlines()]
+        assert [line["hash"] for line in lines] == [0, 1, 2]
+        assert lines[2]["translates"] == {"4": "wind-2"}
+
+    def test_keyword_export_requires_keyword(self):
+        app = _app()
+        with _request_context(app, "/api/keywordExport", method="POST", json_body={"langCode": 1, "keyword": " "}):
+            resp = api.keywordExport()
+
+        assert resp.get_json()["code"] == 400
+
 
 class TestCatalogSearchEndpoint:
     def test_catalog_search_rejects_empty_payload(self):
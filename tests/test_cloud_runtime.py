@@ -95,3 +95,15 @@ def test_cloud_root_and_health_do_not_require_frontend_bundle():
 
     assert client.get("/").get_json()["status"] == "ok"
     assert client.get("/healthz").get_json() == {"cloudMode": True, "status": "ok"}
+
+
+def test_query_time_budget_defaults_on_in_cloud_mode(monkeypatch):
+    monkeypatch.delenv("GTS_QUERY_TIME_BUDGET_MS", raising=False)
+    assert cloud_runtime.query_time_budget_seconds() == 3.0
+
+    monkeypatch.setenv("GTS_QUERY_TIME_BUDGET_MS", "0")
+    assert cloud_runtime.query_time_budget_seconds() == 0
+
+    monkeypatch.setenv("GTS_CLOUD_MODE", "0")
+    monkeypatch.delenv("GTS_QUERY_TIME_BUDGET_MS")
+    assert cloud_runtime.query_time_budget_seconds() == 0
@@ -1,11 +1,23 @@
 """Tests for selected pure/internal logic in the controllers package."""
+import base64
+import json
 import sqlite3
+import threading
+import time
 
 import pytest
 
 import controllers.common as controllers
 
 
+def _wait_for(predicate, what: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail(f"timed out waiting for {what}")
+        time.sleep(0.001)
+
+
 def _patch_avatar_story_dependencies(
     monkeypatch,
     *,
@@ -49,6 +61,15 @@ def _patch_avatar_story_dependencies(
     )
 
 
+def _patch_query_text_hash_info(monkeypatch, factory):
+    monkeypatch.setattr(controllers, "queryTextHashInfo", factory)
+    monkeypatch.setattr(
+        controllers,
+        "queryTextHashInfoBatch",
+        lambda text_hashes, *args, **kwargs: [factory(text_hash, *args, **kwargs) for text_hash in text_hashes],
+    )
+
+
 class TestSearchCache:
     def test_translate_cache_varies_by_result_languages(self, monkeypatch):
         controllers.search_cache.clear()
@@ -87,6 +108,193 @@ class TestSearchCache:
         finally:
             controllers.search_cache.clear()
 
+    def test_search_cache_evicts_least_recently_used_within_namespace_limits(self):
+        from utils.cache import SearchCache
+
+        cache = SearchCache(max_size=2, namespace_limits={"languages": (1, 4096)})
+        cache.set(("a",), 1)
+        cache.set(("b",), 2)
+        assert cache.get(("a",)) == 1
+        cache.set(("c",), 3)
+        cache.set("languages", ["zh-cn"])
+
+        assert cache.get(("b",)) is None
+        assert cache.get(("a",)) == 1
+        assert cache.get("languages") == ["zh-cn"]
+        stats = cache.stats()["namespaces"]
+        assert stats["search"]["entries"] == 2
+        assert stats["search"]["evictions"] == 1
+        assert stats["search"]["hits"] == 2
+        assert stats["search"]["misses"] == 1
+        assert stats["languages"]["entries"] == 1
+
+    def test_search_cache_enforces_byte_budget_and_ttl(self, monkeypatch):
+        from utils import cache as cache_module
+
+        now = {"value": 100.0}
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now["value"])
+        cache = cache_module.SearchCache(expiration_minutes=1, namespace_limits={"search": (100, 2000)})
+        cache.set("search:big", "x" * 5000)
+        assert cache.get("search:big") is None
+
+        cache.set("search:one", "x" * 900)
+        cache.set("search:two", "y" * 900)
+        cache.set("search:three", "z" * 900)
+        assert cache.get("search:one") is None
+        assert cache.stats()["namespaces"]["search"]["bytes"] <= 2000
+
+        now["value"] += 61
+        assert cache.get("search:three") is None
+        assert cache.stats()["namespaces"]["search"]["expirations"] == 1
+
+    def test_data_generation_change_clears_search_and_count_caches(self, monkeypatch):
+        from utils.cache import SearchCache
+
+        cache = SearchCache()
+        assert cache.sync_generation(1) is False
+        cache.set(("q",), 1)
+        assert cache.sync_generation(1) is False
+        assert cache.get(("q",)) == 1
+        assert cache.sync_generation(2) is True
+        assert cache.get(("q",)) is None
+
+        calls = []
+        monkeypatch.setattr(
+            controllers.databaseHelper,
+            "countSubtitleFromKeyword",
+            lambda *args: calls.append(args) or len(calls),
+        )
+        controllers._count_subtitle_from_keyword_cached.cache_clear()
+        assert controllers._count_subtitle_from_keyword_cached("k", 1, None, None) == 1
+        assert controllers._count_subtitle_from_keyword_cached("k", 1, None, None) == 1
+        controllers._clear_data_generation_scoped_caches()
+        assert controllers._count_subtitle_from_keyword_cached("k", 1, None, None) == 2
+        controllers._count_subtitle_from_keyword_cached.cache_clear()
+
+    def test_results_computed_across_a_generation_change_are_not_cached(self, monkeypatch):
+        from utils.cache import SearchCache
+
+        cache = SearchCache()
+        cache.sync_generation(1)
+
+        def compute_across_flush():
+            cache.sync_generation(2)
+            return ["old"]
+
+        assert cache.get_or_compute(("q",), compute_across_flush) == ["old"]
+        assert cache.get(("q",)) is None
+        assert cache.get_or_compute(("q",), lambda: ["new"]) == ["new"]
+        assert cache.get(("q",)) == ["new"]
+
+        generation_state = dict(controllers.databaseHelper._DATA_GENERATION_STATE, applied=1)
+        monkeypatch.setattr(controllers.databaseHelper, "_DATA_GENERATION_STATE", generation_state)
+        calls = []
+
+        def count_across_flush(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                generation_state["applied"] = 2
+                controllers._clear_data_generation_scoped_caches()
+            return len(calls)
+
+        monkeypatch.setattr(controllers.databaseHelper, "countSubtitleFromKeyword", count_across_flush)
+        controllers._count_subtitle_from_keyword_cached.cache_clear()
+        try:
+            assert controllers._count_subtitle_from_keyword_cached("k", 1, None, None) == 1
+            assert controllers._count_subtitle_from_keyword_cached("k", 1, None, None) == 2
+            assert controllers._count_subtitle_from_keyword_cached("k", 1, None, None) == 2
+        finally:
+            controllers._count_subtitle_from_keyword_cached.cache_clear()
+
+    def test_concurrent_identical_misses_compute_once(self, monkeypatch):
+        from utils.cache import SearchCache
+
+        cache = SearchCache()
+        waiters = 4
+        release = threading.Event()
+        calls = []
+
+        def slow_compute():
+            calls.append(1)
+            release.wait(5)
+            return ["result"]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute(("q",), slow_compute)))
+            for _ in range(waiters)
+        ]
+        for thread in threads:
+            thread.start()
+        _wait_for(lambda: cache.stats()["coalesced"] >= waiters - 1, "search cache waiters to coalesce")
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert calls == [1]
+        assert results == [["result"]] * waiters
+        assert cache.get(("q",)) == ["result"]
+
+        count_calls = []
+        gate = threading.Event()
+
+        def slow_count(*args):
+            count_calls.append(args)
+            gate.wait(5)
+            return 7
+
+        monkeypatch.setattr(controllers.databaseHelper, "countSubtitleFromKeyword", slow_count)
+        controllers._count_subtitle_from_keyword_cached.cache_clear()
+        counts = []
+        count_threads = [
+            threading.Thread(
+                target=lambda: counts.append(controllers._count_subtitle_from_keyword_cached("k", 1, None, None))
+            )
+            for _ in range(waiters)
+        ]
+        for thread in count_threads:
+            thread.start()
+        flight = controllers._count_subtitle_from_keyword_cached.__wrapped__.flight
+        _wait_for(lambda: flight.coalesced >= waiters - 1, "keyword count waiters to coalesce")
+        gate.set()
+        for thread in count_threads:
+            thread.join(5)
+        controllers._count_subtitle_from_keyword_cached.cache_clear()
+
+        assert counts == [7] * waiters
+        assert len(count_calls) == 1
+
+
+# ---------------------------------------------------------------------------
+# keyword facets
+# ---------------------------------------------------------------------------
+
+class TestKeywordFacets:
+    def test_keyword_facets_fold_grouped_rows(self, monkeypatch):
+        controllers.search_cache.clear()
+        monkeypatch.setattr(controllers.databaseHelper, "getLangCodeMap", lambda: {1: "CHS"})
+        monkeypatch.setattr(
+            controllers.databaseHelper,
+            "countKeywordFacets",
+            lambda keyword, lang_code, lang_str, created, updated: [
+                ("textmap", "dialogue", 1, "OSRELWin5.0.0", 3),
+                ("textmap", None, 0, "OSRELWin5.1.0", 2),
+                ("readable", None, 0, None, 1),
+            ],
+        )
+        try:
+            facets = controllers.getKeywordFacets("风", 1)
+        finally:
+            controllers.search_cache.clear()
+
+        assert facets == {
+            "total": 6,
+            "sources": {"textmap": 5, "readable": 1, "subtitle": 0},
+            "sourceKinds": {"dialogue": 3, "unknown": 2},
+            "voice": {"with": 3, "without": 3},
+            "createdVersions": {"5.0": 3, "5.1": 2, "unknown": 1},
+        }
+
 
 # ---------------------------------------------------------------------------
 # source_type filter helpers
@@ -322,9 +530,8 @@ class TestSpeakerSourceQueries:
             lambda *args, **kwargs: 1,
         )
         monkeypatch.setattr(controllers.databaseHelper, "getCharterName", lambda avatar_id, lang_code: "琴")
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda *args, **kwargs: {"hash": 101, "translates": {"1": "早上好"}, "voicePaths": ["vo_101.wem"]},
         )
 
@@ -349,9 +556,8 @@ class TestSpeakerSourceQueries:
             lambda *args, **kwargs: 1,
         )
         monkeypatch.setattr(controllers.databaseHelper, "getCharterName", lambda avatar_id, lang_code: "琴")
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda *args, **kwargs: {"hash": 202, "translates": {"1": "故事内容"}, "voicePaths": []},
         )
 
@@ -398,9 +604,8 @@ class TestSpeakerSourceQueries:
             "_count_dialogue_by_talker_type_cached",
             lambda talker_type, *args, **kwargs: 1 if talker_type == matched_type else 0,
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda text_hash, *args, **kwargs: {"hash": text_hash, "translates": {"1": "测试对白"}, "voicePaths": []},
         )
 
@@ -534,9 +739,8 @@ class TestSearchResultSorting:
             "selectTextMapFromKeywordPaged",
             lambda *args, **kwargs: [(1, None, None, None), (2, None, None, None)],
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda text_hash, *args, **kwargs: {
                 "hash": text_hash,
                 "translates": {"4": "keyword"},
@@ -598,9 +802,8 @@ class TestSearchResultSorting:
                 for text_hash in all_hashes[kwargs.get("offset", args[3]):kwargs.get("offset", args[3]) + kwargs.get("limit", args[2])]
             ],
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda text_hash, *args, **kwargs: {
                 "hash": text_hash,
                 "translates": {"4": "keyword"},
@@ -658,9 +861,8 @@ class TestSearchResultSorting:
             "selectTextMapFromKeywordPaged",
             fake_select_textmap,
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda text_hash, *args, **kwargs: {
                 "hash": text_hash,
                 "translates": {"4": "keyword"},
@@ -795,6 +997,231 @@ class TestKnownPrimarySourceLookup:
             conn.close()
 
 
+# ---------------------------------------------------------------------------
+# batched text hash hydration
+# ---------------------------------------------------------------------------
+
+class TestQueryTextHashInfoBatch:
+    def test_batch_matches_per_hash_hydration(self, monkeypatch):
+        conn = sqlite3.connect(":memory:")
+        table_cache = dict(controllers.databaseHelper._CACHE["table"])
+        column_cache = dict(controllers.databaseHelper._CACHE["column"])
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE textMap (hash INTEGER, lang INTEGER, content TEXT);
+                CREATE TABLE dialogue (dialogueId INTEGER, textHash INTEGER);
+                CREATE TABLE voice (dialogueId INTEGER, voicePath TEXT);
+                CREATE TABLE fetters (voiceFileTextTextMapHash INTEGER, avatarId INTEGER, voiceFile INTEGER);
+                """
+            )
+            conn.executemany(
+                "INSERT INTO textMap(hash, lang, content) VALUES (?, ?, ?)",
+                [(1, 1, "甲"), (1, 4, "A"), (2, 1, "乙"), (3, 9, "only-other-lang")],
+            )
+            conn.execute("INSERT INTO dialogue(dialogueId, textHash) VALUES (10, 1)")
+            conn.execute("INSERT INTO voice(dialogueId, voicePath) VALUES (10, 'vo_1.wem')")
+
+            monkeypatch.setattr(controllers.databaseHelper, "conn", conn)
+            monkeypatch.setattr(controllers.databaseHelper, "_FETTER_VOICE_CHECKED", False)
+            monkeypatch.setattr(controllers.languagePackReader, "langPackages", {})
+            monkeypatch.setattr(controllers, "_normalize_text_map_content", lambda content, lang_code: content)
+            controllers.databaseHelper._CACHE["table"].clear()
+            controllers.databaseHelper._CACHE["column"].clear()
+
+            batch = controllers.queryTextHashInfoBatch([1, 2, 3], [1, 4], 1, queryOrigin=False)
+            single = [controllers.queryTextHashInfo(text_hash, [1, 4], 1, queryOrigin=False) for text_hash in [1, 2, 3]]
+
+            assert batch == single
+            assert [entry["hash"] for entry in batch] == [1, 2, 3]
+            assert batch[0]["translates"] == {"1": "甲", "4": "A"}
+            assert batch[0]["voicePaths"] == ["vo_1.wem"]
+            assert batch[2]["translates"] == {"9": "only-other-lang"}
+        finally:
+            controllers.databaseHelper._CACHE["table"].clear()
+            controllers.databaseHelper._CACHE["table"].update(table_cache)
+            controllers.databaseHelper._CACHE["column"].clear()
+            controllers.databaseHelper._CACHE["column"].update(column_cache)
+            conn.close()
+
+    def test_multi_lang_search_runs_in_parallel_and_hydrates_shared_hashes_once(self, monkeypatch):
+        fetched: list[list[int]] = []
+        threads: set[str] = set()
+        # 两种语言同时开始水合，查询有延迟，共享的 hash 仍只能查询一次
+        both_searching = threading.Barrier(2, timeout=5)
+
+        def fake_fetch(text_hashes, langs, source_lang_code, query_origin=True):
+            fetched.append(list(text_hashes))
+            time.sleep(0.05)
+            return [{"hash": text_hash, "translates": {}} for text_hash in text_hashes]
+
+        def fake_get_translate_obj(keyword, lang_code, speaker, **kwargs):
+            threads.add(threading.current_thread().name)
+            hashes = {1: [1, 2], 4: [2, 3]}[lang_code]
+            both_searching.wait()
+            contents = controllers.queryTextHashInfoBatch(hashes, [1, 4], 1, queryOrigin=False)
+            for entry in contents:
+                entry["searchLang"] = lang_code
+            return contents, len(contents)
+
+        monkeypatch.setattr(controllers, "_fetch_text_hash_info_batch", fake_fetch)
+        monkeypatch.setattr(controllers, "getTranslateObj", fake_get_translate_obj)
+
+        results = controllers.getTranslateObjMultiLang("风", [1, 4, 1])
+
+        assert [group["langCode"] for group in results] == [1, 4]
+        assert [[entry["hash"] for entry in group["contents"]] for group in results] == [[1, 2], [2, 3]]
+        # 共享 hash 的条目是副本，各语言补的字段互不影响
+        assert [entry["searchLang"] for entry in results[1]["contents"]] == [4, 4]
+        assert sorted(text_hash for batch in fetched for text_hash in batch) == [1, 2, 3]
+        assert all(name.startswith("multi-lang-search") for name in threads)
+        # 并行搜索结束后不再共享水合结果
+        assert controllers.queryTextHashInfoBatch([2], [1, 4], 1) == [{"hash": 2, "translates": {}}]
+        assert fetched[-1] == [2]
+
+
+# ---------------------------------------------------------------------------
+# cursor (seek) pagination
+# ---------------------------------------------------------------------------
+
+class TestCursorPagination:
+    def _patch_seek_sources(self, monkeypatch, textmap_keys, subtitle_keys):
+        def fake_seek(keys, make_row):
+            def select(keyword, lang_code, limit, after_key=None, *args):
+                return [make_row(key) for key in sorted(keys) if after_key is None or key > tuple(after_key)][:limit]
+            return select
+
+        monkeypatch.setattr(
+            controllers.databaseHelper,
+            "selectTextMapFromKeywordSeek",
+            fake_seek(textmap_keys, lambda key: (key[2], "keyword", None, None, *key)),
+        )
+        monkeypatch.setattr(
+            controllers.databaseHelper,
+            "selectSubtitleFromKeywordSeek",
+            fake_seek(subtitle_keys, lambda key: ("sub.srt", "keyword", 0.0, 1.0, key[2], None, None, *key)),
+        )
+        monkeypatch.setattr(controllers.databaseHelper, "getLangCodeMap", lambda: {})
+        monkeypatch.setattr(controllers.config, "getResultLanguages", lambda: [1])
+        monkeypatch.setattr(controllers.config, "getSourceLanguage", lambda: 1)
+        monkeypatch.setattr(controllers, "_build_lang_str_to_id_map", lambda: {})
+        monkeypatch.setattr(
+            controllers,
+            "_build_subtitle_obj",
+            lambda fileName, content, startTime, endTime, subtitleId, *args: {"subtitleId": subtitleId},
+        )
+        monkeypatch.setattr(controllers, "_mark_entries_with_known_primary_source", lambda entries: None)
+        monkeypatch.setattr(controllers, "_enrich_primary_sources", lambda entries, lang_code: None)
+        monkeypatch.setattr(
+            controllers,
+            "_count_textmap_from_keyword_cached",
+            lambda *args, **kwargs: len(textmap_keys),
+        )
+        monkeypatch.setattr(
+            controllers,
+            "_count_subtitle_from_keyword_cached",
+            lambda *args, **kwargs: len(subtitle_keys),
+        )
+        _patch_query_text_hash_info(
+            monkeypatch,
+            lambda text_hash, *args, **kwargs: {"hash": text_hash, "translates": {"1": "keyword"}},
+        )
+
+    def test_cursor_pages_merge_sources_without_overlap(self, monkeypatch):
+        controllers.search_cache.clear()
+        textmap_keys = [(0, 0, 10), (1, 0, 11), (1, 1, 12), (2, 1, 13)]
+        subtitle_keys = [(0, 1, 20), (1, 1, 21), (3, 1, 22)]
+        self._patch_seek_sources(monkeypatch, textmap_keys, subtitle_keys)
+
+        seen = []
+        cursor = None
+        while True:
+            contents, total, cursor = controllers.getTranslateObjByCursor("keyword", 1, cursor=cursor, page_size=3)
+            assert total == 7
+            seen.extend(entry.get("hash", entry.get("subtitleId")) for entry in contents)
+            if cursor is None:
+                break
+
+        assert seen == [10, 20, 11, 12, 21, 13, 22]
+
+    def test_cursor_rejects_tokens_from_other_queries(self, monkeypatch):
+        controllers.search_cache.clear()
+        self._patch_seek_sources(monkeypatch, [(0, 0, 10), (1, 0, 11)], [])
+
+        _contents, _total, cursor = controllers.getTranslateObjByCursor("keyword", 1, page_size=1)
+
+        assert cursor is not None
+        with pytest.raises(controllers.InvalidSearchCursorError):
+            controllers.getTranslateObjByCursor("other", 1, cursor=cursor, page_size=1)
+        with pytest.raises(controllers.InvalidSearchCursorError):
+            controllers.getTranslateObjByCursor("keyword", 1, cursor="not-a-cursor", page_size=1)
+
+    def test_cursor_keeps_position_of_sources_interrupted_by_budget(self, monkeypatch):
+        controllers.search_cache.clear()
+        textmap_keys = [(0, 0, 10), (1, 0, 11)]
+        subtitle_keys = [(0, 1, 20), (1, 1, 21)]
+        self._patch_seek_sources(monkeypatch, textmap_keys, subtitle_keys)
+        query_budget = controllers.query_budget
+
+        def interrupted_seek(*args):
+            query_budget.current_budget().record_interruption()
+            return []
+
+        def decode(cursor):
+            return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+        token = query_budget.begin(10)
+        try:
+            with monkeypatch.context() as patch:
+                patch.setattr(controllers.databaseHelper, "selectTextMapFromKeywordSeek", interrupted_seek)
+                contents, _total, cursor = controllers.getTranslateObjByCursor("keyword", 1, page_size=2)
+                assert [entry["subtitleId"] for entry in contents] == [20, 21]
+                assert decode(cursor)["k"]["textmap"] is None
+
+                patch.setattr(controllers.databaseHelper, "selectSubtitleFromKeywordSeek", interrupted_seek)
+                contents, _total, stalled_cursor = controllers.getTranslateObjByCursor(
+                    "keyword", 1, cursor=cursor, page_size=2
+                )
+                # 所有数据源都被中断时仍返回游标，位置不变
+                assert contents == []
+                assert decode(stalled_cursor)["k"] == decode(cursor)["k"]
+        finally:
+            query_budget.end(token)
+            controllers.search_cache.clear()
+
+        contents, _total, _cursor = controllers.getTranslateObjByCursor(
+            "keyword", 1, cursor=stalled_cursor, page_size=2
+        )
+        assert [entry["hash"] for entry in contents] == [10, 11]
+
+    @pytest.mark.parametrize(
+        "tamper",
+        [
+            {"k": None},
+            {"k": {"textmap": "1,0,10"}},
+            {"k": {"textmap": [1, 0]}},
+            {"k": {"textmap": [1, "0", 10]}},
+            {"k": {"unknown": None}},
+            {"n": "1"},
+            {"p": 0},
+            {"h": 1},
+        ],
+    )
+    def test_cursor_rejects_tokens_with_malformed_state(self, monkeypatch, tamper):
+        controllers.search_cache.clear()
+        self._patch_seek_sources(monkeypatch, [(0, 0, 10), (1, 0, 11)], [])
+
+        _contents, _total, cursor = controllers.getTranslateObjByCursor("keyword", 1, page_size=1)
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+        state.update(tamper)
+
+        with pytest.raises(controllers.InvalidSearchCursorError):
+            controllers.getTranslateObjByCursor(
+                "keyword", 1, cursor=controllers._encode_search_cursor(state), page_size=1
+            )
+
+
 # ---------------------------------------------------------------------------
 # paginate
 # ---------------------------------------------------------------------------
@@ -882,9 +1309,8 @@ class TestQuestDialogueVersions:
             "selectQuestDialoguesPaged",
             lambda quest_id, page_size, offset: [(123456, "NPC", 2001, 3001, 1001)],
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda *args, **kwargs: {
                 "hash": 123456,
                 "translates": {"1": "测试对白"},
@@ -928,9 +1354,8 @@ class TestQuestDialogueVersions:
                 "TALK_ROLE_MATE_AVATAR": "荧",
             }.get(talker_type),
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda text_hash, *args, **kwargs: {"hash": text_hash, "translates": {"1": f"对白{text_hash}"}},
         )
 
@@ -1270,9 +1695,8 @@ class TestEntityTexts:
             "_get_text_map_content_with_fallback",
             lambda text_hash, *args, **kwargs: title_map.get(text_hash),
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda *args, **kwargs: {"translates": {"1": "衣装介绍"}},
         )
         monkeypatch.setattr(controllers, "_collect_entity_readable_entries", lambda *args, **kwargs: [])
@@ -1314,9 +1738,8 @@ class TestEntityTexts:
             "_get_text_map_content_with_fallback",
             lambda text_hash, *args, **kwargs: title_map.get(text_hash),
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda *args, **kwargs: {"translates": {"1": "造成2点物理伤害。"}},
         )
         monkeypatch.setattr(controllers, "_collect_entity_readable_entries", lambda *args, **kwargs: [])
@@ -1437,9 +1860,8 @@ class TestEntityTexts:
                 2842036365: "「黄金」莱茵多特赠给阿贝多的礼物。",
             }.get(text_hash),
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda text_hash, langs, source_lang_code, queryOrigin=False: {"translates": {}, "hash": text_hash},
         )
         monkeypatch.setattr(
@@ -1781,6 +2203,39 @@ class TestEntitySourceFiltering:
         assert origin == "千星奇域: 有效实体"
         assert primary["detailQuery"]["entityId"] == 200
 
+    def test_select_primary_source_starts_at_precomputed_kind(self, monkeypatch):
+        monkeypatch.setattr(controllers.config, "getSourceLanguage", lambda: 1)
+        monkeypatch.setattr(
+            controllers.databaseHelper,
+            "selectPrimarySourceKinds",
+            lambda text_hashes: {501: "readable"},
+        )
+
+        def unexpected(*args, **kwargs):
+            raise AssertionError("skipped source lookup was called")
+
+        for name in ("getTalkInfo", "getSourceFromFetter", "selectQuestHashSources"):
+            monkeypatch.setattr(controllers.databaseHelper, name, unexpected)
+        monkeypatch.setattr(controllers, "_select_story_source_from_text_hash", unexpected)
+        monkeypatch.setattr(controllers, "_get_valid_entity_source_candidates", unexpected)
+        monkeypatch.setattr(
+            controllers.databaseHelper,
+            "getReadableInfoByTitleHash",
+            lambda text_hash: ("Book1.txt", text_hash, 11) if text_hash == 501 else unexpected(),
+        )
+        monkeypatch.setattr(controllers.databaseHelper, "selectReadableRefsByTitleHash", lambda text_hash: [("Book1.txt", 501, 11)])
+        monkeypatch.setattr(controllers, "_get_text_map_content_with_fallback", lambda text_hash, lang_code, langs: "书名")
+
+        primary, origin, is_talk, _ = controllers._select_primary_source_from_text_hash(501, 1)
+        assert primary["sourceType"] == "readable"
+        assert origin == "阅读物: 书名"
+        assert is_talk is False
+
+        # 表中没有的 hash 直接判定为未归类，不再逐个来源查询
+        primary, origin, _, source_count = controllers._select_primary_source_from_text_hash(999, 1)
+        assert primary["sourceType"] == "unknown"
+        assert source_count == 0
+
     def test_get_text_entity_sources_returns_only_valid_groups(self, monkeypatch):
         monkeypatch.setattr(controllers.config, "getResultLanguages", lambda: [1])
         monkeypatch.setattr(controllers.config, "getSourceLanguage", lambda: 1)
@@ -1811,9 +2266,8 @@ class TestEntitySourceFiltering:
             "_get_entity_title_with_fallback",
             lambda source_type, title_hash, lang_code, fallbacks: {5001: "空实体", 5002: "有效实体"}.get(title_hash),
         )
-        monkeypatch.setattr(
-            controllers,
-            "queryTextHashInfo",
+        _patch_query_text_hash_info(
+            monkeypatch,
             lambda text_hash, langs, source_lang_code, queryOrigin=False: {
                 "translates": {"1": f"文本-{text_hash}"},
                 "hash": text_hash,
@@ -4,6 +4,8 @@ import subprocess
 import sys
 import textwrap
 
+import pytest
+
 
 def test_database_helper_import_keeps_dbbuild_versioning_importable():
     repo_root = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir))
@@ -144,3 +146,452 @@ def test_get_talker_name_uses_display_names_for_special_roles(monkeypatch):
     databaseHelper._get_name_cache_bucket("mate_avatar").clear()
     monkeypatch.setattr(databaseHelper.config, "getIsMale", lambda: "both")
     assert databaseHelper.getTalkerName("TALK_ROLE_MATE_AVATAR", "", 1) == "{荧/空}"
+
+
+def test_connection_pool_gives_each_thread_its_own_read_only_connection(tmp_path, monkeypatch):
+    import threading
+
+    import databaseHelper
+
+    db_path = tmp_path / "pool.db"
+    setup = sqlite3.connect(str(db_path))
+    setup.execute("CREATE TABLE sample (id INTEGER PRIMARY KEY)")
+    setup.commit()
+    setup.close()
+    monkeypatch.setattr(databaseHelper.config, "get_db_path", lambda: db_path)
+
+    pool = databaseHelper._ConnectionPool(max_idle=2)
+    monkeypatch.setattr(databaseHelper, "conn", databaseHelper._PooledConnection(pool))
+    try:
+        main_reader = pool.reader()
+        assert pool.reader() is main_reader
+        assert main_reader.execute("PRAGMA query_only").fetchone()[0] == 1
+
+        seen: list[sqlite3.Connection] = []
+        worker = threading.Thread(target=lambda: seen.append(pool.reader()))
+        worker.start()
+        worker.join()
+        assert seen and seen[0] is not main_reader
+
+        # 线程结束后其读连接会被回收给下一个线程。
+        reused: list[sqlite3.Connection] = []
+        worker = threading.Thread(target=lambda: reused.append(pool.reader()))
+        worker.start()
+        worker.join()
+        assert reused[0] is seen[0]
+
+        with databaseHelper._write_cursor() as cursor:
+            cursor.execute("INSERT INTO sample(id) VALUES (1)")
+        with pytest.raises(sqlite3.OperationalError):
+            main_reader.execute("INSERT INTO sample(id) VALUES (2)")
+        assert main_reader.execute("SELECT COUNT(*) FROM sample").fetchone()[0] == 1
+    finally:
+        pool.close_all()
+
+
+def test_textmap_seek_pages_follow_rank_order_without_overlap(monkeypatch):
+    import databaseHelper
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE version_dim (
+            id INTEGER PRIMARY KEY,
+            raw_version TEXT NOT NULL,
+            version_tag TEXT,
+            version_sort_key INTEGER
+        );
+        CREATE TABLE textMap (
+            id INTEGER PRIMARY KEY,
+            hash INTEGER,
+            lang INTEGER,
+            content TEXT,
+            created_version_id INTEGER,
+            updated_version_id INTEGER
+        );
+        CREATE TABLE dialogue (dialogueId INTEGER, textHash INTEGER, talkId INTEGER, coopQuestId INTEGER);
+        CREATE TABLE voice (dialogueId INTEGER, voicePath TEXT);
+        CREATE TABLE fetters (voiceFileTextTextMapHash INTEGER, avatarId INTEGER, voiceFile INTEGER);
+        """
+    )
+    contents = ["风", "风起", "大风", "风", "微风吹", "无关", "风起地"]
+    connection.executemany(
+        "INSERT INTO textMap(hash, lang, content) VALUES (?, 1, ?)",
+        [(100 + index, content) for index, content in enumerate(contents)],
+    )
+    connection.execute("INSERT INTO dialogue(dialogueId, textHash) VALUES (1, 102)")
+    connection.execute("INSERT INTO voice(dialogueId, voicePath) VALUES (1, 'vo_102.wem')")
+
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setattr(databaseHelper, "_FETTER_VOICE_CHECKED", False)
+    monkeypatch.setattr(databaseHelper, "_is_textmap_fts_lang_enabled", lambda lang_code: False)
+    monkeypatch.setattr(databaseHelper, "_build_textmap_fts_match", lambda keyword, lang_code: None)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+
+    full = databaseHelper.selectTextMapFromKeywordSeek("风", 1, 100)
+    keys = [tuple(row[-3:]) for row in full]
+    assert keys == sorted(keys)
+    assert [row[0] for row in full][:2] == [100, 103]
+    assert 105 not in [row[0] for row in full]
+
+    paged = []
+    after_key = None
+    while True:
+        rows = databaseHelper.selectTextMapFromKeywordSeek("风", 1, 2, after_key)
+        paged.extend(rows)
+        if len(rows) < 2:
+            break
+        after_key = tuple(rows[-1][-3:])
+
+    assert [row[0] for row in paged] == [row[0] for row in full]
+    assert len({row[0] for row in paged}) == len(paged)
+
+    batches = list(databaseHelper.iterTextMapFromKeyword("风", 1, batch_size=2))
+    assert all(len(batch) <= 2 for batch in batches)
+    streamed = [row[0] for batch in batches for row in batch]
+    assert streamed == [row[0] for row in databaseHelper.selectTextMapFromKeywordPaged("风", 1, 100, 0)]
+
+
+def test_subtitle_keyword_search_uses_subtitle_fts_when_built(monkeypatch):
+    import databaseHelper
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE app_meta (k TEXT PRIMARY KEY, v TEXT);
+        INSERT INTO app_meta(k, v) VALUES ('subtitle_fts_langs', '1');
+        CREATE TABLE subtitle (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fileName TEXT,
+            lang INTEGER,
+            startTime REAL,
+            endTime REAL,
+            content TEXT,
+            subtitleId INTEGER,
+            created_version_id INTEGER,
+            updated_version_id INTEGER
+        );
+        CREATE VIRTUAL TABLE subtitle_fts USING fts5(
+            content, lang UNINDEXED, content='subtitle', content_rowid='id', tokenize='trigram'
+        );
+        """
+    )
+    connection.executemany(
+        "INSERT INTO subtitle(fileName, lang, startTime, endTime, content) VALUES (?, 1, ?, ?, ?)",
+        [
+            ("Cs_A", 0.0, 1.0, "蒙德的风起地"),
+            ("Cs_B", 1.0, 2.0, "又一次来到风起地"),
+            ("Cs_C", 2.0, 3.0, "无关内容"),
+        ],
+    )
+    connection.execute(
+        "INSERT INTO subtitle_fts(rowid, content, lang) SELECT id, content, lang FROM subtitle"
+    )
+
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setattr(databaseHelper.config, "getEnableTextMapFts", lambda: True)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    monkeypatch.setitem(
+        databaseHelper._CACHE,
+        "fts",
+        {"available": None, "tokenizer": "trigram", "langs": None, "readable_langs": None, "subtitle_langs": None},
+    )
+
+    rows = databaseHelper.selectSubtitleFromKeyword("风起地", 1)
+    assert sorted(row[0] for row in rows) == ["Cs_A", "Cs_B"]
+    assert databaseHelper.countSubtitleFromKeyword("风起地", 1) == 2
+    assert len(databaseHelper.selectSubtitleFromKeywordSeek("风起地", 1, 10)) == 2
+
+    # 命中必须来自全文索引：从索引里删掉一行后它不再出现
+    connection.execute(
+        "INSERT INTO subtitle_fts(subtitle_fts, rowid, content, lang) VALUES ('delete', 2, '又一次来到风起地', 1)"
+    )
+    rows = databaseHelper.selectSubtitleFromKeyword("风起地", 1)
+    assert [row[0] for row in rows] == ["Cs_A"]
+    assert databaseHelper.countSubtitleFromKeyword("风起地", 1) == 1
+
+
+def test_normalized_content_column_backs_match_ranking(monkeypatch):
+    import databaseHelper
+
+    dbbuild_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), os.pardir, "server", "dbBuild"))
+    monkeypatch.syspath_prepend(dbbuild_dir)
+    import versioning
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE textMap (id INTEGER PRIMARY KEY, hash INTEGER, lang INTEGER, content TEXT);
+        CREATE TABLE readable (id INTEGER PRIMARY KEY, fileName TEXT, lang TEXT, content TEXT);
+        INSERT INTO textMap(hash, lang, content) VALUES (1, 1, ' 风 起\t地 ');
+        """
+    )
+    monkeypatch.setattr(versioning, "conn", connection)
+    versioning._ensure_normalized_content_rules()
+
+    connection.execute("INSERT INTO textMap(hash, lang, content) VALUES (2, 4, ' Mond City ')")
+    connection.execute("INSERT INTO readable(fileName, lang, content) VALUES ('Book1.txt', 'CHS', '传 说')")
+    # 插入不经触发器逐行回写，导入结束后一次补算
+    assert connection.execute("SELECT normalized_content FROM textMap WHERE hash = 2").fetchone() == (None,)
+    assert versioning.backfill_normalized_content() == {"textMap": 1, "readable": 1}
+    assert connection.execute("SELECT hash, normalized_content FROM textMap ORDER BY hash").fetchall() == [
+        (1, "风起地"),
+        (2, "mond city"),
+    ]
+    assert connection.execute("SELECT normalized_content FROM readable").fetchone() == ("传说",)
+    connection.execute("UPDATE textMap SET content = '风 神' WHERE hash = 1")
+    assert connection.execute("SELECT normalized_content FROM textMap WHERE hash = 1").fetchone() == ("风神",)
+
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    sql, params = databaseHelper._build_match_sort_case("tm.content", "风神", 1, table="textMap")
+    assert "coalesce(tm.normalized_content," in sql
+    rank = connection.execute(f"SELECT {sql} FROM textMap tm WHERE hash = 1", params).fetchone()[0]
+    assert rank == 0
+
+
+def test_data_generation_bump_flushes_process_caches(tmp_path, monkeypatch):
+    import databaseHelper
+
+    db_path = tmp_path / "generation.db"
+    setup = sqlite3.connect(str(db_path))
+    setup.execute("CREATE TABLE app_meta (k TEXT PRIMARY KEY, v TEXT)")
+    setup.execute("INSERT INTO app_meta(k, v) VALUES ('db_generation', '3')")
+    setup.commit()
+    monkeypatch.setattr(databaseHelper.config, "get_db_path", lambda: db_path)
+
+    pool = databaseHelper._ConnectionPool(max_idle=2)
+    monkeypatch.setattr(databaseHelper, "conn", databaseHelper._PooledConnection(pool))
+    monkeypatch.setattr(
+        databaseHelper,
+        "_DATA_GENERATION_STATE",
+        {"generation": None, "applied": None, "data_versions": {}},
+    )
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {"stale": True})
+    flushed: list[int] = []
+    monkeypatch.setattr(databaseHelper, "_DATA_GENERATION_LISTENERS", [lambda: flushed.append(1)])
+    try:
+        assert databaseHelper.syncDataGeneration() == 3
+        # 首次同步只记录代数，不清空
+        assert databaseHelper._CACHE["table"] == {"stale": True}
+        assert databaseHelper.syncDataGeneration() == 3
+        assert flushed == []
+
+        # 模拟另一个进程中的 diffUpdate 收尾
+        setup.execute("UPDATE app_meta SET v='4' WHERE k='db_generation'")
+        setup.commit()
+        assert databaseHelper.syncDataGeneration() == 4
+        assert databaseHelper._CACHE["table"] == {}
+        assert flushed == [1]
+    finally:
+        setup.close()
+        pool.close_all()
+
+
+def test_lookups_spanning_a_generation_flush_do_not_repopulate_caches(monkeypatch):
+    import databaseHelper
+
+    for key in ("column", "table", "version", "names"):
+        monkeypatch.setitem(databaseHelper._CACHE, key, {})
+    monkeypatch.setattr(databaseHelper, "_RAW_CHARACTER_NAME_CACHE", {})
+    monkeypatch.setattr(databaseHelper, "_QUEST_STEP_TALK_MAP_CACHE", {})
+    monkeypatch.setattr(databaseHelper, "_normalize_output_text", lambda text, _lang: text)
+
+    def raw_name_read_before_flush(avatar_id, lang_code):
+        # 查询期间另一个请求同步到了新的数据代数
+        databaseHelper._flush_data_caches()
+        return "旧名字"
+
+    monkeypatch.setattr(databaseHelper, "getCharacterNameRaw", raw_name_read_before_flush)
+
+    assert databaseHelper.getCharterName(10000021, 1) == "旧名字"
+    assert databaseHelper._get_name_cache_bucket("characters") == {}
+
+
+def test_textmap_query_template_is_reused_across_keywords(monkeypatch):
+    import databaseHelper
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE version_dim (id INTEGER PRIMARY KEY, raw_version TEXT, version_tag TEXT);
+        INSERT INTO version_dim VALUES (1, 'OSRELWin5.0.0', '5.0'), (2, 'OSRELWin5.1.0', '5.1'), (3, 'CNRELWin5.1.0', '5.1');
+        CREATE TABLE textMap (
+            id INTEGER PRIMARY KEY,
+            hash INTEGER,
+            lang INTEGER,
+            content TEXT,
+            created_version_id INTEGER,
+            updated_version_id INTEGER
+        );
+        """
+    )
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    monkeypatch.setattr(databaseHelper, "_SQL_TEMPLATE_CACHE", {})
+
+    def build(keyword, created_version):
+        exact, fuzzy = databaseHelper._build_like_patterns(keyword, 1)
+        return databaseHelper._build_textmap_query(
+            use_fts=False,
+            keyword=keyword,
+            langCode=1,
+            exact=exact,
+            fuzzy=fuzzy,
+            fts_match=None,
+            voice_expr=None,
+            voice_filter=None,
+            created_version=created_version,
+            updated_version=None,
+            limit=10,
+            offset=0,
+        )
+
+    first_sql, first_params = build("风", "5.0")
+    second_sql, second_params = build("雷电", "5.1")
+    assert second_sql is first_sql
+    assert first_params != second_params
+    # 版本过滤先解析成 version_dim.id 集合，SQL 里不再按行关联 version_dim
+    assert "[2, 3]" in second_params
+    assert "created_version_id in (select value from json_each(?))" in first_sql
+    assert "version_tag" not in first_sql
+    assert build("风", None)[0] != first_sql
+
+    # 表结构变化（如旧库缺少版本列）会得到另一份模板
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    connection.execute("DROP TABLE version_dim")
+    assert build("风", "5.0")[0] != first_sql
+
+
+def test_preloaded_name_tables_answer_lookups_without_queries(monkeypatch):
+    import databaseHelper
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE avatar (avatarId INTEGER PRIMARY KEY, nameTextMapHash INTEGER);
+        CREATE TABLE npc (npcId INTEGER PRIMARY KEY, textHash INTEGER);
+        CREATE TABLE textMap (hash INTEGER, lang INTEGER, content TEXT);
+        INSERT INTO avatar VALUES (10000021, 1);
+        INSERT INTO npc VALUES (1001, 2), (1002, 3);
+        INSERT INTO textMap VALUES (1, 1, '安柏'), (1, 4, 'Amber'), (2, 1, '凯瑟琳'), (2, 4, 'Katheryne');
+        """
+    )
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "names", {})
+    monkeypatch.setattr(databaseHelper, "_RAW_CHARACTER_NAME_CACHE", {})
+
+    assert databaseHelper.preloadNameTables([1, 4, 1]) == {"avatar": 2, "npc": 2}
+
+    statements: list[str] = []
+    connection.set_trace_callback(statements.append)
+    assert databaseHelper.getCharacterNameRaw(10000021, 4) == "Amber"
+    assert databaseHelper.getCharacterNameRaw(10000099, 1) is None
+    assert databaseHelper.getTalkerName("TALK_ROLE_NPC", 1001, 1) == "凯瑟琳"
+    # 预加载里没有名字的 NPC 按原逻辑回退为 None
+    assert databaseHelper.getTalkerName("TALK_ROLE_NPC", 1002, 4) is None
+    assert statements == []
+
+    # 未预加载的语言仍走逐条查询
+    assert databaseHelper.getCharacterNameRaw(10000021, 2) is None
+    assert statements
+
+
+def test_keyword_facets_group_every_source_in_one_query(monkeypatch):
+    import databaseHelper
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE version_dim (id INTEGER PRIMARY KEY, raw_version TEXT, version_tag TEXT);
+        INSERT INTO version_dim VALUES (1, 'OSRELWin5.0.0', '5.0'), (2, 'OSRELWin5.1.0', '5.1');
+        CREATE TABLE textMap (
+            id INTEGER PRIMARY KEY, hash INTEGER, lang INTEGER, content TEXT,
+            created_version_id INTEGER, updated_version_id INTEGER
+        );
+        INSERT INTO textMap(hash, lang, content, created_version_id, updated_version_id) VALUES
+            (1, 1, '风起地', 1, 1), (2, 1, '风起地的树', 2, 2), (3, 1, '又见风起地', 2, 2), (4, 1, '无关', 1, 1);
+        CREATE TABLE text_primary_source (hash INTEGER PRIMARY KEY, source_kind TEXT, ref_id INTEGER, source_count INTEGER);
+        INSERT INTO text_primary_source VALUES (1, 'dialogue', 10, 1), (2, 'quest', 20, 1);
+        CREATE TABLE text_hash_voice (hash INTEGER PRIMARY KEY, has_voice INTEGER);
+        INSERT INTO text_hash_voice VALUES (1, 1);
+        CREATE TABLE subtitle (
+            id INTEGER PRIMARY KEY, fileName TEXT, lang INTEGER, startTime REAL, endTime REAL,
+            content TEXT, subtitleId INTEGER, created_version_id INTEGER, updated_version_id INTEGER
+        );
+        INSERT INTO subtitle(fileName, lang, content, created_version_id, updated_version_id)
+            VALUES ('Cs_A', 1, '风起地的风', 2, 2);
+        """
+    )
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setattr(databaseHelper, "_ensure_fetter_voice_data", lambda: None)
+    monkeypatch.setattr(databaseHelper, "_SQL_TEMPLATE_CACHE", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    monkeypatch.setitem(
+        databaseHelper._CACHE,
+        "fts",
+        {"available": None, "tokenizer": "trigram", "langs": None, "readable_langs": None, "subtitle_langs": None},
+    )
+
+    statements: list[str] = []
+    connection.set_trace_callback(statements.append)
+    rows = databaseHelper.countKeywordFacets("风起地", 1, None)
+    connection.set_trace_callback(None)
+
+    assert len([sql for sql in statements if "group by src" in sql]) == 1
+    assert sorted(rows, key=lambda row: (row[0], row[1] or "")) == [
+        ("subtitle", None, 0, "OSRELWin5.1.0", 1),
+        ("textmap", None, 0, "OSRELWin5.1.0", 1),
+        ("textmap", "dialogue", 1, "OSRELWin5.0.0", 1),
+        ("textmap", "quest", 0, "OSRELWin5.1.0", 1),
+    ]
+    filtered = databaseHelper.countKeywordFacets("风起地", 1, None, created_version="5.1")
+    assert sum(row[-1] for row in filtered) == 3
+
+
+def test_updated_version_filter_uses_resolved_id_sets(monkeypatch):
+    import databaseHelper
+
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE version_dim (id INTEGER PRIMARY KEY, raw_version TEXT, version_tag TEXT);
+        INSERT INTO version_dim VALUES (1, 'OSRELWin5.0.0', '5.0'), (2, 'OSRELWin5.1.0', '5.1'), (3, 'CNRELWin5.1.0', '5.1');
+        CREATE TABLE textMap (
+            id INTEGER PRIMARY KEY, hash INTEGER, lang INTEGER, content TEXT,
+            created_version_id INTEGER, updated_version_id INTEGER
+        );
+        INSERT INTO textMap(hash, lang, content, created_version_id, updated_version_id) VALUES
+            (1, 1, 'a', 1, 2), (2, 1, 'b', 2, 3), (3, 1, 'c', NULL, 3), (4, 1, 'd', 1, 1);
+        """
+    )
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "version", {})
+    monkeypatch.setattr(databaseHelper, "_SQL_TEMPLATE_CACHE", {})
+
+    def hashes(created_version, updated_version):
+        params: list = []
+        sql = databaseHelper._append_version_filter_clause(
+            "select tm.hash from textMap tm where 1=1 ",
+            params,
+            "tm",
+            created_version,
+            updated_version,
+            "textMap",
+        )
+        return [row[0] for row in connection.execute(sql + "order by tm.hash", params)]
+
+    assert hashes("5.0", None) == [1, 4]
+    # 创建与更新同属 5.1 的行不算“在 5.1 更新”
+    assert hashes(None, "5.1") == [1, 3]
+
+    connection.execute("INSERT INTO version_dim VALUES (4, 'OSRELWin5.0.5', '5.0')")
+    connection.execute("UPDATE textMap SET created_version_id = 4 WHERE hash = 4")
+    assert hashes("5.0", None) == [1, 4]
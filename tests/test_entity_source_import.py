@@ -13,6 +13,9 @@ if DBBUILD_DIR not in sys.path:
     sys.path.insert(0, DBBUILD_DIR)
 
 import entitySourceImport
+import textPrimarySourceImport
+import speakerNameImport
+import npcDialogueGroupImport
 import history_backfill
 import databaseHelper
 
@@ -1421,3 +1424,181 @@ def test_catalog_queries_prefer_entity_created_version_and_fallback_to_textmap(m
     connection.execute("UPDATE text_source_entity SET created_version_id=NULL")
     rows = databaseHelper.selectCatalogEntities("", 1)
     assert rows[0][5:7] == ("Version 2.0", "Version 3.0")
+
+
+def test_text_primary_source_follows_cascade_priority_and_refreshes_changed_hashes():
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE dialogue (dialogueId INTEGER, talkId INTEGER, textHash INTEGER);
+        CREATE TABLE fetters (avatarId INTEGER, voiceFileTextTextMapHash INTEGER);
+        CREATE TABLE quest_hash_map (questId INTEGER, hash INTEGER, source_type TEXT);
+        CREATE TABLE text_source_entity (
+            source_type_code INTEGER, entity_id INTEGER, text_hash INTEGER, title_hash INTEGER, extra INTEGER
+        );
+        CREATE TABLE readable (fileName TEXT, titleTextMapHash INTEGER, readableId INTEGER);
+        INSERT INTO dialogue VALUES (1, 7001, 100);
+        INSERT INTO fetters VALUES (10000003, 100);
+        INSERT INTO fetters VALUES (10000003, 200);
+        INSERT INTO quest_hash_map VALUES (3001, 300, 'title');
+        INSERT INTO quest_hash_map VALUES (3002, 300, 'desc');
+        INSERT INTO text_source_entity VALUES (5, 900, 401, 400, 0);
+        INSERT INTO readable VALUES ('Book1.txt', 500, 11);
+        """
+    )
+
+    textPrimarySourceImport.refresh_text_primary_source(connection=connection)
+    rows = connection.execute(
+        "SELECT hash, source_kind, ref_id, source_count FROM text_primary_source ORDER BY hash"
+    ).fetchall()
+    assert rows == [
+        (100, "dialogue", 7001, 1),
+        (200, "voice", 10000003, 1),
+        (300, "quest", 3001, 2),
+        (400, "entity", 900, 1),
+        (401, "entity", 900, 1),
+        (500, "readable", 11, 1),
+    ]
+
+    connection.execute("DELETE FROM dialogue")
+    connection.execute("DELETE FROM readable")
+    textPrimarySourceImport.refresh_text_primary_source(connection=connection, incremental=True)
+    rows = dict(connection.execute("SELECT hash, source_kind FROM text_primary_source").fetchall())
+    assert rows[100] == "voice"
+    assert 500 not in rows
+
+
+def test_speaker_name_index_matches_joined_speaker_queries(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE textMap (id INTEGER PRIMARY KEY, hash INTEGER, lang INTEGER, content TEXT, normalized_content TEXT);
+        CREATE TABLE npc (id INTEGER PRIMARY KEY, npcId INTEGER UNIQUE, textHash INTEGER);
+        CREATE TABLE avatar (id INTEGER PRIMARY KEY, avatarId INTEGER, nameTextMapHash INTEGER);
+        CREATE TABLE dialogue (
+            id INTEGER PRIMARY KEY, talkerType TEXT, talkerId INTEGER, talkId INTEGER,
+            textHash INTEGER, dialogueId INTEGER UNIQUE, coopQuestId INTEGER
+        );
+        CREATE TABLE fetters (fetterId INTEGER, avatarId INTEGER, voiceFileTextTextMapHash INTEGER, voiceFile INTEGER);
+        INSERT INTO npc(npcId, textHash) VALUES (1, 100), (2, 101);
+        INSERT INTO avatar(avatarId, nameTextMapHash) VALUES (10000021, 102);
+        INSERT INTO textMap(hash, lang, content, normalized_content) VALUES
+            (100, 1, '凯瑟琳', '凯瑟琳'), (101, 1, '凯亚', '凯亚'), (102, 1, '安柏', '安柏'),
+            (200, 1, '欢迎来到冒险家协会', NULL), (201, 1, '冒险家，你好', NULL), (202, 1, '侦察骑士安柏', NULL);
+        INSERT INTO dialogue(talkerType, talkerId, talkId, textHash, dialogueId) VALUES
+            ('TALK_ROLE_NPC', 1, 1, 200, 1), ('TALK_ROLE_NPC', 2, 1, 201, 2), ('TALK_ROLE_PLAYER', 1, 1, 201, 3);
+        INSERT INTO fetters(fetterId, avatarId, voiceFileTextTextMapHash, voiceFile) VALUES (1, 10000021, 202, 1);
+        """
+    )
+    monkeypatch.setattr(databaseHelper, "conn", conn)
+    monkeypatch.setattr(databaseHelper, "_SQL_TEMPLATE_CACHE", {})
+    databaseHelper._CACHE["table"].clear()
+    databaseHelper._CACHE["column"].clear()
+
+    def run_queries():
+        return (
+            databaseHelper.selectDialogueByTalkerKeyword("凯", 1),
+            databaseHelper.countDialogueByTalkerKeyword("凯", 1),
+            databaseHelper.selectDialogueByTalkerAndKeyword("凯瑟琳", "冒险家", 1),
+            databaseHelper.countDialogueByTalkerAndKeyword("凯瑟琳", "冒险家", 1),
+            databaseHelper.selectFetterBySpeakerKeyword("安柏", 1),
+            databaseHelper.countFetterBySpeakerKeyword("安柏", 1),
+        )
+
+    joined = run_queries()
+    assert speakerNameImport.refresh_speaker_name(connection=conn) == 3
+    databaseHelper._CACHE["table"].clear()
+
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    assert run_queries() == joined
+    conn.set_trace_callback(None)
+
+    assert joined[0] == [(201, "TALK_ROLE_NPC", 2, 2), (200, "TALK_ROLE_NPC", 1, 1)]
+    assert joined[4] == [(202, 10000021)]
+    assert statements and all("join npc" not in sql and "join avatar" not in sql for sql in statements)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT textHash FROM dialogue WHERE talkerType = 'TALK_ROLE_NPC' AND talkerId = 1"
+    ).fetchall()
+    assert any("dialogue_talkerType_talkerId_index" in row[-1] for row in plan)
+
+
+def test_npc_dialogue_group_table_matches_live_grouping(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE textMap (
+            id INTEGER PRIMARY KEY, hash INTEGER, lang INTEGER, content TEXT,
+            created_version_id INTEGER, updated_version_id INTEGER,
+            UNIQUE (lang, hash)
+        );
+        CREATE TABLE version_dim (id INTEGER PRIMARY KEY, raw_version TEXT, version_tag TEXT, version_sort_key INTEGER);
+        CREATE TABLE dialogue (
+            id INTEGER PRIMARY KEY, talkerType TEXT, talkerId INTEGER, talkId INTEGER,
+            textHash INTEGER, dialogueId INTEGER UNIQUE, coopQuestId INTEGER
+        );
+        CREATE TABLE questTalk (questId INTEGER, talkId INTEGER, coopQuestId INTEGER);
+        INSERT INTO version_dim(id, raw_version, version_tag, version_sort_key) VALUES
+            (1, '1.0', '1.0', 100), (2, '2.0', '2.0', 200), (3, '3.0', '3.0', 300);
+        INSERT INTO dialogue(talkerType, talkerId, talkId, textHash, dialogueId, coopQuestId) VALUES
+            ('TALK_ROLE_NPC', 1, 10, 101, 1001, NULL),
+            ('TALK_ROLE_PLAYER', 0, 10, 102, 1002, NULL),
+            ('TALK_ROLE_NPC', 2, 10, 103, 1003, NULL),
+            ('TALK_ROLE_NPC', 1, 20, 201, 2001, NULL),
+            ('TALK_ROLE_NPC', 1, 0, 301, 3001, NULL),
+            ('TALK_ROLE_NPC', 1, 0, 302, 3002, NULL),
+            ('TALK_ROLE_NPC', 2, 30, 401, 4001, 5),
+            ('TALK_ROLE_NPC', 2, 30, 402, 4002, 5);
+        INSERT INTO questTalk(questId, talkId, coopQuestId) VALUES (7, 20, NULL);
+        INSERT INTO textMap(hash, lang, content, created_version_id, updated_version_id) VALUES
+            (101, 1, 'a', 2, 3), (102, 1, 'b', 1, 2), (103, 1, 'c', 2, 2),
+            (201, 1, 'd', 1, 1), (301, 1, 'e', 3, 3), (302, 1, 'f', NULL, NULL),
+            (401, 1, 'g', 2, 2), (402, 1, 'h', 1, 3), (101, 4, 'A', 3, 3);
+        """
+    )
+    monkeypatch.setattr(databaseHelper, "conn", conn)
+    monkeypatch.setattr(databaseHelper.config, "getSourceLanguage", lambda: 1)
+    databaseHelper._CACHE["table"].clear()
+    databaseHelper._CACHE["column"].clear()
+
+    def run_queries():
+        return (
+            databaseHelper.getNpcNonTaskDialogueStats(1),
+            databaseHelper.countNpcNonTaskDialogueGroups(1),
+            databaseHelper.countNpcNonTaskDialogueGroupsForNpcIds([1, 2]),
+            databaseHelper.selectNpcNonTaskDialogueGroupPage(1, 10),
+            databaseHelper.selectNpcNonTaskDialogueGroupPageForNpcIds([1, 2], 2, 1),
+            databaseHelper.selectNpcNonTaskDialogueGroupSummaries(1),
+            databaseHelper.selectNpcNonTaskDialogueGroupSummariesForNpcIds([1, 2], created_version="2.0"),
+            databaseHelper.selectNpcNonTaskDialogueGroupSummariesForNpcIds([2], updated_version="3.0"),
+        )
+
+    live = run_queries()
+    assert npcDialogueGroupImport.refresh_npc_dialogue_group(connection=conn) == 10
+    databaseHelper._CACHE["table"].clear()
+
+    statements: list[str] = []
+    conn.set_trace_callback(statements.append)
+    assert run_queries() == live
+    conn.set_trace_callback(None)
+
+    assert live[0] == (3, 5)
+    assert live[5] == [
+        (10, None, None, 1001, 3, "1.0", "3.0"),
+        (0, None, 3001, 3001, 1, "3.0", "3.0"),
+        (0, None, 3002, 3002, 1, None, None),
+    ]
+    assert live[7] == [
+        (10, None, None, 1003, 3, "1.0", "3.0"),
+        (30, 5, None, 4001, 2, "1.0", "3.0"),
+    ]
+    assert all("questTalk" not in sql for sql in statements)
+
+    # 只重算改动的 talk，其余分组保持不变
+    conn.execute("UPDATE textMap SET created_version_id = 3 WHERE hash = 401")
+    conn.execute("DELETE FROM dialogue WHERE dialogueId = 4002")
+    assert npcDialogueGroupImport.refresh_npc_dialogue_group(connection=conn, talk_ids=[30]) == 10
+    assert databaseHelper.selectNpcNonTaskDialogueGroupSummaries(2) == [
+        (10, None, None, 1003, 3, "1.0", "3.0"),
+        (30, 5, None, 4001, 1, "3.0", "2.0"),
+    ]
@@ -107,6 +107,24 @@ class TestReplaceWithNames:
         )
         assert result == "{他/她}很强"
 
+    @patch("placeholderHandler.databaseHelper")
+    def test_mixed_placeholders_render_in_one_pass(self, mock_db):
+        mock_db.getManualTextMap.side_effect = lambda pid, lang: {
+            "INFO_MALE_PRONOUN_HE": "他",
+            "INFO_FEMALE_PRONOUN_SHE": "她",
+        }.get(pid)
+
+        text = (
+            "#嗯，{NICKNAME}{M#他们}{F#她们}今天也来了，"
+            "{PLAYERAVATAR#SEXPRO[INFO_MALE_PRONOUN_HE|INFO_FEMALE_PRONOUN_SHE]}和"
+            "{MATEAVATAR#SEXPRO[INFO_MALE_PRONOUN_HE|INFO_FEMALE_PRONOUN_SHE]}，"
+            "{REALNAME[ID(1)|HOSTONLY(true)]}与{REALNAME[ID(2)|HOSTONLY(true)]}"
+        )
+        result = placeholderHandler._replace_with_names(
+            text, playerIsMale=True, lang=1, wander_name="流浪者", traveller_name="空",
+        )
+        assert result == "嗯，空他们今天也来了，他和她，流浪者与小家伙"
+
 
 # ---------------------------------------------------------------------------
 # _normalize_special_name
@@ -136,13 +154,21 @@ class TestReplace:
         assert placeholderHandler.replace("", True, 1) == ""
 
     @patch("placeholderHandler.databaseHelper")
-    def test_replace_calls_db_for_character_names(self, mock_db):
-        mock_db.getCharacterNameRaw.return_value = None
+    def test_replace_resolves_character_names_once_per_language(self, mock_db, monkeypatch):
+        monkeypatch.setattr(placeholderHandler, "_SPECIAL_NAME_CACHE", {})
+        mock_db.getCharacterNameRaw.side_effect = lambda avatar_id, lang: {
+            placeholderHandler._WANDERER_AVATAR_ID: "流浪者",
+            placeholderHandler._TRAVELLER_AVATAR_ID: "旅行者",
+        }[avatar_id]
         mock_db.getManualTextMap.return_value = None
 
-        result = placeholderHandler.replace("普通文本", True, 1)
-        assert result == "普通文本"
-        # Should call getCharacterNameRaw for wanderer and traveller
+        assert placeholderHandler.replace("普通文本", True, 1) == "普通文本"
+        # 文本里没有名称占位符时不查名称
+        assert mock_db.getCharacterNameRaw.call_count == 0
+
+        assert placeholderHandler.replace("{NICKNAME}，早上好", True, 1) == "旅行者，早上好"
+        assert placeholderHandler.replace("{REALNAME[ID(1)|HOSTONLY(true)]}来了", True, 1) == "流浪者来了"
+        # Wanderer and traveller names are looked up once, then served from the cache
         assert mock_db.getCharacterNameRaw.call_count == 2
 
     @patch("placeholderHandler.databaseHelper")
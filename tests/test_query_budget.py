@@ -0,0 +1,132 @@
+"""Tests for the per-request query time budget."""
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import databaseHelper
+import controllers.common as controllers
+from utils import query_budget
+
+
+_SLOW_SQL = (
+    "with recursive n(i) as (select 1 union all select i + 1 from n where i < 50000000) "
+    "select count(*) from n"
+)
+
+
+@pytest.fixture()
+def budgeted_connection():
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    connection.set_progress_handler(query_budget.progress_handler, query_budget.PROGRESS_STEPS)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture()
+def expired_budget():
+    token = query_budget.begin(0.001)
+    query_budget.current_budget().deadline = 0
+    yield query_budget.current_budget()
+    query_budget.end(token)
+
+
+def test_budgeted_query_degrades_to_default_when_interrupted(budgeted_connection, expired_budget):
+    @databaseHelper._degrade_on_query_budget(list)
+    def slow_select():
+        return budgeted_connection.execute(_SLOW_SQL).fetchall()
+
+    assert slow_select() == []
+    assert expired_budget.truncated
+    assert query_budget.is_truncated()
+
+
+def test_unarmed_queries_ignore_an_expired_budget(budgeted_connection, expired_budget):
+    row = budgeted_connection.execute("select count(*) from (select 1 union all select 2)").fetchone()
+
+    assert row == (2,)
+    assert not expired_budget.truncated
+
+
+def test_budgeted_query_runs_normally_without_a_budget(budgeted_connection):
+    @databaseHelper._degrade_on_query_budget(int)
+    def count():
+        return budgeted_connection.execute("select 3").fetchone()[0]
+
+    assert query_budget.current_budget() is None
+    assert count() == 3
+
+
+def test_interrupted_fts_query_does_not_fall_back_to_like(budgeted_connection, expired_budget):
+    cursor = budgeted_connection.cursor()
+    with query_budget.armed():
+        with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+            databaseHelper._execute_with_fallback(cursor, _SLOW_SQL, [], "select 1", [])
+
+
+def test_degraded_keyword_count_is_not_cached(monkeypatch, expired_budget):
+    calls = []
+
+    def count_subtitles(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            expired_budget.record_interruption()
+            return 0
+        return 5
+
+    monkeypatch.setattr(controllers.databaseHelper, "countSubtitleFromKeyword", count_subtitles)
+    controllers._count_subtitle_from_keyword_cached.cache_clear()
+    try:
+        assert controllers._count_subtitle_from_keyword_cached("ab", 1, None, None) == 0
+        assert controllers._count_subtitle_from_keyword_cached("ab", 1, None, None) == 5
+        assert controllers._count_subtitle_from_keyword_cached("ab", 1, None, None) == 5
+    finally:
+        controllers._count_subtitle_from_keyword_cached.cache_clear()
+
+    assert len(calls) == 2
+
+
+def test_waiter_sharing_a_budget_degraded_leader_result_is_truncated():
+    from utils.cache import SearchCache
+
+    cache = SearchCache()
+    started = threading.Event()
+    release = threading.Event()
+    outcomes = {}
+
+    def degraded_compute():
+        started.set()
+        release.wait(5)
+        query_budget.current_budget().record_interruption()
+        return ([], 0)
+
+    def request(name):
+        token = query_budget.begin(10)
+        try:
+            value = cache.get_or_compute(
+                ("q",),
+                degraded_compute,
+                cacheable=controllers._result_is_complete,
+                on_shared_uncacheable=controllers._mark_shared_result_truncated,
+            )
+            outcomes[name] = (value, query_budget.is_truncated())
+        finally:
+            query_budget.end(token)
+
+    leader = threading.Thread(target=request, args=("leader",))
+    leader.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=request, args=("waiter",))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < 1:
+        if time.monotonic() > deadline:
+            pytest.fail("waiter never joined the leader's flight")
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+
+    assert outcomes == {"leader": (([], 0), True), "waiter": (([], 0), True)}
+    assert cache.get(("q",)) is None
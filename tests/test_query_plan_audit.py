@@ -0,0 +1,58 @@
+"""Tests for the EXPLAIN QUERY PLAN audit harness."""
+from utils import query_plan_audit
+
+
+def test_plan_findings_flags_large_table_scans_and_temp_order_by():
+    sql = (
+        "select tm.hash from textMap tm join dialogue d on d.textHash = tm.hash "
+        "join textMap_fts f on f.rowid = tm.rowid order by tm.content"
+    )
+    details = [
+        "SCAN tm",
+        "SEARCH d USING INDEX dialogue_textHash_index (textHash=?)",
+        "SCAN f VIRTUAL TABLE INDEX 0:M1",
+        "USE TEMP B-TREE FOR ORDER BY",
+    ]
+
+    assert query_plan_audit.plan_findings(sql, details) == ["SCAN textMap", "TEMP B-TREE FOR ORDER BY"]
+
+
+def test_plan_findings_ignores_index_searches_and_small_tables():
+    sql = "select l.codeName from langCode l join textMap tm on tm.lang = l.id where tm.hash = ?"
+    details = [
+        "SCAN l",
+        "SEARCH tm USING INDEX sqlite_autoindex_textMap_1 (hash=? AND lang=?)",
+        "USE TEMP B-TREE FOR DISTINCT",
+    ]
+
+    assert query_plan_audit.plan_findings(sql, details) == []
+
+
+def test_compare_with_snapshot_reports_only_new_findings():
+    results = {
+        "a": {"status": "ok", "plans": [], "findings": ["SCAN textMap", "TEMP B-TREE FOR ORDER BY"]},
+        "b": {"status": "ok", "plans": [], "findings": ["SCAN dialogue"]},
+        "c": {"status": "error: no such column", "plans": [], "findings": []},
+    }
+    snapshot = {"cases": {"a": {"findings": ["TEMP B-TREE FOR ORDER BY"], "plans": []}}}
+
+    assert query_plan_audit.compare_with_snapshot(results, snapshot) == {
+        "a": ["SCAN textMap"],
+        "b": ["SCAN dialogue"],
+    }
+
+
+def test_database_helper_query_plans_match_snapshot():
+    # 只比较归纳出的问题（全表扫描、临时排序等），不比较逐行计划文本，因此不依赖生成快照时的 SQLite 版本
+    snapshot = query_plan_audit.load_snapshot()
+    assert snapshot.get("cases"), "query plan snapshot is missing"
+
+    connection = query_plan_audit.build_fixture_connection()
+    try:
+        results = query_plan_audit.run_audit(connection)
+    finally:
+        connection.close()
+
+    errors = {name: result["status"] for name, result in results.items() if result["status"].startswith("error")}
+    assert errors == {}
+    assert query_plan_audit.compare_with_snapshot(results, snapshot) == {}
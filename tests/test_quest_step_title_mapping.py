@@ -12,6 +12,7 @@ if DBBUILD_DIR not in sys.path:
 
 import databaseHelper
 import questImport
+import questStepImport
 from genshin_data_core.access import FilesystemGameDataAccess
 from genshin_data_core.quest import (
     build_step_title_hash_by_talk_id,
@@ -375,6 +376,7 @@ def test_get_quest_step_title_map_merges_db_rows_with_quest_bin_fallback(monkeyp
         {},
     )
     monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
     monkeypatch.setattr(databaseHelper, "_QUEST_STEP_ROWS_BY_MAIN_ID", {})
     monkeypatch.setattr(
         databaseHelper,
@@ -418,6 +420,111 @@ def test_get_quest_step_title_map_merges_db_rows_with_quest_bin_fallback(monkeyp
     assert result[1000712] == "与温迪合奏"
 
 
+def test_get_quest_step_title_map_reads_imported_quest_step_tables(monkeypatch, tmp_path):
+    connection = sqlite3.connect(":memory:")
+    _create_textmap_and_quest_talk_tables(connection)
+    connection.executemany(
+        "INSERT INTO textMap(hash, content, lang) VALUES (?,?,?)",
+        [
+            (1108051172, "与温迪合奏", 1),
+            (1897459020, "与温迪一同循风前进", 1),
+            (2447604868, "击败出现的魔物", 1),
+            (419665676, "（test）与兰那罗对话$HIDDEN", 1),
+            (555, "", 1),
+            (777, "风与牧歌之城", 1),
+        ],
+    )
+    connection.executemany(
+        "INSERT INTO questTalk(questId, talkId, stepTitleTextMapHash, coopQuestId) VALUES (?,?,?,?)",
+        [
+            (10007, 1000702, None, 0),
+            (10007, 1000703, None, 0),
+            (10007, 1000712, 1108051172, 0),
+        ],
+    )
+    connection.execute("CREATE TABLE quest (questId INTEGER PRIMARY KEY, descTextMapHash INTEGER)")
+    connection.execute("INSERT INTO quest(questId, descTextMapHash) VALUES (10007, 777)")
+
+    quest_obj = {
+        "MEGJPCLADOG": [
+            {
+                "KKMJBEPGLGD": 1000702,
+                "AJGGCMPLKHK": 1897459020,
+                "DGINIFCGMGL": 1,
+                "POPHAFEBKIH": [
+                    {"AAHAKNIPEDM": [1000702, 0], "HAHEIAHBPEJ": "QUEST_CONTENT_FINISH_PLOT"}
+                ],
+            },
+            {
+                "KKMJBEPGLGD": 1000712,
+                "AJGGCMPLKHK": 2447604868,
+                "DGINIFCGMGL": 11,
+                "POPHAFEBKIH": [
+                    {"AAHAKNIPEDM": [1000712, 0], "HAHEIAHBPEJ": "QUEST_CONTENT_FINISH_PLOT"}
+                ],
+            },
+            {
+                "KKMJBEPGLGD": 1000703,
+                "AJGGCMPLKHK": 419665676,
+                "DGINIFCGMGL": 12,
+                "POPHAFEBKIH": [],
+            },
+        ],
+        "NFFIGDHFAJG": [
+            {"NFIEHACCECI": 1000703},
+        ],
+    }
+    quest_dir = tmp_path / "BinOutput" / "Quest"
+    quest_dir.mkdir(parents=True)
+    (quest_dir / "10007.json").write_text(json.dumps(quest_obj), encoding="utf-8")
+    (quest_dir / "10008.json").write_text(json.dumps({"NFIEHACCECI": 10008, "showType": "QUEST_HIDDEN"}), encoding="utf-8")
+    excel_dir = tmp_path / "ExcelBinOutput"
+    excel_dir.mkdir(parents=True)
+    # Excel 标题哈希在该语言下为空时，回退到 BinOutput 子任务上的哈希
+    (excel_dir / "QuestExcelConfigData.json").write_text(
+        json.dumps([{"mainId": 10007, "subId": 1000702, "order": 1, "stepDescTextMapHash": 555}]),
+        encoding="utf-8",
+    )
+    (excel_dir / "MainQuestExcelConfigData.json").write_text(
+        json.dumps([{"id": 10009, "showType": "QUEST_HIDDEN"}]),
+        encoding="utf-8",
+    )
+
+    assert questStepImport.refresh_quest_steps(connection=connection, data_path=str(tmp_path)) == 3
+    assert connection.execute("SELECT questId FROM quest_hidden ORDER BY questId").fetchall() == [(10008,), (10009,)]
+
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setattr(databaseHelper, "_normalize_output_text", lambda text, lang_code: text)
+    monkeypatch.setattr(databaseHelper, "countQuestDialogues", lambda quest_id: 0)
+
+    def _unexpected_game_data_read(*_args):
+        raise AssertionError("quest views should not read game data when quest_step tables exist")
+
+    monkeypatch.setattr(databaseHelper, "_get_quest_bin_output", _unexpected_game_data_read)
+    monkeypatch.setattr(databaseHelper, "_load_main_quest_rows_by_id", _unexpected_game_data_read)
+
+    result = databaseHelper.getQuestStepTitleMap(10007, 1)
+
+    assert result == {
+        1000702: "与温迪一同循风前进",
+        1000703: "（test）与兰那罗对话$HIDDEN",
+        1000712: "与温迪合奏",
+    }
+    assert databaseHelper.isHiddenQuestWithoutBody(10008)
+    assert databaseHelper.isHiddenQuestWithoutBody(10009)
+    assert not databaseHelper.isHiddenQuestWithoutBody(10007)
+    # 描述在该语言下缺失时直接返回空，不回退读取任务 Excel
+    assert databaseHelper.getQuestDescription(10007, 1) == "风与牧歌之城"
+    assert databaseHelper.getQuestDescription(10007, 4) == ""
+    assert databaseHelper.getQuestDescription(10008, 1) == ""
+
+    (quest_dir / "10007.json").unlink()
+    assert questStepImport.refresh_quest_steps(connection=connection, data_path=str(tmp_path), quest_ids=[10007]) == 0
+    assert databaseHelper.getQuestStepTitleMap(10007, 1) == {1000712: "与温迪合奏"}
+
+
 def test_backfill_quest_metadata_populates_finish_plot_step_title(monkeypatch, tmp_path):
     connection = sqlite3.connect(":memory:")
     _create_backfill_tables(connection)
@@ -206,3 +206,49 @@ def test_database_helper_uses_readable_meta_for_sql_category_filters(tmp_path, m
     assert [row[1] for row in item_rows] == [201140]
     assert [row[1] for row in readable_rows] == [201039]
     assert [row[3] for row in book_rows] == [200001]
+
+
+def test_readable_keyword_search_uses_readable_fts_when_built(tmp_path, monkeypatch):
+    connection = sqlite3.connect(":memory:")
+    _create_readable_tables(connection)
+    connection.executescript(
+        """
+        CREATE TABLE app_meta (k TEXT PRIMARY KEY, v TEXT);
+        INSERT INTO app_meta(k, v) VALUES ('readable_fts_langs', '1');
+        CREATE VIRTUAL TABLE readable_fts USING fts5(
+            content, lang UNINDEXED, content='readable', content_rowid='id', tokenize='trigram'
+        );
+        """
+    )
+    connection.executemany(
+        "INSERT INTO readable(fileName, lang, content) VALUES (?, ?, ?)",
+        [
+            ("Book1.txt", "CHS", "风起地的传说故事"),
+            ("Book2.txt", "CHS", "另一本传说故事集"),
+            ("Book3.txt", "CHS", "无关内容"),
+        ],
+    )
+    connection.execute(
+        "INSERT INTO readable_fts(rowid, content, lang) SELECT id, content, lang FROM readable"
+    )
+
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setattr(databaseHelper.config, "getEnableTextMapFts", lambda: True)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+    monkeypatch.setitem(
+        databaseHelper._CACHE,
+        "fts",
+        {"available": None, "tokenizer": "trigram", "langs": None, "readable_langs": None},
+    )
+
+    rows = databaseHelper.selectReadableFromKeyword("传说故事", 1, "CHS")
+    assert sorted(row[0] for row in rows) == ["Book1.txt", "Book2.txt"]
+    assert databaseHelper.countReadableFromKeyword("传说故事", 1, "CHS") == 2
+
+    # 命中必须来自全文索引：从索引里删掉一行后它不再出现
+    connection.execute(
+        "INSERT INTO readable_fts(readable_fts, rowid, content, lang) VALUES ('delete', 2, '另一本传说故事集', 'CHS')"
+    )
+    rows = databaseHelper.selectReadableFromKeyword("传说故事", 1, "CHS")
+    assert [row[0] for row in rows] == ["Book1.txt"]
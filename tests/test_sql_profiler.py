@@ -0,0 +1,76 @@
+"""Tests for the opt-in SQL profiler."""
+import sqlite3
+
+import pytest
+
+from utils import sql_profiler as sql_profiler_module
+from utils.sql_profiler import ProfiledConnection, SqlProfiler, normalize_sql, param_shape
+
+
+@pytest.fixture()
+def profiler(monkeypatch):
+    profiler = SqlProfiler(max_slow_statements=2, max_recent_requests=3)
+    monkeypatch.setattr(sql_profiler_module, "sql_profiler", profiler)
+    return profiler
+
+
+def test_normalize_sql_folds_literals_and_placeholder_lists():
+    sql = """
+        select t1.hash from textMap t1
+        where t1.lang = 1 and t1.content like 'a''b%' and t1.hash in (?, ?, ?)
+    """
+
+    assert normalize_sql(sql) == (
+        "select t1.hash from textMap t1 where t1.lang = ? and t1.content like ? and t1.hash in (?...)"
+    )
+
+
+def test_param_shape_keeps_types_not_values():
+    assert param_shape((1, "abc", None, 1.5)) == "(int, str[3], null, float)"
+    assert param_shape({"lang": 1}) == "{lang: int}"
+    assert param_shape(("x" * 40,)) == "(str[32+])"
+
+
+def test_profiled_connection_attributes_statements_to_request(profiler):
+    connection = sqlite3.connect(":memory:", factory=ProfiledConnection)
+    connection.execute("create table t(id integer primary key, name text)")
+    connection.executemany("insert into t(name) values (?)", [("a",), ("b",), ("c",)])
+    profiler.reset()
+
+    token = profiler.begin_request("GET", "/api/keywordQuery")
+    assert connection.execute("select name from t where id = ?", (2,)).fetchone() == ("b",)
+    cursor = connection.cursor()
+    assert [row[0] for row in cursor.execute("select name from t order by id")] == ["a", "b", "c"]
+    cursor.close()
+    summary = profiler.end_request(token)
+    connection.close()
+
+    assert summary["path"] == "/api/keywordQuery"
+    assert summary["statements"] == 2
+    assert summary["executions"] == 2
+    snapshot = profiler.snapshot()
+    assert snapshot["recentRequests"][0]["path"] == "/api/keywordQuery"
+    statements = {entry["sql"]: entry for entry in snapshot["slowestStatements"]}
+    assert set(statements) == {"select name from t where id = ?", "select name from t order by id"}
+    assert statements["select name from t where id = ?"]["paramShape"] == "(int)"
+    assert statements["select name from t order by id"]["path"] == "/api/keywordQuery"
+
+
+def test_slowest_statements_keep_only_the_slowest_entries(profiler):
+    profiler.record("select 1 from a where x = 5", (1,), 0.001)
+    profiler.record("select 1 from b", (), 0.003)
+    profiler.record("select 1 from a where x = 9", ("long",), 0.004)
+    profiler.record("select 1 from c", (), 0.002)
+
+    snapshot = profiler.snapshot()
+    assert [entry["sql"] for entry in snapshot["slowestStatements"]] == [
+        "select ? from a where x = ?",
+        "select ? from b",
+    ]
+    first = snapshot["slowestStatements"][0]
+    assert first["count"] == 2
+    assert first["maxMs"] == 4.0
+    assert first["paramShape"] == "(str[4])"
+
+    profiler.reset()
+    assert profiler.snapshot()["slowestStatements"] == []
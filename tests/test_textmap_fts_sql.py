@@ -10,6 +10,13 @@ if DBBUILD_DIR not in sys.path:
     sys.path.insert(0, DBBUILD_DIR)
 
 from textmap_fts_sql import (  # noqa: E402
+    build_readable_fts_ad_trigger_sql,
+    build_readable_fts_ai_trigger_sql,
+    build_readable_fts_au_trigger_sql,
+    build_readable_fts_table_sql,
+    build_subtitle_fts_delete_sql,
+    build_subtitle_fts_insert_sql,
+    build_subtitle_fts_table_sql,
     build_textmap_fts_ad_trigger_sql,
     build_textmap_fts_ai_trigger_sql,
     build_textmap_fts_au_trigger_sql,
@@ -73,3 +80,75 @@ def test_fts_languages_still_round_trip_through_index(tmp_path):
     conn.commit()
     assert cur.execute("SELECT COUNT(*) FROM textMap_fts").fetchone()[0] == 0
     conn.close()
+
+
+def test_readable_fts_triggers_follow_text_lang_guard(tmp_path):
+    conn = sqlite3.connect(tmp_path / "readable-fts.db")
+    conn.create_function("gts_fts_content", 2, lambda _lang, content: str(content or ""))
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE readable(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fileName TEXT,
+            lang TEXT,
+            content TEXT
+        )
+        """
+    )
+    langs_sql = "'CHS','EN'"
+    cur.execute(build_readable_fts_table_sql("unicode61", "full", 0))
+    cur.execute(build_readable_fts_ai_trigger_sql(langs_sql))
+    cur.execute(build_readable_fts_ad_trigger_sql(langs_sql))
+    cur.execute(build_readable_fts_au_trigger_sql(langs_sql))
+
+    cur.execute("INSERT INTO readable(fileName, lang, content) VALUES (?,?,?)", ("Book1.txt", "EN", "old book"))
+    cur.execute("INSERT INTO readable(fileName, lang, content) VALUES (?,?,?)", ("Book1.txt", "JP", "old book"))
+    conn.commit()
+    assert cur.execute("SELECT rowid, lang FROM readable_fts WHERE readable_fts MATCH 'old'").fetchall() == [(1, "EN")]
+
+    cur.execute("UPDATE readable SET content=? WHERE lang=?", ("new book", "EN"))
+    conn.commit()
+    assert cur.execute("SELECT rowid FROM readable_fts WHERE readable_fts MATCH 'new'").fetchall() == [(1,)]
+    assert cur.execute("SELECT rowid FROM readable_fts WHERE readable_fts MATCH 'old'").fetchall() == []
+
+    cur.execute("DELETE FROM readable")
+    conn.commit()
+    assert cur.execute("SELECT rowid FROM readable_fts WHERE readable_fts MATCH 'book'").fetchall() == []
+    conn.close()
+
+
+def test_subtitle_fts_file_maintenance_follows_lang_guard(tmp_path):
+    conn = sqlite3.connect(tmp_path / "subtitle-fts.db")
+    conn.create_function("gts_fts_content", 2, lambda _lang, content: str(content or ""))
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE subtitle(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fileName TEXT,
+            lang INTEGER,
+            content TEXT
+        )
+        """
+    )
+    langs_sql = "1,4"
+    cur.execute(build_subtitle_fts_table_sql("unicode61", "full", 0))
+    cur.executemany(
+        "INSERT INTO subtitle(fileName, lang, content) VALUES (?,?,?)",
+        [("Cs_A", 4, "old line"), ("Cs_A", 9, "old line"), ("Cs_B", 4, "other line")],
+    )
+    cur.execute(build_subtitle_fts_insert_sql(langs_sql))
+    conn.commit()
+    assert cur.execute("SELECT rowid FROM subtitle_fts WHERE subtitle_fts MATCH 'old'").fetchall() == [(1,)]
+
+    # 与 importSubtitlesByFiles 一致：改写前按文件删索引，改写后按文件补索引
+    file_where = "fileName=? AND lang=?"
+    cur.execute(build_subtitle_fts_delete_sql(langs_sql, file_where), ("Cs_A", 4))
+    cur.execute("UPDATE subtitle SET content=? WHERE fileName=? AND lang=?", ("new line", "Cs_A", 4))
+    cur.execute(build_subtitle_fts_insert_sql(langs_sql, file_where), ("Cs_A", 4))
+    conn.commit()
+    assert cur.execute("SELECT rowid FROM subtitle_fts WHERE subtitle_fts MATCH 'new'").fetchall() == [(1,)]
+    assert cur.execute("SELECT rowid FROM subtitle_fts WHERE subtitle_fts MATCH 'old'").fetchall() == []
+    assert cur.execute("SELECT rowid FROM subtitle_fts WHERE subtitle_fts MATCH 'other'").fetchall() == [(3,)]
+    conn.close()
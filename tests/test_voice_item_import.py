@@ -1,5 +1,7 @@
 """Regression tests for voice item schema parsing."""
+import json
 import os
+import sqlite3
 import sys
 
 
@@ -10,6 +12,7 @@ if DBBUILD_DIR not in sys.path:
     sys.path.insert(0, DBBUILD_DIR)
 
 import databaseHelper
+import textHashVoiceImport
 import voiceItemImport
 
 
@@ -41,15 +44,84 @@ def test_dbbuild_extract_fetter_voice_rows_supports_latest_schema(monkeypatch):
     ]
 
 
-def test_runtime_extract_fetter_voice_rows_supports_latest_schema(monkeypatch):
-    monkeypatch.setattr(
-        databaseHelper,
-        "_load_fetter_avatar_mappings",
-        lambda: {"switch_zibai": 10000126},
+def test_refresh_fetter_voice_writes_rows_and_build_marker(monkeypatch, tmp_path):
+    items_dir = tmp_path / "BinOutput" / "Voice" / "Items"
+    items_dir.mkdir(parents=True)
+    (items_dir / "Fetter.json").write_text(json.dumps({"1": _latest_fetter_content()}), encoding="utf-8")
+    connection = sqlite3.connect(":memory:")
+    monkeypatch.setattr(voiceItemImport, "conn", connection)
+    monkeypatch.setattr(voiceItemImport, "DATA_PATH", str(tmp_path))
+    monkeypatch.setattr(voiceItemImport, "avatarMappings", {"switch_zibai": 10000126})
+
+    assert not voiceItemImport.fetter_voice_built()
+    assert voiceItemImport.refresh_fetter_voice() == 1
+    assert voiceItemImport.fetter_voice_built()
+    assert connection.execute("SELECT avatarId, voiceFile, voicePath FROM fetterVoice").fetchall() == [
+        (10000126, 710001, "VO_friendship\\VO_zibai\\vo_zibai_redeem_01.wem")
+    ]
+
+
+def test_runtime_fetter_voice_check_only_reads_the_build_marker(monkeypatch):
+    connection = sqlite3.connect(":memory:")
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setattr(databaseHelper, "_FETTER_VOICE_CHECKED", False)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+
+    # 旧库既无标记也无表：只补建空表，不解析语音数据
+    databaseHelper._ensure_fetter_voice_data()
+    assert databaseHelper._table_exists("fetterVoice")
+    assert connection.execute("SELECT COUNT(*) FROM fetterVoice").fetchone() == (0,)
+
+    connection.execute("CREATE TABLE app_meta (k TEXT PRIMARY KEY, v TEXT)")
+    connection.execute("INSERT INTO app_meta(k, v) VALUES ('fetter_voice_built', '1')")
+    statements: list[str] = []
+    connection.set_trace_callback(statements.append)
+    databaseHelper._ensure_fetter_voice_data()
+    assert statements == []
+
+    # 数据代数变化（_flush_data_caches）后重新检查一次，仍只读标记
+    monkeypatch.setattr(databaseHelper, "_FETTER_VOICE_CHECKED", False)
+    databaseHelper._ensure_fetter_voice_data()
+    assert statements and all(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+
+
+def test_text_hash_voice_refresh_backs_runtime_voice_lookup(monkeypatch):
+    connection = sqlite3.connect(":memory:")
+    connection.executescript(
+        """
+        CREATE TABLE dialogue (dialogueId INTEGER, textHash INTEGER);
+        CREATE TABLE voice (dialogueId INTEGER, voicePath TEXT);
+        CREATE TABLE fetters (voiceFileTextTextMapHash INTEGER, avatarId INTEGER, voiceFile INTEGER);
+        CREATE TABLE fetterVoice (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            avatarId INTEGER NOT NULL,
+            voiceFile INTEGER NOT NULL,
+            voicePath TEXT NOT NULL
+        );
+        """
+    )
+    connection.executemany(
+        "INSERT INTO dialogue(dialogueId, textHash) VALUES (?, ?)",
+        [(1, 100), (2, 100), (3, 200)],
     )
+    connection.executemany("INSERT INTO voice(dialogueId, voicePath) VALUES (?, ?)", [(1, "a.wem"), (2, "b.wem")])
+    connection.executemany(
+        "INSERT INTO fetters(voiceFileTextTextMapHash, avatarId, voiceFile) VALUES (?, ?, ?)",
+        [(300, 10000002, 7), (400, 10000002, 8)],
+    )
+    connection.execute("INSERT INTO fetterVoice(avatarId, voiceFile, voicePath) VALUES (10000002, 7, 'c.wem')")
 
-    rows = databaseHelper._extract_fetter_voice_rows(_latest_fetter_content())
+    assert textHashVoiceImport.refresh_text_hash_voice(connection=connection) == 2
+    assert sorted(row[0] for row in connection.execute("SELECT hash FROM text_hash_voice")) == [100, 300]
 
-    assert rows == [
-        (10000126, 710001, "VO_friendship\\VO_zibai\\vo_zibai_redeem_01.wem")
+    monkeypatch.setattr(databaseHelper, "conn", connection)
+    monkeypatch.setitem(databaseHelper._CACHE, "table", {})
+    monkeypatch.setitem(databaseHelper._CACHE, "column", {})
+
+    assert "text_hash_voice" in databaseHelper._voice_order_expr("tm.hash")
+    assert [databaseHelper.hasVoiceForTextHashDb(text_hash) for text_hash in (100, 200, 300, 400)] == [
+        True,
+        False,
+        True,
+        False,
     ]